@@ -128,6 +128,31 @@ api_router.include_router(
     responses={404: {"description": "Not found"}},
 )
 
+@api_router.get("/metrics/latency")
+async def get_stage_latency(current_token: dict = Depends(JWTCookieBearer())):
+    """p50/p95/p99 latency per request stage for this worker"""
+    from app.core.tracing import stage_latency
+    return {"success": True, "stages": stage_latency.report()}
+
+
+@api_router.get("/metrics/compute")
+async def get_compute_metrics(current_token: dict = Depends(JWTCookieBearer())):
+    """Queue depth, per-tenant slots and queue wait for the DuckDB and parsing pools"""
+    from app.core.compute_executor import compute_executor
+    return {"success": True, "pools": compute_executor.get_stats()}
+
+
+@api_router.get("/metrics/profiles/{trace_id}")
+async def get_request_profile(trace_id: str, current_token: dict = Depends(JWTCookieBearer())):
+    """Sampled stack profile captured for a request sent with X-Aiser-Profile: 1"""
+    from fastapi import HTTPException
+    from app.core.tracing import profile_store
+    profile = profile_store.get(trace_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {"success": True, "trace_id": trace_id, "profile": profile}
+
+
 # Debug endpoints (development only)
 api_router.include_router(router=debug_router, prefix="/debug", tags=["debug"])
 
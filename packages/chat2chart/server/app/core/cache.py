@@ -1,3 +1,5 @@
+import asyncio
+import fnmatch
 import hashlib
 import json
 import logging
@@ -5,9 +7,67 @@ import time
 from typing import Any, Dict, List, Optional, Union
 
 import redis
+import redis.asyncio as aioredis
+
+try:
+    import msgpack
+except Exception:
+    msgpack = None
+
+try:
+    import zstandard
+except Exception:
+    zstandard = None
 
 logger = logging.getLogger(__name__)
 
+# Leading marker bytes for values written by AsyncRedisCache. Values without a
+# marker are plain JSON as written by the sync RedisCache. The sync client
+# decodes responses as text and cannot read these, so AsyncRedisCache keeps its
+# entries under their own key prefix.
+_MARKER_MSGPACK = b"\x01"
+_MARKER_ZSTD_MSGPACK = b"\x02"
+_MARKER_ZSTD_JSON = b"\x03"
+
+_SCAN_BATCH = 500
+_TAG_KEY_PREFIX = "cachetag:"
+_ASYNC_KEY_PREFIX = "acache:"
+
+
+def encode_value(value: Any, compress_min_bytes: int = 1024) -> bytes:
+    """Serialize a cache value (msgpack when available, zstd above the threshold)"""
+    if msgpack is not None:
+        payload = msgpack.packb(value, default=str, use_bin_type=True)
+        marker, compressed_marker = _MARKER_MSGPACK, _MARKER_ZSTD_MSGPACK
+    else:
+        payload = json.dumps(value, default=str).encode("utf-8")
+        marker, compressed_marker = b"", _MARKER_ZSTD_JSON
+
+    if zstandard is not None and compress_min_bytes and len(payload) >= compress_min_bytes:
+        return compressed_marker + zstandard.ZstdCompressor(level=3).compress(payload)
+    return marker + payload
+
+
+def decode_value(raw: Union[bytes, str, None]) -> Any:
+    """Inverse of encode_value; also accepts plain JSON written by the sync client"""
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        return json.loads(raw)
+    marker = raw[:1]
+    if marker == _MARKER_MSGPACK:
+        return msgpack.unpackb(raw[1:], raw=False)
+    if marker == _MARKER_ZSTD_MSGPACK:
+        return msgpack.unpackb(zstandard.ZstdDecompressor().decompress(raw[1:]), raw=False)
+    if marker == _MARKER_ZSTD_JSON:
+        return json.loads(zstandard.ZstdDecompressor().decompress(raw[1:]))
+    return json.loads(raw)
+
+
+def _fallback_match(pattern: str, key: str) -> bool:
+    """Match fallback keys against a Redis glob pattern (substring kept for older callers)"""
+    return pattern in key or fnmatch.fnmatchcase(key, pattern)
+
 class RedisCache:
     """Redis-based cache with fallback to in-memory cache"""
     
@@ -72,10 +132,9 @@ class RedisCache:
         try:
             if self.redis_client:
                 # Clear all keys starting with ai_response:
-                keys = self.redis_client.keys("ai_response:*")
-                if keys:
-                    self.redis_client.delete(*keys)
-                    logger.info(f"🧹 Cleared {len(keys)} AI cache entries from Redis")
+                cleared = self._delete_matching("ai_response:*")
+                if cleared:
+                    logger.info(f"🧹 Cleared {cleared} AI cache entries from Redis")
             
             # Clear fallback cache
             ai_keys = [k for k in self.fallback_cache.keys() if k.startswith("ai_response:")]
@@ -88,6 +147,19 @@ class RedisCache:
         except Exception as e:
             logger.error(f"Error clearing AI cache: {e}")
 
+    def _delete_matching(self, pattern: str) -> int:
+        """Delete Redis keys matching pattern using incremental SCAN (never blocking KEYS)"""
+        deleted = 0
+        batch: List[str] = []
+        for key in self.redis_client.scan_iter(match=pattern, count=_SCAN_BATCH):
+            batch.append(key)
+            if len(batch) >= _SCAN_BATCH:
+                deleted += self.redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += self.redis_client.unlink(*batch)
+        return deleted
+
     def _generate_key(self, prefix: str, identifier: str) -> str:
         """Generate consistent cache key"""
         key_string = f"{prefix}:{identifier}"
@@ -259,7 +331,21 @@ class RedisCache:
             return False
     
     def get_many(self, keys: List[str]) -> Dict[str, Any]:
-        """Get multiple values at once"""
+        """Get multiple values at once (single MGET round trip)"""
+        if not keys:
+            return {}
+        if self.redis_client:
+            try:
+                result = {}
+                for key, raw in zip(keys, self.redis_client.mget(keys)):
+                    if raw is not None:
+                        result[key] = json.loads(raw)
+                self.cache_stats['hits'] += len(result)
+                self.cache_stats['misses'] += len(keys) - len(result)
+                return result
+            except Exception as e:
+                logger.error(f"Cache get_many error: {e}")
+                self.cache_stats['errors'] += 1
         result = {}
         for key in keys:
             value = self.get(key)
@@ -268,7 +354,20 @@ class RedisCache:
         return result
     
     def set_many(self, data: Dict[str, Any], ttl: Optional[int] = None) -> bool:
-        """Set multiple values at once"""
+        """Set multiple values at once (pipelined SETEX)"""
+        if not data:
+            return True
+        if self.redis_client:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key, value in data.items():
+                    pipe.setex(key, ttl or self.default_ttl, json.dumps(value))
+                pipe.execute()
+                self.cache_stats['sets'] += len(data)
+                return True
+            except Exception as e:
+                logger.error(f"Cache set_many error: {e}")
+                self.cache_stats['errors'] += 1
         success = True
         for key, value in data.items():
             if not self.set(key, value, ttl):
@@ -282,12 +381,10 @@ class RedisCache:
         try:
             # Try Redis first
             if self.redis_client:
-                keys = self.redis_client.keys(pattern)
-                if keys:
-                    cleared_count += self.redis_client.delete(*keys)
+                cleared_count += self._delete_matching(pattern)
             
             # Clear fallback cache
-            keys_to_remove = [k for k in self.fallback_cache.keys() if pattern in k]
+            keys_to_remove = [k for k in self.fallback_cache.keys() if _fallback_match(pattern, k)]
             for key in keys_to_remove:
                 del self.fallback_cache[key]
                 cleared_count += 1
@@ -330,9 +427,7 @@ class RedisCache:
         if self.redis_client:
             try:
                 if pattern:
-                    keys = self.redis_client.keys(pattern)
-                    if keys:
-                        cleared_count += self.redis_client.delete(*keys)
+                    cleared_count += self._delete_matching(pattern)
                 else:
                     self.redis_client.flushdb()
                     cleared_count = -1  # All keys cleared
@@ -342,7 +437,7 @@ class RedisCache:
         
         # Clear fallback cache
         if pattern:
-            keys_to_remove = [k for k in self.fallback_cache.keys() if pattern in k]
+            keys_to_remove = [k for k in self.fallback_cache.keys() if _fallback_match(pattern, k)]
             for key in keys_to_remove:
                 del self.fallback_cache[key]
         else:
@@ -371,21 +466,382 @@ class RedisCache:
         
         return health
 
-# Global cache instance - will be initialized with proper config
+class AsyncRedisCache:
+    """asyncio-native Redis cache with a shared connection pool.
+
+    Mirrors the RedisCache API as coroutines so async request handlers never
+    block the event loop on a Redis round trip. Bulk reads/writes use a single
+    MGET / pipelined SETEX, pattern invalidation uses SCAN + UNLINK, and values
+    are msgpack-encoded (zstd-compressed above a size threshold) when those
+    libraries are installed. Keys (including tag sets) are stored under
+    ``key_prefix`` so the sync RedisCache never reads the binary format.
+    Falls back to an in-memory cache when Redis is unreachable and retries the
+    connection after ``retry_interval`` seconds.
+    """
+
+    def __init__(self, redis_url: str = "redis://localhost:6379",
+                 max_connections: int = 50,
+                 max_fallback_size: int = 1000,
+                 default_ttl: int = 3600,
+                 compress_min_bytes: int = 1024,
+                 retry_interval: float = 30.0,
+                 key_prefix: str = _ASYNC_KEY_PREFIX):
+        self.redis_url = redis_url
+        self.key_prefix = key_prefix
+        self.max_connections = max_connections
+        self.max_fallback_size = max_fallback_size
+        self.default_ttl = default_ttl
+        self.compress_min_bytes = compress_min_bytes
+        self.retry_interval = retry_interval
+        self.pool: Optional[aioredis.ConnectionPool] = None
+        self.redis_client: Optional[aioredis.Redis] = None
+        self.fallback_cache: Dict[str, Dict[str, Any]] = {}
+        self.cache_stats = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'deletes': 0,
+            'errors': 0
+        }
+        self.fallback_tags: Dict[str, set] = {}
+        self._next_connect_attempt = 0.0
+        self._connect_lock: Optional[asyncio.Lock] = None
+
+    async def _client(self) -> Optional[aioredis.Redis]:
+        """Return a connected client, (re)connecting lazily inside the running loop"""
+        if self.redis_client is not None:
+            return self.redis_client
+        if time.monotonic() < self._next_connect_attempt:
+            return None
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.redis_client is not None:
+                return self.redis_client
+            try:
+                pool = aioredis.ConnectionPool.from_url(
+                    self.redis_url,
+                    max_connections=self.max_connections,
+                    socket_connect_timeout=5,
+                    socket_timeout=5,
+                    retry_on_timeout=True,
+                    health_check_interval=30,
+                )
+                client = aioredis.Redis(connection_pool=pool)
+                await client.ping()
+                self.pool, self.redis_client = pool, client
+                logger.info(f"✅ Async Redis pool established (max {self.max_connections} connections)")
+            except Exception as e:
+                logger.warning(f"⚠️ Async Redis connection failed, using in-memory cache: {e}")
+                self._next_connect_attempt = time.monotonic() + self.retry_interval
+        return self.redis_client
+
+    async def redis_available(self) -> bool:
+        """True when a Redis connection is (or can now be) established"""
+        return await self._client() is not None
+
+    def _key(self, key: str) -> str:
+        """Redis key for a cache key (the in-memory fallback uses cache keys as-is)"""
+        return self.key_prefix + key
+
+    def _on_redis_error(self, op: str, error: Exception) -> None:
+        logger.error(f"Async cache {op} error: {error}")
+        self.cache_stats['errors'] += 1
+        if isinstance(error, (redis.ConnectionError, redis.TimeoutError, OSError)):
+            # Drop the pool; the next call falls back to memory until retry_interval passes
+            self.redis_client = None
+            self._next_connect_attempt = time.monotonic() + self.retry_interval
+
+    # In-memory fallback (same semantics as RedisCache.fallback_cache)
+
+    def _fallback_get(self, key: str) -> Any:
+        item = self.fallback_cache.get(key)
+        if item is None:
+            return None
+        if time.time() >= item['expires_at']:
+            del self.fallback_cache[key]
+            return None
+        return item['value']
+
+    def _fallback_set(self, key: str, value: Any, ttl: int) -> None:
+        if len(self.fallback_cache) >= self.max_fallback_size:
+            oldest_keys = sorted(
+                self.fallback_cache.keys(),
+                key=lambda k: self.fallback_cache[k]['created_at']
+            )[:len(self.fallback_cache) // 4]
+            for old_key in oldest_keys:
+                del self.fallback_cache[old_key]
+        now = time.time()
+        self.fallback_cache[key] = {'value': value, 'created_at': now, 'expires_at': now + ttl}
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        """Get value from cache"""
+        client = await self._client()
+        if client is not None:
+            try:
+                raw = await client.get(self._key(key))
+                if raw is not None:
+                    self.cache_stats['hits'] += 1
+                    return decode_value(raw)
+            except Exception as e:
+                self._on_redis_error("get", e)
+
+        value = self._fallback_get(key)
+        if value is not None:
+            self.cache_stats['hits'] += 1
+            return value
+        self.cache_stats['misses'] += 1
+        return default
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """Set value in cache"""
+        ttl = ttl or self.default_ttl
+        client = await self._client()
+        if client is not None:
+            try:
+                await client.setex(self._key(key), ttl, encode_value(value, self.compress_min_bytes))
+                self.cache_stats['sets'] += 1
+                return True
+            except Exception as e:
+                self._on_redis_error("set", e)
+
+        try:
+            self._fallback_set(key, value, ttl)
+            self.cache_stats['sets'] += 1
+            return True
+        except Exception as e:
+            logger.error(f"Async cache fallback set error: {e}")
+            self.cache_stats['errors'] += 1
+            return False
+
+    async def delete(self, *keys: str) -> int:
+        """Delete one or more keys; returns the number of Redis keys removed"""
+        if not keys:
+            return 0
+        deleted = 0
+        client = await self._client()
+        if client is not None:
+            try:
+                deleted = await client.unlink(*[self._key(key) for key in keys])
+            except Exception as e:
+                self._on_redis_error("delete", e)
+        for key in keys:
+            if self.fallback_cache.pop(key, None) is not None and client is None:
+                deleted += 1
+        self.cache_stats['deletes'] += len(keys)
+        return deleted
+
+    async def exists(self, key: str) -> bool:
+        client = await self._client()
+        if client is not None:
+            try:
+                return bool(await client.exists(self._key(key)))
+            except Exception as e:
+                self._on_redis_error("exists", e)
+        return self._fallback_get(key) is not None
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Get multiple values in a single MGET round trip"""
+        if not keys:
+            return {}
+        result: Dict[str, Any] = {}
+        client = await self._client()
+        if client is not None:
+            try:
+                for key, raw in zip(keys, await client.mget([self._key(key) for key in keys])):
+                    if raw is not None:
+                        result[key] = decode_value(raw)
+                self.cache_stats['hits'] += len(result)
+                self.cache_stats['misses'] += len(keys) - len(result)
+                return result
+            except Exception as e:
+                self._on_redis_error("get_many", e)
+
+        for key in keys:
+            value = self._fallback_get(key)
+            if value is not None:
+                result[key] = value
+        self.cache_stats['hits'] += len(result)
+        self.cache_stats['misses'] += len(keys) - len(result)
+        return result
+
+    async def set_many(self, data: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Set multiple values with one pipelined round trip.
+
+        MSET cannot carry a TTL, so each entry is a SETEX inside a
+        non-transactional pipeline (same wire cost, per-key expiry).
+        """
+        if not data:
+            return True
+        ttl = ttl or self.default_ttl
+        client = await self._client()
+        if client is not None:
+            try:
+                async with client.pipeline(transaction=False) as pipe:
+                    for key, value in data.items():
+                        pipe.setex(self._key(key), ttl, encode_value(value, self.compress_min_bytes))
+                    await pipe.execute()
+                self.cache_stats['sets'] += len(data)
+                return True
+            except Exception as e:
+                self._on_redis_error("set_many", e)
+
+        for key, value in data.items():
+            self._fallback_set(key, value, ttl)
+        self.cache_stats['sets'] += len(data)
+        return True
+
+    async def clear_pattern(self, pattern: str, batch_size: int = _SCAN_BATCH) -> int:
+        """Delete keys matching a glob pattern using SCAN + batched UNLINK"""
+        cleared = 0
+        client = await self._client()
+        if client is not None:
+            try:
+                batch: List[bytes] = []
+                async for key in client.scan_iter(match=self._key(pattern), count=batch_size):
+                    batch.append(key)
+                    if len(batch) >= batch_size:
+                        cleared += await client.unlink(*batch)
+                        batch = []
+                if batch:
+                    cleared += await client.unlink(*batch)
+            except Exception as e:
+                self._on_redis_error("clear_pattern", e)
+
+        for key in [k for k in self.fallback_cache if _fallback_match(pattern, k)]:
+            del self.fallback_cache[key]
+            cleared += 1
+        return cleared
+
+    async def add_key_tags(self, key: str, tags: List[str], ttl: Optional[int] = None) -> None:
+        """Record key under each tag's set (<prefix>cachetag:<tag>) so it can be invalidated by tag"""
+        if not tags:
+            return
+        ttl = ttl or self.default_ttl
+        client = await self._client()
+        if client is not None:
+            try:
+                async with client.pipeline(transaction=False) as pipe:
+                    for tag in tags:
+                        tag_key = self._key(_TAG_KEY_PREFIX + tag)
+                        pipe.sadd(tag_key, self._key(key))
+                        # Keep the tag set at least as long as the tagged value
+                        pipe.expire(tag_key, ttl)
+                    await pipe.execute()
+                return
+            except Exception as e:
+                self._on_redis_error("add_key_tags", e)
+        for tag in tags:
+            self.fallback_tags.setdefault(tag, set()).add(key)
+
+    async def invalidate_tags(self, tags: List[str]) -> int:
+        """Delete every key recorded under the given tags, plus the tag sets themselves"""
+        removed = 0
+        client = await self._client()
+        if client is not None:
+            try:
+                for tag in tags:
+                    tag_key = self._key(_TAG_KEY_PREFIX + tag)
+                    members = [m async for m in client.sscan_iter(tag_key, count=_SCAN_BATCH)]
+                    for i in range(0, len(members), _SCAN_BATCH):
+                        removed += await client.unlink(*members[i:i + _SCAN_BATCH])
+                    await client.unlink(tag_key)
+            except Exception as e:
+                self._on_redis_error("invalidate_tags", e)
+        for tag in tags:
+            for key in self.fallback_tags.pop(tag, set()):
+                if self.fallback_cache.pop(key, None) is not None:
+                    removed += 1
+        return removed
+
+    async def publish(self, channel: str, message: str) -> int:
+        """Publish a message to other workers; returns receiver count (0 without Redis)"""
+        client = await self._client()
+        if client is None:
+            return 0
+        try:
+            return await client.publish(channel, message)
+        except Exception as e:
+            self._on_redis_error("publish", e)
+            return 0
+
+    async def subscribe(self, channel: str):
+        """Return a PubSub subscribed to channel on a dedicated connection, or None"""
+        client = await self._client()
+        if client is None:
+            return None
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+        return pubsub
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        stats = self.cache_stats.copy()
+        stats.update({
+            'redis_connected': self.redis_client is not None,
+            'fallback_cache_size': len(self.fallback_cache),
+            'fallback_cache_max': self.max_fallback_size,
+            'max_connections': self.max_connections,
+            'encoding': 'msgpack' if msgpack is not None else 'json',
+            'compression': 'zstd' if zstandard is not None else None,
+        })
+        return stats
+
+    async def health_check(self) -> Dict[str, Any]:
+        health: Dict[str, Any] = {
+            'redis_healthy': False,
+            'fallback_healthy': True,
+            'response_time_ms': None
+        }
+        client = await self._client()
+        if client is not None:
+            try:
+                start_time = time.time()
+                await client.ping()
+                health['response_time_ms'] = (time.time() - start_time) * 1000
+                health['redis_healthy'] = True
+            except Exception as e:
+                logger.warning(f"Async Redis health check failed: {e}")
+        return health
+
+    async def close(self) -> None:
+        """Release pooled connections (called on application shutdown)"""
+        if self.pool is not None:
+            try:
+                await self.pool.disconnect()
+            except Exception as e:
+                logger.warning(f"Failed to close async Redis pool: {e}")
+        self.pool = None
+        self.redis_client = None
+
+# Global cache instances - will be initialized with proper config
 cache = None
+async_cache: Optional[AsyncRedisCache] = None
 
-def initialize_cache():
-    """Initialize the global cache instance with proper configuration"""
-    global cache
+
+def _resolve_redis_url() -> str:
     from app.core.config import settings
-    
+
     # Use Redis URL from environment or fallback to Docker service name
     redis_url = settings.REDIS_URL
     if redis_url == "redis://localhost:6379" or "localhost" in redis_url:
         # Fallback to Docker service name for containerized environments
         redis_url = f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}"
-    
+    return redis_url
+
+
+def initialize_cache():
+    """Initialize the global cache instances with proper configuration"""
+    global cache, async_cache
+    from app.core.config import settings
+
+    redis_url = _resolve_redis_url()
     cache = RedisCache(redis_url=redis_url)
+    # The async pool connects lazily on first use inside the event loop
+    async_cache = AsyncRedisCache(
+        redis_url=redis_url,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        compress_min_bytes=settings.CACHE_COMPRESSION_MIN_BYTES,
+    )
     return cache
 
 # Initialize cache when module is imported
@@ -394,4 +850,5 @@ try:
 except Exception as e:
     logger.warning(f"Failed to initialize cache with config: {e}")
     # Fallback to default localhost for development
-    cache = RedisCache()
\ No newline at end of file
+    cache = RedisCache()
+    async_cache = AsyncRedisCache()
\ No newline at end of file
@@ -0,0 +1,267 @@
+"""
+Tag-based Cache Invalidation
+Cache tiers (query results, schemas, formatted schema strings, SQL plans,
+Redis ``qe:`` keys) record each entry under dependency tags such as the data
+source id, schema hash, organization and project. ``invalidate(tag)`` evicts
+every entry carrying that tag from all tiers in this worker, deletes tagged
+Redis keys and broadcasts the tag over Redis pub/sub so other workers evict
+their in-memory copies too.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "aiser:cache:invalidate"
+
+
+def data_source_tag(data_source_id: Any) -> str:
+    return f"ds:{data_source_id}"
+
+
+def schema_tag(schema_hash: str) -> str:
+    return f"schema:{schema_hash}"
+
+
+def org_tag(organization_id: Any) -> str:
+    return f"org:{organization_id}"
+
+
+def project_tag(project_id: Any) -> str:
+    return f"project:{project_id}"
+
+
+def tags_for_data_source(data_source: Optional[Dict[str, Any]], schema_hash: Optional[str] = None) -> List[str]:
+    """Dependency tags for an entry derived from a data source dict"""
+    data_source = data_source or {}
+    tags = []
+    ds_id = data_source.get("id") or data_source.get("data_source_id")
+    if ds_id:
+        tags.append(data_source_tag(ds_id))
+    if data_source.get("organization_id"):
+        tags.append(org_tag(data_source["organization_id"]))
+    if data_source.get("project_id"):
+        tags.append(project_tag(data_source["project_id"]))
+    schema_hash = schema_hash or data_source.get("schema_hash")
+    if schema_hash:
+        tags.append(schema_tag(schema_hash))
+    return tags
+
+
+class CacheTagRegistry:
+    """Per-worker tag index over all registered cache tiers.
+
+    Tiers register a ``remove_keys(keys)`` callback. Bound methods are held
+    weakly, so short-lived service instances (many are created per request)
+    are not kept alive by the registry. The entry index is bounded; the oldest
+    entries are forgotten first, which is safe because every tier also
+    expires entries by TTL.
+    """
+
+    def __init__(self, max_entries: int = 100_000, channel: str = INVALIDATION_CHANNEL):
+        self.max_entries = max_entries
+        self.channel = channel
+        self.worker_id = uuid.uuid4().hex
+        self._tiers: Dict[str, Callable[[], Optional[Callable[[List[str]], Any]]]] = {}
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, ...]]" = OrderedDict()
+        self._tag_index: Dict[str, Set[Tuple[str, str]]] = {}
+        self._lock = threading.RLock()
+        self._listener_task: Optional[asyncio.Task] = None
+        self.stats = {"tagged": 0, "invalidations": 0, "evicted_entries": 0, "remote_invalidations": 0}
+
+    # Tier registration
+
+    def register_tier(self, name: str, remove_keys: Callable[[List[str]], Any]) -> str:
+        """Register (or replace) the eviction callback for a cache tier"""
+        if hasattr(remove_keys, "__self__") and hasattr(remove_keys, "__func__"):
+            ref = weakref.WeakMethod(remove_keys, lambda _ref, n=name: self._drop_tier(n, _ref))
+        else:
+            ref = lambda fn=remove_keys: fn  # plain functions are held strongly
+        with self._lock:
+            self._tiers[name] = ref
+        return name
+
+    def _drop_tier(self, name: str, ref: Any) -> None:
+        with self._lock:
+            if self._tiers.get(name) is ref:
+                self._tiers.pop(name, None)
+
+    # Tagging
+
+    def tag(self, tier: str, key: str, tags: Iterable[str]) -> None:
+        """Record that ``key`` in ``tier`` depends on ``tags``"""
+        tags = tuple(t for t in tags if t)
+        if not tags:
+            return
+        entry = (tier, key)
+        with self._lock:
+            self._forget(entry)
+            self._entries[entry] = tags
+            for t in tags:
+                self._tag_index.setdefault(t, set()).add(entry)
+            self.stats["tagged"] += 1
+            while len(self._entries) > self.max_entries:
+                oldest, _ = next(iter(self._entries.items()))
+                self._forget(oldest)
+
+    def untag(self, tier: str, key: str) -> None:
+        with self._lock:
+            self._forget((tier, key))
+
+    def _forget(self, entry: Tuple[str, str]) -> None:
+        tags = self._entries.pop(entry, None)
+        for t in tags or ():
+            members = self._tag_index.get(t)
+            if members is not None:
+                members.discard(entry)
+                if not members:
+                    del self._tag_index[t]
+
+    # Invalidation
+
+    def invalidate_local(self, *tags: str) -> int:
+        """Evict entries carrying any of ``tags`` from this worker's tiers"""
+        by_tier: Dict[str, List[str]] = {}
+        with self._lock:
+            for t in tags:
+                for entry in list(self._tag_index.get(t, ())):
+                    tier, key = entry
+                    by_tier.setdefault(tier, []).append(key)
+                    self._forget(entry)
+            callbacks = {tier: self._tiers.get(tier) for tier in by_tier}
+
+        evicted = 0
+        for tier, keys in by_tier.items():
+            ref = callbacks.get(tier)
+            remove_keys = ref() if ref is not None else None
+            if remove_keys is None:
+                continue
+            try:
+                remove_keys(keys)
+                evicted += len(keys)
+            except Exception as e:
+                logger.warning(f"⚠️ Cache tier {tier} failed to evict {len(keys)} keys: {e}")
+        self.stats["invalidations"] += 1
+        self.stats["evicted_entries"] += evicted
+        if evicted:
+            logger.info(f"🗑️ Invalidated {evicted} cached entries for tags {list(tags)}")
+        return evicted
+
+    async def invalidate(self, *tags: str, broadcast: bool = True) -> int:
+        """Evict tagged entries here, delete tagged Redis keys and notify other workers"""
+        tags = tuple(t for t in tags if t)
+        if not tags:
+            return 0
+        evicted = self.invalidate_local(*tags)
+        try:
+            from app.core.cache import async_cache
+
+            if async_cache is not None:
+                evicted += await async_cache.invalidate_tags(list(tags))
+                if broadcast:
+                    await async_cache.publish(
+                        self.channel, json.dumps({"origin": self.worker_id, "tags": list(tags)})
+                    )
+        except Exception as e:
+            logger.warning(f"⚠️ Distributed cache invalidation failed for {list(tags)}: {e}")
+        return evicted
+
+    def invalidate_nowait(self, *tags: str) -> int:
+        """Synchronous variant: evict locally now and schedule the distributed part"""
+        evicted = self.invalidate_local(*tags)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return evicted
+        loop.create_task(self._invalidate_remote(tags))
+        return evicted
+
+    async def _invalidate_remote(self, tags: Tuple[str, ...]) -> None:
+        try:
+            from app.core.cache import async_cache
+
+            if async_cache is not None:
+                await async_cache.invalidate_tags(list(tags))
+                await async_cache.publish(self.channel, json.dumps({"origin": self.worker_id, "tags": list(tags)}))
+        except Exception as e:
+            logger.warning(f"⚠️ Distributed cache invalidation failed for {list(tags)}: {e}")
+
+    async def tag_redis_key(self, key: str, tags: Iterable[str], ttl: Optional[int] = None) -> None:
+        """Record a shared Redis key under tags (stored in Redis so any worker can invalidate it)"""
+        from app.core.cache import async_cache
+
+        tags = [t for t in tags if t]
+        if async_cache is not None and tags:
+            await async_cache.add_key_tags(key, tags, ttl)
+
+    # Cross-worker listener
+
+    def handle_message(self, data: Any) -> int:
+        """Apply an invalidation broadcast from another worker"""
+        try:
+            payload = json.loads(data.decode() if isinstance(data, (bytes, bytearray)) else data)
+        except Exception:
+            return 0
+        if payload.get("origin") == self.worker_id:
+            return 0
+        self.stats["remote_invalidations"] += 1
+        return self.invalidate_local(*payload.get("tags", []))
+
+    async def _listen(self, retry_interval: float = 5.0) -> None:
+        from app.core.cache import async_cache
+
+        while True:
+            pubsub = None
+            try:
+                pubsub = await async_cache.subscribe(self.channel) if async_cache else None
+                if pubsub is None:
+                    await asyncio.sleep(retry_interval * 6)
+                    continue
+                logger.info(f"📡 Listening for cache invalidations on {self.channel}")
+                async for message in pubsub.listen():
+                    if message and message.get("type") == "message":
+                        self.handle_message(message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Cache invalidation listener error: {e}")
+                await asyncio.sleep(retry_interval)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose() if hasattr(pubsub, "aclose") else await pubsub.close()
+                    except Exception:
+                        pass
+
+    def start_listener(self) -> None:
+        if self._listener_task is None or self._listener_task.done():
+            self._listener_task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop_listener(self) -> None:
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "indexed_entries": len(self._entries),
+                "indexed_tags": len(self._tag_index),
+                "tiers": len(self._tiers),
+                "listening": self._listener_task is not None and not self._listener_task.done(),
+            }
+
+
+cache_tags = CacheTagRegistry()
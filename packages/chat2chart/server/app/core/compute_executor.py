@@ -0,0 +1,395 @@
+"""
+Compute Executor
+Runs blocking DuckDB work on a bounded thread pool and CPU-bound pandas /
+openpyxl parsing on a process pool so neither stalls the event loop. Pool
+slots are handed out round-robin across tenants with a per-tenant cap, queue
+depth and queue wait are exposed for /metrics/compute, and in-flight work is
+cancelled (DuckDB statements interrupted) when the client disconnects.
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Optional
+
+from app.core.tracing import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+POOL_DUCKDB = "duckdb"
+POOL_CPU = "cpu"
+DEFAULT_TENANT = "default"
+ANONYMOUS_TENANT = "anonymous"
+
+_current_tenant: ContextVar[Optional[str]] = ContextVar("aiser_compute_tenant", default=None)
+_client_disconnected: ContextVar[Optional[asyncio.Event]] = ContextVar("aiser_client_disconnected", default=None)
+
+
+class ComputeCancelled(Exception):
+    """Raised when offloaded work is abandoned because the client went away"""
+
+
+def current_tenant() -> str:
+    return _current_tenant.get() or DEFAULT_TENANT
+
+
+def set_request_context(tenant: Optional[str], disconnected: Optional[asyncio.Event] = None):
+    """Bind the tenant and disconnect event used by work started in this context"""
+    return _current_tenant.set(tenant), _client_disconnected.set(disconnected)
+
+
+def principal_tenant(payload: Any) -> Optional[str]:
+    """Fairness key of an authenticated principal: its organization, else the user"""
+    if not isinstance(payload, dict):
+        return None
+    tenant = payload.get("organization_id") or payload.get("user_id") or payload.get("id") or payload.get("sub")
+    return str(tenant) if tenant else None
+
+
+def binds_principal_tenant(resolve: Callable) -> Callable:
+    """Decorator for async auth dependencies: rebinds the request's tenant to the principal they return.
+
+    FastAPI awaits async dependencies in the endpoint's context, so the
+    binding holds for the compute work the endpoint starts.
+    """
+
+    @functools.wraps(resolve)
+    async def wrapper(*args, **kwargs):
+        payload = await resolve(*args, **kwargs)
+        tenant = principal_tenant(payload)
+        if tenant:
+            _current_tenant.set(tenant)
+        return payload
+
+    return wrapper
+
+
+class FairScheduler:
+    """Round-robin slot scheduler across tenants.
+
+    At most ``slots`` jobs run at once and at most ``per_tenant`` of them for
+    any one tenant. When a slot frees up it goes to the next tenant in
+    rotation that has work waiting, so one tenant's burst cannot starve the
+    others. Must be used from a single event loop thread; ``release`` is
+    marshalled onto the loop by the executor.
+    """
+
+    def __init__(self, slots: int, per_tenant: int):
+        self.slots = max(1, int(slots))
+        self.per_tenant = max(1, min(int(per_tenant), self.slots))
+        self.available = self.slots
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._running: Dict[str, int] = {}
+
+    async def acquire(self, tenant: str) -> None:
+        fut = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(tenant, deque()).append(fut)
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # The slot was granted just as we were cancelled; hand it on
+                self.release(tenant)
+            else:
+                self._discard(tenant, fut)
+            raise
+
+    def release(self, tenant: str) -> None:
+        running = self._running.get(tenant, 0) - 1
+        if running > 0:
+            self._running[tenant] = running
+        else:
+            self._running.pop(tenant, None)
+        self.available = min(self.slots, self.available + 1)
+        self._dispatch()
+
+    def _discard(self, tenant: str, fut: asyncio.Future) -> None:
+        queue = self._waiting.get(tenant)
+        if queue is None:
+            return
+        try:
+            queue.remove(fut)
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiting[tenant]
+
+    def _dispatch(self) -> None:
+        while self.available > 0:
+            tenant = next(
+                (t for t in self._waiting if self._running.get(t, 0) < self.per_tenant), None
+            )
+            if tenant is None:
+                return
+            queue = self._waiting[tenant]
+            fut = queue.popleft()
+            if not queue:
+                del self._waiting[tenant]
+            else:
+                self._waiting.move_to_end(tenant)
+            if fut.cancelled():
+                continue
+            self._running[tenant] = self._running.get(tenant, 0) + 1
+            self.available -= 1
+            fut.set_result(None)
+
+    def queued(self) -> int:
+        return sum(len(q) for q in self._waiting.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        tenants = set(self._running) | set(self._waiting)
+        return {
+            "slots": self.slots,
+            "per_tenant": self.per_tenant,
+            "running": self.slots - self.available,
+            "queued": self.queued(),
+            "tenants": {
+                t: {"running": self._running.get(t, 0), "queued": len(self._waiting.get(t, ()))}
+                for t in sorted(tenants)
+            },
+        }
+
+
+class ComputeExecutor:
+    """Dedicated executors for blocking analytics work.
+
+    ``run_duckdb`` uses a thread pool (DuckDB releases the GIL while it
+    executes). ``run_cpu`` uses a spawn-based process pool for GIL-bound
+    parsing; its callables and arguments must be picklable, so keep them in
+    import-light modules such as ``app.core.compute_tasks``. With
+    ``process_workers=0`` CPU work runs on the thread pool instead.
+    """
+
+    def __init__(self, thread_workers: int = 8, process_workers: int = 2, max_per_tenant: int = 4):
+        self.thread_workers = max(1, int(thread_workers))
+        self.process_workers = max(0, int(process_workers))
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._process_pool_failed = False
+        self._lock = threading.Lock()
+        self._schedulers = {
+            POOL_DUCKDB: FairScheduler(self.thread_workers, max_per_tenant),
+            POOL_CPU: FairScheduler(self.process_workers or self.thread_workers, max_per_tenant),
+        }
+        self._queue_wait = {POOL_DUCKDB: LatencyHistogram(), POOL_CPU: LatencyHistogram()}
+        self._run_time = {POOL_DUCKDB: LatencyHistogram(), POOL_CPU: LatencyHistogram()}
+        self.stats = {
+            kind: {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0}
+            for kind in (POOL_DUCKDB, POOL_CPU)
+        }
+
+    # Pools
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            with self._lock:
+                if self._threads is None:
+                    self._threads = ThreadPoolExecutor(
+                        max_workers=self.thread_workers, thread_name_prefix="aiser-duckdb"
+                    )
+        return self._threads
+
+    def _cpu_pool(self) -> Executor:
+        if self.process_workers == 0 or self._process_pool_failed:
+            return self._thread_pool()
+        if self._processes is None:
+            with self._lock:
+                if self._processes is None and not self._process_pool_failed:
+                    try:
+                        self._processes = ProcessPoolExecutor(
+                            max_workers=self.process_workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                        )
+                    except Exception as e:
+                        logger.warning(f"⚠️ Process pool unavailable, parsing on threads instead: {e}")
+                        self._process_pool_failed = True
+                        return self._thread_pool()
+        return self._processes
+
+    # Submission
+
+    async def run_duckdb(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        tenant: Optional[str] = None,
+        interrupt: Any = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Run blocking DuckDB work on the thread pool.
+
+        ``interrupt`` is a DuckDB connection whose running statement is
+        interrupted if the caller is cancelled or the client disconnects.
+        """
+        return await self._run(POOL_DUCKDB, self._thread_pool(), fn, args, kwargs, tenant, interrupt)
+
+    async def run_cpu(self, fn: Callable[..., Any], *args: Any, tenant: Optional[str] = None, **kwargs: Any) -> Any:
+        """Run CPU-bound parsing on the process pool (``fn`` must be picklable)"""
+        try:
+            return await self._run(POOL_CPU, self._cpu_pool(), fn, args, kwargs, tenant, None)
+        except Exception as e:
+            # A worker died (e.g. OOM); retry once on the thread pool so the request still succeeds
+            if type(e).__name__ != "BrokenProcessPool":
+                raise
+            logger.warning(f"⚠️ Compute process pool broke, falling back to threads: {e}")
+            with self._lock:
+                self._processes = None
+                self._process_pool_failed = True
+            return await self._run(POOL_CPU, self._thread_pool(), fn, args, kwargs, tenant, None)
+
+    async def _run(self, kind, pool, fn, args, kwargs, tenant, interrupt) -> Any:
+        tenant = tenant or current_tenant()
+        disconnected = _client_disconnected.get()
+        if disconnected is not None and disconnected.is_set():
+            raise ComputeCancelled("Client disconnected before work started")
+
+        scheduler = self._schedulers[kind]
+        stats = self.stats[kind]
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        await scheduler.acquire(tenant)
+        started = time.perf_counter()
+        self._queue_wait[kind].record((started - queued_at) * 1000.0)
+        stats["submitted"] += 1
+
+        try:
+            cf = pool.submit(fn, *args, **kwargs)
+        except Exception:
+            scheduler.release(tenant)
+            stats["failed"] += 1
+            raise
+
+        def _done(_cf) -> None:
+            self._run_time[kind].record((time.perf_counter() - started) * 1000.0)
+            # The slot stays taken until the worker really finishes, even if the caller gave up
+            try:
+                loop.call_soon_threadsafe(scheduler.release, tenant)
+            except RuntimeError:
+                pass  # loop closed during shutdown
+
+        cf.add_done_callback(_done)
+        future = asyncio.wrap_future(cf)
+        waiter = asyncio.ensure_future(disconnected.wait()) if disconnected is not None else None
+        try:
+            if waiter is None:
+                result = await asyncio.shield(future)
+            else:
+                done, _ = await asyncio.wait({future, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                if future not in done:
+                    self._abandon(kind, cf, interrupt)
+                    raise ComputeCancelled("Client disconnected")
+                result = future.result()
+        except asyncio.CancelledError:
+            self._abandon(kind, cf, interrupt)
+            raise
+        except ComputeCancelled:
+            raise
+        except Exception:
+            stats["failed"] += 1
+            raise
+        finally:
+            if waiter is not None:
+                waiter.cancel()
+        stats["completed"] += 1
+        return result
+
+    def _abandon(self, kind: str, cf, interrupt: Any) -> None:
+        self.stats[kind]["cancelled"] += 1
+        if cf.cancel():
+            return
+        if interrupt is not None and not cf.done():
+            try:
+                interrupt.interrupt()
+                logger.info("🛑 Interrupted DuckDB statement for a cancelled request")
+            except Exception as e:
+                logger.debug(f"DuckDB interrupt failed: {e}")
+
+    # Introspection / lifecycle
+
+    def get_stats(self) -> Dict[str, Any]:
+        report = {}
+        for kind, scheduler in self._schedulers.items():
+            report[kind] = {
+                **scheduler.snapshot(),
+                **self.stats[kind],
+                "queue_wait": self._queue_wait[kind].summary(),
+                "run_time": self._run_time[kind].summary(),
+            }
+        report[POOL_CPU]["backend"] = "threads" if (self.process_workers == 0 or self._process_pool_failed) else "processes"
+        return report
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            pools, self._threads, self._processes = (self._threads, self._processes), None, None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=True)
+
+
+class ComputeContextMiddleware:
+    """ASGI middleware binding the tenant and a client-disconnect event.
+
+    Incoming messages are relayed through a small bounded queue by a pump
+    task, so an ``http.disconnect`` is noticed while the endpoint is still
+    busy in the executor instead of only when it next reads the request.
+    Every request starts in one anonymous bucket; the auth dependencies
+    rebind it to the verified principal (see ``binds_principal_tenant``).
+    Client headers are never trusted for the tenant.
+    """
+
+    def __init__(self, app, queue_size: int = 16):
+        self.app = app
+        self.queue_size = queue_size
+
+    async def __call__(self, scope, receive, send):
+        if scope.get("type") != "http":
+            return await self.app(scope, receive, send)
+
+        disconnected = asyncio.Event()
+        messages: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def pump() -> None:
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message.get("type") == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        async def relayed_receive():
+            if disconnected.is_set() and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        pump_task = asyncio.ensure_future(pump())
+        tokens = set_request_context(ANONYMOUS_TENANT, disconnected)
+        try:
+            await self.app(scope, relayed_receive, send)
+        finally:
+            _current_tenant.reset(tokens[0])
+            _client_disconnected.reset(tokens[1])
+            pump_task.cancel()
+
+
+def _build_executor() -> ComputeExecutor:
+    try:
+        from app.core.config import settings
+
+        return ComputeExecutor(
+            thread_workers=settings.COMPUTE_THREAD_WORKERS,
+            process_workers=settings.COMPUTE_PROCESS_WORKERS,
+            max_per_tenant=settings.COMPUTE_MAX_PER_TENANT,
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Using default compute executor settings: {e}")
+        return ComputeExecutor()
+
+
+compute_executor = _build_executor()
@@ -0,0 +1,133 @@
+"""
+Compute Pool Tasks
+Picklable, import-light functions executed in the compute process pool (see
+app/core/compute_executor.py). Worker processes are spawned fresh, so this
+module must not import the application (models, services, settings).
+"""
+
+import json
+from typing import Any, Optional
+
+
+def read_csv_frame(file_path: str, delimiter: str = ",", encoding: str = "utf-8"):
+    """Parse a delimited text file into a DataFrame"""
+    import pandas as pd
+
+    return pd.read_csv(file_path, delimiter=delimiter, encoding=encoding)
+
+
+def read_excel_frame(file_path: str, sheet_name: Any = 0, engine: Optional[str] = "openpyxl"):
+    """Parse one worksheet into a DataFrame with NaN/NaT normalised to None"""
+    import pandas as pd
+
+    df = pd.read_excel(file_path, sheet_name=sheet_name, engine=engine)
+    df = df.replace({pd.NA: None, pd.NaT: None})
+    return df.where(pd.notnull(df), None)
+
+
+def excel_reader_engine(file_path: str = "") -> Optional[str]:
+    """Fastest available Excel backend: calamine (Rust) when installed, else openpyxl/xlrd"""
+    try:
+        import python_calamine  # noqa: F401
+
+        return "calamine"
+    except ImportError:
+        return None if file_path.lower().endswith(".xls") else "openpyxl"
+
+
+def _calamine_frame(file_path: str, sheet_name: Any):
+    """Read a sheet with python-calamine directly (for pandas versions without engine='calamine')"""
+    import pandas as pd
+    from python_calamine import CalamineWorkbook
+
+    workbook = CalamineWorkbook.from_path(file_path)
+    sheet = workbook.get_sheet_by_index(sheet_name) if isinstance(sheet_name, int) else workbook.get_sheet_by_name(sheet_name)
+    rows = sheet.to_python(skip_empty_area=True)
+    if not rows:
+        return pd.DataFrame()
+    header, seen = [], {}
+    for i, value in enumerate(rows[0]):
+        name = str(value).strip() if value not in (None, "") else f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    width = len(header)
+    # Excel stores every number as a float; whole numbers come back as ints like openpyxl reads them
+    body = [
+        [int(v) if isinstance(v, float) and v.is_integer() else v for v in (list(r) + [None] * width)[:width]]
+        for r in rows[1:]
+    ]
+    # calamine reports empty cells as ""; treat them as missing like pandas does
+    return pd.DataFrame(body, columns=header).replace({"": None})
+
+
+def _read_excel_any(file_path: str, sheet_name: Any, engine: Optional[str]):
+    import pandas as pd
+
+    if engine == "calamine":
+        try:
+            return pd.read_excel(file_path, sheet_name=sheet_name, engine="calamine")
+        except ValueError:
+            # pandas < 2.2 does not know the calamine engine
+            return _calamine_frame(file_path, sheet_name)
+    return pd.read_excel(file_path, sheet_name=sheet_name, engine=engine)
+
+
+def excel_sheet_to_parquet(file_path: str, sheet_name: Any, out_path: str, engine: Optional[str] = None) -> dict:
+    """Parse one worksheet and write it straight to Parquet.
+
+    Returns the row count and Arrow column types so the caller never has to
+    re-read the sheet; the parsed frame itself never crosses the process
+    boundary.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = _read_excel_any(file_path, sheet_name, engine)
+    df.columns = [str(c) for c in df.columns]
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns (numbers and text in one column) become text
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].map(lambda v: None if v is None or v != v else str(v))
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(table, out_path, compression="zstd")
+    return {
+        "sheet": sheet_name,
+        "path": out_path,
+        "row_count": table.num_rows,
+        "columns": [{"name": f.name, "arrow_type": str(f.type)} for f in table.schema],
+        "engine": engine or "default",
+    }
+
+
+def read_excel_sheet_names(file_path: str) -> list:
+    """List worksheet names without loading cell data"""
+    try:
+        from python_calamine import CalamineWorkbook
+
+        return list(CalamineWorkbook.from_path(file_path).sheet_names)
+    except ImportError:
+        pass
+    try:
+        import openpyxl
+
+        wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            return list(wb.sheetnames)
+        finally:
+            wb.close()
+    except Exception:
+        import pandas as pd
+
+        return list(pd.ExcelFile(file_path).sheet_names)
+
+
+def load_json_file(file_path: str, encoding: str = "utf-8") -> Any:
+    with open(file_path, "r", encoding=encoding) as f:
+        return json.load(f)
@@ -42,6 +42,18 @@ class Settings(BaseSettings):
         os.getenv("MAX_UPLOAD_SIZE", str(10485760))  # 10 * 1024 * 1024
     )  # 10MB
 
+    # Query Snapshot Storage (columnar parquet parts per snapshot)
+    SNAPSHOT_STORAGE_DIR: str = os.getenv("SNAPSHOT_STORAGE_DIR", os.path.join(os.getenv("UPLOAD_DIR", "uploads"), "snapshots"))
+    SNAPSHOT_MAX_PARTS: int = int(os.getenv("SNAPSHOT_MAX_PARTS", "32"))
+
+    # Streaming uploads: converted to Parquet; files larger than a BYTEA row go to the columnar store
+    UPLOAD_COLUMNAR_DIR: str = os.getenv("UPLOAD_COLUMNAR_DIR", os.path.join(os.getenv("UPLOAD_DIR", "uploads"), "columnar"))
+    STREAMING_UPLOAD_MAX_MB: int = int(os.getenv("STREAMING_UPLOAD_MAX_MB", "4096"))
+    # Data browsing: Parquet copies of stored files used for paginated reads (LRU by size)
+    DATA_BROWSE_CACHE_DIR: str = os.getenv("DATA_BROWSE_CACHE_DIR", os.path.join(os.getenv("UPLOAD_DIR", "uploads"), "browse"))
+    DATA_BROWSE_CACHE_MAX_MB: int = int(os.getenv("DATA_BROWSE_CACHE_MAX_MB", "2048"))
+    DATA_BROWSE_MAX_PAGE_ROWS: int = int(os.getenv("DATA_BROWSE_MAX_PAGE_ROWS", "10000"))
+
     # AWS Settings
     AWS_ACCESS_KEY_ID: str = os.getenv("AWS_ACCESS_KEY_ID", "")
     AWS_SECRET_ACCESS_KEY: str = os.getenv("AWS_SECRET_ACCESS_KEY", "")
@@ -82,6 +94,9 @@ class Settings(BaseSettings):
     ENABLE_MCP_CHARTS: bool = os.getenv("ENABLE_MCP_CHARTS", "false").lower() == "true"
     ENABLE_FUNCTION_CALLING: bool = os.getenv("ENABLE_FUNCTION_CALLING", "true").lower() == "true"
     ENABLE_INTELLIGENT_MODELING: bool = os.getenv("ENABLE_INTELLIGENT_MODELING", "true").lower() == "true"
+    ENABLE_REQUEST_TRACING: bool = os.getenv("ENABLE_REQUEST_TRACING", "true").lower() == "true"
+    # Allow per-request stack sampling via the X-Aiser-Profile header
+    ENABLE_REQUEST_PROFILING: bool = os.getenv("ENABLE_REQUEST_PROFILING", "false").lower() == "true"
 
     # CORS Settings
     CORS_ORIGINS: str = os.getenv(
@@ -103,6 +118,75 @@ class Settings(BaseSettings):
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
     REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
     REDIS_URL: str = os.getenv("REDIS_URL", f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}")
+    # Async cache client: pool size and compression threshold for cached values
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    CACHE_COMPRESSION_MIN_BYTES: int = int(os.getenv("CACHE_COMPRESSION_MIN_BYTES", "1024"))
+    # Query results are invalidated by data source tag (see core/cache_invalidation.py)
+    QUERY_RESULT_CACHE_TTL: int = int(os.getenv("QUERY_RESULT_CACHE_TTL", "3600"))
+    # Result budgets: rows/bytes returned inline; larger results spill to Parquet up to the spill cap (see data/services/result_spill.py)
+    QUERY_RESULT_MAX_ROWS: int = int(os.getenv("QUERY_RESULT_MAX_ROWS", "50000"))
+    QUERY_RESULT_MAX_BYTES: int = int(os.getenv("QUERY_RESULT_MAX_BYTES", str(64 * 1024 * 1024)))
+    QUERY_SPILL_MAX_ROWS: int = int(os.getenv("QUERY_SPILL_MAX_ROWS", "5000000"))
+    QUERY_SPILL_MAX_BYTES: int = int(os.getenv("QUERY_SPILL_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+    QUERY_SPILL_DIR: str = os.getenv("QUERY_SPILL_DIR", os.path.join(os.getenv("UPLOAD_DIR", "uploads"), "spill"))
+    QUERY_SPILL_TTL: int = int(os.getenv("QUERY_SPILL_TTL", "3600"))
+    QUERY_FETCH_BATCH_ROWS: int = int(os.getenv("QUERY_FETCH_BATCH_ROWS", "5000"))
+    # Statement timeout (seconds) forwarded to the engine; 0 disables
+    QUERY_STATEMENT_TIMEOUT: float = float(os.getenv("QUERY_STATEMENT_TIMEOUT", "120"))
+    # API sources: fetched pages land as Parquet parts in a per-source DuckDB workspace, refetched after the TTL (see data/services/api_workspace.py)
+    API_WORKSPACE_DIR: str = os.getenv("API_WORKSPACE_DIR", os.path.join(os.getenv("UPLOAD_DIR", "uploads"), "api_workspaces"))
+    API_WORKSPACE_TTL: int = int(os.getenv("API_WORKSPACE_TTL", "900"))
+    API_WORKSPACE_MAX_PAGES: int = int(os.getenv("API_WORKSPACE_MAX_PAGES", "200"))
+    API_WORKSPACE_PART_ROWS: int = int(os.getenv("API_WORKSPACE_PART_ROWS", "50000"))
+    API_WORKSPACE_MAX_OPEN: int = int(os.getenv("API_WORKSPACE_MAX_OPEN", "32"))
+    API_REQUEST_TIMEOUT: int = int(os.getenv("API_REQUEST_TIMEOUT", "60"))
+    # Max concurrent sub-question queries in deep file analysis
+    ANALYSIS_MAX_PARALLEL_QUERIES: int = int(os.getenv("ANALYSIS_MAX_PARALLEL_QUERIES", "4"))
+    # Off-loop compute: DuckDB thread pool, parsing process pool (0 = use threads), per-tenant slot cap
+    COMPUTE_THREAD_WORKERS: int = int(os.getenv("COMPUTE_THREAD_WORKERS", str(min(32, (os.cpu_count() or 2) * 2))))
+    COMPUTE_PROCESS_WORKERS: int = int(os.getenv("COMPUTE_PROCESS_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+    COMPUTE_MAX_PER_TENANT: int = int(os.getenv("COMPUTE_MAX_PER_TENANT", "4"))
+    # Approximate query mode: weighted samples for exploratory aggregates on large datasets
+    APPROX_SAMPLE_DIR: str = os.getenv("APPROX_SAMPLE_DIR", os.path.join(os.getenv("UPLOAD_DIR", "uploads"), "samples"))
+    APPROX_MIN_ROWS: int = int(os.getenv("APPROX_MIN_ROWS", "5000000"))
+    APPROX_SAMPLE_TARGET_ROWS: int = int(os.getenv("APPROX_SAMPLE_TARGET_ROWS", "1000000"))
+    APPROX_MIN_STRATUM_ROWS: int = int(os.getenv("APPROX_MIN_STRATUM_ROWS", "1000"))
+    APPROX_MAX_STRATA: int = int(os.getenv("APPROX_MAX_STRATA", "1000"))
+    APPROX_MIN_GROUP_SAMPLE_ROWS: int = int(os.getenv("APPROX_MIN_GROUP_SAMPLE_ROWS", "30"))
+    APPROX_DEFAULT_SAMPLE_PERCENT: float = float(os.getenv("APPROX_DEFAULT_SAMPLE_PERCENT", "1.0"))
+    # Data source catalog: per-worker metadata cache (evicted by ds:<id> tag on writes; TTL is a backstop)
+    DATA_SOURCE_CATALOG_TTL: int = int(os.getenv("DATA_SOURCE_CATALOG_TTL", "300"))
+    DATA_SOURCE_CATALOG_MAX_ENTRIES: int = int(os.getenv("DATA_SOURCE_CATALOG_MAX_ENTRIES", "5000"))
+    DATA_SOURCE_CATALOG_MAX_SAMPLES: int = int(os.getenv("DATA_SOURCE_CATALOG_MAX_SAMPLES", "32"))
+    # Chart data reduction: LTTB/M4, binning and top-N before chart configs are built (see charts/utils/data_reduction.py)
+    CHART_REDUCTION_ENABLED: bool = os.getenv("CHART_REDUCTION_ENABLED", "true").lower() == "true"
+    CHART_MAX_POINTS: int = int(os.getenv("CHART_MAX_POINTS", "2000"))
+    CHART_MAX_CATEGORIES: int = int(os.getenv("CHART_MAX_CATEGORIES", "20"))
+    CHART_SCATTER_BINS: int = int(os.getenv("CHART_SCATTER_BINS", "40"))  # per axis; 40x40 cells fit CHART_MAX_POINTS
+    # Database schema introspection: bulk catalog queries; refreshes re-read only objects whose DDL marker changed
+    SCHEMA_INTROSPECTION_INCREMENTAL_MAX_TABLES: int = int(os.getenv("SCHEMA_INTROSPECTION_INCREMENTAL_MAX_TABLES", "200"))
+    SCHEMA_INTROSPECTION_MAX_ENGINES: int = int(os.getenv("SCHEMA_INTROSPECTION_MAX_ENGINES", "16"))
+    # Schema cache: shared through Redis; entries older than FRESH_SECONDS are served while revalidating in the background
+    SCHEMA_CACHE_TTL_HOURS: int = int(os.getenv("SCHEMA_CACHE_TTL_HOURS", "24"))
+    SCHEMA_CACHE_FRESH_SECONDS: int = int(os.getenv("SCHEMA_CACHE_FRESH_SECONDS", "300"))
+    # NL2SQL plan cache: validated SQL per parameterized question, schema hash and dialect (see ai/services/sql_plan_cache.py)
+    SQL_PLAN_CACHE_ENABLED: bool = os.getenv("SQL_PLAN_CACHE_ENABLED", "true").lower() == "true"
+    SQL_PLAN_CACHE_TTL: int = int(os.getenv("SQL_PLAN_CACHE_TTL", str(7 * 24 * 3600)))
+    # SQL compilation pipeline: parsed ASTs and compiled output kept per (sql, dialect) (see data/services/sql_pipeline.py)
+    SQL_COMPILE_CACHE_SIZE: int = int(os.getenv("SQL_COMPILE_CACHE_SIZE", "2048"))
+    # Warehouse connectors: Arrow record-batch streams with a per-stream row/byte budget (0 = unbounded)
+    CONNECTOR_STREAM_BATCH_ROWS: int = int(os.getenv("CONNECTOR_STREAM_BATCH_ROWS", "50000"))
+    CONNECTOR_STREAM_MAX_ROWS: int = int(os.getenv("CONNECTOR_STREAM_MAX_ROWS", "1000000"))
+    CONNECTOR_STREAM_MAX_BYTES: int = int(os.getenv("CONNECTOR_STREAM_MAX_BYTES", str(512 * 1024 * 1024)))
+    # Rollups: pre-aggregated tables built from frequent GROUP BY patterns (see data/services/rollup_manager.py)
+    ROLLUP_ENABLED: bool = os.getenv("ROLLUP_ENABLED", "true").lower() == "true"
+    ROLLUP_DIR: str = os.getenv("ROLLUP_DIR", os.path.join(os.getenv("UPLOAD_DIR", "uploads"), "rollups"))
+    ROLLUP_MIN_QUERY_COUNT: int = int(os.getenv("ROLLUP_MIN_QUERY_COUNT", "3"))
+    ROLLUP_MIN_SOURCE_ROWS: int = int(os.getenv("ROLLUP_MIN_SOURCE_ROWS", "100000"))
+    ROLLUP_MAX_DIMENSIONS: int = int(os.getenv("ROLLUP_MAX_DIMENSIONS", "6"))
+    ROLLUP_MAX_PER_SOURCE: int = int(os.getenv("ROLLUP_MAX_PER_SOURCE", "5"))
+    ROLLUP_MAX_ROW_RATIO: float = float(os.getenv("ROLLUP_MAX_ROW_RATIO", "0.5"))
+    ROLLUP_MAX_STALENESS_SECONDS: int = int(os.getenv("ROLLUP_MAX_STALENESS_SECONDS", "900"))
 
     # Environment Settings
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
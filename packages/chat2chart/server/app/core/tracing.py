@@ -0,0 +1,316 @@
+"""
+Request-scoped tracing
+Records per-stage spans (auth, RBAC, schema fetch, LLM call, SQL generation,
+query execution, chart build, DB persistence) for the current request using
+context variables, exposes them as a Server-Timing header and aggregates
+stage latencies into log-linear (HDR-style) histograms for p50/p95/p99.
+"""
+
+import functools
+import logging
+import math
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Canonical stage names used by instrumented code paths
+STAGE_AUTH = "auth"
+STAGE_RBAC = "rbac"
+STAGE_SCHEMA_FETCH = "schema_fetch"
+STAGE_LLM_CALL = "llm_call"
+STAGE_SQL_GENERATION = "sql_generation"
+STAGE_QUERY_EXECUTION = "query_execution"
+STAGE_CHART_BUILD = "chart_build"
+STAGE_DB_PERSISTENCE = "db_persistence"
+STAGE_REQUEST = "request"
+
+
+class Span:
+    """A timed stage within a request"""
+
+    __slots__ = ("name", "start", "end", "attributes")
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+
+    def set(self, **attributes: Any) -> None:
+        """Attach attributes (e.g. token counts) to the span"""
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "duration_ms": round(self.duration_ms, 3), **self.attributes}
+
+
+_CLIENT_TRACE_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+
+def client_trace_id(value: Optional[str]) -> Optional[str]:
+    """A client-supplied trace id if it is short and header/log safe, else None.
+
+    Kept only for correlation: the trace id itself (and the profile store key)
+    is always generated on the server.
+    """
+    if value and _CLIENT_TRACE_ID.fullmatch(value):
+        return value
+    return None
+
+
+class RequestTrace:
+    """All spans recorded for a single request"""
+
+    def __init__(self, trace_id: Optional[str] = None, profile: bool = False, client_trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.client_trace_id = client_trace_id
+        self.spans: List[Span] = []
+        self.profile = profile
+
+    def stage_totals(self) -> "OrderedDict[str, float]":
+        """Total milliseconds per stage, in first-seen order"""
+        totals: "OrderedDict[str, float]" = OrderedDict()
+        for s in self.spans:
+            totals[s.name] = totals.get(s.name, 0.0) + s.duration_ms
+        return totals
+
+    def server_timing_header(self) -> str:
+        """Format stage totals for the Server-Timing response header"""
+        entries = []
+        for name, total in self.stage_totals().items():
+            entry = f"{name};dur={total:.1f}"
+            tokens = sum(
+                int(s.attributes.get("total_tokens") or 0) for s in self.spans if s.name == name
+            )
+            if tokens:
+                entry += f';desc="tokens={tokens}"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("aiser_request_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def start_trace(trace_id: Optional[str] = None, profile: bool = False, client_trace_id: Optional[str] = None) -> RequestTrace:
+    """Begin a trace for the current context (typically called by middleware)"""
+    trace = RequestTrace(trace_id, profile=profile, client_trace_id=client_trace_id)
+    _current_trace.set(trace)
+    return trace
+
+
+class LatencyHistogram:
+    """Log-linear histogram in the spirit of HdrHistogram.
+
+    Values are bucketed by power of two with ``sub_buckets`` linear buckets per
+    octave, giving a bounded relative error (~1/sub_buckets) with a few hundred
+    counters regardless of how many observations are recorded.
+    """
+
+    def __init__(self, sub_buckets: int = 32, min_value_ms: float = 0.01):
+        self.sub_buckets = sub_buckets
+        self.min_value_ms = min_value_ms
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def _index(self, value_ms: float) -> int:
+        scaled = max(value_ms, self.min_value_ms) / self.min_value_ms
+        octave = int(math.floor(math.log2(scaled)))
+        fraction = scaled / (2 ** octave) - 1.0  # in [0, 1)
+        return octave * self.sub_buckets + min(int(fraction * self.sub_buckets), self.sub_buckets - 1)
+
+    def _upper_bound(self, index: int) -> float:
+        octave, sub = divmod(index, self.sub_buckets)
+        return self.min_value_ms * (2 ** octave) * (1.0 + (sub + 1) / self.sub_buckets)
+
+    def record(self, value_ms: float) -> None:
+        index = self._index(value_ms)
+        with self._lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.total += 1
+            self.sum_ms += value_ms
+            self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, pct: float) -> float:
+        with self._lock:
+            if not self.total:
+                return 0.0
+            target = max(1, int(math.ceil(self.total * pct / 100.0)))
+            seen = 0
+            for index in sorted(self.counts):
+                seen += self.counts[index]
+                if seen >= target:
+                    return min(self._upper_bound(index), self.max_ms)
+            return self.max_ms
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.total,
+            "mean_ms": round(self.sum_ms / self.total, 3) if self.total else 0.0,
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class StageLatencyRegistry:
+    """Per-process stage latency histograms"""
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, duration_ms: float) -> None:
+        hist = self._histograms.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(stage, LatencyHistogram())
+        hist.record(duration_ms)
+
+    def record_trace(self, trace: RequestTrace) -> None:
+        for stage, total in trace.stage_totals().items():
+            self.record(stage, total)
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {stage: hist.summary() for stage, hist in sorted(self._histograms.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+stage_latency = StageLatencyRegistry()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time a stage for the current request.
+
+    Works in both sync and async code; when no trace is active the span is
+    still timed but not recorded anywhere.
+    """
+    s = Span(name, attributes)
+    try:
+        yield s
+    except Exception as e:
+        s.set(error=type(e).__name__)
+        raise
+    finally:
+        s.end = time.perf_counter()
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append(s)
+
+
+def traced(name: str) -> Callable:
+    """Decorator recording a span around a sync or async function"""
+
+    def decorator(func: Callable) -> Callable:
+        if _is_coroutine_function(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return sync_wrapper
+
+    return decorator
+
+
+def _is_coroutine_function(func: Callable) -> bool:
+    import inspect
+
+    return inspect.iscoroutinefunction(func)
+
+
+class SamplingProfiler:
+    """Lightweight stack sampler for a single thread.
+
+    Samples the target thread's stack every ``interval`` seconds from a
+    background thread and aggregates collapsed stacks ("a;b;c" -> count).
+    The event loop thread is shared by concurrent requests, so samples can
+    include other requests' frames; use it on a quiet worker.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.005, max_depth: int = 64):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self._collapse(frame)] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="aiser-sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        return {
+            "interval_ms": self.interval * 1000.0,
+            "total_samples": sum(self.samples.values()),
+            "stacks": [{"stack": stack, "count": count} for stack, count in self.samples.most_common(200)],
+        }
+
+
+class ProfileStore:
+    """Keeps the most recent request profiles in memory (bounded)"""
+
+    def __init__(self, max_profiles: int = 50):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def put(self, trace_id: str, profile: Dict[str, Any]) -> None:
+        self._profiles[trace_id] = profile
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        return self._profiles.get(trace_id)
+
+
+profile_store = ProfileStore()
@@ -69,9 +69,16 @@ app.add_middleware(
         "X-RateLimit-Limit",
         "X-RateLimit-Remaining",
         "X-RateLimit-Reset",
+        "Server-Timing",
+        "X-Trace-Id",
+        "X-Client-Trace-Id",
     ],
 )
 
+# Binds tenant + client-disconnect detection for work offloaded to the compute executor
+from app.core.compute_executor import ComputeContextMiddleware
+app.add_middleware(ComputeContextMiddleware)
+
 app.include_router(api_router)
 
 
@@ -137,29 +144,49 @@ async def startup_event():
             await conn.run_sync(Base.metadata.create_all)
         
         logger.info("Database tables created successfully")
-        
-        # Start background tasks
-        try:
-            import asyncio
-            asyncio.create_task(schedule_retention_cleanup())
-            logger.info("✅ Background retention cleanup task started")
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to start retention cleanup task: {e}")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
         # Don't fail startup - let the app try to run anyway
 
+    # Start background tasks (spilled results are cleaned up even when the database is unavailable)
+    try:
+        import asyncio
+        asyncio.create_task(schedule_retention_cleanup())
+        logger.info("✅ Background retention cleanup task started")
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to start retention cleanup task: {e}")
+
+    # Receive cache invalidations broadcast by other workers
+    try:
+        from app.core.cache_invalidation import cache_tags
+        cache_tags.start_listener()
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to start cache invalidation listener: {e}")
+
 
 async def schedule_retention_cleanup():
-    """Background task to run data retention cleanup daily"""
+    """Background task to run data retention cleanup daily and expire spilled query results"""
     import asyncio
+    import time
     from app.db.session import get_async_session
     from app.modules.data.services.data_retention_service import DataRetentionService
+    from app.modules.data.services.result_spill import spill_store
     
+    # Spilled results left by the previous run are removed when the store starts
+    try:
+        await asyncio.to_thread(spill_store.cleanup_expired)
+    except Exception as e:
+        logger.warning(f"⚠️ Spilled result cleanup failed: {e}")
+    
+    spill_interval = max(60, min(settings.QUERY_SPILL_TTL, 3600))
+    next_retention = time.monotonic() + 86400  # 24 hours before the first retention run, then daily
     while True:
         try:
-            # Wait 24 hours (86400 seconds) before first run, then daily
-            await asyncio.sleep(86400)  # 24 hours
+            await asyncio.sleep(spill_interval)
+            await asyncio.to_thread(spill_store.cleanup_expired)
+            if time.monotonic() < next_retention:
+                continue
+            next_retention = time.monotonic() + 86400
             
             logger.info("🧹 Starting scheduled data retention cleanup...")
             async with get_async_session() as db:
@@ -169,7 +196,7 @@ async def schedule_retention_cleanup():
         except Exception as e:
             logger.error(f"❌ Retention cleanup task failed: {e}", exc_info=True)
             # Continue running even if one cleanup fails
-            await asyncio.sleep(3600)  # Wait 1 hour before retry on error
+            next_retention = min(next_retention, time.monotonic() + 3600)  # Retry within 1 hour on error
 
 
 @app.get("/health")
@@ -180,6 +207,13 @@ async def health_check():
 @app.on_event("shutdown")
 async def shutdown_event():
     print("Performing cleanup before shutdown...")
+    from app.core.cache import async_cache
+    from app.core.cache_invalidation import cache_tags
+    await cache_tags.stop_listener()
+    from app.core.compute_executor import compute_executor
+    compute_executor.shutdown(wait=False)
+    if async_cache:
+        await async_cache.close()
 
 
 # Simple rate limiting for AI endpoints (per-identifier per minute)
@@ -308,6 +342,40 @@ async def embed_token_middleware(request: Request, call_next):
     return response
 
 
+@app.middleware("http")
+async def request_tracing_middleware(request: Request, call_next):
+    """Record per-stage spans for the request and expose them via Server-Timing.
+
+    Registered last so it wraps every other middleware. Send
+    `X-Aiser-Profile: 1` (when ENABLE_REQUEST_PROFILING is on) to sample the
+    event loop stack for this request; fetch it from /metrics/profiles/{trace_id}.
+    The trace id is always generated here; a well-formed client `X-Trace-Id`
+    is recorded on the request span and echoed as `X-Client-Trace-Id`.
+    """
+    if not settings.ENABLE_REQUEST_TRACING:
+        return await call_next(request)
+
+    from app.core.tracing import start_trace, span, stage_latency, profile_store, SamplingProfiler, STAGE_REQUEST, client_trace_id
+
+    profile = settings.ENABLE_REQUEST_PROFILING and request.headers.get("x-aiser-profile") in ("1", "true")
+    trace = start_trace(profile=profile, client_trace_id=client_trace_id(request.headers.get("x-trace-id")))
+    profiler = SamplingProfiler().start() if profile else None
+    span_attributes = {"client_trace_id": trace.client_trace_id} if trace.client_trace_id else {}
+    try:
+        with span(STAGE_REQUEST, path=request.url.path, **span_attributes):
+            response = await call_next(request)
+    finally:
+        if profiler is not None:
+            profile_store.put(trace.trace_id, {"path": request.url.path, **profiler.stop()})
+        stage_latency.record_trace(trace)
+
+    response.headers["Server-Timing"] = trace.server_timing_header()
+    response.headers["X-Trace-Id"] = trace.trace_id
+    if trace.client_trace_id:
+        response.headers["X-Client-Trace-Id"] = trace.client_trace_id
+    return response
+
+
 @app.exception_handler(Exception)
 async def exception_handler(request: Request, exc: Exception):
     """Global exception handler to catch unexpected errors, log full traceback
@@ -13,6 +13,8 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 from app.modules.ai.services.litellm_service import LiteLLMService  # noqa: E402
+from app.core.tracing import traced, STAGE_CHART_BUILD  # noqa: E402
+from app.modules.charts.utils.data_reduction import BIN_COUNT_FIELD, ReductionSpec, reduce_rows  # noqa: E402
 from app.modules.chats.schemas import (
     AgentContextSchema,
     ReasoningStepSchema,
@@ -572,6 +574,17 @@ Return ONLY valid JSON, no markdown code blocks or extra text."""
             error_config = self._generate_default_chart_config(parsed_data, title, error_message=f"Chart generation failed: {str(e)}")
             return json.dumps(error_config)
     
+    def _reduce_chart_data(self, data: List[Dict], chart_type: str, x_col: str, y_cols: List[str]) -> tuple:
+        """Rows reduced to what the chart can show, and a record of the reduction (None if none applied)"""
+        reduced = reduce_rows(data, ReductionSpec.from_options(None, chart_type, x=x_col, y=y_cols))
+        return reduced["rows"], reduced["reduction"]
+    
+    @staticmethod
+    def _with_reduction(config: Dict[str, Any], reduction: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if reduction:
+            config["reduction"] = reduction
+        return config
+    
     def _generate_line_chart_config(self, data: List[Dict], title: str) -> Dict[str, Any]:
         """Generate line chart configuration."""
         # Find date and numeric columns
@@ -587,6 +600,9 @@ Return ONLY valid JSON, no markdown code blocks or extra text."""
         if not date_col or not numeric_cols:
             return self._generate_default_chart_config(data, title)
         
+        # Downsample long series to what the chart can draw
+        data, reduction = self._reduce_chart_data(data, "line", date_col, numeric_cols)
+        
         # Prepare data
         x_data = [row[date_col] for row in data]
         series_data = []
@@ -598,7 +614,7 @@ Return ONLY valid JSON, no markdown code blocks or extra text."""
                 "data": [row[col] for row in data]
             })
         
-        return {
+        return self._with_reduction({
             "title": {"text": title or "Line Chart"},
             "tooltip": {"trigger": "axis"},
             "legend": {"data": numeric_cols},
@@ -608,7 +624,7 @@ Return ONLY valid JSON, no markdown code blocks or extra text."""
             },
             "yAxis": {"type": "value"},
             "series": series_data
-        }
+        }, reduction)
     
     def _generate_bar_chart_config(self, data: List[Dict], title: str) -> Dict[str, Any]:
         """Generate bar chart configuration."""
@@ -629,10 +645,13 @@ Return ONLY valid JSON, no markdown code blocks or extra text."""
         x_col = categorical_cols[0]
         y_col = numeric_cols[0]
         
+        # Keep the top categories and fold the rest into "Other"
+        data, reduction = self._reduce_chart_data(data, "bar", x_col, [y_col])
+        
         x_data = [row[x_col] for row in data]
         y_data = [row[y_col] for row in data]
         
-        return {
+        return self._with_reduction({
             "title": {"text": title or "Bar Chart"},
             "tooltip": {"trigger": "axis"},
             "xAxis": {
@@ -645,7 +664,7 @@ Return ONLY valid JSON, no markdown code blocks or extra text."""
                 "type": "bar",
                 "data": y_data
             }]
-        }
+        }, reduction)
     
     def _generate_pie_chart_config(self, data: List[Dict], title: str) -> Dict[str, Any]:
         """Generate pie chart configuration."""
@@ -666,9 +685,12 @@ Return ONLY valid JSON, no markdown code blocks or extra text."""
         label_col = categorical_cols[0]
         value_col = numeric_cols[0]
         
+        # Keep the largest slices and fold the rest into "Other"
+        data, reduction = self._reduce_chart_data(data, "pie", label_col, [value_col])
+        
         pie_data = [{"name": row[label_col], "value": row[value_col]} for row in data]
         
-        return {
+        return self._with_reduction({
             "title": {"text": title or "Pie Chart"},
             "tooltip": {"trigger": "item"},
             "series": [{
@@ -676,7 +698,7 @@ Return ONLY valid JSON, no markdown code blocks or extra text."""
                 "type": "pie",
                 "data": pie_data
             }]
-        }
+        }, reduction)
     
     def _generate_scatter_chart_config(self, data: List[Dict], title: str) -> Dict[str, Any]:
         """Generate scatter plot configuration."""
@@ -694,9 +716,14 @@ Return ONLY valid JSON, no markdown code blocks or extra text."""
         x_col = numeric_cols[0]
         y_col = numeric_cols[1]
         
-        scatter_data = [[row[x_col], row[y_col]] for row in data]
+        # Dense point clouds are binned; each point then carries its bin's row count
+        data, reduction = self._reduce_chart_data(data, "scatter", x_col, [y_col])
+        if reduction:
+            scatter_data = [[row[x_col], row[y_col], row[BIN_COUNT_FIELD]] for row in data]
+        else:
+            scatter_data = [[row[x_col], row[y_col]] for row in data]
         
-        return {
+        return self._with_reduction({
             "title": {"text": title or "Scatter Plot"},
             "tooltip": {"trigger": "item"},
             "xAxis": {"type": "value"},
@@ -706,7 +733,7 @@ Return ONLY valid JSON, no markdown code blocks or extra text."""
                 "type": "scatter",
                 "data": scatter_data
             }]
-        }
+        }, reduction)
     
     def _generate_heatmap_config(self, data: List[Dict], title: str) -> Dict[str, Any]:
         """Generate heatmap configuration."""
@@ -1140,6 +1167,7 @@ Provide your final ECharts configuration as valid JSON. You can either:
         
         return schema
     
+    @traced(STAGE_CHART_BUILD)
     async def generate_chart(
         self,
         data: List[Dict],
@@ -14,6 +14,7 @@ from typing import Any, Dict, List, Optional
 import importlib
 
 from app.modules.ai.services.litellm_service import LiteLLMService  # noqa: E402
+from app.modules.ai.utils.stats_engine import ColumnarStats, classify_columns
 from app.modules.chats.schemas import (
     AgentContextSchema,
     ReasoningStepSchema,
@@ -165,283 +166,47 @@ class StatisticalAnalysisTool(BaseTool):
     
     def _comprehensive_analysis(self, data: List[Dict]) -> Dict[str, Any]:
         """Perform comprehensive statistical analysis."""
+        stats = ColumnarStats(data)
         analysis = {
-            "data_summary": self._data_summary(data),
-            "numeric_analysis": self._numeric_analysis(data),
-            "categorical_analysis": self._categorical_analysis(data),
-            "correlations": self._correlation_analysis(data),
-            "trends": self._trend_analysis(data),
-            "anomalies": self._anomaly_analysis(data)
+            "data_summary": self._data_summary(stats, data),
+            "numeric_analysis": stats.numeric_summary(),
+            "categorical_analysis": stats.categorical_summary(),
+            "correlations": stats.correlations(),
+            "trends": stats.trends(),
+            "anomalies": stats.outliers()
         }
         
         return analysis
     
-    def _data_summary(self, data: List[Dict]) -> Dict[str, Any]:
+    def _data_summary(self, stats: ColumnarStats, data: List[Dict]) -> Dict[str, Any]:
         """Generate data summary."""
         return {
-            "total_rows": len(data),
+            "total_rows": stats.row_count,
             "total_columns": len(data[0]) if data else 0,
-            "column_names": list(data[0].keys()) if data else [],
-            "data_types": self._get_column_types(data)
+            "column_names": stats.columns,
+            "data_types": stats.types
         }
     
-    def _numeric_analysis(self, data: List[Dict]) -> Dict[str, Any]:
-        """Analyze numeric columns."""
-        numeric_cols = self._get_numeric_columns(data)
-        analysis = {}
-        
-        for col in numeric_cols:
-            values = [float(row[col]) for row in data if row[col] is not None]
-            if values:
-                analysis[col] = {
-                    "count": len(values),
-                    "mean": sum(values) / len(values),
-                    "median": sorted(values)[len(values)//2],
-                    "min": min(values),
-                    "max": max(values),
-                    "std_dev": self._calculate_std_dev(values),
-                    "range": max(values) - min(values)
-                }
-        
-        return analysis
-    
-    def _categorical_analysis(self, data: List[Dict]) -> Dict[str, Any]:
-        """Analyze categorical columns."""
-        categorical_cols = self._get_categorical_columns(data)
-        analysis = {}
-        
-        for col in categorical_cols:
-            values = [row[col] for row in data if row[col] is not None]
-            if values:
-                value_counts = {}
-                for value in values:
-                    value_counts[value] = value_counts.get(value, 0) + 1
-                
-                analysis[col] = {
-                    "unique_values": len(value_counts),
-                    "most_common": max(value_counts.items(), key=lambda x: x[1]),
-                    "value_distribution": value_counts
-                }
-        
-        return analysis
-    
-    def _correlation_analysis(self, data: List[Dict]) -> Dict[str, Any]:
-        """Analyze correlations between numeric columns."""
-        numeric_cols = self._get_numeric_columns(data)
-        correlations = {}
-        
-        for i, col1 in enumerate(numeric_cols):
-            for col2 in numeric_cols[i+1:]:
-                correlation = self._calculate_correlation(data, col1, col2)
-                if correlation is not None:
-                    correlations[f"{col1}_vs_{col2}"] = correlation
-        
-        return correlations
-    
     def _trend_analysis(self, data: List[Dict]) -> Dict[str, Any]:
         """Analyze trends in the data."""
-        trends = {}
-        
-        # Look for time-based trends
-        date_cols = self._get_date_columns(data)
-        numeric_cols = self._get_numeric_columns(data)
-        
-        for date_col in date_cols:
-            for num_col in numeric_cols:
-                trend = self._calculate_trend(data, date_col, num_col)
-                if trend:
-                    trends[f"{num_col}_over_{date_col}"] = trend
-        
-        return trends
+        stats = ColumnarStats(data)
+        return {"data_summary": self._data_summary(stats, data), "trends": stats.trends()}
     
     def _anomaly_analysis(self, data: List[Dict]) -> Dict[str, Any]:
         """Detect anomalies in the data."""
-        anomalies = {}
-        numeric_cols = self._get_numeric_columns(data)
-        
-        for col in numeric_cols:
-            values = [float(row[col]) for row in data if row[col] is not None]
-            if len(values) > 10:  # Need sufficient data for anomaly detection
-                outliers = self._detect_outliers(values)
-                if outliers:
-                    anomalies[col] = {
-                        "outlier_count": len(outliers),
-                        "outlier_indices": outliers,
-                        "outlier_values": [values[i] for i in outliers]
-                    }
-        
-        return anomalies
+        stats = ColumnarStats(data)
+        return {"data_summary": self._data_summary(stats, data), "anomalies": stats.outliers()}
     
     def _basic_analysis(self, data: List[Dict]) -> Dict[str, Any]:
         """Perform basic analysis."""
+        types = classify_columns(data)
         return {
             "row_count": len(data),
             "column_count": len(data[0]) if data else 0,
-            "numeric_columns": self._get_numeric_columns(data),
-            "categorical_columns": self._get_categorical_columns(data)
+            "numeric_columns": [c for c, t in types.items() if t == "numeric"],
+            "categorical_columns": [c for c, t in types.items() if t == "categorical"]
         }
     
-    def _get_column_types(self, data: List[Dict]) -> Dict[str, str]:
-        """Get data types for each column."""
-        types = {}
-        if not data:
-            return types
-        
-        for key in data[0].keys():
-            sample_values = [row.get(key) for row in data[:10]]
-            if self._is_numeric_column(sample_values):
-                types[key] = "numeric"
-            elif self._is_date_column(sample_values):
-                types[key] = "date"
-            else:
-                types[key] = "categorical"
-        
-        return types
-    
-    def _get_numeric_columns(self, data: List[Dict]) -> List[str]:
-        """Get list of numeric columns."""
-        numeric_cols = []
-        if not data:
-            return numeric_cols
-        
-        for key in data[0].keys():
-            sample_values = [row.get(key) for row in data[:10]]
-            if self._is_numeric_column(sample_values):
-                numeric_cols.append(key)
-        
-        return numeric_cols
-    
-    def _get_categorical_columns(self, data: List[Dict]) -> List[str]:
-        """Get list of categorical columns."""
-        categorical_cols = []
-        if not data:
-            return categorical_cols
-        
-        for key in data[0].keys():
-            sample_values = [row.get(key) for row in data[:10]]
-            if not self._is_numeric_column(sample_values) and not self._is_date_column(sample_values):
-                categorical_cols.append(key)
-        
-        return categorical_cols
-    
-    def _get_date_columns(self, data: List[Dict]) -> List[str]:
-        """Get list of date columns."""
-        date_cols = []
-        if not data:
-            return date_cols
-        
-        for key in data[0].keys():
-            sample_values = [row.get(key) for row in data[:10]]
-            if self._is_date_column(sample_values):
-                date_cols.append(key)
-        
-        return date_cols
-    
-    def _is_numeric_column(self, sample_values: List[Any]) -> bool:
-        """Check if column contains numeric values."""
-        numeric_count = 0
-        for value in sample_values:
-            if value is not None:
-                try:
-                    float(value)
-                    numeric_count += 1
-                except (ValueError, TypeError):
-                    pass
-        
-        return numeric_count / len(sample_values) > 0.8 if sample_values else False
-    
-    def _is_date_column(self, sample_values: List[Any]) -> bool:
-        """Check if column contains date values."""
-        date_count = 0
-        for value in sample_values:
-            if value is not None:
-                try:
-                    datetime.fromisoformat(str(value).replace('Z', '+00:00'))
-                    date_count += 1
-                except (ValueError, TypeError):
-                    pass
-        
-        return date_count / len(sample_values) > 0.8 if sample_values else False
-    
-    def _calculate_std_dev(self, values: List[float]) -> float:
-        """Calculate standard deviation."""
-        if len(values) < 2:
-            return 0.0
-        
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / len(values)
-        return variance ** 0.5
-    
-    def _calculate_correlation(self, data: List[Dict], col1: str, col2: str) -> Optional[float]:
-        """Calculate correlation between two numeric columns."""
-        values1 = [float(row[col1]) for row in data if row[col1] is not None]
-        values2 = [float(row[col2]) for row in data if row[col2] is not None]
-        
-        if len(values1) != len(values2) or len(values1) < 2:
-            return None
-        
-        # Simple correlation calculation
-        mean1 = sum(values1) / len(values1)
-        mean2 = sum(values2) / len(values2)
-        
-        numerator = sum((x - mean1) * (y - mean2) for x, y in zip(values1, values2))
-        denominator = (sum((x - mean1) ** 2 for x in values1) * sum((y - mean2) ** 2 for y in values2)) ** 0.5
-        
-        if denominator == 0:
-            return None
-        
-        return numerator / denominator
-    
-    def _calculate_trend(self, data: List[Dict], date_col: str, num_col: str) -> Optional[Dict[str, Any]]:
-        """Calculate trend for a numeric column over time."""
-        # Simplified trend calculation
-        values = [float(row[num_col]) for row in data if row[num_col] is not None]
-        if len(values) < 2:
-            return None
-        
-        # Simple linear trend
-        first_half = values[:len(values)//2]
-        second_half = values[len(values)//2:]
-        
-        if first_half and second_half:
-            first_avg = sum(first_half) / len(first_half)
-            second_avg = sum(second_half) / len(second_half)
-            
-            trend_direction = "upward" if second_avg > first_avg else "downward"
-            trend_strength = abs(second_avg - first_avg) / first_avg if first_avg != 0 else 0
-            
-            return {
-                "direction": trend_direction,
-                "strength": trend_strength,
-                "first_half_avg": first_avg,
-                "second_half_avg": second_avg
-            }
-        
-        return None
-    
-    def _detect_outliers(self, values: List[float]) -> List[int]:
-        """Detect outliers using IQR method."""
-        if len(values) < 4:
-            return []
-        
-        sorted_values = sorted(values)
-        q1_index = len(sorted_values) // 4
-        q3_index = 3 * len(sorted_values) // 4
-        
-        q1 = sorted_values[q1_index]
-        q3 = sorted_values[q3_index]
-        iqr = q3 - q1
-        
-        lower_bound = q1 - 1.5 * iqr
-        upper_bound = q3 + 1.5 * iqr
-        
-        outliers = []
-        for i, value in enumerate(values):
-            if value < lower_bound or value > upper_bound:
-                outliers.append(i)
-        
-        return outliers
-    
     async def _arun(self, data: str, analysis_type: str = "comprehensive") -> str:
         """Async version of statistical analysis."""
         # Ensure we return a string, not a coroutine
@@ -5,6 +5,7 @@ This agent provides production-grade natural language to SQL conversion
 with business terminology, query optimization, and error correction.
 """
 
+import hashlib
 import json
 import logging
 import re
@@ -19,11 +20,10 @@ try:
 except Exception:
     _HAS_SQLGLOT = False
 
-# Import schema cache for performance
-try:
-    from app.modules.ai.utils.schema_cache import global_schema_cache
-except ImportError:
-    global_schema_cache = None
+# Schemas and their prompt text are cached across workers (see schema_cache_service)
+from app.modules.ai.services.schema_cache_service import get_schema_cache_service
+from app.modules.ai.services.sql_plan_cache import sql_plan_cache
+from app.modules.data.services.sql_pipeline import normalize_dialect, sql_pipeline
 
 # Try direct imports first (preferred method)
 try:
@@ -90,6 +90,7 @@ from app.modules.chats.schemas import (
 )  # noqa: E402
 
 from app.modules.ai.services.litellm_service import LiteLLMService  # noqa: E402
+from app.core.tracing import traced, STAGE_SCHEMA_FETCH, STAGE_SQL_GENERATION  # noqa: E402
 
 logger = logging.getLogger(__name__)
 
@@ -102,6 +103,32 @@ else:
     logger.debug("✅ LangChain components available for NL2SQLAgent")
 
 
+async def fetch_source_schema(data_service: Any, data_source_id: str) -> Optional[Dict[str, Any]]:
+    """``get_source_schema`` through the shared schema cache.
+
+    Stale entries are served while a background refresh runs; the data source's
+    ``updated_at`` is the change probe, so an unchanged source is not reloaded.
+    Failed lookups are returned as-is and never cached.
+    """
+    failure: Dict[str, Any] = {}
+
+    async def load():
+        response = await data_service.get_source_schema(data_source_id)
+        if response and response.get('success'):
+            return response
+        failure['response'] = response
+        return None
+
+    async def probe():
+        from app.modules.data.services.data_source_catalog import data_source_catalog
+
+        source = await data_source_catalog.get(data_source_id, include_schema=False)
+        return source.get('updated_at') if source else None
+
+    cached = await get_schema_cache_service().get_or_load(data_source_id, load, probe=probe, kind='source')
+    return cached if cached is not None else failure.get('response')
+
+
 class SQLValidationTool(BaseTool):
     """Tool for validating and correcting SQL queries."""
     
@@ -170,7 +197,6 @@ class SQLValidationTool(BaseTool):
                         return "Invalid SQL syntax"
                     return "SQL syntax appears valid (schema validation skipped - data_source_id not provided)"
             
-            # Optionally transpile/normalize SQL for ClickHouse using sqlglot
             # Determine dialect from kwargs or schema_info
             dialect = None
             try:
@@ -185,50 +211,22 @@ class SQLValidationTool(BaseTool):
             except Exception:
                 schema_info = {}
 
-            # Normalize dialect names for sqlglot
-            dialect_map = {
-                'postgresql': 'postgres',
-                'postgres': 'postgres',
-                'pg': 'postgres',
-                'clickhouse': 'clickhouse',
-                'mysql': 'mysql',
-                'snowflake': 'snowflake',
-                'sqlite': 'sqlite'
-            }
-            dialect_normalized = dialect_map.get((dialect or '').lower(), '') if isinstance(dialect, str) else ''
-
-            # Optionally transpile/normalize SQL for target dialect using sqlglot
-            try:
-                if _HAS_SQLGLOT and dialect_normalized:
-                    # Try to parse/validate with sqlglot and also transpile if needed
-                    try:
-                        parsed = sqlglot.parse_one(sql_query, read=dialect_normalized)
-                        # Optionally convert to dialect-specific SQL (normalize)
-                        sql_query = parsed.to_sql(dialect=dialect_normalized)
-                    except Exception:
-                        # Try transpile as fallback
-                        out = sqlglot.transpile(sql_query, read="ansi", write=dialect_normalized)
-                        if out and isinstance(out, list):
-                            sql_query = out[0]
-            except Exception:
-                # If sqlglot not available or fails, continue with original SQL
-                pass
-
-            # Parse SQL
-            parsed = sqlparse.parse(sql_query)
-            if not parsed:
+            # Parsed once by the SQL pipeline; the schema checks below reuse the cached result
+            dialect_normalized = normalize_dialect(dialect) if isinstance(dialect, str) else None
+            if not sql_pipeline.compile(sql_query, read=dialect_normalized).parsed and not sqlparse.parse(sql_query):
                 return "Invalid SQL syntax"
             
             # Get schema information for validation
-            schema_info = await self._get_schema_info(data_source_id)
+            if not schema_info:
+                schema_info = await self._get_schema_info(data_source_id)
             if not schema_info:
                 return "Unable to retrieve schema for validation."
 
-            validation_result = self._validate_against_schema(sql_query, schema_info)
+            validation_result = self._validate_against_schema(sql_query, schema_info, dialect_normalized)
             if not validation_result["valid"]:
                 # Attempt to fix common errors
                 fixed_query = self._fix_common_errors(sql_query, schema_info)
-                validation_result_after_fix = self._validate_against_schema(fixed_query, schema_info)
+                validation_result_after_fix = self._validate_against_schema(fixed_query, schema_info, dialect_normalized)
                 if validation_result_after_fix["valid"]:
                     return f"SQL syntax is valid after corrections: {fixed_query}"
                 else:
@@ -241,6 +239,7 @@ class SQLValidationTool(BaseTool):
             logger.error(f"Error validating SQL: {e}", exc_info=True)
             return f"SQL validation failed: {str(e)}"
     
+    @traced(STAGE_SCHEMA_FETCH)
     async def _get_schema_info(self, data_source_id: str) -> Dict[str, Any]:  # New async method
         """Retrieve schema information for a given data source asynchronously."""
         try:
@@ -249,7 +248,7 @@ class SQLValidationTool(BaseTool):
                 return {}
             
             # Use the data service to get schema
-            schema_response = await self._data_service.get_source_schema(data_source_id)
+            schema_response = await fetch_source_schema(self._data_service, data_source_id)
             
             # Handle the response structure - get_source_schema returns a dict with 'schema' key
             if schema_response and isinstance(schema_response, dict):
@@ -305,6 +304,14 @@ class SQLValidationTool(BaseTool):
         
         sql_query = sql_query.strip()
         
+        # A query the SQL pipeline parses has balanced quotes and parentheses;
+        # only structural checks remain (the text heuristics below are the fallback)
+        compiled = sql_pipeline.compile(sql_query)
+        if compiled.parsed and compiled.statement_type == "select":
+            if sql_query.upper().startswith('SELECT') and not compiled.facts.get("has_from"):
+                return ["SELECT statement missing FROM clause"]
+            return []
+        
         # Check for unbalanced single quotes
         single_quote_count = sql_query.count("'")
         if single_quote_count % 2 != 0:
@@ -370,7 +377,7 @@ class SQLValidationTool(BaseTool):
         
         return errors
     
-    def _validate_against_schema(self, sql_query: str, schema_info: Dict) -> Dict[str, Any]:
+    def _validate_against_schema(self, sql_query: str, schema_info: Dict, dialect: Optional[str] = None) -> Dict[str, Any]:
         """Validate SQL query against database schema."""
         errors = []
         
@@ -390,26 +397,35 @@ class SQLValidationTool(BaseTool):
                 "errors": ["Schema information not available for validation"]
             }
         
-        # Extract table names from query - handle database.table format
-        # Pattern: FROM database.table or FROM table, JOIN database.table or JOIN table
-        table_pattern = r'\bFROM\s+(?:`?([\w]+)`?\.)?`?([\w]+)`?\b|\bJOIN\s+(?:`?([\w]+)`?\.)?`?([\w]+)`?\b'
-        matches = re.findall(table_pattern, sql_query, re.IGNORECASE)
-        table_names = []  # List of (database, table) tuples or (None, table) for unqualified
-        for match in matches:
-            # match is (db_from, table_from, db_join, table_join)
-            if match[1]:  # FROM table
-                table_names.append((match[0] if match[0] else None, match[1]))
-            if match[3]:  # JOIN table
-                table_names.append((match[2] if match[2] else None, match[3]))
-        
-        # Also try simpler pattern for table names without database prefix
-        simple_pattern = r'\bFROM\s+`?([\w]+)`?\b|\bJOIN\s+`?([\w]+)`?\b'
-        simple_matches = re.findall(simple_pattern, sql_query, re.IGNORECASE)
-        for match in simple_matches:
-            if match[0]:
-                table_names.append((None, match[0]))
-            if match[1]:
-                table_names.append((None, match[1]))
+        # Table references from the parsed query (CTEs and EXTRACT(... FROM col) are not tables);
+        # the regex scan only handles SQL the parser rejects
+        compiled = sql_pipeline.compile(sql_query, read=dialect)
+        if compiled.parsed:
+            table_names = [
+                (name.rsplit('.', 1)[0], name.rsplit('.', 1)[1]) if '.' in name else (None, name)
+                for name in compiled.tables
+            ]
+        else:
+            # Extract table names from query - handle database.table format
+            # Pattern: FROM database.table or FROM table, JOIN database.table or JOIN table
+            table_pattern = r'\bFROM\s+(?:`?([\w]+)`?\.)?`?([\w]+)`?\b|\bJOIN\s+(?:`?([\w]+)`?\.)?`?([\w]+)`?\b'
+            matches = re.findall(table_pattern, sql_query, re.IGNORECASE)
+            table_names = []  # List of (database, table) tuples or (None, table) for unqualified
+            for match in matches:
+                # match is (db_from, table_from, db_join, table_join)
+                if match[1]:  # FROM table
+                    table_names.append((match[0] if match[0] else None, match[1]))
+                if match[3]:  # JOIN table
+                    table_names.append((match[2] if match[2] else None, match[3]))
+        
+            # Also try simpler pattern for table names without database prefix
+            simple_pattern = r'\bFROM\s+`?([\w]+)`?\b|\bJOIN\s+`?([\w]+)`?\b'
+            simple_matches = re.findall(simple_pattern, sql_query, re.IGNORECASE)
+            for match in simple_matches:
+                if match[0]:
+                    table_names.append((None, match[0]))
+                if match[1]:
+                    table_names.append((None, match[1]))
         
         # Remove duplicates
         table_names = list(set(table_names))
@@ -716,16 +732,7 @@ class SQLValidationTool(BaseTool):
         if not _HAS_SQLGLOT:
             return sql_query
         try:
-            # Try to parse and convert to clickhouse SQL
-            try:
-                parsed = sqlglot.parse_one(sql_query)
-                return parsed.to_sql(dialect="clickhouse")
-            except Exception:
-                # Fallback to transpile
-                out = sqlglot.transpile(sql_query, read="ansi", write="clickhouse")
-                if out and isinstance(out, list):
-                    return out[0]
-                return sql_query
+            return sql_pipeline.compile(sql_query, write="clickhouse").sql
         except Exception:
             return sql_query
 
@@ -1001,6 +1008,7 @@ Return ONLY the JSON object, no other text. The sql_query field must contain act
         
         return agent_executor
     
+    @traced(STAGE_SQL_GENERATION)
     async def generate_sql(
         self,
         natural_language_query: str,
@@ -1081,7 +1089,7 @@ Return ONLY the JSON object, no other text. The sql_query field must contain act
                 logger.info(f"✅ Using provided schema_info: {len(schem_info)} tables/objects")
             else:
                 # Fallback: fetch schema from data service
-                schem_info_result = await self.data_service.get_source_schema(data_source_id)
+                schem_info_result = await fetch_source_schema(self.data_service, data_source_id)
                 if not schem_info_result or not schem_info_result.get('success'):
                     error_msg = schem_info_result.get('error', 'Unknown error') if schem_info_result else 'No response from schema service'
                     logger.warning(f"⚠️ Failed to get schema for data source {data_source_id}: {error_msg}, will proceed without schema")
@@ -1263,37 +1271,45 @@ Would you like help connecting a data source?
                 
                 return "\n".join(formatted_parts)
             
-            # Format schema for better LLM understanding
-            schema_str_formatted = format_schema_for_llm(schem_info)
-            schema_str_json = json.dumps(schem_info, indent=2)
-            
-            # Use formatted version for prompt, JSON for detailed reference
-            schema_str = f"{schema_str_formatted}\n\n=== DETAILED SCHEMA (JSON) ===\n{schema_str_json}"
-            
-            if len(schema_str) > MAX_SCHEMA_TOKENS * 4:  # Rough char-to-token ratio
-                logger.info(f"📊 Large schema detected ({len(schema_str)} chars), summarizing for LLM")
-                # Summarize schema: keep only table names and key columns
-                summarized_schema = {}
-                for table_name, table_info in list(schem_info.items())[:30]:  # Top 30 tables
-                    if isinstance(table_info, dict):
-                        # Skip schema-only keys
-                        if '.' not in table_name and 'columns' not in table_info and 'rowCount' not in table_info and 'engine' not in table_info:
-                            continue
-                        summarized_table = {"table_name": table_name}
-                        if 'columns' in table_info:
-                            # Keep only first 15 columns per table (more for better column visibility)
-                            cols = table_info['columns'][:15]
-                            summarized_table['columns'] = cols
-                            if len(table_info['columns']) > 15:
-                                summarized_table['_total_columns'] = str(len(table_info['columns']))  # Store as string for JSON compatibility
-                        summarized_schema[table_name] = summarized_table
-                    else:
-                        summarized_schema[table_name] = table_info
-                schem_info = summarized_schema
+            # Prompt text built from a fetched schema is cached with that schema version
+            schema_cache = get_schema_cache_service()
+            schema_str = await schema_cache.get_formatted(data_source_id, 'llm_prompt', kind='source') if not schema_info else None
+            if schema_str:
+                logger.info(f"✅ Using cached prompt schema ({len(schema_str)} chars)")
+            else:
+                # Format schema for better LLM understanding
                 schema_str_formatted = format_schema_for_llm(schem_info)
                 schema_str_json = json.dumps(schem_info, indent=2)
+            
+                # Use formatted version for prompt, JSON for detailed reference
                 schema_str = f"{schema_str_formatted}\n\n=== DETAILED SCHEMA (JSON) ===\n{schema_str_json}"
-                logger.info(f"✅ Schema summarized: {len(schema_str)} chars")
+            
+                if len(schema_str) > MAX_SCHEMA_TOKENS * 4:  # Rough char-to-token ratio
+                    logger.info(f"📊 Large schema detected ({len(schema_str)} chars), summarizing for LLM")
+                    # Summarize schema: keep only table names and key columns
+                    summarized_schema = {}
+                    for table_name, table_info in list(schem_info.items())[:30]:  # Top 30 tables
+                        if isinstance(table_info, dict):
+                            # Skip schema-only keys
+                            if '.' not in table_name and 'columns' not in table_info and 'rowCount' not in table_info and 'engine' not in table_info:
+                                continue
+                            summarized_table = {"table_name": table_name}
+                            if 'columns' in table_info:
+                                # Keep only first 15 columns per table (more for better column visibility)
+                                cols = table_info['columns'][:15]
+                                summarized_table['columns'] = cols
+                                if len(table_info['columns']) > 15:
+                                    summarized_table['_total_columns'] = str(len(table_info['columns']))  # Store as string for JSON compatibility
+                            summarized_schema[table_name] = summarized_table
+                        else:
+                            summarized_schema[table_name] = table_info
+                    schem_info = summarized_schema
+                    schema_str_formatted = format_schema_for_llm(schem_info)
+                    schema_str_json = json.dumps(schem_info, indent=2)
+                    schema_str = f"{schema_str_formatted}\n\n=== DETAILED SCHEMA (JSON) ===\n{schema_str_json}"
+                    logger.info(f"✅ Schema summarized: {len(schema_str)} chars")
+                if not schema_info and schem_info:
+                    await schema_cache.set_formatted(data_source_id, 'llm_prompt', schema_str, kind='source')
             
             # Get database type for dialect-specific instructions
             db_type = None
@@ -1307,6 +1323,25 @@ Would you like help connecting a data source?
                 except Exception:
                     pass
             
+            # Repeated questions (same schema text and dialect) reuse the validated SQL without an LLM call
+            plan_dialect = db_type or data_source_type
+            plan_sqlglot_dialect = normalize_dialect(plan_dialect) or ('duckdb' if data_source_type == 'file' else None)
+            plan_schema_hash = hashlib.md5(schema_str.encode()).hexdigest()
+            use_plan_cache = not conversation_history
+            plan = await sql_plan_cache.lookup(natural_language_query, data_source_id, plan_schema_hash, plan_dialect) if use_plan_cache else None
+            if plan:
+                logger.info(f"✅ [NL2SQL_AGENT] SQL plan cache hit (template={plan['template']}), skipping LLM generation")
+                return {
+                    "sql_query": plan["sql"],
+                    "explanation": self._generate_business_explanation(plan["sql"], natural_language_query),
+                    "validation_result": plan.get("validation_result") or {"valid": True, "message": "Validated when cached"},
+                    "reasoning_steps": [step.dict() for step in reasoning_steps],
+                    "execution_time_ms": int((time.time() - start_time) * 1000),
+                    "success": True,
+                    "result_columns": plan.get("columns", []),
+                    "plan_cache": {"hit": True, "template": plan["template"]},
+                }
+            
             # Add dialect-specific instructions
             dialect_instructions = ""
             # CRITICAL: File data sources use DuckDB, not ClickHouse
@@ -1766,10 +1801,18 @@ Before returning SQL, verify:
             # Calculate execution time
             execution_time = int((time.time() - start_time) * 1000)
             
+            sql_valid = "SQL syntax is valid" in validation_result
+            if use_plan_cache and sql_valid and sql_query:
+                await sql_plan_cache.store(
+                    natural_language_query, data_source_id, plan_schema_hash, plan_dialect, sql_query,
+                    sqlglot_dialect=plan_sqlglot_dialect,
+                    validation_result={"valid": True, "message": validation_result},
+                )
+            
             return {
                 "sql_query": sql_query,
                 "explanation": explanation,
-                "validation_result": {"valid": "SQL syntax is valid" in validation_result, "message": validation_result},
+                "validation_result": {"valid": sql_valid, "message": validation_result},
                 "reasoning_steps": [step.dict() for step in reasoning_steps],
                 "execution_time_ms": execution_time,
                 "success": True
@@ -1819,7 +1862,7 @@ Before returning SQL, verify:
                 schem_info = schema_info
                 logger.info(f"✅ Using provided schema_info: {len(schem_info)} tables/objects")
             else:
-                schem_info_result = await self.data_service.get_source_schema(data_source_id)
+                schem_info_result = await fetch_source_schema(self.data_service, data_source_id)
                 if not schem_info_result or not schem_info_result.get('success'):
                     error_msg = schem_info_result.get('error', 'Unknown error') if schem_info_result else 'No response from schema service'
                     logger.warning(f"⚠️ Failed to get schema for data source {data_source_id}: {error_msg}")
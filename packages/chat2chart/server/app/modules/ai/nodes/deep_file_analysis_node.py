@@ -8,17 +8,29 @@ Implements multi-step analysis workflow for file data sources:
 4. Result Synthesis (combine into comprehensive report)
 """
 
+import asyncio
 import logging
 import json
 from typing import Any, Dict, List, Optional
 import duckdb
-import pandas as pd
 
+from app.core.compute_executor import compute_executor
+from app.core.compute_tasks import read_excel_frame
 from app.modules.ai.schemas.graph_state import AiserWorkflowState
 from app.modules.ai.services.litellm_service import LiteLLMService
+from app.modules.data.services.excel_ingest import attach_columnar_sheets
+from app.modules.ai.utils.column_profiler import (
+    PROFILE_CACHE_TTL,
+    content_hash,
+    profile_cache_key,
+    profile_table,
+)
 
 logger = logging.getLogger(__name__)
 
+# Workbooks loaded from raw bytes are profiled on their first sheet
+_EXCEL_PROFILE_SHEET = 0
+
 
 async def deep_file_analysis_node(state: AiserWorkflowState) -> AiserWorkflowState:
     """
@@ -265,26 +277,29 @@ async def _run_data_profiling(data_source: Dict[str, Any]) -> Dict[str, Any]:
     """
     Run statistical profiling queries to understand data structure.
     Returns a profile dictionary with column statistics, data quality metrics, etc.
+    
+    All column statistics come from a single aggregate scan (see
+    utils/column_profiler.py). Profiles are cached by file content hash, so
+    re-analysing the same upload skips loading and profiling entirely.
     """
     try:
         file_path = data_source.get("file_path")
         file_format = data_source.get("format", "csv")
         schema = data_source.get("schema", {})
         
-        # Check if DuckDB tables are already created (multi-sheet Excel)
+        # Multi-sheet Excel uploads keep each sheet as Parquet in the columnar store
         duckdb_tables = schema.get("duckdb_tables") if isinstance(schema, dict) else None
         
         conn = duckdb.connect()
-        profile = {
-            "columns": [],
-            "row_count": 0,
-            "data_quality": {},
-            "statistical_summary": {}
-        }
+        file_hash = None
+        tenant = str(data_source.get("organization_id") or data_source.get("user_id") or "") or None
         
         try:
-            # Load file data if not already loaded
-            if not duckdb_tables:
+            # Attach stored sheets as views ('data' = primary sheet); otherwise load the file
+            attached = bool(duckdb_tables) and await compute_executor.run_duckdb(
+                attach_columnar_sheets, conn, schema, tenant=tenant
+            )
+            if not attached:
                 if not file_path:
                     raise Exception("No file_path available for data profiling")
                 
@@ -303,6 +318,12 @@ async def _run_data_profiling(data_source: Dict[str, Any]) -> Dict[str, Any]:
                     # Load file from PostgreSQL storage
                     file_content = await storage_service.get_file(file_path, user_id)
                     
+                    file_hash = await asyncio.to_thread(content_hash, file_content)
+                    cached_profile = await _get_cached_profile(file_hash, file_format)
+                    if cached_profile is not None:
+                        conn.close()
+                        return cached_profile
+                    
                     # Write to temp file for DuckDB
                     import tempfile
                     import os
@@ -311,20 +332,7 @@ async def _run_data_profiling(data_source: Dict[str, Any]) -> Dict[str, Any]:
                         tmp_path = tmp.name
                     
                     try:
-                        if file_format == "csv":
-                            safe_path = tmp_path.replace("'", "''")
-                            conn.execute(f"CREATE TABLE IF NOT EXISTS data AS SELECT * FROM read_csv_auto('{safe_path}')")
-                        elif file_format == "parquet":
-                            safe_path = tmp_path.replace("'", "''")
-                            conn.execute(f"CREATE TABLE IF NOT EXISTS data AS SELECT * FROM read_parquet('{safe_path}')")
-                        elif file_format in ("xlsx", "xls"):
-                            # Use pandas to read Excel and register with DuckDB
-                            df = pd.read_excel(tmp_path, engine='openpyxl', sheet_name=0)  # Read first sheet
-                            conn.register("_excel_df", df)
-                            conn.execute("CREATE TABLE IF NOT EXISTS data AS SELECT * FROM _excel_df")
-                            logger.info(f"✅ Loaded Excel file into DuckDB: {len(df)} rows, {len(df.columns)} columns")
-                        else:
-                            raise Exception(f"Unsupported file format: {file_format}")
+                        await _load_data_table(conn, tmp_path, file_format, tenant)
                     finally:
                         # Clean up temp file
                         if tmp_path and os.path.exists(tmp_path):
@@ -334,108 +342,23 @@ async def _run_data_profiling(data_source: Dict[str, Any]) -> Dict[str, Any]:
                                 logger.warning(f"Failed to clean up temp file: {e}")
                 else:
                     # Legacy: file_path is an actual file path (shouldn't happen in production)
-                    if file_format == "csv":
-                        safe_path = file_path.replace("'", "''") if file_path else ""
-                        conn.execute(f"CREATE TABLE IF NOT EXISTS data AS SELECT * FROM read_csv_auto('{safe_path}')")
-                    elif file_format == "parquet":
-                        safe_path = file_path.replace("'", "''") if file_path else ""
-                        conn.execute(f"CREATE TABLE IF NOT EXISTS data AS SELECT * FROM read_parquet('{safe_path}')")
-                    elif file_format in ("xlsx", "xls"):
-                        # Use pandas to read Excel and register with DuckDB
-                        try:
-                            df = pd.read_excel(file_path, engine='openpyxl', sheet_name=0)  # Read first sheet
-                            conn.register("_excel_df", df)
-                            conn.execute("CREATE TABLE IF NOT EXISTS data AS SELECT * FROM _excel_df")
-                            logger.info(f"✅ Loaded Excel file into DuckDB: {len(df)} rows, {len(df.columns)} columns")
-                        except Exception as excel_error:
-                            logger.error(f"❌ Failed to load Excel file: {excel_error}")
-                            raise Exception(f"Excel file processing failed: {str(excel_error)}")
-                    else:
-                        raise Exception(f"Unsupported file format: {file_format}")
-                
-                table_name = "data"
-            else:
-                # Use first sheet table
-                table_name = list(duckdb_tables.values())[0]
-                conn.execute(f"CREATE OR REPLACE VIEW data AS SELECT * FROM {table_name}")
-            
-            # Get row count
-            row_count = conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
-            profile["row_count"] = row_count
-            
-            # Get column info
-            columns_info = conn.execute("DESCRIBE data").fetchall()
-            column_names = [col[0] for col in columns_info]
-            
-            # For each column, get statistical summary
-            # Note: DuckDB DESCRIBE returns (column_name, column_type, null, default, expr_type)
-            for col_info in columns_info:
-                col_name = col_info[0]
-                col_type = col_info[1]
-                col_profile = {
-                    "name": col_name,
-                    "type": col_type,
-                    "null_count": 0,
-                    "distinct_count": 0,
-                    "min": None,
-                    "max": None,
-                    "avg": None,
-                    "sample_values": []
-                }
-                
-                try:
-                    # Null count
-                    null_result = conn.execute(f"SELECT COUNT(*) FROM data WHERE {col_name} IS NULL").fetchone()
-                    col_profile["null_count"] = null_result[0] if null_result else 0
-                    
-                    # Distinct count
-                    distinct_result = conn.execute(f"SELECT COUNT(DISTINCT {col_name}) FROM data").fetchone()
-                    col_profile["distinct_count"] = distinct_result[0] if distinct_result else 0
-                    
-                    # For numeric columns, get min/max/avg
-                    if "INT" in col_type.upper() or "DOUBLE" in col_type.upper() or "FLOAT" in col_type.upper() or "DECIMAL" in col_type.upper():
-                        try:
-                            stats = conn.execute(f"""
-                                SELECT 
-                                    MIN({col_name}) as min_val,
-                                    MAX({col_name}) as max_val,
-                                    AVG({col_name}) as avg_val
-                                FROM data
-                                WHERE {col_name} IS NOT NULL
-                            """).fetchone()
-                            if stats:
-                                col_profile["min"] = stats[0]
-                                col_profile["max"] = stats[1]
-                                col_profile["avg"] = float(stats[2]) if stats[2] is not None else None
-                        except Exception as e:
-                            logger.debug(f"Could not get numeric stats for {col_name}: {e}")
-                    
-                    # Sample values (most common)
-                    try:
-                        sample = conn.execute(f"""
-                            SELECT {col_name}, COUNT(*) as cnt
-                            FROM data
-                            WHERE {col_name} IS NOT NULL
-                            GROUP BY {col_name}
-                            ORDER BY cnt DESC
-                            LIMIT 5
-                        """).fetchall()
-                        col_profile["sample_values"] = [row[0] for row in sample]
-                    except Exception as e:
-                        logger.debug(f"Could not get sample values for {col_name}: {e}")
+                    file_hash = await asyncio.to_thread(content_hash, None, file_path)
+                    cached_profile = await _get_cached_profile(file_hash, file_format)
+                    if cached_profile is not None:
+                        conn.close()
+                        return cached_profile
                     
-                except Exception as col_error:
-                    logger.warning(f"Error profiling column {col_name}: {col_error}")
+                    await _load_data_table(conn, file_path, file_format, tenant)
                 
-                profile["columns"].append(col_profile)
+            table_name = "data"
             
-            # Data quality metrics
-            profile["data_quality"] = {
-                "total_rows": row_count,
-                "total_columns": len(column_names),
-                "columns_with_nulls": sum(1 for col in profile["columns"] if col["null_count"] > 0),
-                "columns_with_duplicates": sum(1 for col in profile["columns"] if col["distinct_count"] < row_count and col["distinct_count"] > 0)
-            }
+            # One aggregate scan for all column statistics (+ one for top values), off the event loop
+            profile = await compute_executor.run_duckdb(profile_table, conn, "data", tenant=tenant, interrupt=conn)
+            row_count = profile["row_count"]
+            column_names = [col["name"] for col in profile["columns"]]
+            
+            if file_hash:
+                await _set_cached_profile(file_hash, file_format, profile)
             
             conn.close()
             logger.info(f"✅ Data profiling complete: {row_count} rows, {len(column_names)} columns")
@@ -452,6 +375,66 @@ async def _run_data_profiling(data_source: Dict[str, Any]) -> Dict[str, Any]:
         return {"error": str(e)}
 
 
+async def _load_data_table(conn, path: str, file_format: str, tenant: Optional[str]) -> None:
+    """Create the 'data' table from a local file; scans and Excel parsing run on the compute executor"""
+    safe_path = path.replace("'", "''")
+    if file_format == "csv":
+        await compute_executor.run_duckdb(
+            conn.execute, f"CREATE TABLE IF NOT EXISTS data AS SELECT * FROM read_csv_auto('{safe_path}')",
+            tenant=tenant, interrupt=conn,
+        )
+    elif file_format == "parquet":
+        await compute_executor.run_duckdb(
+            conn.execute, f"CREATE TABLE IF NOT EXISTS data AS SELECT * FROM read_parquet('{safe_path}')",
+            tenant=tenant, interrupt=conn,
+        )
+    elif file_format in ("xlsx", "xls"):
+        # Use pandas to read Excel (first sheet) in the parsing pool and register with DuckDB
+        try:
+            df = await compute_executor.run_cpu(read_excel_frame, path, _EXCEL_PROFILE_SHEET, tenant=tenant)
+            conn.register("_excel_df", df)
+            await compute_executor.run_duckdb(
+                conn.execute, "CREATE TABLE IF NOT EXISTS data AS SELECT * FROM _excel_df", tenant=tenant
+            )
+            logger.info(f"✅ Loaded Excel file into DuckDB: {len(df)} rows, {len(df.columns)} columns")
+        except Exception as excel_error:
+            logger.error(f"❌ Failed to load Excel file: {excel_error}")
+            raise Exception(f"Excel file processing failed: {str(excel_error)}")
+    else:
+        raise Exception(f"Unsupported file format: {file_format}")
+
+
+def _profile_key(file_hash: str, file_format: str) -> str:
+    """Profiles cover the 'data' table, which for workbooks is the first sheet only"""
+    sheet = _EXCEL_PROFILE_SHEET if file_format in ("xlsx", "xls") else None
+    return profile_cache_key(file_hash, file_format, table="data", sheet=sheet)
+
+
+async def _get_cached_profile(file_hash: Optional[str], file_format: str) -> Optional[Dict[str, Any]]:
+    """Return a previously computed profile for identical file content, if any"""
+    if not file_hash:
+        return None
+    try:
+        from app.core.cache import async_cache
+        cached = await async_cache.get(_profile_key(file_hash, file_format)) if async_cache else None
+        if cached:
+            logger.info(f"✅ Using cached data profile for content {file_hash[:12]}")
+            cached = {**cached, "profiling": {**(cached.get("profiling") or {}), "cached": True}}
+        return cached
+    except Exception as e:
+        logger.debug(f"Profile cache lookup failed: {e}")
+        return None
+
+
+async def _set_cached_profile(file_hash: str, file_format: str, profile: Dict[str, Any]) -> None:
+    try:
+        from app.core.cache import async_cache
+        if async_cache:
+            await async_cache.set(_profile_key(file_hash, file_format), profile, ttl=PROFILE_CACHE_TTL)
+    except Exception as e:
+        logger.debug(f"Profile cache store failed: {e}")
+
+
 async def _create_analysis_plan(query: str, profile: Dict[str, Any], data_source: Dict[str, Any], model: Optional[str] = None) -> Dict[str, Any]:
     """
     Use LLM to create an analysis plan, breaking the user query into sub-questions.
@@ -620,6 +603,7 @@ async def _execute_analysis_queries(plan: Dict[str, Any], data_source: Dict[str,
     """
     try:
         from app.modules.data.services.multi_engine_query_service import MultiEngineQueryService
+        from app.modules.data.services.result_spill import spill_store
         
         results = []
         sub_questions = plan.get("sub_questions", [])
@@ -631,35 +615,32 @@ async def _execute_analysis_queries(plan: Dict[str, Any], data_source: Dict[str,
         # Initialize query service
         query_service = MultiEngineQueryService()
         
-        # Execute queries in parallel using asyncio
-        import asyncio
-        tasks = []
-        for sq in sub_questions:
-            sql = sq.get("sql", "").strip()
-            if not sql:
-                continue
-            
-            # Use MultiEngineQueryService.execute_query which will:
-            # 1. Automatically select DuckDB for file sources
-            # 2. Handle file loading (CSV, Parquet, Excel with multi-sheet support)
-            # 3. Provide proper error handling and caching
-            task = query_service.execute_query(
-                query=sql,
-                data_source=data_source,
-                engine=None,  # Let service auto-select (will choose DuckDB for files)
-                optimization=True
+        planned = [(sq, sq.get("sql", "").strip()) for sq in sub_questions]
+        planned = [(sq, sql) for sq, sql in planned if sql]
+        
+        # Load the dataset once and run all sub-questions concurrently on it
+        # (file sources share one read-only DuckDB database; others run as
+        # concurrent execute_query calls), capped by ANALYSIS_MAX_PARALLEL_QUERIES
+        try:
+            query_results = await query_service.execute_queries_shared(
+                [sql for _, sql in planned], data_source, optimization=True
             )
-            tasks.append((task, sq))
+        except Exception as e:
+            query_results = [e] * len(planned)
         
-        # Wait for all queries to complete
-        for task, sq in tasks:
+        for (sq, _sql), result in zip(planned, query_results):
             try:
-                result = await task
+                if isinstance(result, Exception):
+                    raise result
                 
                 # Extract data from result
                 if result.get("success"):
                     query_data = result.get("data", [])
                     query_columns = result.get("columns", [])
+                    # Oversized results keep their first page inline; nothing pages the rest here
+                    partial = bool(result.get("spill") or result.get("truncated"))
+                    if result.get("spill"):
+                        spill_store.release(result["spill"]["handle"])
                     
                     results.append({
                         "question": sq.get("question", ""),
@@ -669,7 +650,8 @@ async def _execute_analysis_queries(plan: Dict[str, Any], data_source: Dict[str,
                             "success": True,
                             "data": query_data,
                             "columns": query_columns,
-                            "row_count": len(query_data),
+                            "row_count": result.get("row_count", len(query_data)),
+                            "partial": partial,
                             "engine": result.get("engine", "unknown")
                         }
                     })
@@ -9,6 +9,7 @@ import re
 from typing import Any, Optional
 
 from app.modules.ai.schemas.graph_state import AiserWorkflowState
+from app.modules.data.services.sql_pipeline import sql_pipeline
 from app.modules.ai.services.langgraph_base import (
     validate_state_transition,
     handle_node_errors
@@ -135,31 +136,17 @@ async def validate_sql_node(
         # Basic SQL validation
         sql_upper = sql_query.upper().strip()
         
-        # Check for SELECT statement
-        if not sql_upper.startswith("SELECT"):
-            state["error"] = "SQL query must start with SELECT"
-            logger.error("❌ SQL validation failed: query does not start with SELECT")
+        # Read-only guard: one SELECT/WITH statement with no DDL/DML anywhere in its tree
+        check = sql_pipeline.check_read_only(sql_query)
+        if check.modifies:
+            state["error"] = "SQL query contains potentially dangerous operations"
+            state["critical_failure"] = True
+            logger.error(f"❌ SQL validation failed: {check.reason}")
+            return state
+        if not check.allowed:
+            state["error"] = f"SQL query must be a single SELECT statement ({check.reason})"
+            logger.error(f"❌ SQL validation failed: {check.reason}")
             return state
-        
-        # Check for common SQL injection patterns (basic)
-        dangerous_patterns = [
-            r';\s*DROP\s+TABLE',
-            r';\s*DELETE\s+FROM',
-            r';\s*TRUNCATE',
-            r';\s*ALTER\s+TABLE',
-            r';\s*CREATE\s+TABLE',
-            r';\s*INSERT\s+INTO',
-            r';\s*UPDATE\s+',
-            r';\s*EXEC\s*\(',
-            r';\s*EXECUTE\s*\(',
-        ]
-        
-        for pattern in dangerous_patterns:
-            if re.search(pattern, sql_query, re.IGNORECASE):
-                state["error"] = "SQL query contains potentially dangerous operations"
-                state["critical_failure"] = True
-                logger.error(f"❌ SQL validation failed: dangerous pattern detected: {pattern}")
-                return state
         
         # Check for balanced parentheses - CRITICAL: Fix or fail
         open_parens = sql_query.count('(')
@@ -10,6 +10,7 @@ import json
 import re
 
 from .litellm_service import LiteLLMService
+from app.modules.charts.utils.data_reduction import BIN_COUNT_FIELD, ReductionSpec, reduce_rows
 
 logger = logging.getLogger(__name__)
 
@@ -1484,6 +1485,21 @@ Your comprehensive analysis:"""
 
         return "table"
 
+    def _reduce_chart_rows(self, rows: List[Dict], chart_type: str, x_col: str, y_col: str, analysis: Dict) -> tuple:
+        """Rows reduced for the chart (widget options come from analysis['reduction']) and the reduction record"""
+        spec = ReductionSpec.from_options((analysis or {}).get("reduction"), chart_type, x=x_col, y=y_col)
+        reduced = reduce_rows(rows, spec)
+        return reduced["rows"], reduced["reduction"]
+
+    @staticmethod
+    def _with_reduction(config: Dict, reduction: Optional[Dict], rows: Optional[List[Dict]] = None) -> Dict:
+        """Record the applied reduction and ship the reduced rows instead of the raw ones"""
+        if reduction:
+            config["reduction"] = reduction
+            if rows is not None:
+                config["data"] = rows
+        return config
+
     def _generate_bar_chart_config(self, data: List[Dict], analysis: Dict) -> Dict:
         """Generate ECharts bar chart configuration"""
         if not data:
@@ -1515,11 +1531,16 @@ Your comprehensive analysis:"""
             value = float(row.get(value_col, 0))
             aggregated[category] = aggregated.get(category, 0) + value
 
+        # Keep the top categories and fold the rest into "Other"
+        rows, reduction = self._reduce_chart_rows(
+            [{category_col: k, value_col: v} for k, v in aggregated.items()], "bar", category_col, value_col, analysis
+        )
+
         # Prepare chart data
-        categories = list(aggregated.keys())
-        values = list(aggregated.values())
+        categories = [row[category_col] for row in rows]
+        values = [row[value_col] for row in rows]
 
-        return {
+        return self._with_reduction({
             "type": "bar",
             "title": f"{value_col} by {category_col}",
             "xAxis": {"type": "category", "data": categories},
@@ -1527,7 +1548,7 @@ Your comprehensive analysis:"""
             "series": [{"type": "bar", "data": values, "name": value_col}],
             "tooltip": {"trigger": "axis"},
             "data": data,  # Include raw data for reference
-        }
+        }, reduction, rows)
 
     def _generate_line_chart_config(self, data: List[Dict], analysis: Dict) -> Dict:
         """Generate ECharts line chart configuration"""
@@ -1557,11 +1578,12 @@ Your comprehensive analysis:"""
 
         # Sort data by x-axis
         sorted_data = sorted(data, key=lambda x: str(x.get(x_col, "")))
+        sorted_data, reduction = self._reduce_chart_rows(sorted_data, "line", x_col, value_col, analysis)
 
         x_values = [str(row.get(x_col, "")) for row in sorted_data]
         y_values = [float(row.get(value_col, 0)) for row in sorted_data]
 
-        return {
+        return self._with_reduction({
             "type": "line",
             "title": f"{value_col} over {x_col}",
             "xAxis": {"type": "category", "data": x_values},
@@ -1569,7 +1591,7 @@ Your comprehensive analysis:"""
             "series": [{"type": "line", "data": y_values, "name": value_col}],
             "tooltip": {"trigger": "axis"},
             "data": data,
-        }
+        }, reduction, sorted_data)
 
     def _generate_pie_chart_config(self, data: List[Dict], analysis: Dict) -> Dict:
         """Generate ECharts pie chart configuration"""
@@ -1602,15 +1624,20 @@ Your comprehensive analysis:"""
             value = float(row.get(value_col, 0))
             aggregated[category] = aggregated.get(category, 0) + value
 
+        # Keep the largest slices and fold the rest into "Other"
+        rows, reduction = self._reduce_chart_rows(
+            [{category_col: k, value_col: v} for k, v in aggregated.items()], "pie", category_col, value_col, analysis
+        )
+
         # Prepare pie chart data
-        pie_data = [{"name": k, "value": v} for k, v in aggregated.items()]
+        pie_data = [{"name": row[category_col], "value": row[value_col]} for row in rows]
 
-        return {
+        return self._with_reduction({
             "type": "pie",
             "title": f"{value_col} by {category_col}",
             "data": pie_data,
             "radius": "50%",
-        }
+        }, reduction)
 
     def _generate_scatter_chart_config(self, data: List[Dict], analysis: Dict) -> Dict:
         """Generate ECharts scatter chart configuration"""
@@ -1632,15 +1659,21 @@ Your comprehensive analysis:"""
         x_col = numeric_cols[0]
         y_col = numeric_cols[1]
 
+        # Dense point clouds are binned; each point then carries its bin's row count
+        rows, reduction = self._reduce_chart_rows(data, "scatter", x_col, y_col, analysis)
+
         # Prepare scatter data
         scatter_data = []
-        for row in data:
+        for row in rows:
             x_val = row.get(x_col)
             y_val = row.get(y_col)
             if x_val is not None and y_val is not None:
-                scatter_data.append([float(x_val), float(y_val)])
+                point = [float(x_val), float(y_val)]
+                if reduction:
+                    point.append(row[BIN_COUNT_FIELD])
+                scatter_data.append(point)
 
-        return {
+        return self._with_reduction({
             "type": "scatter",
             "title": f"{y_col} vs {x_col}",
             "xAxis": {"type": "value", "name": x_col},
@@ -1648,7 +1681,7 @@ Your comprehensive analysis:"""
             "series": [{"type": "scatter", "data": scatter_data, "symbolSize": 8}],
             "tooltip": {"trigger": "item"},
             "data": data,
-        }
+        }, reduction, rows)
 
     def _generate_table_config(self, data: List[Dict], analysis: Dict) -> Dict:
         """Generate table configuration"""
@@ -1692,11 +1725,12 @@ Your comprehensive analysis:"""
 
         # Sort data by x-axis
         sorted_data = sorted(data, key=lambda x: str(x.get(x_col, "")))
+        sorted_data, reduction = self._reduce_chart_rows(sorted_data, "area", x_col, value_col, analysis)
 
         x_values = [str(row.get(x_col, "")) for row in sorted_data]
         y_values = [float(row.get(value_col, 0)) for row in sorted_data]
 
-        return {
+        return self._with_reduction({
             "type": "area",
             "title": f"Cumulative {value_col} over {x_col}",
             "xAxis": {"type": "category", "data": x_values},
@@ -1712,7 +1746,7 @@ Your comprehensive analysis:"""
             ],
             "tooltip": {"trigger": "axis"},
             "data": data,
-        }
+        }, reduction, sorted_data)
 
     def _generate_heatmap_chart_config(self, data: List[Dict], analysis: Dict) -> Dict:
         """Generate ECharts heatmap configuration for correlation matrices"""
@@ -2414,24 +2448,13 @@ Your comprehensive analysis:"""
 
     async def _validate_sql_query(self, sql: str, context: Dict) -> str:
         """Validate and sanitize SQL query"""
-        # Basic SQL validation - in production, use proper SQL parsing
-        sql_upper = sql.upper()
-
-        # Check for dangerous operations
-        dangerous_keywords = [
-            "DROP",
-            "DELETE",
-            "UPDATE",
-            "INSERT",
-            "ALTER",
-            "CREATE",
-            "TRUNCATE",
-        ]
-        if any(keyword in sql_upper for keyword in dangerous_keywords):
-            raise ValueError(f"SQL query contains dangerous operation: {sql}")
+        from app.modules.data.services.sql_pipeline import sql_pipeline
 
-        # Ensure it's a SELECT query
-        if not sql_upper.strip().startswith("SELECT"):
+        # Parsed read-only guard: one SELECT/WITH statement, no DDL/DML anywhere in the tree
+        check = sql_pipeline.check_read_only(sql)
+        if check.modifies:
+            raise ValueError(f"SQL query contains dangerous operation: {sql}")
+        if not check.allowed:
             raise ValueError("Only SELECT queries are allowed")
 
         return sql
@@ -10,6 +10,7 @@ import asyncio
 from litellm import acompletion, completion
 import json
 from app.core.cache import cache
+from app.core.tracing import span, STAGE_LLM_CALL
 import re
 import time
 
@@ -980,7 +981,15 @@ Return only valid JSON array.
             logger.info(f"🔧 LiteLLM parameters: {litellm_params}")
             
             # Generate completion
-            response = await acompletion(**litellm_params)
+            with span(STAGE_LLM_CALL, model=model_config['model']) as llm_span:
+                response = await acompletion(**litellm_params)
+                usage = getattr(response, 'usage', None)
+                if usage is not None:
+                    llm_span.set(
+                        prompt_tokens=getattr(usage, 'prompt_tokens', None),
+                        completion_tokens=getattr(usage, 'completion_tokens', None),
+                        total_tokens=getattr(usage, 'total_tokens', None),
+                    )
             
             logger.info(f"🔍 Raw response from acompletion: {response}")
             logger.info(f"🔍 Response type: {type(response)}")
@@ -10,7 +10,9 @@ import logging
 import hashlib
 import re
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+
+from app.core.cache_invalidation import cache_tags, data_source_tag
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +46,7 @@ class QueryCacheService:
             "invalidations": 0,
             "evictions": 0
         }
+        self._cache_tier = cache_tags.register_tier(f"query_cache_service:{id(self)}", self._evict_keys)
         logger.info(f"✅ QueryCacheService initialized (TTL: {default_ttl_minutes}m, max: {max_cache_size})")
     
     def _normalize_sql(self, sql_query: str) -> str:
@@ -136,7 +139,8 @@ class QueryCacheService:
         data_source_id: str, 
         sql_query: str, 
         result: Dict[str, Any],
-        ttl_minutes: Optional[int] = None
+        ttl_minutes: Optional[int] = None,
+        tags: Optional[List[str]] = None
     ) -> None:
         """
         Cache query result.
@@ -146,6 +150,7 @@ class QueryCacheService:
             sql_query: SQL query string
             result: Query result dictionary to cache
             ttl_minutes: TTL in minutes (uses default if not provided)
+            tags: Extra dependency tags (schema hash, org, project); the data source tag is always added
         """
         # Check cache size and evict if needed
         if len(self._cache) >= self.max_cache_size:
@@ -170,6 +175,7 @@ class QueryCacheService:
             "ttl_minutes": ttl,
             "result_size": result_size
         }
+        cache_tags.tag(self._cache_tier, cache_key, [data_source_tag(data_source_id), *(tags or [])])
         
         logger.debug(f"✅ Cached query result for {data_source_id} (TTL: {ttl}m, size: {result_size} bytes)")
     
@@ -187,6 +193,11 @@ class QueryCacheService:
         self._cache_stats["evictions"] += 1
         logger.debug(f"🗑️ Evicted oldest cache entry: {oldest_key}")
     
+    def _evict_keys(self, keys: List[str]) -> None:
+        """Eviction callback used by tag-based invalidation."""
+        removed = sum(1 for key in keys if self._cache.pop(key, None) is not None)
+        self._cache_stats["invalidations"] += removed
+
     def invalidate(self, data_source_id: str) -> None:
         """
         Invalidate all cached queries for data source.
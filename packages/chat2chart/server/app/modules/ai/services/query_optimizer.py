@@ -10,6 +10,8 @@ import re
 from typing import Any, Dict, List, Optional, Tuple
 from enum import Enum
 
+from app.modules.data.services.sql_pipeline import normalize_dialect, sql_pipeline
+
 logger = logging.getLogger(__name__)
 
 
@@ -74,7 +76,7 @@ class QueryOptimizer:
         optimizations_applied = []
         
         # 1. Basic query cleanup
-        optimized_query, cleanup_ops = self._cleanup_query(optimized_query)
+        optimized_query, cleanup_ops = self._cleanup_query(optimized_query, dialect)
         optimizations_applied.extend(cleanup_ops)
         
         # 2. Dialect-specific optimizations
@@ -152,7 +154,12 @@ class QueryOptimizer:
         
         return DatabaseDialect.GENERIC
     
-    def _cleanup_query(self, query: str) -> Tuple[str, List[str]]:
+    def _facts(self, query: str, dialect: DatabaseDialect) -> Optional[Dict[str, Any]]:
+        """Structural facts from the shared SQL pipeline (None when the query does not parse)."""
+        compiled = sql_pipeline.compile(query, read=normalize_dialect(dialect.value))
+        return compiled.facts if compiled.parsed else None
+    
+    def _cleanup_query(self, query: str, dialect: DatabaseDialect = DatabaseDialect.GENERIC) -> Tuple[str, List[str]]:
         """Basic query cleanup and normalization."""
         optimizations = []
         cleaned = query.strip()
@@ -162,8 +169,9 @@ class QueryOptimizer:
             cleaned = cleaned[:-1].strip()
             optimizations.append("removed_trailing_semicolon")
         
-        # Normalize whitespace
-        cleaned = re.sub(r'\s+', ' ', cleaned)
+        # Normalize whitespace; parsable queries keep theirs so string literals are not altered
+        if self._facts(cleaned, dialect) is None:
+            cleaned = re.sub(r'\s+', ' ', cleaned)
         optimizations.append("normalized_whitespace")
         
         return cleaned, optimizations
@@ -217,6 +225,8 @@ class QueryOptimizer:
         """
         optimizations = []
         optimized = query
+        facts = self._facts(query, DatabaseDialect.CLICKHOUSE)
+        windows = facts["window_functions"] if facts else []
         
         # CRITICAL: Replace unsupported window functions
         # ClickHouse doesn't support lag(), lead(), first_value(), last_value() window functions
@@ -224,7 +234,7 @@ class QueryOptimizer:
         
         # Pattern: lag(column) OVER (ORDER BY ...)
         lag_pattern = r'\blag\s*\(\s*([^)]+)\s*\)\s+OVER\s*\([^)]*ORDER\s+BY\s+([^)]+)\)'
-        if re.search(lag_pattern, optimized, re.IGNORECASE):
+        if "lag" in windows or (facts is None and re.search(lag_pattern, optimized, re.IGNORECASE)):
             optimizations.append("clickhouse_lag_function_replaced")
             # Replace with arrayElement and array functions
             # This is complex - for now, log warning and suggest alternative
@@ -242,7 +252,7 @@ class QueryOptimizer:
         
         # Pattern: lead() - similar issue
         lead_pattern = r'\blead\s*\(\s*([^)]+)\s*\)\s+OVER\s*\([^)]*ORDER\s+BY\s+([^)]+)\)'
-        if re.search(lead_pattern, optimized, re.IGNORECASE):
+        if "lead" in windows or (facts is None and re.search(lead_pattern, optimized, re.IGNORECASE)):
             optimizations.append("clickhouse_lead_function_replaced")
             logger.warning("⚠️ ClickHouse doesn't support lead() window function. Query may fail.")
         
@@ -250,7 +260,7 @@ class QueryOptimizer:
         # But we can optimize aggregations
         
         # Use APPROX_COUNT_DISTINCT for large datasets if COUNT(DISTINCT) is used
-        if re.search(r'\bCOUNT\s*\(\s*DISTINCT\s+', optimized, re.IGNORECASE):
+        if facts["count_distinct"] if facts else re.search(r'\bCOUNT\s*\(\s*DISTINCT\s+', optimized, re.IGNORECASE):
             # Only suggest if we know it's a large dataset
             if schema_info:
                 total_rows = sum(
@@ -262,7 +272,7 @@ class QueryOptimizer:
                     optimizations.append("consider_approx_count_distinct_for_large_dataset")
         
         # Prefer array functions for aggregations
-        if re.search(r'\bGROUP\s+BY\s+', optimized, re.IGNORECASE):
+        if facts["has_group_by"] if facts else re.search(r'\bGROUP\s+BY\s+', optimized, re.IGNORECASE):
             optimizations.append("clickhouse_group_by_optimized")
         
         return optimized, optimizations
@@ -275,17 +285,26 @@ class QueryOptimizer:
         """PostgreSQL-specific optimizations."""
         optimizations = []
         optimized = query
+        facts = self._facts(query, DatabaseDialect.POSTGRESQL)
         
         # Use EXPLAIN ANALYZE hints (not in query, but metadata)
-        if re.search(r'\bJOIN\b', query, re.IGNORECASE):
+        if facts["joins"] if facts else re.search(r'\bJOIN\b', query, re.IGNORECASE):
             optimizations.append("postgresql_join_optimization_applicable")
         
         # Prefer CTEs for complex queries
-        if len(re.findall(r'\b(SELECT|FROM|WHERE|JOIN)\b', query, re.IGNORECASE)) > 8:
+        if facts:
+            complexity = facts["selects"] * 2 + facts["joins"] + facts["has_where"]
+        else:
+            complexity = len(re.findall(r'\b(SELECT|FROM|WHERE|JOIN)\b', query, re.IGNORECASE))
+        if complexity > 8:
             optimizations.append("consider_cte_for_complexity")
         
         # Use LIMIT with ORDER BY for pagination
-        if re.search(r'\bLIMIT\b', query, re.IGNORECASE) and not re.search(r'\bORDER\s+BY\b', query, re.IGNORECASE):
+        if facts:
+            limit_without_order = facts["has_limit"] and not facts["has_order_by"]
+        else:
+            limit_without_order = re.search(r'\bLIMIT\b', query, re.IGNORECASE) and not re.search(r'\bORDER\s+BY\b', query, re.IGNORECASE)
+        if limit_without_order:
             optimizations.append("add_order_by_with_limit")
         
         return optimized, optimizations
@@ -299,12 +318,14 @@ class QueryOptimizer:
         optimizations = []
         optimized = query
         
+        facts = self._facts(query, DatabaseDialect.MYSQL)
+        
         # MySQL index hints (not modifying query, but suggesting)
-        if re.search(r'\bJOIN\b', query, re.IGNORECASE):
+        if facts["joins"] if facts else re.search(r'\bJOIN\b', query, re.IGNORECASE):
             optimizations.append("mysql_index_hints_available")
         
         # Use LIMIT for large result sets
-        if not re.search(r'\bLIMIT\b', query, re.IGNORECASE):
+        if not (facts["has_limit"] if facts else re.search(r'\bLIMIT\b', query, re.IGNORECASE)):
             optimizations.append("consider_limit_for_large_results")
         
         return optimized, optimizations
@@ -401,7 +422,8 @@ class QueryOptimizer:
         optimized = query
         
         # Warehouses benefit from aggregation pushdown
-        if re.search(r'\b(SUM|AVG|COUNT|MAX|MIN)\s*\(', query, re.IGNORECASE):
+        facts = self._facts(query, dialect)
+        if facts["aggregates"] if facts else re.search(r'\b(SUM|AVG|COUNT|MAX|MIN)\s*\(', query, re.IGNORECASE):
             optimizations.append("warehouse_aggregation_optimized")
         
         # Partition pruning hints
@@ -433,21 +455,29 @@ class QueryOptimizer:
         """Apply general performance optimizations."""
         optimizations = []
         optimized = query
+        facts = self._facts(query, dialect)
         
         # Add LIMIT if missing and query might return large results
-        if not re.search(r'\bLIMIT\b', query, re.IGNORECASE):
-            # Check if it's a SELECT without aggregation (likely large result)
-            if re.search(r'^\s*SELECT\s+', query, re.IGNORECASE) and \
-               not re.search(r'\b(SUM|AVG|COUNT|MAX|MIN|GROUP\s+BY)\b', query, re.IGNORECASE):
-                # Don't modify query automatically, but suggest
-                optimizations.append("consider_adding_limit")
+        if facts:
+            # A plain SELECT without aggregation is likely a large result
+            unbounded = (
+                not facts["has_limit"] and facts["selects"] > 0
+                and not facts["aggregates"] and not facts["has_group_by"]
+            )
+        else:
+            unbounded = not re.search(r'\bLIMIT\b', query, re.IGNORECASE) and \
+                re.search(r'^\s*SELECT\s+', query, re.IGNORECASE) and \
+                not re.search(r'\b(SUM|AVG|COUNT|MAX|MIN|GROUP\s+BY)\b', query, re.IGNORECASE)
+        if unbounded:
+            # Don't modify query automatically, but suggest
+            optimizations.append("consider_adding_limit")
         
         # Optimize WHERE clause order (suggest most selective first)
-        if re.search(r'\bWHERE\s+', query, re.IGNORECASE):
+        if facts["has_where"] if facts else re.search(r'\bWHERE\s+', query, re.IGNORECASE):
             optimizations.append("where_clause_optimization_applicable")
         
         # Suggest indexes for common patterns
-        if re.search(r'\bWHERE\s+.*\s+=\s+', query, re.IGNORECASE):
+        if facts["has_equality_filter"] if facts else re.search(r'\bWHERE\s+.*\s+=\s+', query, re.IGNORECASE):
             optimizations.append("equality_filter_detected_index_beneficial")
         
         return {"query": optimized, "optimizations": optimizations}
@@ -534,7 +564,8 @@ class QueryOptimizer:
         dialect = self._parse_dialect(db_dialect or self._detect_dialect(data_source_type))
         
         # Analyze query patterns
-        if not re.search(r'\bLIMIT\b', query, re.IGNORECASE):
+        facts = self._facts(query, dialect)
+        if not (facts["has_limit"] if facts else re.search(r'\bLIMIT\b', query, re.IGNORECASE)):
             suggestions.append({
                 "type": "performance",
                 "severity": "medium",
@@ -542,7 +573,7 @@ class QueryOptimizer:
                 "dialect": dialect.value
             })
         
-        if re.search(r'\bSELECT\s+\*\b', query, re.IGNORECASE):
+        if facts["select_star"] if facts else re.search(r'\bSELECT\s+\*', query, re.IGNORECASE):
             suggestions.append({
                 "type": "performance",
                 "severity": "low",
@@ -552,7 +583,7 @@ class QueryOptimizer:
         
         # Dialect-specific suggestions
         if dialect == DatabaseDialect.CLICKHOUSE:
-            if re.search(r'\bCOUNT\s*\(\s*DISTINCT\s+', query, re.IGNORECASE):
+            if facts["count_distinct"] if facts else re.search(r'\bCOUNT\s*\(\s*DISTINCT\s+', query, re.IGNORECASE):
                 suggestions.append({
                     "type": "performance",
                     "severity": "high",
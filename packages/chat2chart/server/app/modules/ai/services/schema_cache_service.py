@@ -3,13 +3,23 @@ Schema Cache Service - Intelligent caching for data source schemas.
 
 This service provides efficient schema caching to avoid redundant schema retrieval
 on every query. Schemas are cached per data source with TTL and invalidation support.
+
+The async methods add a shared tier in Redis (compact msgpack/zstd values via
+``async_cache``) so workers and restarts reuse each other's schemas, with a
+per-source version/hash, stale-while-revalidate refresh and formatted prompt
+strings cached next to the schema they were built from.
 """
 
+import asyncio
 import json
 import logging
 import hashlib
+import time
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, Optional
+from typing import Awaitable, Callable, Dict, Any, List, Optional
+
+from app.core.cache_invalidation import cache_tags, data_source_tag, schema_tag
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -34,17 +44,27 @@ class SchemaCacheService:
             default_ttl_hours: Default TTL for cached schemas in hours (default: 24)
         """
         self._cache: Dict[str, Dict[str, Any]] = {}
+        self._formatted: Dict[str, str] = {}
+        self._revalidating: Dict[str, asyncio.Task] = {}
         self.default_ttl_hours = default_ttl_hours
         self._cache_stats = {
             "hits": 0,
             "misses": 0,
-            "invalidations": 0
+            "invalidations": 0,
+            "shared_hits": 0,
+            "loads": 0,
+            "probe_unchanged": 0,
         }
+        self._cache_tier = cache_tags.register_tier(f"schema_cache_service:{id(self)}", self._evict_keys)
         logger.info(f"✅ SchemaCacheService initialized with TTL: {default_ttl_hours} hours")
     
-    def _get_cache_key(self, data_source_id: str) -> str:
-        """Generate cache key for data source."""
-        return f"schema:{data_source_id}"
+    def _get_cache_key(self, data_source_id: str, kind: Optional[str] = None) -> str:
+        """Generate cache key for data source (``kind`` separates differently shaped schemas)."""
+        return f"schema:{kind}:{data_source_id}" if kind else f"schema:{data_source_id}"
+
+    @staticmethod
+    def _shared_key(cache_key: str) -> str:
+        return f"shared:{cache_key}"
     
     def _is_expired(self, cached_item: Dict[str, Any]) -> bool:
         """Check if cached item is expired."""
@@ -102,6 +122,13 @@ class SchemaCacheService:
         cache_key = self._get_cache_key(data_source_id)
         ttl = ttl_hours or self.default_ttl_hours
         expires_at = datetime.now(timezone.utc) + timedelta(hours=ttl)
+        schema_hash = self._compute_schema_hash(schema)
+        
+        # A changed schema makes every cache entry derived from this data source stale
+        previous = self._cache.get(cache_key)
+        if previous and previous.get("schema_hash") != schema_hash:
+            logger.info(f"🔄 Schema changed for {data_source_id}, invalidating dependent caches")
+            cache_tags.invalidate_nowait(data_source_tag(data_source_id))
         
         # Store schema with metadata
         self._cache[cache_key] = {
@@ -110,11 +137,170 @@ class SchemaCacheService:
             "cached_at": datetime.now(timezone.utc).isoformat(),
             "expires_at": expires_at,
             "ttl_hours": ttl,
-            "schema_hash": self._compute_schema_hash(schema)
+            "schema_hash": schema_hash
         }
+        cache_tags.tag(self._cache_tier, cache_key, [data_source_tag(data_source_id), schema_tag(schema_hash)])
         
         logger.info(f"✅ Cached schema for {data_source_id} (TTL: {ttl}h, expires: {expires_at.isoformat()})")
     
+    # Shared tier (Redis) with stale-while-revalidate
+
+    async def get_shared_schema(self, data_source_id: str, kind: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Cached schema from this worker or, failing that, from the shared store"""
+        entry = await self._entry(data_source_id, kind)
+        return entry.get("schema") if entry else None
+
+    async def _entry(self, data_source_id: str, kind: Optional[str]) -> Optional[Dict[str, Any]]:
+        cache_key = self._get_cache_key(data_source_id, kind)
+        cached_item = self._cache.get(cache_key)
+        if cached_item and not self._is_expired(cached_item):
+            self._cache_stats["hits"] += 1
+            return cached_item
+        from app.core.cache import async_cache
+
+        shared = await async_cache.get(self._shared_key(cache_key)) if async_cache else None
+        if not isinstance(shared, dict) or "schema" not in shared:
+            self._cache_stats["misses"] += 1
+            return None
+        self._cache_stats["shared_hits"] += 1
+        return self._set_local(cache_key, data_source_id, shared)
+
+    def _set_local(self, cache_key: str, data_source_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        ttl = entry.get("ttl_hours") or self.default_ttl_hours
+        cached_item = {
+            **entry,
+            "data_source_id": data_source_id,
+            "expires_at": datetime.now(timezone.utc) + timedelta(hours=ttl),
+            "ttl_hours": ttl,
+        }
+        self._cache[cache_key] = cached_item
+        cache_tags.tag(self._cache_tier, cache_key, [data_source_tag(data_source_id), schema_tag(entry["schema_hash"])])
+        return cached_item
+
+    async def store_schema(
+        self,
+        data_source_id: str,
+        schema: Dict[str, Any],
+        kind: Optional[str] = None,
+        probe: Optional[str] = None,
+        ttl_hours: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Cache a schema here and in the shared store; a changed hash bumps the version and invalidates dependents"""
+        cache_key = self._get_cache_key(data_source_id, kind)
+        schema_hash = self._compute_schema_hash(schema)
+        previous = await self._entry(data_source_id, kind)
+        version = int((previous or {}).get("version") or 0)
+        if previous is None or previous.get("schema_hash") != schema_hash:
+            version += 1
+            if previous is not None:
+                logger.info(f"🔄 Schema changed for {data_source_id} (v{version}), invalidating dependent caches")
+                # Before writing, so the new entry is not evicted with the old one
+                await cache_tags.invalidate(data_source_tag(data_source_id))
+        ttl = ttl_hours or self.default_ttl_hours
+        entry = {
+            "schema": schema,
+            "schema_hash": schema_hash,
+            "version": version,
+            "probe": probe,
+            "cached_at": datetime.now(timezone.utc).isoformat(),
+            "fresh_until": time.time() + settings.SCHEMA_CACHE_FRESH_SECONDS,
+            "ttl_hours": ttl,
+        }
+        await self._write_shared(cache_key, data_source_id, entry)
+        return self._set_local(cache_key, data_source_id, entry)
+
+    async def _write_shared(self, cache_key: str, data_source_id: str, entry: Dict[str, Any]) -> None:
+        from app.core.cache import async_cache
+
+        if async_cache is None:
+            return
+        key, ttl = self._shared_key(cache_key), int(entry["ttl_hours"] * 3600)
+        await async_cache.set(key, entry, ttl=ttl)
+        await cache_tags.tag_redis_key(key, [data_source_tag(data_source_id)], ttl=ttl)
+
+    async def get_or_load(
+        self,
+        data_source_id: str,
+        loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+        probe: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+        kind: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Cached schema, loading it on a miss.
+
+        A stale entry (older than ``SCHEMA_CACHE_FRESH_SECONDS``) is returned
+        immediately and revalidated in the background: ``probe`` returns a
+        cheap change token (e.g. catalog last-modified); when it matches the
+        stored one the entry is only marked fresh again instead of reloaded.
+        """
+        entry = await self._entry(data_source_id, kind)
+        if entry is None:
+            return (await self._revalidate(data_source_id, loader, probe, kind, None) or {}).get("schema")
+        if time.time() >= entry.get("fresh_until", 0):
+            task_key = self._get_cache_key(data_source_id, kind)
+            if task_key not in self._revalidating:
+                task = asyncio.create_task(self._revalidate(data_source_id, loader, probe, kind, entry))
+                self._revalidating[task_key] = task
+                task.add_done_callback(lambda _t, k=task_key: self._revalidating.pop(k, None))
+        return entry.get("schema")
+
+    async def _revalidate(self, data_source_id, loader, probe, kind, entry) -> Optional[Dict[str, Any]]:
+        try:
+            token = await probe() if probe else None
+            if entry is not None and token is not None and token == entry.get("probe"):
+                self._cache_stats["probe_unchanged"] += 1
+                entry = {k: v for k, v in entry.items() if k not in ("expires_at", "data_source_id")}
+                entry["fresh_until"] = time.time() + settings.SCHEMA_CACHE_FRESH_SECONDS
+                cache_key = self._get_cache_key(data_source_id, kind)
+                await self._write_shared(cache_key, data_source_id, entry)
+                return self._set_local(cache_key, data_source_id, entry)
+            schema = await loader()
+            if not schema:
+                return entry
+            self._cache_stats["loads"] += 1
+            return await self.store_schema(data_source_id, schema, kind=kind, probe=token)
+        except Exception as e:
+            logger.warning(f"⚠️ Schema revalidation failed for {data_source_id}: {e}")
+            return entry
+
+    async def get_formatted(self, data_source_id: str, variant: str, kind: Optional[str] = None) -> Optional[str]:
+        """Prompt-ready schema text built from the currently cached schema version"""
+        entry = await self._entry(data_source_id, kind)
+        if not entry:
+            return None
+        key = f"schema_fmt:{variant}:{entry['schema_hash']}"
+        text = self._formatted.get(key)
+        if text is None:
+            from app.core.cache import async_cache
+
+            text = await async_cache.get(key) if async_cache else None
+            if isinstance(text, str):
+                self._formatted[key] = text
+        return text if isinstance(text, str) else None
+
+    async def set_formatted(self, data_source_id: str, variant: str, text: str, kind: Optional[str] = None) -> None:
+        entry = await self._entry(data_source_id, kind)
+        if not entry:
+            return
+        key = f"schema_fmt:{variant}:{entry['schema_hash']}"
+        self._formatted[key] = text
+        cache_tags.tag(self._cache_tier, key, [data_source_tag(data_source_id), schema_tag(entry["schema_hash"])])
+        from app.core.cache import async_cache
+
+        if async_cache is not None:
+            ttl = int(entry.get("ttl_hours", self.default_ttl_hours) * 3600)
+            await async_cache.set(key, text, ttl=ttl)
+            await cache_tags.tag_redis_key(key, [data_source_tag(data_source_id)], ttl=ttl)
+
+    def get_schema_hash(self, data_source_id: str) -> Optional[str]:
+        """Hash of the cached schema (for tagging derived entries), if cached."""
+        cached_item = self._cache.get(self._get_cache_key(data_source_id))
+        return cached_item.get("schema_hash") if cached_item else None
+    
+    def _evict_keys(self, keys: List[str]) -> None:
+        """Eviction callback used by tag-based invalidation."""
+        removed = sum(1 for key in keys if self._cache.pop(key, None) is not None or self._formatted.pop(key, None) is not None)
+        self._cache_stats["invalidations"] += removed
+    
     def invalidate(self, data_source_id: str) -> None:
         """
         Invalidate cached schema for data source.
@@ -182,6 +368,6 @@ def get_schema_cache_service() -> SchemaCacheService:
     """Get or create global schema cache service instance."""
     global _schema_cache_service
     if _schema_cache_service is None:
-        _schema_cache_service = SchemaCacheService(default_ttl_hours=24)
+        _schema_cache_service = SchemaCacheService(default_ttl_hours=settings.SCHEMA_CACHE_TTL_HOURS)
     return _schema_cache_service
 
@@ -0,0 +1,231 @@
+"""
+SQL Plan Cache
+Reuse validated NL2SQL output for repeated questions instead of calling the LLM
+
+Entries are keyed by (normalized question, data source, schema hash, dialect).
+Literals in the question (quoted strings, numbers, month names) are lifted out
+of the key, so "sales for March" and "sales for April" share one entry: when
+each question literal maps to exactly one literal in the generated SQL, the SQL
+is stored as a skeleton and the new values are substituted into its AST on a
+hit. Otherwise the entry only matches the exact same literals. Entries live in
+the shared cache and are dropped with their data source tag.
+"""
+
+import hashlib
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.cache_invalidation import cache_tags, data_source_tag
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import sqlglot
+    from sqlglot import exp
+
+    SQLGLOT_AVAILABLE = True
+except ImportError:  # pragma: no cover - sqlglot ships with the server requirements
+    SQLGLOT_AVAILABLE = False
+
+MONTHS = [
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+]
+_MONTH_ABBR = {name[:3]: i for i, name in enumerate(MONTHS)}
+_MONTH_ABBR["sept"] = 8
+_LITERAL_RE = re.compile(
+    r"'([^']*)'|\"([^\"]*)\"|\b(" + "|".join(MONTHS + sorted(_MONTH_ABBR, key=len, reverse=True)) + r")\b|(?<![\w.])(\d+(?:\.\d+)?)\b",
+    re.IGNORECASE,
+)
+_PLACEHOLDERS = {"string": "<str>", "month": "<month>", "number": "<num>"}
+
+Param = Tuple[str, str]  # (kind, value)
+
+
+def parameterize_question(question: str) -> Tuple[str, List[Param]]:
+    """Question text with literals replaced by placeholders, and the literals in order"""
+    params: List[Param] = []
+
+    def lift(match: "re.Match") -> str:
+        if match.group(1) is not None or match.group(2) is not None:
+            param = ("string", match.group(1) if match.group(1) is not None else match.group(2))
+        elif match.group(3):
+            param = ("month", match.group(3))
+        else:
+            param = ("number", match.group(4))
+        params.append(param)
+        return _PLACEHOLDERS[param[0]]
+
+    template = _LITERAL_RE.sub(lift, question.strip())
+    template = re.sub(r"\s+", " ", template.lower()).rstrip("?.! ")
+    return template, params
+
+
+def _month_index(value: str) -> int:
+    value = value.lower()
+    return MONTHS.index(value) if value in MONTHS else _MONTH_ABBR[value]
+
+
+def _forms(kind: str, value: str) -> List[Tuple[str, bool, str]]:
+    """Ways a question literal can appear as a SQL literal: (form, is_string, normalized text)"""
+    if kind == "number":
+        return [("number", False, value), ("text", True, value)]
+    if kind == "string":
+        return [("text", True, value.lower())]
+    index = _month_index(value)
+    return [
+        ("month_name", True, MONTHS[index]),
+        ("month_abbr", True, MONTHS[index][:3]),
+        ("month_number", False, str(index + 1)),
+    ]
+
+
+def _render(form: str, original: str, kind: str, value: str) -> "exp.Literal":
+    if form == "number":
+        return exp.Literal.number(value)
+    if form == "month_number":
+        return exp.Literal.number(_month_index(value) + 1)
+    if form in ("month_name", "month_abbr"):
+        name = MONTHS[_month_index(value)]
+        text = name if form == "month_name" else name[:3]
+        # Keep the casing style of the literal the SQL was generated with
+        if original.isupper():
+            text = text.upper()
+        elif original[:1].isupper():
+            text = text.capitalize()
+        return exp.Literal.string(text)
+    return exp.Literal.string(value)
+
+
+def sql_slots(sql: str, dialect: Optional[str], params: List[Param]) -> Optional[List[Dict[str, Any]]]:
+    """Where each question literal sits among the SQL's literals; None unless every one maps to exactly one"""
+    if not SQLGLOT_AVAILABLE or not params:
+        return None
+    try:
+        literals = list(sqlglot.parse_one(sql, read=dialect).find_all(exp.Literal))
+    except Exception:
+        return None
+    slots, used = [], set()
+    for kind, value in params:
+        found = []
+        for form, is_string, text in _forms(kind, value):
+            for index, literal in enumerate(literals):
+                literal_text = literal.this.lower() if literal.is_string else literal.this
+                if literal.is_string == is_string and literal_text == text and index not in used:
+                    found.append((index, form))
+        if len(found) != 1:
+            return None
+        used.add(found[0][0])
+        slots.append({"literal": found[0][0], "form": found[0][1]})
+    return slots
+
+
+def fill_slots(sql: str, dialect: Optional[str], slots: List[Dict[str, Any]], params: List[Param]) -> str:
+    """The skeleton SQL with this question's literal values"""
+    tree = sqlglot.parse_one(sql, read=dialect)
+    literals = list(tree.find_all(exp.Literal))
+    for slot, (kind, value) in zip(slots, params):
+        literal = literals[slot["literal"]]
+        literal.replace(_render(slot["form"], literal.this, kind, value))
+    return tree.sql(dialect=dialect)
+
+
+def result_columns(sql: str, dialect: Optional[str]) -> List[str]:
+    """Output column names of a SELECT (the result signature stored with a plan)"""
+    if not SQLGLOT_AVAILABLE:
+        return []
+    try:
+        tree = sqlglot.parse_one(sql, read=dialect)
+        select = tree if isinstance(tree, exp.Select) else tree.find(exp.Select)
+        return [e.alias_or_name for e in select.expressions] if select is not None else []
+    except Exception:
+        return []
+
+
+class SQLPlanCache:
+    """Validated, dialect-ready SQL per parameterized question, schema version and dialect"""
+
+    def __init__(self):
+        self.stats = {"hits": 0, "template_hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def _key(template: str, data_source_id: str, schema_hash: str, dialect: Optional[str], values: str = "") -> str:
+        identity = "\x1f".join([template, str(data_source_id), schema_hash, dialect or "", values])
+        return f"sql_plan:{hashlib.sha256(identity.encode()).hexdigest()}"
+
+    @staticmethod
+    def _values(params: List[Param]) -> str:
+        return "\x1e".join(f"{kind}:{value.lower()}" for kind, value in params)
+
+    async def lookup(
+        self, question: str, data_source_id: str, schema_hash: str, dialect: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Cached plan for this question (literals substituted), or None"""
+        if not settings.SQL_PLAN_CACHE_ENABLED:
+            return None
+        from app.core.cache import async_cache
+
+        if async_cache is None:
+            return None
+        try:
+            template, params = parameterize_question(question)
+            skeleton_key = self._key(template, data_source_id, schema_hash, dialect)
+            exact_key = self._key(template, data_source_id, schema_hash, dialect, self._values(params))
+            entries = await async_cache.get_many([skeleton_key, exact_key])
+            skeleton, exact = entries.get(skeleton_key), entries.get(exact_key)
+            if not params:
+                exact = skeleton  # nothing to substitute: both keys are the same
+            if isinstance(exact, dict):
+                self.stats["hits"] += 1
+                return {**exact, "template": False}
+            if isinstance(skeleton, dict) and len(skeleton.get("slots") or []) == len(params):
+                sql = fill_slots(skeleton["sql"], skeleton.get("sqlglot_dialect"), skeleton["slots"], params)
+                self.stats["hits"] += 1
+                self.stats["template_hits"] += 1
+                return {**skeleton, "sql": sql, "template": True}
+        except Exception as e:
+            logger.warning(f"⚠️ SQL plan cache lookup failed: {e}")
+        self.stats["misses"] += 1
+        return None
+
+    async def store(
+        self,
+        question: str,
+        data_source_id: str,
+        schema_hash: str,
+        dialect: Optional[str],
+        sql: str,
+        sqlglot_dialect: Optional[str] = None,
+        validation_result: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Remember the final SQL for this question; as a skeleton when its literals can be located"""
+        if not settings.SQL_PLAN_CACHE_ENABLED or not sql:
+            return
+        from app.core.cache import async_cache
+
+        if async_cache is None:
+            return
+        try:
+            template, params = parameterize_question(question)
+            slots = sql_slots(sql, sqlglot_dialect, params)
+            values = "" if slots is not None or not params else self._values(params)
+            key = self._key(template, data_source_id, schema_hash, dialect, values)
+            entry = {
+                "sql": sql,
+                "slots": slots,
+                "sqlglot_dialect": sqlglot_dialect,
+                "columns": result_columns(sql, sqlglot_dialect),
+                "validation_result": validation_result,
+            }
+            ttl = settings.SQL_PLAN_CACHE_TTL
+            await async_cache.set(key, entry, ttl=ttl)
+            await cache_tags.tag_redis_key(key, [data_source_tag(data_source_id)], ttl=ttl)
+            self.stats["stores"] += 1
+        except Exception as e:
+            logger.warning(f"⚠️ SQL plan cache store failed: {e}")
+
+
+# Global instance
+sql_plan_cache = SQLPlanCache()
@@ -6,7 +6,9 @@ Caches formatted schema strings to avoid repeated formatting and reduce LLM toke
 
 import time
 import logging
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+
+from app.core.cache_invalidation import cache_tags, data_source_tag
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +32,7 @@ class SchemaCache:
         """
         self._cache: Dict[str, Dict] = {}
         self._ttl = ttl_seconds
+        self._cache_tier = cache_tags.register_tier(f"formatted_schema:{id(self)}", self._evict_keys)
         logger.info(f"✅ SchemaCache initialized with TTL={ttl_seconds}s")
     
     def get(self, data_source_id: str) -> Optional[str]:
@@ -70,8 +73,14 @@ class SchemaCache:
             'hits': 0,
             'size_bytes': len(formatted_schema)
         }
+        cache_tags.tag(self._cache_tier, data_source_id, [data_source_tag(data_source_id)])
         logger.info(f"💾 Schema cached for {data_source_id} ({len(formatted_schema)} bytes)")
     
+    def _evict_keys(self, keys: List[str]):
+        """Eviction callback used by tag-based invalidation."""
+        for key in keys:
+            self._cache.pop(key, None)
+    
     def invalidate(self, data_source_id: str):
         """
         Invalidate cached schema for a data source.
@@ -10,6 +10,9 @@ import logging
 from jose import jwt as jose_jwt
 from jose.exceptions import JWTError, ExpiredSignatureError
 from jose.utils import base64url_decode
+
+from app.core.compute_executor import binds_principal_tenant
+from app.core.tracing import traced, STAGE_AUTH
 import os
 import time
 import requests
@@ -240,6 +243,7 @@ class JWTBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True):
         super(JWTBearer, self).__init__(auto_error=auto_error)
 
+    @binds_principal_tenant
     async def __call__(self, request: Request):
         credentials: HTTPAuthorizationCredentials = await super().__call__(request)
         if credentials:
@@ -317,6 +321,8 @@ class JWTCookieBearer(HTTPBearer):
         except Exception:
             return False
 
+    @traced(STAGE_AUTH)
+    @binds_principal_tenant
     async def __call__(self, request: Request):
         # Only check Authorization header for Bearer token
         token = None
@@ -0,0 +1,304 @@
+"""
+Chart Data Reduction
+Shrinks chart data to what a chart can actually show before it is serialized:
+LTTB / M4 downsampling for line and area series, 2-D binning for scatter and
+heatmap points, and top-N plus an "Other" bucket for bar and pie categories.
+Reductions run on result rows with NumPy or, when the source speaks SQL, are
+pushed down by wrapping the query in an equivalent aggregation.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SERIES_CHARTS = ("line", "area")
+POINT_CHARTS = ("scatter", "heatmap")
+CATEGORY_CHARTS = ("bar", "pie")
+OTHER_LABEL = "Other"
+BIN_COUNT_FIELD = "count"
+_SOURCE = "__chart_src"
+
+
+@dataclass
+class ReductionSpec:
+    """What to reduce and how far; built from a widget's ``reduction`` options"""
+
+    chart_type: str
+    x: Optional[str] = None
+    y: List[str] = field(default_factory=list)
+    method: str = "auto"  # auto | lttb | m4 | bin | top_n | none
+    max_points: int = 0
+    max_categories: int = 0
+    bins: int = 0
+
+    def __post_init__(self):
+        self.chart_type = (self.chart_type or "").lower()
+        self.method = (self.method or "auto").lower()
+        self.max_points = int(self.max_points or settings.CHART_MAX_POINTS)
+        self.max_categories = int(self.max_categories or settings.CHART_MAX_CATEGORIES)
+        self.bins = int(self.bins or settings.CHART_SCATTER_BINS)
+
+    @classmethod
+    def from_options(cls, options: Optional[Dict[str, Any]], chart_type: Optional[str] = None,
+                     x: Optional[str] = None, y: Union[str, Sequence[str], None] = None) -> Optional["ReductionSpec"]:
+        """Spec from widget options (explicit arguments fill the gaps); None when reduction is off"""
+        options = dict(options or {})
+        if options.get("enabled") is False or not settings.CHART_REDUCTION_ENABLED:
+            return None
+        y = options.get("y", y)
+        spec = cls(
+            chart_type=options.get("chart_type") or chart_type or "",
+            x=options.get("x") or x,
+            y=[y] if isinstance(y, str) else list(y or []),
+            method=options.get("method", "auto"),
+            max_points=options.get("max_points", 0),
+            max_categories=options.get("max_categories", 0),
+            bins=options.get("bins", 0),
+        )
+        return None if spec.method == "none" or not spec.kind else spec
+
+    @property
+    def kind(self) -> Optional[str]:
+        if self.chart_type in SERIES_CHARTS:
+            return "series"
+        if self.chart_type in POINT_CHARTS:
+            return "points"
+        if self.chart_type in CATEGORY_CHARTS:
+            return "categories"
+        return None
+
+
+def _as_float(values: Sequence[Any]) -> np.ndarray:
+    try:
+        return np.asarray(values, dtype=np.float64)  # fast path: numbers and None only
+    except (TypeError, ValueError):
+        pass
+    out = np.empty(len(values), dtype=np.float64)
+    for i, value in enumerate(values):
+        try:
+            out[i] = float(value)
+        except (TypeError, ValueError):
+            out[i] = np.nan
+    return out
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices kept by Largest-Triangle-Three-Buckets (first and last point always kept)"""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        # Average of the next bucket is the third triangle vertex
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def m4(x: np.ndarray, y: np.ndarray, width: int) -> np.ndarray:
+    """Indices of the first, last, min and max point of each of ``width`` x-buckets"""
+    n = len(y)
+    if n <= 4 * width:
+        return np.arange(n)
+    span = x[-1] - x[0]
+    if span > 0:
+        bucket = np.minimum(((x - x[0]) / span * width).astype(np.int64), width - 1)
+    else:
+        bucket = np.arange(n) * width // n
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    keep = [starts, ends]
+    for reducer in (np.minimum, np.maximum):
+        extreme = reducer.reduceat(y, starts)
+        # First index in each bucket that hits the bucket's extreme
+        hits = np.flatnonzero(y == np.repeat(extreme, ends - starts + 1))
+        keep.append(hits[np.r_[True, bucket[hits[1:]] != bucket[hits[:-1]]]])
+    return np.unique(np.concatenate(keep))
+
+
+def _series_positions(rows: List[Dict[str, Any]], x_col: Optional[str]) -> np.ndarray:
+    """Numeric x when the x column is numeric, otherwise the row position (category axes)"""
+    if x_col:
+        x = _as_float([row.get(x_col) for row in rows])
+        if not np.isnan(x).any() and np.all(np.diff(x) >= 0):
+            return x
+    return np.arange(len(rows), dtype=np.float64)
+
+
+def reduce_series(rows: List[Dict[str, Any]], spec: ReductionSpec) -> Optional[Dict[str, Any]]:
+    if len(rows) <= spec.max_points or not spec.y:
+        return None
+    x = _series_positions(rows, spec.x)
+    ys = [np.nan_to_num(_as_float([row.get(col) for row in rows])) for col in spec.y]
+    if spec.method == "m4":
+        keep = np.unique(np.concatenate([m4(x, y, max(1, spec.max_points // 4)) for y in ys]))
+        method = "m4"
+    else:
+        # One LTTB pass per series, sharing the budget; the x axis is the union of kept points
+        budget = max(3, spec.max_points // len(ys))
+        keep = np.unique(np.concatenate([lttb(x, y, budget) for y in ys]))
+        method = "lttb"
+    return {"rows": [rows[i] for i in keep], "method": method}
+
+
+def reduce_points(rows: List[Dict[str, Any]], spec: ReductionSpec) -> Optional[Dict[str, Any]]:
+    y_col = spec.y[0] if spec.y else None
+    if len(rows) <= spec.max_points or not spec.x or not y_col:
+        return None
+    x = _as_float([row.get(spec.x) for row in rows])
+    y = _as_float([row.get(y_col) for row in rows])
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if not valid.any():
+        return None
+    counts, x_edges, y_edges = np.histogram2d(x[valid], y[valid], bins=spec.bins)
+    xi, yi = np.nonzero(counts)
+    x_mid = (x_edges[:-1] + x_edges[1:]) / 2
+    y_mid = (y_edges[:-1] + y_edges[1:]) / 2
+    binned = [
+        {spec.x: float(x_mid[i]), y_col: float(y_mid[j]), BIN_COUNT_FIELD: int(counts[i, j])}
+        for i, j in zip(xi.tolist(), yi.tolist())
+    ]
+    return {"rows": binned, "method": "bin"}
+
+
+def reduce_categories(rows: List[Dict[str, Any]], spec: ReductionSpec) -> Optional[Dict[str, Any]]:
+    if not spec.x or not spec.y:
+        return None
+    labels = [row.get(spec.x) for row in rows]
+    unique, inverse = np.unique(np.array([str(label) for label in labels], dtype=object), return_inverse=True)
+    if len(unique) <= spec.max_categories:
+        return None
+    totals = np.column_stack([
+        np.bincount(inverse, weights=np.nan_to_num(_as_float([row.get(col) for row in rows])), minlength=len(unique))
+        for col in spec.y
+    ])
+    order = np.argsort(-totals[:, 0], kind="stable")
+    top, rest = order[:spec.max_categories - 1], order[spec.max_categories - 1:]
+    reduced = [{spec.x: unique[i], **{col: float(totals[i, k]) for k, col in enumerate(spec.y)}} for i in top]
+    reduced.append({spec.x: OTHER_LABEL, **{col: float(totals[rest, k].sum()) for k, col in enumerate(spec.y)}})
+    return {"rows": reduced, "method": "top_n", "other_categories": int(len(rest))}
+
+
+def reduce_rows(rows: List[Dict[str, Any]], spec: Optional[ReductionSpec]) -> Dict[str, Any]:
+    """Reduced rows plus a record of what was applied (``reduction`` is None when nothing was)"""
+    if not spec or not rows or not isinstance(rows[0], dict):
+        return {"rows": rows, "reduction": None}
+    try:
+        reducer = {"series": reduce_series, "points": reduce_points, "categories": reduce_categories}[spec.kind]
+        reduced = reducer(rows, spec)
+    except Exception as e:
+        logger.warning(f"⚠️ Chart data reduction failed, using all rows: {e}")
+        reduced = None
+    if not reduced:
+        return {"rows": rows, "reduction": None}
+    new_rows = reduced.pop("rows")
+    reduction = {
+        "chart_type": spec.chart_type,
+        "input_rows": len(rows),
+        "output_rows": len(new_rows),
+        "pushed_down": False,
+        **reduced,
+    }
+    logger.info(f"📉 Reduced {spec.chart_type} data {len(rows)} → {len(new_rows)} rows ({reduction['method']})")
+    return {"rows": new_rows, "reduction": reduction}
+
+
+# SQL push-down ---------------------------------------------------------------
+
+def _quote(name: str, dialect: str) -> str:
+    from sqlglot import exp
+
+    return exp.to_identifier(name, quoted=True).sql(dialect=dialect)
+
+
+def _series_sql(spec: ReductionSpec, q) -> Optional[str]:
+    # M4 over equal-count row buckets: exact M4 for evenly spaced series, and portable
+    width = max(1, spec.max_points // 4)
+    x = q(spec.x)
+    ranks = [
+        f"ROW_NUMBER() OVER (PARTITION BY __bucket ORDER BY {x}) AS __first",
+        f"ROW_NUMBER() OVER (PARTITION BY __bucket ORDER BY {x} DESC) AS __last",
+    ]
+    keep = ["__first = 1", "__last = 1"]
+    for i, col in enumerate(spec.y):
+        ranks.append(f"ROW_NUMBER() OVER (PARTITION BY __bucket ORDER BY {q(col)}) AS __min_{i}")
+        ranks.append(f"ROW_NUMBER() OVER (PARTITION BY __bucket ORDER BY {q(col)} DESC) AS __max_{i}")
+        keep += [f"__min_{i} = 1", f"__max_{i} = 1"]
+    columns = ", ".join([x] + [q(col) for col in spec.y])
+    return (
+        f"WITH __numbered AS (SELECT {columns}, ROW_NUMBER() OVER (ORDER BY {x}) AS __rn, "
+        f"COUNT(*) OVER () AS __total FROM {_SOURCE}), "
+        f"__bucketed AS (SELECT {columns}, FLOOR((__rn - 1) * {width} / __total) AS __bucket, __total FROM __numbered), "
+        f"__ranked AS (SELECT {columns}, __total, {', '.join(ranks)} FROM __bucketed) "
+        f"SELECT {columns} FROM __ranked WHERE __total <= {spec.max_points} OR {' OR '.join(keep)} ORDER BY {x}"
+    )
+
+
+def _points_sql(spec: ReductionSpec, q) -> Optional[str]:
+    x, y, bins = q(spec.x), q(spec.y[0]), spec.bins
+    x_bin = f"LEAST(FLOOR(({x} - __x0) * {bins} / NULLIF(__x1 - __x0, 0)), {bins - 1})"
+    y_bin = f"LEAST(FLOOR(({y} - __y0) * {bins} / NULLIF(__y1 - __y0, 0)), {bins - 1})"
+    return (
+        f"WITH __bounds AS (SELECT MIN({x}) AS __x0, MAX({x}) AS __x1, MIN({y}) AS __y0, MAX({y}) AS __y1 "
+        f"FROM {_SOURCE}), "
+        f"__binned AS (SELECT COALESCE({x_bin}, 0) AS __xb, COALESCE({y_bin}, 0) AS __yb, __x0, __x1, __y0, __y1 "
+        f"FROM {_SOURCE} CROSS JOIN __bounds WHERE {x} IS NOT NULL AND {y} IS NOT NULL) "
+        f"SELECT __x0 + (__xb + 0.5) * (__x1 - __x0) / {bins} AS {x}, "
+        f"__y0 + (__yb + 0.5) * (__y1 - __y0) / {bins} AS {y}, COUNT(*) AS {q(BIN_COUNT_FIELD)} "
+        f"FROM __binned GROUP BY __xb, __yb, __x0, __x1, __y0, __y1"
+    )
+
+
+def _categories_sql(spec: ReductionSpec, q) -> Optional[str]:
+    x, n = q(spec.x), spec.max_categories
+    sums = ", ".join(f"SUM({q(col)}) AS {q(col)}" for col in spec.y)
+    first = q(spec.y[0])
+    return (
+        f"WITH __agg AS (SELECT {x}, {sums} FROM {_SOURCE} GROUP BY {x}), "
+        f"__ranked AS (SELECT __agg.*, ROW_NUMBER() OVER (ORDER BY {first} DESC) AS __rank, "
+        f"COUNT(*) OVER () AS __groups FROM __agg) "
+        f"SELECT CASE WHEN __groups <= {n} OR __rank < {n} THEN CAST({x} AS VARCHAR) ELSE '{OTHER_LABEL}' END AS {x}, "
+        f"{', '.join(f'SUM({q(col)}) AS {q(col)}' for col in spec.y)} FROM __ranked "
+        f"GROUP BY 1 ORDER BY MIN(__rank)"
+    )
+
+
+def reduction_sql(query: str, spec: ReductionSpec, dialect: str) -> Optional[str]:
+    """``query`` wrapped in the SQL equivalent of the reduction, or None if it cannot be pushed down"""
+    if not spec or not spec.x or not spec.y or spec.method in ("lttb", "none"):
+        return None
+    builders = {"series": _series_sql, "points": _points_sql, "categories": _categories_sql}
+    try:
+        import sqlglot
+
+        outer = builders[spec.kind](spec, lambda name: _quote(name, "duckdb"))
+        outer = sqlglot.transpile(outer, read="duckdb", write=dialect)[0]
+        inner = query.strip().rstrip(";")
+        # Every template starts with a CTE list; the original query becomes its first entry
+        return f"WITH {_SOURCE} AS ({inner}), " + outer[len("WITH "):]
+    except Exception as e:
+        logger.debug(f"Could not build pushed-down reduction for {spec.chart_type}: {e}")
+        return None
+
+
+def pushed_down_reduction(spec: ReductionSpec, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reduction record for rows produced by ``reduction_sql``"""
+    return {
+        "chart_type": spec.chart_type,
+        "method": {"series": "m4", "points": "bin", "categories": "top_n"}[spec.kind],
+        "output_rows": len(rows),
+        "pushed_down": True,
+    }
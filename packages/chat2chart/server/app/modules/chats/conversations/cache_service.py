@@ -8,7 +8,7 @@ import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 
-from app.core.cache import cache
+from app.core.cache import async_cache
 
 logger = logging.getLogger(__name__)
 
@@ -45,11 +45,11 @@ class ConversationCacheService:
     async def get_conversation(cls, conversation_id: str) -> Optional[Dict[str, Any]]:
         """Get conversation from cache"""
         try:
-            if not cache or not cache.redis_client:
+            if not async_cache or not await async_cache.redis_available():
                 return None
             
             key = cls._get_conversation_key(conversation_id)
-            cached = cache.get(key)
+            cached = await async_cache.get(key)
             
             if cached:
                 logger.debug(f"✅ Cache hit for conversation {conversation_id}")
@@ -65,7 +65,7 @@ class ConversationCacheService:
     async def set_conversation(cls, conversation_id: str, conversation_data: Dict[str, Any], ttl: Optional[int] = None) -> bool:
         """Cache a conversation"""
         try:
-            if not cache or not cache.redis_client:
+            if not async_cache or not await async_cache.redis_available():
                 return False
             
             key = cls._get_conversation_key(conversation_id)
@@ -74,7 +74,7 @@ class ConversationCacheService:
             # Ensure datetime objects are serialized
             serializable_data = cls._make_serializable(conversation_data)
             
-            success = cache.set(key, serializable_data, ttl)
+            success = await async_cache.set(key, serializable_data, ttl)
             if success:
                 logger.debug(f"✅ Cached conversation {conversation_id} (TTL: {ttl}s)")
             return success
@@ -86,11 +86,11 @@ class ConversationCacheService:
     async def get_conversation_list(cls, user_id: str, offset: int = 0, limit: int = 50) -> Optional[List[Dict[str, Any]]]:
         """Get conversation list from cache"""
         try:
-            if not cache or not cache.redis_client:
+            if not async_cache or not await async_cache.redis_available():
                 return None
             
             key = cls._get_conversation_list_key(user_id, offset, limit)
-            cached = cache.get(key)
+            cached = await async_cache.get(key)
             
             if cached:
                 logger.debug(f"✅ Cache hit for conversation list (user: {user_id}, offset: {offset}, limit: {limit})")
@@ -105,7 +105,7 @@ class ConversationCacheService:
     async def set_conversation_list(cls, user_id: str, conversations: List[Dict[str, Any]], offset: int = 0, limit: int = 50, ttl: Optional[int] = None) -> bool:
         """Cache conversation list"""
         try:
-            if not cache or not cache.redis_client:
+            if not async_cache or not await async_cache.redis_available():
                 return False
             
             key = cls._get_conversation_list_key(user_id, offset, limit)
@@ -114,7 +114,7 @@ class ConversationCacheService:
             # Ensure datetime objects are serialized
             serializable_data = [cls._make_serializable(conv) for conv in conversations]
             
-            success = cache.set(key, serializable_data, ttl)
+            success = await async_cache.set(key, serializable_data, ttl)
             if success:
                 logger.debug(f"✅ Cached conversation list (user: {user_id}, count: {len(conversations)}, TTL: {ttl}s)")
             return success
@@ -126,11 +126,11 @@ class ConversationCacheService:
     async def get_messages(cls, conversation_id: str) -> Optional[List[Dict[str, Any]]]:
         """Get messages for a conversation from cache"""
         try:
-            if not cache or not cache.redis_client:
+            if not async_cache or not await async_cache.redis_available():
                 return None
             
             key = cls._get_conversation_messages_key(conversation_id)
-            cached = cache.get(key)
+            cached = await async_cache.get(key)
             
             if cached:
                 logger.debug(f"✅ Cache hit for messages (conversation: {conversation_id})")
@@ -145,7 +145,7 @@ class ConversationCacheService:
     async def set_messages(cls, conversation_id: str, messages: List[Dict[str, Any]], ttl: Optional[int] = None) -> bool:
         """Cache messages for a conversation"""
         try:
-            if not cache or not cache.redis_client:
+            if not async_cache or not await async_cache.redis_available():
                 return False
             
             key = cls._get_conversation_messages_key(conversation_id)
@@ -154,7 +154,7 @@ class ConversationCacheService:
             # Ensure datetime objects are serialized
             serializable_data = [cls._make_serializable(msg) for msg in messages]
             
-            success = cache.set(key, serializable_data, ttl)
+            success = await async_cache.set(key, serializable_data, ttl)
             if success:
                 logger.debug(f"✅ Cached messages (conversation: {conversation_id}, count: {len(messages)}, TTL: {ttl}s)")
             return success
@@ -166,16 +166,16 @@ class ConversationCacheService:
     async def invalidate_conversation(cls, conversation_id: str) -> bool:
         """Invalidate cache for a conversation and its messages"""
         try:
-            if not cache or not cache.redis_client:
+            if not async_cache or not await async_cache.redis_available():
                 return False
             
             # Delete conversation
             conv_key = cls._get_conversation_key(conversation_id)
-            cache.delete(conv_key)
+            await async_cache.delete(conv_key)
             
             # Delete messages
             msgs_key = cls._get_conversation_messages_key(conversation_id)
-            cache.delete(msgs_key)
+            await async_cache.delete(msgs_key)
             
             # Invalidate conversation lists (pattern match)
             # Note: This is a best-effort - we can't easily invalidate all user lists
@@ -191,12 +191,12 @@ class ConversationCacheService:
     async def invalidate_user_conversation_lists(cls, user_id: str) -> bool:
         """Invalidate all conversation lists for a user"""
         try:
-            if not cache or not cache.redis_client:
+            if not async_cache or not await async_cache.redis_available():
                 return False
             
             # Delete all conversation list keys for this user
             pattern = f"conv_list:{user_id}:*"
-            cleared = cache.clear_pattern(pattern)
+            cleared = await async_cache.clear_pattern(pattern)
             
             logger.debug(f"✅ Invalidated conversation lists for user {user_id} ({cleared} keys)")
             return True
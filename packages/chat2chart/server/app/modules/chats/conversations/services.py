@@ -11,6 +11,7 @@ from app.modules.chats.messages.repository import MessageRepository
 from app.modules.chats.messages.schemas import MessageResponseSchema
 import logging
 import uuid
+from app.core.tracing import traced, STAGE_DB_PERSISTENCE
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -188,6 +189,7 @@ class ConversationService(
             logger.error(f"Failed to get conversation: {str(e)}")
             raise e
 
+    @traced(STAGE_DB_PERSISTENCE)
     async def add_message(self, conversation_id: str, message: dict):
         """Add a message to a conversation with full AI metadata preservation"""
         try:
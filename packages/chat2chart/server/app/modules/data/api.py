@@ -3,6 +3,7 @@ Data Connectivity API
 FastAPI endpoints for universal data connectivity
 """
 
+import asyncio
 import logging
 import json
 import re
@@ -10,20 +11,40 @@ import os
 from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 import time
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends, status, Request
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends, status, Request, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.modules.authentication.deps.auth_bearer import JWTCookieBearer
+from app.core.cache_invalidation import cache_tags, data_source_tag
+from app.core.config import settings
 # Auth class removed - using extract_user_payload helper instead
 # from app.modules.authentication.auth import Auth
 from app.db.session import get_async_session
 # DataSourceRBACService removed - organization/RBAC context removed
 # from .services.rbac_service import DataSourceRBACService
 from .services.data_connectivity_service import DataConnectivityService
+from .services.data_browser import (
+    ARROW_STREAM_MEDIA_TYPE,
+    BROWSE_FORMATS,
+    BrowseError,
+    BrowseRequest,
+    data_browser,
+)
+from .services.streaming_ingest import (
+    STREAMABLE_FORMATS,
+    IngestEventStreamResponse,
+    MultipartFileStream,
+    iter_upload_file,
+)
 from .services.intelligent_data_modeling_service import IntelligentDataModelingService
 from .services.database_connector_service import DatabaseConnectorService
 from .services.data_retention_service import DataRetentionService
 from app.modules.data.services.multi_engine_query_service import MultiEngineQueryService, QueryEngine
+from app.modules.data.services.result_spill import ResultBudget, spill_store
+from app.modules.data.services.query_cost_model import query_performance_monitor
+from app.modules.data.services import rollup_manager as rollups
+from app.modules.charts.utils.data_reduction import ReductionSpec
 from app.modules.data.services.enterprise_connectors_service import EnterpriseConnectorsService, ConnectionConfig, ConnectorType
 from app.modules.data.services.delta_iceberg_connector import DeltaIcebergConnector
 import sqlalchemy as sa
@@ -414,12 +435,6 @@ async def upload_file(
                 name = 'Uploaded File'
             logger.info(f"📁 Auto-generated data source name from filename: {name}")
         
-        # Read file content
-        content = await file.read()
-        
-        if not content:
-            raise HTTPException(status_code=400, detail="File is empty")
-        
         # Prepare options for the service
         options = {
             'include_data': include_preview,
@@ -442,12 +457,26 @@ async def upload_file(
         except Exception:
             pass
 
+        # Columnar-convertible formats are ingested chunk by chunk (bounded memory);
+        # other formats are still read whole
+        streaming = data_service._get_file_extension(file.filename) in STREAMABLE_FORMATS
+        content = None
+        if not streaming:
+            content = await file.read()
+            if not content:
+                raise HTTPException(status_code=400, detail="File is empty")
+
+        async def _upload() -> Dict[str, Any]:
+            if streaming:
+                return await data_service.ingest_upload(iter_upload_file(file), file.filename, options)
+            return await data_service.upload_file(content, file.filename, options)
+
         # Use the data service to handle the upload
         # If preview_only, skip database save but still process file for preview
         if preview_only:
             # Process file for preview only (no database save)
             options['preview_only'] = True
-            result = await data_service.upload_file(content, file.filename, options)
+            result = await _upload()
             
             # Return preview data without saving to database
             if result.get('success') and result.get('data_source'):
@@ -464,7 +493,7 @@ async def upload_file(
             else:
                 raise HTTPException(status_code=400, detail=result.get('error', 'Preview generation failed'))
         
-        result = await data_service.upload_file(content, file.filename, options)
+        result = await _upload()
         
         if result['success']:
             # Ensure user_id is set on the data source
@@ -495,6 +524,54 @@ async def upload_file(
 
 
 
+@router.post("/upload/stream")
+async def upload_file_stream(
+    request: Request,
+    current_token: Union[str, dict] = Depends(JWTCookieBearer())
+):
+    """Stream a multipart upload (field 'file') straight into columnar storage.
+
+    The body is parsed incrementally, so memory stays bounded for multi-GB
+    files. Responds with newline-delimited JSON events: ``preview`` (schema
+    and sample from the first chunk) while the upload is still arriving,
+    then ``complete`` (same payload as /upload) or ``error``. Form fields
+    ``name``, ``delimiter`` and ``preview_only`` may also be passed as query
+    parameters; fields sent after the file part are only used for naming.
+    """
+    user_id = None
+    if isinstance(current_token, dict):
+        user_id = str(current_token.get('id') or current_token.get('user_id') or current_token.get('sub') or '')
+    if not user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Authentication required')
+
+    await enforce_data_source_limit(user_id)
+
+    try:
+        stream = await MultipartFileStream(request).start()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    params = {**stream.fields, **dict(request.query_params)}
+    if data_service._get_file_extension(stream.filename) not in STREAMABLE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Streaming upload supports: {', '.join(STREAMABLE_FORMATS)}")
+
+    name = (params.get('name') or '').strip() or stream.filename.rsplit('.', 1)[0]
+    options = {
+        'include_data': False,
+        'delimiter': params.get('delimiter') or ',',
+        'user_id': user_id,
+        'upload_with_prompt': str(params.get('upload_with_prompt', '')).lower() in ('1', 'true'),
+        'name': name,
+        'preview_only': str(params.get('preview_only', '')).lower() in ('1', 'true'),
+    }
+
+    async def events():
+        async for event in data_service.ingest_upload_stream(stream.chunks(), stream.filename, options):
+            yield json.dumps(event, default=str) + "\n"
+
+    return IngestEventStreamResponse(events(), media_type="application/x-ndjson")
+
+
 # Get data source endpoint
 @router.get("/sources/{data_source_id}")
 async def get_data_source(
@@ -668,6 +745,7 @@ async def delete_data_source(data_source_id: str, current_token: Union[str, dict
         result = data_service.delete_data_source(data_source_id)
 
         if result['success']:
+            await cache_tags.invalidate(data_source_tag(data_source_id))
             return {
                 "success": True,
                 "message": result['message']
@@ -998,9 +1076,23 @@ async def health_check():
 @router.get("/sources/{data_source_id}/data")
 async def get_data_source_data(
     data_source_id: str,
+    limit: Optional[int] = Query(None, ge=1, description="Rows per page (streams: omit for all rows)"),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    columns: Optional[str] = Query(None, description="Comma-separated projection"),
+    sort: Optional[str] = Query(None, description="Comma-separated columns, '-' prefix for descending"),
+    filters: Optional[List[str]] = Query(None, alias="filter", description="column:op:value, repeatable"),
+    response_format: str = Query("json", alias="format", description="json | ndjson | arrow"),
+    sheet: Optional[str] = Query(None, description="Excel sheet (defaults to the primary sheet)"),
+    include_total: bool = Query(True),
     current_token: Union[str, dict] = Depends(JWTCookieBearer())
 ):
-    """Get data from uploaded data source - REQUIRES AUTHENTICATION and ownership verification"""
+    """Browse data of an uploaded data source - REQUIRES AUTHENTICATION and ownership verification.
+
+    File sources are paged server-side: projection, sort and filters run in
+    DuckDB over a cached Parquet copy. ``format=ndjson`` or ``format=arrow``
+    streams the selected rows in record batches instead of a JSON page.
+    """
     try:
         # Extract user ID from JWT token - CRITICAL for security
         try:
@@ -1053,92 +1145,45 @@ async def get_data_source_data(
         
         data_source = data_source_info['data_source']
         
-        # For file-based sources, check if file exists and load data
+        # For file-based sources, serve a page (or stream) from the columnar copy
         if data_source['type'] == 'file':
-            # If a transient in-memory sample was provided at creation, return it
-            if data_source.get('data'):
-                return {
-                    "success": True,
-                    "data_source_id": data_source_id,
-                    "data": data_source.get('data', []),
-                    "metadata": {
-                        "filename": data_source['name'],
-                        "columns": data_source.get('schema', {}).get('columns', []),
-                        "row_count": len(data_source.get('data', [])),
-                        "file_path": data_source.get('file_path'),
-                        "format": data_source.get('format')
-                    }
-                }
+            if response_format not in BROWSE_FORMATS:
+                raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(BROWSE_FORMATS)}")
+            if response_format == 'json':
+                limit = min(limit or settings.DATA_BROWSE_MAX_PAGE_ROWS, settings.DATA_BROWSE_MAX_PAGE_ROWS)
             
-            # Try to load from PostgreSQL storage
-            object_key = data_source.get('file_path')  # Now it's object_key
-            if object_key:
-                try:
-                    from app.modules.data.services.postgres_storage_service import PostgresStorageService
-                    storage_service = PostgresStorageService()
-                    
-                    # Load file from PostgreSQL
-                    file_content = await storage_service.get_file(object_key, user_id)
-                    
-                    # Process based on format
-                    import tempfile
-                    file_format = data_source.get('format', 'csv')
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_format}") as tmp:
-                        tmp.write(file_content)
-                        tmp_path = tmp.name
-                    
-                    try:
-                        if file_format == 'csv':
-                            import pandas as pd
-                            df = pd.read_csv(tmp_path)
-                            data = df.to_dict('records')
-                        elif file_format in ['xlsx', 'xls']:
-                            import pandas as pd
-                            df = pd.read_excel(tmp_path)
-                            data = df.to_dict('records')
-                        elif file_format == 'json':
-                            import json
-                            with open(tmp_path, 'r') as f:
-                                data = json.load(f)
-                        else:
-                            raise HTTPException(status_code=400, detail=f"Unsupported format: {file_format}")
-                        
-                        return {
-                            "success": True,
-                            "data_source_id": data_source_id,
-                            "data": data,
-                            "metadata": {
-                                "filename": data_source['name'],
-                                "columns": data_source.get('schema', {}).get('columns', []),
-                                "row_count": len(data),
-                                "file_path": object_key,
-                                "format": file_format
-                            }
-                        }
-                    finally:
-                        if os.path.exists(tmp_path):
-                            os.unlink(tmp_path)
-                except Exception as e:
-                    logger.error(f"Failed to load from PostgreSQL storage: {e}")
-                    # Fall through to sample_data fallback
+            try:
+                browse = BrowseRequest.parse(columns, sort, filters, offset, limit, cursor)
+                parquet_path = await data_browser.resolve_parquet(data_source, user_id, sheet)
+                if response_format != 'json':
+                    chunks = await data_browser.stream(parquet_path, browse, response_format)
+                    media_type = ARROW_STREAM_MEDIA_TYPE if response_format == 'arrow' else "application/x-ndjson"
+                    return StreamingResponse(chunks, media_type=media_type)
+                page = await data_browser.page(parquet_path, browse, include_total)
+            except BrowseError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            except LookupError as e:
+                raise HTTPException(status_code=400, detail=str(e))
             
-            # Fallback to sample_data
-            sample_data = data_source.get('sample_data', [])
-            if sample_data:
-                return {
-                    "success": True,
-                    "data_source_id": data_source_id,
-                    "data": sample_data,
-                    "metadata": {
-                        "filename": data_source['name'],
-                        "columns": data_source.get('schema', {}).get('columns', []),
-                        "row_count": len(sample_data),
-                        "file_path": object_key,
-                        "format": data_source.get('format')
-                    }
+            return {
+                "success": True,
+                "data_source_id": data_source_id,
+                "data": page['data'],
+                "metadata": {
+                    "filename": data_source['name'],
+                    "columns": page['columns'],
+                    "row_count": page['total_rows'] if page['total_rows'] is not None else len(page['data']),
+                    "file_path": data_source.get('file_path'),
+                    "format": data_source.get('format')
+                },
+                "pagination": {
+                    "offset": page['offset'],
+                    "limit": page['limit'],
+                    "has_more": page['has_more'],
+                    "next_cursor": page['next_cursor'],
+                    "total_rows": page['total_rows']
                 }
-            
-            raise HTTPException(status_code=400, detail="No data available for this data source")
+            }
         
         # For database sources, return connection info
         elif data_source['type'] == 'database':
@@ -1918,25 +1963,45 @@ class CreateMaterializedViewRequest(BaseModel):
     table_schema: Optional[str] = Field(None, alias="schema")
 
 
+async def _materialized_view_source(data_source_id: str, current_token: Union[str, dict]) -> Dict[str, Any]:
+    """Data source for a materialized view change; the caller must be signed in and own the source"""
+    from app.modules.authentication.helpers import extract_user_payload
+
+    try:
+        user_payload = extract_user_payload(current_token)
+        user_id = str(user_payload.get('id') or user_payload.get('user_id') or user_payload.get('sub') or '')
+    except Exception:
+        user_id = ''
+    if not user_id:
+        logger.warning('materialized view change attempted without authenticated user')
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Authentication required')
+    data_source = await data_service.get_data_source_by_id(data_source_id)
+    if not data_source or (data_source.get("user_id") and str(data_source["user_id"]) != user_id):
+        raise HTTPException(status_code=404, detail="Data source not found")
+    return data_source
+
+
 @router.post("/sources/{data_source_id}/materialized-views")
-async def create_materialized_view(data_source_id: str, request: CreateMaterializedViewRequest):
-    """Create a materialized view using provided SQL (Postgres)."""
+async def create_materialized_view(
+    data_source_id: str,
+    request: CreateMaterializedViewRequest,
+    current_token: Union[str, dict] = Depends(JWTCookieBearer())
+):
+    """Create a materialized view from a single read-only SELECT (Postgres)."""
     try:
-        data_source = await data_service.get_data_source_by_id(data_source_id)
-        if not data_source:
-            raise HTTPException(status_code=404, detail="Data source not found")
+        data_source = await _materialized_view_source(data_source_id, current_token)
 
-        # simple validation for name to avoid injection
-        if not re.match(r"^[a-zA-Z_][a-zA-Z0-9_]*$", request.name):
-            raise HTTPException(status_code=400, detail="Invalid view name")
-        qualified = f"{request.schema}.{request.name}" if request.schema else request.name
-        create_sql = f"CREATE MATERIALIZED VIEW {qualified} AS {request.sql}"
-        await multi_engine_service.execute_query(
-            query=create_sql,
-            data_source=data_source,
-            engine=QueryEngine.DIRECT_SQL,
-            optimization=False,
+        # Identifiers and the SELECT are validated; only the DDL built around them runs with allow_ddl
+        try:
+            qualified = rollups.qualified_view_name(request.name, request.table_schema)
+            select_sql = rollups.materialized_view_select(request.sql, multi_engine_service.sql_dialect(data_source))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        result = await multi_engine_service.execute_maintenance_sql(
+            rollups.create_materialized_view_sql(qualified, select_sql), data_source
         )
+        if not result.get("success"):
+            raise HTTPException(status_code=400, detail=result.get("error"))
         return {"success": True, "message": "Materialized view created"}
     except HTTPException:
         raise
@@ -1946,20 +2011,20 @@ async def create_materialized_view(data_source_id: str, request: CreateMateriali
 
 
 @router.post("/sources/{data_source_id}/materialized-views/{schema}.{name}/refresh")
-async def refresh_materialized_view(data_source_id: str, schema: str, name: str):
+async def refresh_materialized_view(
+    data_source_id: str, schema: str, name: str, current_token: Union[str, dict] = Depends(JWTCookieBearer())
+):
     try:
-        data_source = await data_service.get_data_source_by_id(data_source_id)
-        if not data_source:
-            raise HTTPException(status_code=404, detail="Data source not found")
-        if not re.match(r"^[a-zA-Z_][a-zA-Z0-9_]*$", schema) or not re.match(r"^[a-zA-Z_][a-zA-Z0-9_]*$", name):
+        data_source = await _materialized_view_source(data_source_id, current_token)
+        try:
+            qualified = rollups.qualified_view_name(name, schema)
+        except ValueError:
             raise HTTPException(status_code=400, detail="Invalid identifiers")
-        refresh_sql = f"REFRESH MATERIALIZED VIEW CONCURRENTLY {schema}.{name}"
-        await multi_engine_service.execute_query(
-            query=refresh_sql,
-            data_source=data_source,
-            engine=QueryEngine.DIRECT_SQL,
-            optimization=False,
+        result = await multi_engine_service.execute_maintenance_sql(
+            rollups.refresh_materialized_view_sql(qualified, concurrently=True), data_source
         )
+        if not result.get("success"):
+            raise HTTPException(status_code=400, detail=result.get("error"))
         return {"success": True, "message": "Materialized view refreshed"}
     except HTTPException:
         raise
@@ -1969,20 +2034,20 @@ async def refresh_materialized_view(data_source_id: str, schema: str, name: str)
 
 
 @router.delete("/sources/{data_source_id}/materialized-views/{schema}.{name}")
-async def drop_materialized_view(data_source_id: str, schema: str, name: str):
+async def drop_materialized_view(
+    data_source_id: str, schema: str, name: str, current_token: Union[str, dict] = Depends(JWTCookieBearer())
+):
     try:
-        data_source = await data_service.get_data_source_by_id(data_source_id)
-        if not data_source:
-            raise HTTPException(status_code=404, detail="Data source not found")
-        if not re.match(r"^[a-zA-Z_][a-zA-Z0-9_]*$", schema) or not re.match(r"^[a-zA-Z_][a-zA-Z0-9_]*$", name):
+        data_source = await _materialized_view_source(data_source_id, current_token)
+        try:
+            qualified = rollups.qualified_view_name(name, schema)
+        except ValueError:
             raise HTTPException(status_code=400, detail="Invalid identifiers")
-        drop_sql = f"DROP MATERIALIZED VIEW IF EXISTS {schema}.{name}"
-        await multi_engine_service.execute_query(
-            query=drop_sql,
-            data_source=data_source,
-            engine=QueryEngine.DIRECT_SQL,
-            optimization=False,
+        result = await multi_engine_service.execute_maintenance_sql(
+            rollups.drop_materialized_view_sql(qualified), data_source
         )
+        if not result.get("success"):
+            raise HTTPException(status_code=400, detail=result.get("error"))
         return {"success": True, "message": "Materialized view dropped"}
     except HTTPException:
         raise
@@ -1991,6 +2056,34 @@ async def drop_materialized_view(data_source_id: str, schema: str, name: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/sources/{data_source_id}/rollups")
+async def list_rollups(data_source_id: str):
+    """Rollups built for a data source, the frequent query patterns seen and the rollups they suggest"""
+    data_source = await data_service.get_data_source_by_id(data_source_id)
+    if not data_source:
+        raise HTTPException(status_code=404, detail="Data source not found")
+    return {"success": True, **rollups.rollup_manager.status(data_source)}
+
+
+@router.post("/sources/{data_source_id}/rollups/build")
+async def build_rollups(data_source_id: str):
+    """Mine the data source's snapshot history for frequent aggregates and build their rollups now"""
+    try:
+        data_source = await data_service.get_data_source_by_id(data_source_id)
+        if not data_source:
+            raise HTTPException(status_code=404, detail="Data source not found")
+        history = await asyncio.to_thread(rollups.load_snapshot_history, data_source_id)
+        dialect = multi_engine_service.sql_dialect(data_source)
+        observed = rollups.rollup_manager.observe_history(history, data_source, dialect)
+        built = await multi_engine_service.maintain_rollups(data_source)
+        return {"success": True, "observed_queries": observed, "built": built}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Failed to build rollups: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 class AnalyzeQueryRequest(BaseModel):
     sql: str
 
@@ -2244,6 +2337,15 @@ async def execute_multi_engine_query(request: Dict[str, Any]):
         filters = request.get('filters')  # Optional: [{field, op, value|values|from/to}]
         engine = request.get('engine')  # Optional: 'duckdb', 'cube', 'spark', 'direct_sql', 'pandas'
         optimization = request.get('optimization', True)
+        # Optional: 'approximate' for a sampled answer with error bounds, 'auto' to let the cost model decide
+        mode = str(request.get('mode', 'exact')).lower()
+        approximate = None if mode == 'auto' else mode == 'approximate'
+        # Optional: a widget's reduction options ({chart_type, x, y, max_points, ...}) to shrink chart data
+        reduction = ReductionSpec.from_options(request.get('reduction')) if isinstance(request.get('reduction'), dict) else None
+        # Optional: max_rows / max_bytes returned inline and timeout_seconds, clamped to the server limits
+        budget = None
+        if any(request.get(key) is not None for key in ('max_rows', 'max_bytes', 'timeout_seconds')):
+            budget = ResultBudget.from_options(request)
         
         logger.info(f"🔍 Extracted from request: query={query[:200]}..., data_source_id={data_source_id}, engine={engine}")
         
@@ -2253,24 +2355,7 @@ async def execute_multi_engine_query(request: Dict[str, Any]):
         # Get data source
         logger.info(f"🔍 Fetching data source: {data_source_id}")
         data_source = await data_service.get_data_source_by_id(data_source_id)
-        # Enrich file-based data sources with persisted sample_data if available
-        try:
-            if data_source and data_source.get('type') == 'file' and not data_source.get('data') and not data_source.get('sample_data'):
-                from app.db.session import get_sync_engine
-                eng = get_sync_engine()
-                import sqlalchemy as sa
-                with eng.connect() as conn:
-                    r = conn.execute(sa.text("SELECT sample_data FROM data_sources WHERE id = :id LIMIT 1"), {"id": data_source_id})
-                    row = r.fetchone()
-                    if row and row[0] is not None:
-                        try:
-                            data_source['sample_data'] = row[0]
-                            data_source['data'] = row[0]
-                        except Exception:
-                            data_source['sample_data'] = row[0]
-        except Exception:
-            # Non-fatal: continue with whatever data_source we have
-            logger.debug('Failed to enrich data_source with persisted sample_data')
+        # Persisted sample_data already comes with the catalog row
         # Additional fallback: check in-memory preview registry for inline sample data
         try:
             if data_source and data_source.get('type') == 'file' and not data_source.get('data') and not data_source.get('sample_data'):
@@ -2314,12 +2399,23 @@ async def execute_multi_engine_query(request: Dict[str, Any]):
                 pass
 
         # Execute query
-        result = await multi_engine_service.execute_query(
-            query=query,
-            data_source=data_source,
-            engine=selected_engine,
-            optimization=optimization
-        )
+        if reduction and not approximate:
+            result = await multi_engine_service.execute_chart_query(
+                query=query,
+                data_source=data_source,
+                reduction=reduction,
+                engine=selected_engine,
+                optimization=optimization
+            )
+        else:
+            result = await multi_engine_service.execute_query(
+                query=query,
+                data_source=data_source,
+                engine=selected_engine,
+                optimization=optimization,
+                approximate=approximate,
+                budget=budget
+            )
         
         # Ensure result has proper structure with all required fields
         logger.info(f"📊 Query execution result: success={result.get('success')}, data_length={len(result.get('data', []))}, columns={result.get('columns', [])}, engine={result.get('engine')}")
@@ -2346,6 +2442,24 @@ async def execute_multi_engine_query(request: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/query/results/{handle}")
+async def get_query_result_page(handle: str, offset: int = 0, limit: Optional[int] = None):
+    """Page through a result that was spilled to disk by /query/execute"""
+    try:
+        result = await asyncio.to_thread(spill_store.page, handle, offset, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not result.get('success'):
+        raise HTTPException(status_code=404, detail=result.get('error'))
+    return result
+
+
+@router.delete("/query/results/{handle}")
+async def release_query_result(handle: str):
+    """Delete a spilled result before it expires"""
+    return {"success": spill_store.release(handle)}
+
+
 def _apply_filters_to_query(original_query: str, filters: list) -> str:
     """Safely wrap query with filters as WHERE clauses.
     SELECT * FROM (original_query) AS q WHERE ...
@@ -2389,6 +2503,59 @@ def _apply_filters_to_query(original_query: str, filters: list) -> str:
     return f"SELECT * FROM ({original_query}) AS q WHERE {where}"
 
 
+@router.post("/query/refine")
+async def refine_approximate_query(request: Dict[str, Any]):
+    """Refine an approximate answer to the exact one.
+
+    Streams NDJSON: one line per progressively larger sample, then the exact
+    result (``final: true``).
+    """
+    query = request.get('query', '')
+    data_source_id = request.get('data_source_id')
+    if not query or not data_source_id:
+        raise HTTPException(status_code=400, detail="Query and data_source_id are required")
+
+    data_source = await data_service.get_data_source_by_id(data_source_id)
+    if not data_source:
+        raise HTTPException(status_code=404, detail="Data source not found")
+
+    async def stages():
+        try:
+            async for stage in multi_engine_service.refine_to_exact(query, data_source):
+                yield json.dumps(stage, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"❌ Query refinement failed: {str(e)}")
+            yield json.dumps({"success": False, "error": str(e), "final": True}) + "\n"
+
+    return StreamingResponse(stages(), media_type="application/x-ndjson")
+
+
+@router.post("/query/explain")
+async def explain_query_plan(request: Dict[str, Any]):
+    """Explain which engine and strategy the cost model would pick for a query, without running it"""
+    query = request.get('query', '')
+    data_source_id = request.get('data_source_id')
+    if not query or not data_source_id:
+        raise HTTPException(status_code=400, detail="Query and data_source_id are required")
+
+    data_source = await data_service.get_data_source_by_id(data_source_id)
+    if not data_source:
+        raise HTTPException(status_code=404, detail="Data source not found")
+
+    result = await multi_engine_service.explain_query(
+        query, data_source, allow_approximate=str(request.get('mode', 'exact')).lower() in ('auto', 'approximate')
+    )
+    if not result.get('success'):
+        raise HTTPException(status_code=500, detail=result.get('error'))
+    return result
+
+
+@router.get("/query/engine-stats")
+async def get_query_engine_stats():
+    """Per-engine runtimes and fitted latency models the cost model decides from"""
+    return {"success": True, **query_performance_monitor.get_performance_report()}
+
+
 @router.post("/query/parallel")
 async def execute_parallel_queries(request: Dict[str, Any]):
     """Execute multiple queries in parallel"""
@@ -2572,6 +2739,7 @@ async def update_schema_from_verification(data_source_id: str, request: Dict[str
             data_source_id=data_source_id,
             user_feedback=user_feedback
         )
+        await cache_tags.invalidate(data_source_tag(data_source_id))
         
         return result
         
@@ -0,0 +1,458 @@
+"""
+API Source Workspaces
+Land REST API responses as Parquet parts queried through a per-source DuckDB workspace
+
+Each API data source gets a directory under ``API_WORKSPACE_DIR`` holding the
+fetched pages as Parquet parts and a manifest (fetch time, row count,
+incremental watermark). Workers share the files and keep an in-memory DuckDB
+connection per source with a ``data`` view over the parts, so repeated
+questions run SQL directly against Arrow-backed storage and the API is only
+called again once the refresh TTL has passed.
+
+Pagination and incremental refresh are configured on the source's
+``connection_config``::
+
+    "records_path": "payload.items",
+    "pagination": {"type": "page" | "offset" | "cursor" | "link", ...},
+    "incremental": {"field": "updated_at", "param": "since", "key": "id"},
+    "refresh_ttl": 600
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import duckdb
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from app.core.cache_invalidation import cache_tags, tags_for_data_source
+from app.core.config import settings
+from app.modules.data.services.arrow_connectors import rows_to_batch
+from app.modules.data.services.excel_ingest import seal_connection
+
+logger = logging.getLogger(__name__)
+
+# Keys probed for the record list when no records_path is configured
+_RECORD_KEYS = ("data", "results", "items", "records", "rows")
+
+
+@dataclass
+class ApiRequestSpec:
+    """Endpoint, auth and paging settings of an API data source"""
+
+    url: str
+    method: str = "GET"
+    headers: Optional[Dict[str, str]] = None
+    params: Optional[Dict[str, Any]] = None
+    auth: Optional[Tuple[str, str]] = None
+    records_path: Optional[str] = None
+    pagination: Optional[Dict[str, Any]] = None
+    incremental: Optional[Dict[str, Any]] = None
+    refresh_ttl: int = 900
+
+    @classmethod
+    def from_data_source(cls, data_source: Dict[str, Any]) -> Optional["ApiRequestSpec"]:
+        config = data_source.get("connection_config") or data_source.get("config") or {}
+        if isinstance(config, str):
+            try:
+                config = json.loads(config)
+            except ValueError:
+                config = {}
+        try:
+            from app.modules.data.utils.credentials import decrypt_credentials
+            config = decrypt_credentials(config)
+        except Exception:
+            pass
+        url = config.get("url") or config.get("endpoint") or data_source.get("api_url")
+        if not url:
+            return None
+
+        headers = dict(config.get("headers") or {})
+        auth = None
+        if config.get("api_key"):
+            headers[config.get("api_key_header", "X-API-Key")] = config["api_key"]
+        elif config.get("bearer_token"):
+            headers["Authorization"] = f"Bearer {config['bearer_token']}"
+        elif config.get("username") and config.get("password"):
+            auth = (config["username"], config["password"])
+        return cls(
+            url=url,
+            method=str(config.get("method", "GET")).upper(),
+            headers=headers,
+            params=dict(config.get("params") or {}),
+            auth=auth,
+            records_path=config.get("records_path"),
+            pagination=config.get("pagination"),
+            incremental=config.get("incremental"),
+            refresh_ttl=int(config.get("refresh_ttl") or settings.API_WORKSPACE_TTL),
+        )
+
+    def fingerprint(self) -> str:
+        """Changes whenever what would be fetched changes (credentials excluded)"""
+        shape = [self.url, self.method, self.params, self.records_path, self.pagination, self.incremental]
+        return hashlib.sha256(json.dumps(shape, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _dig(payload: Any, path: Optional[str]) -> Any:
+    for part in (path or "").split("."):
+        if not part:
+            continue
+        if isinstance(payload, dict):
+            payload = payload.get(part)
+        elif isinstance(payload, list) and part.isdigit() and int(part) < len(payload):
+            payload = payload[int(part)]
+        else:
+            return None
+    return payload
+
+
+def extract_records(payload: Any, records_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """The list of records in an API response body"""
+    if records_path:
+        payload = _dig(payload, records_path)
+    elif isinstance(payload, dict):
+        for key in _RECORD_KEYS:
+            if isinstance(payload.get(key), list):
+                payload = payload[key]
+                break
+    if isinstance(payload, dict):
+        return [payload]
+    if isinstance(payload, list):
+        return [r if isinstance(r, dict) else {"value": r} for r in payload]
+    return []
+
+
+def records_to_table(records: List[Dict[str, Any]]) -> pa.Table:
+    """Records as an Arrow table; columns are the union of keys, inconsistent values become text"""
+    names: Dict[str, None] = {}
+    for record in records:
+        names.update(dict.fromkeys(record))
+    columns = list(names)
+    batch = rows_to_batch([tuple(r.get(c) for c in columns) for r in records], columns)
+    arrays = [a.cast(pa.string()) if pa.types.is_null(a.type) else a for a in batch.columns]
+    return pa.Table.from_arrays(arrays, names=columns)
+
+
+class ApiPager:
+    """Walks an endpoint's pages according to its ``pagination`` settings"""
+
+    def __init__(self, spec: ApiRequestSpec, params: Optional[Dict[str, Any]] = None):
+        self.spec = spec
+        self.paging = dict(spec.pagination or {})
+        self.kind = self.paging.get("type")
+        self.url = spec.url
+        self.params = {**(spec.params or {}), **(params or {})}
+        self.page_size = self.paging.get("page_size")
+        self.max_pages = int(self.paging.get("max_pages") or settings.API_WORKSPACE_MAX_PAGES)
+        self.pages = 0
+        self.complete = False
+        if self.kind == "page":
+            self.params[self.paging.get("page_param", "page")] = int(self.paging.get("start", 1))
+        elif self.kind == "offset":
+            self.params[self.paging.get("offset_param", "offset")] = 0
+        if self.page_size and self.kind in ("page", "offset"):
+            size_param = self.paging.get("size_param", "limit" if self.kind == "offset" else "page_size")
+            self.params[size_param] = self.page_size
+
+    async def __aiter__(self):
+        import aiohttp
+
+        timeout = aiohttp.ClientTimeout(total=settings.API_REQUEST_TIMEOUT)
+        auth = aiohttp.BasicAuth(*self.spec.auth) if self.spec.auth else None
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            while self.url and self.pages < self.max_pages:
+                async with session.request(
+                    self.spec.method, self.url, headers=self.spec.headers, params=self.params, auth=auth
+                ) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"API request failed with status {response.status}: {(await response.text())[:200]}")
+                    body = await response.read()
+                    content_type = response.headers.get("Content-Type", "").lower()
+                    links = response.links
+                self.pages += 1
+                table, payload = self._parse(body, content_type)
+                yield table
+                if not self._advance(table.num_rows, payload, links):
+                    self.complete = True
+                    return
+        self.complete = not self.url
+
+    def _parse(self, body: bytes, content_type: str) -> Tuple[pa.Table, Any]:
+        if "csv" in content_type:
+            from pyarrow import csv as pa_csv
+            return pa_csv.read_csv(io.BytesIO(body)), None
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            from pyarrow import csv as pa_csv
+            return pa_csv.read_csv(io.BytesIO(body)), None
+        return records_to_table(extract_records(payload, self.spec.records_path)), payload
+
+    def _advance(self, rows: int, payload: Any, links) -> bool:
+        """Set up the next request; False when this was the last page"""
+        if not rows or not self.kind:
+            return False
+        if self.kind in ("page", "offset") and self.page_size and rows < int(self.page_size):
+            return False
+        if self.kind == "page":
+            self.params[self.paging.get("page_param", "page")] += 1
+        elif self.kind == "offset":
+            self.params[self.paging.get("offset_param", "offset")] += rows
+        elif self.kind == "cursor":
+            cursor = _dig(payload, self.paging.get("cursor_path", "next_cursor"))
+            if not cursor:
+                return False
+            self.params[self.paging.get("cursor_param", "cursor")] = cursor
+        elif self.kind == "link":
+            next_path = self.paging.get("next_path")
+            next_url = _dig(payload, next_path) if next_path else (links.get("next") or {}).get("url")
+            if not next_url:
+                return False
+            # The next link carries its own query string
+            self.url, self.params = str(next_url), {}
+        else:
+            return False
+        return True
+
+
+class ApiWorkspace:
+    """One worker's DuckDB connection over a source's Parquet parts.
+
+    The connection is sealed (no file, network or extension access) as soon
+    as it is opened; the parts are read through pyarrow datasets, which are
+    registered on every cursor handed out by ``cursor()``.
+    """
+
+    def __init__(self, key: str, directory: str):
+        self.key = key
+        self.directory = directory
+        self.conn = duckdb.connect()
+        seal_connection(self.conn)
+        self.generation = None
+        self.parts: Tuple[str, ...] = ()
+        self.rows = 0
+        self._datasets: Dict[str, ds.Dataset] = {}
+
+    def cursor(self):
+        """A cursor for one query, with the current parts registered on it"""
+        cursor = self.conn.cursor()
+        for name, dataset in self._datasets.items():
+            cursor.register(name, dataset)
+        return cursor
+
+    def attach(self, manifest: Dict[str, Any], aliases: List[str]) -> None:
+        """(Re)point the ``data`` view at the manifest's parts"""
+        parts = tuple(manifest.get("parts", []))
+        if parts == self.parts and manifest.get("generation") == self.generation:
+            return
+        self.rows = int(manifest.get("rows") or 0)
+        self.generation, self.parts = manifest.get("generation"), parts
+        if not parts:
+            return
+        datasets = {f"_aiser_part_{i}": ds.dataset(os.path.join(self.directory, p), format="parquet")
+                    for i, p in enumerate(parts)}
+        for name in self._datasets.keys() - datasets.keys():
+            self.conn.unregister(name)
+        for name, dataset in datasets.items():
+            self.conn.register(name, dataset)
+        self._datasets = datasets
+        key_field = (manifest.get("incremental") or {}).get("key")
+        if key_field:
+            # Later parts win for records re-fetched by an incremental refresh
+            quoted = '"' + str(key_field).replace('"', '""') + '"'
+            union = " UNION ALL BY NAME ".join(f"SELECT *, {i} AS _aiser_part FROM {name}"
+                                               for i, name in enumerate(datasets))
+            select = (f"SELECT * EXCLUDE (_aiser_part) FROM ({union}) "
+                      f"QUALIFY row_number() OVER (PARTITION BY {quoted} ORDER BY _aiser_part DESC) = 1")
+        else:
+            select = " UNION ALL BY NAME ".join(f"SELECT * FROM {name}" for name in datasets)
+        self.conn.execute(f"CREATE OR REPLACE VIEW data AS {select}")
+        for alias in aliases:
+            if alias and alias != "data":
+                self.conn.execute(f'CREATE OR REPLACE VIEW "{alias}" AS SELECT * FROM data')
+
+    def close(self) -> None:
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class ApiWorkspaceManager:
+    """Fetches API sources into workspaces and keeps them fresh.
+
+    The manifest under ``API_WORKSPACE_DIR`` is shared by all workers; a
+    refresh happens once per TTL (one at a time per source in each worker)
+    and a failed refresh keeps serving the previous data. Workspaces are
+    dropped when their data source is invalidated.
+    """
+
+    def __init__(self, workspace_dir: Optional[str] = None, max_open: Optional[int] = None):
+        self.workspace_dir = workspace_dir or settings.API_WORKSPACE_DIR
+        self.max_open = max_open or settings.API_WORKSPACE_MAX_OPEN
+        self._open: "OrderedDict[str, ApiWorkspace]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {"fetches": 0, "incremental": 0, "served_fresh": 0, "pages": 0}
+        self._tier = cache_tags.register_tier("api_workspaces", self._evict)
+
+    def _key(self, data_source: Dict[str, Any], spec: ApiRequestSpec) -> str:
+        identity = f"{data_source.get('id')}|{spec.fingerprint()}"
+        return hashlib.sha256(identity.encode()).hexdigest()[:40]
+
+    def _dir(self, key: str) -> str:
+        return os.path.join(self.workspace_dir, key)
+
+    def _manifest_path(self, key: str) -> str:
+        return os.path.join(self._dir(key), "manifest.json")
+
+    def _read_manifest(self, key: str) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, key: str, manifest: Dict[str, Any]) -> None:
+        path = self._manifest_path(key)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(path + ".tmp", path)
+
+    def _evict(self, keys: List[str]) -> None:
+        for key in keys:
+            workspace = self._open.pop(key, None)
+            if workspace:
+                workspace.close()
+            shutil.rmtree(self._dir(key), ignore_errors=True)
+
+    @staticmethod
+    def _fresh(manifest: Dict[str, Any], spec: ApiRequestSpec) -> bool:
+        return bool(manifest.get("parts")) and time.time() - manifest.get("fetched_at", 0) < spec.refresh_ttl
+
+    async def workspace(self, data_source: Dict[str, Any], force_refresh: bool = False) -> ApiWorkspace:
+        """The source's workspace, fetched or refreshed first when missing or past its TTL"""
+        spec = ApiRequestSpec.from_data_source(data_source)
+        if spec is None:
+            raise ValueError("API data source missing URL/endpoint configuration")
+        key = self._key(data_source, spec)
+        manifest = self._read_manifest(key)
+        if force_refresh or not self._fresh(manifest, spec):
+            async with self._locks.setdefault(key, asyncio.Lock()):
+                manifest = self._read_manifest(key)
+                if force_refresh or not self._fresh(manifest, spec):
+                    try:
+                        manifest = await self._refresh(key, spec, manifest)
+                    except Exception as e:
+                        if not manifest.get("parts"):
+                            raise
+                        logger.warning(f"⚠️ API refresh failed for {data_source.get('id')}, serving data from "
+                                       f"{int(time.time() - manifest.get('fetched_at', 0))}s ago: {e}")
+        else:
+            self.stats["served_fresh"] += 1
+
+        workspace = self._open.get(key)
+        if workspace is None:
+            workspace = ApiWorkspace(key, self._dir(key))
+            self._open[key] = workspace
+            cache_tags.tag(self._tier, key, tags_for_data_source(data_source))
+            while len(self._open) > self.max_open:
+                _, evicted = self._open.popitem(last=False)
+                evicted.close()
+        self._open.move_to_end(key)
+        workspace.attach(manifest, [str(data_source.get("id") or "")])
+        return workspace
+
+    async def _refresh(self, key: str, spec: ApiRequestSpec, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        directory = self._dir(key)
+        os.makedirs(directory, exist_ok=True)
+        incremental = spec.incremental or {}
+        watermark = manifest.get("watermark")
+        append = bool(incremental.get("field") and incremental.get("param") and watermark and manifest.get("parts"))
+        generation = int(manifest.get("generation") or 0) + (0 if append else 1)
+        parts = list(manifest.get("parts", [])) if append else []
+        params = {incremental["param"]: watermark} if append else None
+
+        pager = ApiPager(spec, params)
+        pending: List[pa.Table] = []
+        pending_rows, new_rows = 0, 0
+
+        async def flush():
+            nonlocal pending, pending_rows
+            if not pending:
+                return
+            name = f"g{generation:06d}-{len(parts):06d}.parquet"
+            table = pa.concat_tables(pending, promote_options="permissive")
+            await asyncio.to_thread(pq.write_table, table, os.path.join(directory, name))
+            parts.append(name)
+            pending, pending_rows = [], 0
+
+        # Pages are written out as they arrive instead of accumulating the whole source in memory
+        async for table in pager:
+            if table.num_rows:
+                pending.append(table)
+                pending_rows += table.num_rows
+                new_rows += table.num_rows
+            if pending_rows >= settings.API_WORKSPACE_PART_ROWS:
+                await flush()
+        await flush()
+
+        self.stats["pages"] += pager.pages
+        self.stats["incremental" if append else "fetches"] += 1
+        updated = {
+            "generation": generation,
+            "parts": parts,
+            "fetched_at": time.time(),
+            "rows": (int(manifest.get("rows") or 0) if append else 0) + new_rows,
+            "pages": pager.pages,
+            "complete": pager.complete,
+            "incremental": incremental,
+            "watermark": watermark if append else None,
+        }
+        if incremental.get("field") and parts:
+            updated["watermark"] = await asyncio.to_thread(self._watermark, directory, parts, incremental["field"]) or watermark
+        self._write_manifest(key, updated)
+        if not append:
+            self._remove_stale_parts(directory, generation)
+        logger.info(f"🌐 API source {'appended' if append else 'fetched'}: {new_rows} rows in {pager.pages} pages"
+                    f"{'' if pager.complete else ' (page limit reached)'}")
+        return updated
+
+    @staticmethod
+    def _watermark(directory: str, parts: List[str], field: str) -> Optional[str]:
+        files = ", ".join("'" + os.path.join(directory, p).replace("'", "''") + "'" for p in parts)
+        quoted = '"' + field.replace('"', '""') + '"'
+        with duckdb.connect() as conn:
+            try:
+                value = conn.execute(f"SELECT max({quoted}) FROM read_parquet([{files}], union_by_name=true)").fetchone()[0]
+            except duckdb.Error:
+                return None
+        return None if value is None else str(value)
+
+    @staticmethod
+    def _remove_stale_parts(directory: str, generation: int) -> None:
+        # The previous generation stays for queries other workers still have open against it
+        for name in os.listdir(directory):
+            if name.startswith("g") and name.endswith(".parquet") and int(name[1:7]) < generation - 1:
+                try:
+                    os.unlink(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    def close(self) -> None:
+        while self._open:
+            _, workspace = self._open.popitem()
+            workspace.close()
+
+
+# Global instance
+api_workspace_manager = ApiWorkspaceManager()
@@ -0,0 +1,409 @@
+"""
+Approximate Query Execution
+Rewrites eligible aggregate queries (COUNT/SUM/AVG/MIN/MAX grouped by plain
+columns) to weighted estimators over a sample and reports 95% confidence
+bounds next to every estimate. File sources use a maintained stratified
+sample stored as Parquet with a per-row weight; warehouses sample at query
+time with the dialect's TABLESAMPLE / SAMPLE clause.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.cache_invalidation import cache_tags, tags_for_data_source
+from app.core.compute_executor import compute_executor
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import sqlglot
+    from sqlglot import exp
+
+    SQLGLOT_AVAILABLE = True
+except ImportError:  # pragma: no cover - sqlglot ships with the server requirements
+    SQLGLOT_AVAILABLE = False
+
+from app.modules.data.services.sql_pipeline import sql_pipeline
+
+WEIGHT_COLUMN = "__approx_weight"
+SAMPLE_ROWS_COLUMN = "__approx_n"
+Z_95 = 1.96
+
+# Data source db_type -> sqlglot dialect, for sources whose dialect can sample rows
+SAMPLING_DIALECTS = {
+    "postgresql": "postgres",
+    "postgres": "postgres",
+    "clickhouse": "clickhouse",
+    "snowflake": "snowflake",
+    "bigquery": "bigquery",
+    "trino": "trino",
+    "presto": "presto",
+    "duckdb": "duckdb",
+    "mssql": "tsql",
+    "sqlserver": "tsql",
+}
+# Row-level (Bernoulli) sampling keeps the variance estimates honest; others only offer block sampling
+_BERNOULLI_DIALECTS = {"postgres", "snowflake", "trino", "presto", "duckdb"}
+
+
+class ApproximationNotApplicable(Exception):
+    """The query or data source cannot be answered from a sample"""
+
+
+@dataclass
+class AggregateEstimate:
+    """One aggregate in the projection and the helper columns holding its variance terms"""
+
+    alias: str
+    kind: str  # count | count_col | sum | avg | min | max
+    helpers: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ApproximatePlan:
+    sql: str  # weighted query over the sample
+    exact_sql: str  # original query with the same output names, for refine-to-exact
+    aggregates: List[AggregateEstimate]
+    dialect: str
+
+
+def _agg_kind(node) -> Optional[str]:
+    if isinstance(node, exp.Count):
+        if isinstance(node.this, exp.Distinct):
+            raise ApproximationNotApplicable("COUNT(DISTINCT) cannot be estimated from a sample")
+        return "count" if node.this is None or isinstance(node.this, exp.Star) else "count_col"
+    for cls, kind in ((exp.Sum, "sum"), (exp.Avg, "avg"), (exp.Min, "min"), (exp.Max, "max")):
+        if isinstance(node, cls):
+            if isinstance(node.this, exp.Distinct):
+                raise ApproximationNotApplicable(f"{kind.upper()}(DISTINCT) cannot be estimated from a sample")
+            return kind
+    return None
+
+
+def plan_approximate_query(
+    query: str,
+    dialect: str = "duckdb",
+    weight_column: Optional[str] = None,
+    table_sample_percent: Optional[float] = None,
+) -> ApproximatePlan:
+    """Rewrite an aggregate query into weighted estimators.
+
+    Exactly one of ``weight_column`` (a pre-built weighted sample) or
+    ``table_sample_percent`` (sample the table inside the query, constant
+    weight) must be given. Raises ``ApproximationNotApplicable`` for queries
+    whose answer cannot be scaled from a sample: joins, subqueries, HAVING,
+    window functions, DISTINCT aggregates or aggregates nested in expressions.
+    """
+    if not SQLGLOT_AVAILABLE:
+        raise ApproximationNotApplicable("sqlglot is not installed")
+    try:
+        tree = sql_pipeline.parse(query, dialect)
+    except Exception as e:
+        raise ApproximationNotApplicable(f"Query could not be parsed: {e}")
+
+    if not isinstance(tree, exp.Select):
+        raise ApproximationNotApplicable("Only single SELECT statements can be approximated")
+    if tree.args.get("joins") or len(list(tree.find_all(exp.Select))) > 1 or tree.args.get("with"):
+        raise ApproximationNotApplicable("Joins and subqueries are answered exactly")
+    if tree.args.get("having") or tree.args.get("distinct") or tree.find(exp.Window):
+        raise ApproximationNotApplicable("HAVING, DISTINCT and window functions are answered exactly")
+    from_ = tree.args.get("from")
+    if not from_ or not isinstance(from_.this, exp.Table):
+        raise ApproximationNotApplicable("Query must read a single table")
+
+    if table_sample_percent is not None:
+        weight_sql = repr(100.0 / float(table_sample_percent))
+    elif weight_column:
+        weight_sql = f'"{weight_column}"'
+    else:
+        raise ValueError("weight_column or table_sample_percent is required")
+
+    def parse(sql: str):
+        return sqlglot.parse_one(sql, read="duckdb")
+
+    exact = tree.copy()
+    projections, extra, aggregates = [], [], []
+    agg_aliases: Dict[str, str] = {}
+    for index, (projection, exact_projection) in enumerate(zip(tree.expressions, exact.expressions)):
+        node = projection.unalias()
+        kind = _agg_kind(node)
+        if kind is None:
+            if node.find(exp.AggFunc):
+                raise ApproximationNotApplicable("Aggregates inside expressions are answered exactly")
+            projections.append(projection)
+            continue
+
+        alias = projection.alias or node.sql(dialect="duckdb").lower()
+        if not projection.alias:
+            exact_projection.replace(exp.alias_(exact_projection.copy(), alias, quoted=True))
+        agg_aliases[node.sql(dialect="duckdb")] = alias
+        x = f"CAST(({node.this.sql(dialect='duckdb')}) AS DOUBLE)" if kind != "count" else None
+        w = f"({weight_sql})"
+        ww = f"({w} * ({w} - 1))"
+        helpers = [f"__approx_{index}_{h}" for h in ("a", "b", "c", "d")]
+        if kind == "count":
+            estimate = f"SUM({w})"
+            parts = [f"SUM({ww})"]
+        elif kind == "count_col":
+            estimate = f"COALESCE(SUM(CASE WHEN {x} IS NOT NULL THEN {w} END), 0)"
+            parts = [f"SUM(CASE WHEN {x} IS NOT NULL THEN {ww} END)"]
+        elif kind == "sum":
+            estimate = f"SUM({x} * {w})"
+            parts = [f"SUM({ww} * {x} * {x})"]
+        elif kind == "avg":
+            estimate = f"SUM({x} * {w}) / NULLIF(SUM(CASE WHEN {x} IS NOT NULL THEN {w} END), 0)"
+            parts = [
+                f"SUM({ww} * {x} * {x})",
+                f"SUM({ww} * {x})",
+                f"SUM(CASE WHEN {x} IS NOT NULL THEN {ww} END)",
+                f"SUM(CASE WHEN {x} IS NOT NULL THEN {w} END)",
+            ]
+        else:
+            # MIN/MAX are read from the sample as-is; no bound can be given
+            estimate, parts = node.sql(dialect="duckdb"), []
+        projections.append(exp.alias_(parse(estimate), alias, quoted=True))
+        helpers = helpers[: len(parts)]
+        extra.extend(exp.alias_(parse(part), helper, quoted=True) for part, helper in zip(parts, helpers))
+        aggregates.append(AggregateEstimate(alias=alias, kind=kind, helpers=helpers))
+
+    if not aggregates:
+        raise ApproximationNotApplicable("Only aggregate queries can be approximated")
+
+    # ORDER BY an aggregate must sort by the weighted estimate
+    order = tree.args.get("order")
+    if order:
+        for ordered in order.expressions:
+            key = ordered.this.sql(dialect="duckdb")
+            if key in agg_aliases:
+                ordered.set("this", exp.column(agg_aliases[key], quoted=True))
+            elif ordered.this.find(exp.AggFunc):
+                raise ApproximationNotApplicable("ORDER BY an aggregate outside the projection is answered exactly")
+
+    extra.append(exp.alias_(parse("COUNT(*)"), SAMPLE_ROWS_COLUMN, quoted=True))
+    tree.set("expressions", projections + extra)
+
+    if table_sample_percent is not None:
+        table = from_.this
+        if dialect == "clickhouse":
+            sample = exp.TableSample(this=table.copy(), size=exp.Literal.number(round(table_sample_percent / 100.0, 6)))
+        else:
+            method = "BERNOULLI" if dialect in _BERNOULLI_DIALECTS else "SYSTEM"
+            sample = exp.TableSample(
+                this=table.copy(), method=exp.var(method), percent=exp.Literal.number(round(table_sample_percent, 6))
+            )
+        table.replace(sample)
+
+    return ApproximatePlan(
+        sql=tree.sql(dialect=dialect),
+        exact_sql=exact.sql(dialect=dialect),
+        aggregates=aggregates,
+        dialect=dialect,
+    )
+
+
+def finalize_rows(rows: List[Dict[str, Any]], plan: ApproximatePlan, min_group_rows: Optional[int] = None) -> Dict[str, Any]:
+    """Strip helper columns and compute 95% bounds per row and aggregate"""
+    min_group_rows = settings.APPROX_MIN_GROUP_SAMPLE_ROWS if min_group_rows is None else min_group_rows
+    bounds, unreliable = [], 0
+    for row in rows:
+        sample_rows = int(row.pop(SAMPLE_ROWS_COLUMN, 0) or 0)
+        row_bounds = {}
+        for agg in plan.aggregates:
+            terms = [float(row.pop(h) or 0.0) for h in agg.helpers]
+            estimate = row.get(agg.alias)
+            if agg.kind in ("min", "max") or estimate is None:
+                row_bounds[agg.alias] = {"estimate": estimate, "low": None, "high": None, "relative_error": None}
+                continue
+            if agg.kind == "avg":
+                a, b, c, d = terms
+                variance = (a - 2 * estimate * b + estimate * estimate * c) / (d * d) if d else 0.0
+            else:
+                variance = terms[0]
+            margin = Z_95 * math.sqrt(max(variance, 0.0))
+            if agg.kind in ("count", "count_col"):
+                row[agg.alias] = estimate = int(round(estimate))
+            row_bounds[agg.alias] = {
+                "estimate": estimate,
+                "low": estimate - margin,
+                "high": estimate + margin,
+                "relative_error": (margin / abs(estimate)) if estimate else None,
+            }
+        reliable = sample_rows >= min_group_rows
+        unreliable += 0 if reliable else 1
+        bounds.append({"sample_rows": sample_rows, "reliable": reliable, "bounds": row_bounds})
+    return {"confidence": 0.95, "error_bounds": bounds, "unreliable_groups": unreliable}
+
+
+def sampling_dialect(data_source: Dict[str, Any]) -> Optional[str]:
+    conn_info = data_source.get("connection_info") if isinstance(data_source.get("connection_info"), dict) else {}
+    db_type = (data_source.get("db_type") or conn_info.get("db_type") or conn_info.get("type") or "").lower()
+    return SAMPLING_DIALECTS.get(db_type)
+
+
+def table_sample_percent(row_count: Optional[int]) -> float:
+    """Sampling percentage for a warehouse table of ``row_count`` rows (unknown: default rate)"""
+    if not row_count:
+        return settings.APPROX_DEFAULT_SAMPLE_PERCENT
+    if row_count < settings.APPROX_MIN_ROWS:
+        raise ApproximationNotApplicable("Dataset is small enough to run exactly")
+    return max(0.01, min(100.0, settings.APPROX_SAMPLE_TARGET_ROWS * 100.0 / row_count))
+
+
+def refine_percents(start_percent: float) -> List[float]:
+    """Progressively larger sampling rates (10x each) below a full scan"""
+    steps, percent = [], start_percent * 10
+    while percent < 100:
+        steps.append(percent)
+        percent *= 10
+    return steps
+
+
+class StratifiedSampleStore:
+    """Maintained weighted samples of file data sources, stored as Parquet.
+
+    The sample is stratified on the lowest-cardinality text column (the
+    likeliest GROUP BY key): every stratum keeps at least
+    ``APPROX_MIN_STRATUM_ROWS`` rows (or all of its rows), the rest is sampled
+    at the target rate. Each row carries its inverse inclusion probability in
+    ``__approx_weight``. Samples are dropped when their data source is
+    invalidated.
+    """
+
+    def __init__(self, sample_dir: Optional[str] = None):
+        self.sample_dir = sample_dir or settings.APPROX_SAMPLE_DIR
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._tier = cache_tags.register_tier("approx_samples", self._evict)
+
+    def _key(self, data_source: Dict[str, Any]) -> str:
+        identity = f"{data_source.get('id')}|{data_source.get('file_path')}|{data_source.get('size')}"
+        return hashlib.sha256(identity.encode()).hexdigest()[:40]
+
+    def _evict(self, keys: List[str]) -> None:
+        for key in keys:
+            self._meta.pop(key, None)
+            for suffix in (".parquet", ".json"):
+                try:
+                    os.unlink(os.path.join(self.sample_dir, key + suffix))
+                except OSError:
+                    pass
+
+    async def get_sample(
+        self,
+        data_source: Dict[str, Any],
+        load: Callable[[Any, Dict[str, Any]], Awaitable[None]],
+        tenant: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Sample metadata ({path, population_rows, sample_rows, ...}); None when the data is too small to sample.
+
+        ``load(conn, data_source)`` must create the full dataset as ``data``
+        on a DuckDB connection; it is only called when the sample is built.
+        """
+        key = self._key(data_source)
+        if key in self._meta:
+            return self._meta[key] or None
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in self._meta:
+                meta_path = os.path.join(self.sample_dir, key + ".json")
+                meta = await asyncio.to_thread(self._read_meta, meta_path)
+                if meta is None:
+                    meta = await self._build(data_source, load, key, tenant)
+                self._meta[key] = meta
+                cache_tags.tag(self._tier, key, tags_for_data_source(data_source))
+        return self._meta[key] or None
+
+    @staticmethod
+    def _read_meta(meta_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            return meta if not meta or os.path.exists(meta.get("path", "")) else None
+        except (OSError, ValueError):
+            return None
+
+    async def _build(self, data_source, load, key: str, tenant: Optional[str]) -> Dict[str, Any]:
+        import duckdb
+
+        os.makedirs(self.sample_dir, exist_ok=True)
+        conn = duckdb.connect()
+        try:
+            await load(conn, data_source)
+            meta = await compute_executor.run_duckdb(
+                self._write_sample, conn, os.path.join(self.sample_dir, key + ".parquet"), tenant=tenant, interrupt=conn
+            )
+        finally:
+            conn.close()
+        with open(os.path.join(self.sample_dir, key + ".json"), "w") as f:
+            json.dump(meta, f)
+        if meta:
+            logger.info(
+                f"🎯 Built stratified sample for {data_source.get('id')}: {meta['sample_rows']} of "
+                f"{meta['population_rows']} rows (strata: {meta['strata_column'] or 'none'})"
+            )
+        return meta
+
+    @staticmethod
+    def _write_sample(conn, out_path: str) -> Dict[str, Any]:
+        """Write the weighted sample of table 'data' (blocking); {} when the table is too small"""
+        population = conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
+        if population < settings.APPROX_MIN_ROWS:
+            return {}
+        rate = min(1.0, settings.APPROX_SAMPLE_TARGET_ROWS / population)
+
+        text_columns = [
+            row[0] for row in conn.execute("DESCRIBE data").fetchall()
+            if row[1] in ("VARCHAR", "BOOLEAN") or row[1].startswith("ENUM")
+        ]
+        strata_column = None
+        if text_columns:
+            counts = conn.execute(
+                "SELECT " + ", ".join(f'approx_count_distinct("{c}")' for c in text_columns) + " FROM data"
+            ).fetchone()
+            candidates = [
+                (n, c) for n, c in zip(counts, text_columns) if 2 <= n <= settings.APPROX_MAX_STRATA
+            ]
+            strata_column = min(candidates)[1] if candidates else None
+
+        tmp_path = out_path + ".tmp"
+        safe = tmp_path.replace("'", "''")
+        if strata_column:
+            column = '"' + strata_column.replace('"', '""') + '"'
+            # Inclusion probability per row from its stratum size (a window, not a join: DuckDB
+            # mis-evaluates random() filters over join results)
+            conn.execute(
+                f"""COPY (
+                    SELECT * EXCLUDE (__p), 1.0 / __p AS {WEIGHT_COLUMN}
+                    FROM (
+                        SELECT *, LEAST(1.0::DOUBLE, GREATEST({rate}::DOUBLE,
+                               {settings.APPROX_MIN_STRATUM_ROWS}::DOUBLE / COUNT(*) OVER (PARTITION BY {column}))) AS __p
+                        FROM data
+                    )
+                    WHERE random() < __p
+                ) TO '{safe}' (FORMAT PARQUET, COMPRESSION ZSTD)"""
+            )
+        else:
+            conn.execute(
+                f"COPY (SELECT *, {1.0 / rate}::DOUBLE AS {WEIGHT_COLUMN} FROM data WHERE random() < {rate}::DOUBLE) "
+                f"TO '{safe}' (FORMAT PARQUET, COMPRESSION ZSTD)"
+            )
+        os.replace(tmp_path, out_path)
+        sample_rows = conn.execute(f"SELECT COUNT(*) FROM read_parquet('{out_path.replace(chr(39), chr(39) * 2)}')").fetchone()[0]
+        return {
+            "path": out_path,
+            "population_rows": int(population),
+            "sample_rows": int(sample_rows),
+            "sample_rate": rate,
+            "strata_column": strata_column,
+        }
+
+
+# Global instance
+sample_store = StratifiedSampleStore()
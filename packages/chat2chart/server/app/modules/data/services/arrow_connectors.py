@@ -0,0 +1,588 @@
+"""
+Arrow Result Streaming for Warehouse Connectors
+Execute SQL on a pooled driver client and yield Arrow record batches
+
+Each connector opens and pools driver clients per connection, runs the query
+on a worker thread and hands ``pyarrow.RecordBatch`` objects to the caller
+through a bounded queue, so a large extract never exists as Python row dicts.
+Streams enforce a row/byte budget (truncating and closing the remote cursor
+once it is spent) and can be cancelled by the consumer at any time, which
+cancels the remote query too.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = 4  # batches buffered between the driver thread and the consumer
+_DONE = object()
+
+
+class ConnectorUnavailable(RuntimeError):
+    """The driver for a connector is not installed"""
+
+
+@dataclass
+class StreamBudget:
+    """Upper bounds for one result stream (None means unbounded)"""
+
+    max_rows: Optional[int] = None
+    max_bytes: Optional[int] = None
+
+    @classmethod
+    def default(cls) -> "StreamBudget":
+        return cls(settings.CONNECTOR_STREAM_MAX_ROWS or None, settings.CONNECTOR_STREAM_MAX_BYTES or None)
+
+
+@dataclass
+class QueryHandle:
+    """What a running driver query exposes to the stream"""
+
+    schema: Optional[pa.Schema] = None
+    query_id: Optional[str] = None
+    cancel: Optional[Callable[[], Any]] = None
+
+
+class ArrowConnector:
+    """Driver adapter: subclasses implement ``connect`` and ``execute`` (both blocking)"""
+
+    name = "base"
+    driver = ""  # importable module the connector needs
+    package = ""  # pip package named in the error when the driver is missing
+
+    def __init__(self):
+        self._idle: Dict[str, List[Any]] = {}
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "reused": 0, "closed": 0, "streams": 0, "cancelled": 0, "truncated": 0}
+
+    # Driver hooks
+
+    def connect(self, config: Any) -> Any:
+        raise NotImplementedError
+
+    def execute(
+        self, client: Any, query: str, params: Optional[Dict[str, Any]], batch_rows: int
+    ) -> Tuple[QueryHandle, Iterator[pa.RecordBatch]]:
+        raise NotImplementedError
+
+    def close_client(self, client: Any) -> None:
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    def pool_key(self, config: Any) -> str:
+        return "|".join(str(getattr(config, k, None) or "") for k in ("host", "port", "database", "schema", "username"))
+
+    # Client pool
+
+    def available(self) -> bool:
+        try:
+            __import__(self.driver)
+            return True
+        except ImportError:
+            return False
+
+    def acquire(self, config: Any) -> Any:
+        if not self.available():
+            raise ConnectorUnavailable(f"{self.name} driver is not installed (pip install {self.package})")
+        key = self.pool_key(config)
+        with self._lock:
+            slots = self._slots.setdefault(key, threading.BoundedSemaphore(max(1, getattr(config, "max_connections", 0) or 1)))
+        if not slots.acquire(timeout=getattr(config, "timeout", None) or None):
+            raise TimeoutError(f"No free {self.name} connection for {key} (max_connections reached)")
+        try:
+            with self._lock:
+                idle = self._idle.get(key)
+                if idle:
+                    self.stats["reused"] += 1
+                    return idle.pop()
+            client = self.connect(config)
+            self.stats["opened"] += 1
+            return client
+        except Exception:
+            slots.release()
+            raise
+
+    def release(self, config: Any, client: Any, healthy: bool = True) -> None:
+        key = self.pool_key(config)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            keep = healthy and len(idle) < max(1, getattr(config, "max_connections", 0) or 1)
+            if keep:
+                idle.append(client)
+            slots = self._slots.get(key)
+        if not keep:
+            self.close_client(client)
+            self.stats["closed"] += 1
+        if slots is not None:
+            slots.release()
+
+    def close(self, config: Any = None) -> int:
+        """Close idle clients (of one connection, or all); in-use clients close on release"""
+        with self._lock:
+            keys = [self.pool_key(config)] if config is not None else list(self._idle)
+            clients = [c for k in keys for c in self._idle.pop(k, [])]
+        for client in clients:
+            self.close_client(client)
+        self.stats["closed"] += len(clients)
+        return len(clients)
+
+    # Streaming
+
+    def stream(
+        self,
+        config: Any,
+        query: str,
+        params: Optional[Dict[str, Any]] = None,
+        budget: Optional[StreamBudget] = None,
+        batch_rows: Optional[int] = None,
+    ) -> "ArrowResultStream":
+        self.stats["streams"] += 1
+        return ArrowResultStream(
+            self, config, query, params, budget or StreamBudget.default(),
+            batch_rows or settings.CONNECTOR_STREAM_BATCH_ROWS,
+        )
+
+
+class ArrowResultStream:
+    """Async iterator of record batches from one query.
+
+    Use ``async with`` (or ``to_table``) so the driver thread is always stopped
+    and the client returned to the pool, even when the consumer stops early.
+    """
+
+    def __init__(self, connector: ArrowConnector, config: Any, query: str, params, budget: StreamBudget, batch_rows: int):
+        self.connector = connector
+        self.config = config
+        self.query = query
+        self.params = params
+        self.budget = budget
+        self.batch_rows = max(1, int(batch_rows))
+        self.schema: Optional[pa.Schema] = None
+        self.query_id: Optional[str] = None
+        self.rows = 0
+        self.bytes = 0
+        self.batches = 0
+        self.truncated = False
+        self.cancelled = False
+        self._queue: "queue.Queue" = queue.Queue(maxsize=QUEUE_DEPTH)
+        self._stop = threading.Event()
+        self._handle: Optional[QueryHandle] = None
+        self._producer: Optional[asyncio.Future] = None
+        self._finished = False
+
+    async def __aenter__(self) -> "ArrowResultStream":
+        return self
+
+    async def __aexit__(self, *exc) -> bool:
+        await self.aclose()
+        return False
+
+    def __aiter__(self) -> AsyncIterator[pa.RecordBatch]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[pa.RecordBatch]:
+        if self._producer is not None:
+            raise RuntimeError("An ArrowResultStream can only be iterated once")
+        self._producer = asyncio.ensure_future(asyncio.to_thread(self._produce))
+        try:
+            while True:
+                item = await asyncio.to_thread(self._queue.get)
+                if item is _DONE:
+                    self._finished = True
+                    break
+                if isinstance(item, BaseException):
+                    self._finished = True
+                    raise item
+                yield item
+        finally:
+            await self.aclose()
+
+    def cancel(self) -> None:
+        """Stop the stream and cancel the remote query (safe from any thread)"""
+        if self._finished or self._stop.is_set():
+            return
+        self.cancelled = True
+        self.connector.stats["cancelled"] += 1
+        self._stop.set()
+        self._cancel_remote()
+
+    async def aclose(self) -> None:
+        if self._producer is None:
+            return
+        if not self._finished:
+            self.cancel()
+            # Unblock a producer waiting on a full queue
+            while not self._producer.done():
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    await asyncio.sleep(0.01)
+        await asyncio.shield(self._producer)
+
+    async def to_table(self) -> pa.Table:
+        """Collect the stream into one Arrow table (no row dicts)"""
+        batches = [batch async for batch in self]
+        if not batches:
+            return (self.schema or pa.schema([])).empty_table()
+        tables = [pa.Table.from_batches([b]) for b in batches]
+        return pa.concat_tables(tables, promote_options="default").combine_chunks()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "batches": self.batches,
+            "truncated": self.truncated,
+            "cancelled": self.cancelled,
+            "budget": {"max_rows": self.budget.max_rows, "max_bytes": self.budget.max_bytes},
+        }
+
+    # Driver thread
+
+    def _cancel_remote(self) -> None:
+        handle = self._handle
+        if handle is not None and handle.cancel is not None:
+            try:
+                handle.cancel()
+            except Exception as e:
+                logger.debug(f"Remote cancel for {self.connector.name} failed: {e}")
+
+    def _within_budget(self, batch: pa.RecordBatch) -> Optional[pa.RecordBatch]:
+        max_rows, max_bytes = self.budget.max_rows, self.budget.max_bytes
+        if max_rows is not None and self.rows + batch.num_rows > max_rows:
+            batch = batch.slice(0, max(max_rows - self.rows, 0))
+            self.truncated = True
+        if max_bytes is not None and batch.num_rows and self.bytes + batch.nbytes > max_bytes:
+            per_row = batch.nbytes / batch.num_rows
+            batch = batch.slice(0, max(int((max_bytes - self.bytes) / per_row), 0))
+            self.truncated = True
+        return batch if batch.num_rows or not self.truncated else None
+
+    def _put(self, item: Any) -> None:
+        while True:
+            if self._stop.is_set() and item is not _DONE:
+                return
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._stop.is_set():
+                    return
+
+    def _produce(self) -> None:
+        client, healthy, batches = None, True, None
+        try:
+            client = self.connector.acquire(self.config)
+            self._handle, batches = self.connector.execute(client, self.query, self.params, self.batch_rows)
+            self.query_id = self._handle.query_id
+            self.schema = self._handle.schema
+            if self._stop.is_set():
+                self._cancel_remote()
+            for batch in batches:
+                if self._stop.is_set():
+                    break
+                if self.schema is None:
+                    self.schema = batch.schema
+                batch = self._within_budget(batch)
+                if batch is not None and batch.num_rows:
+                    self.rows += batch.num_rows
+                    self.bytes += batch.nbytes
+                    self.batches += 1
+                    self._put(batch)
+                if self.truncated:
+                    # Closing the cursor below stops the remote query; the client stays reusable
+                    self.connector.stats["truncated"] += 1
+                    logger.info(f"✂️ {self.connector.name} stream truncated at {self.rows} rows / {self.bytes} bytes")
+                    break
+        except BaseException as e:
+            healthy = False
+            self._put(e)
+        finally:
+            if batches is not None and hasattr(batches, "close"):
+                try:
+                    batches.close()
+                except Exception:
+                    healthy = False
+            if client is not None:
+                self.connector.release(self.config, client, healthy and not self.cancelled)
+            self._put(_DONE)
+
+
+def _metadata(config: Any) -> Dict[str, Any]:
+    return getattr(config, "metadata", None) or {}
+
+
+class DuckDBArrowConnector(ArrowConnector):
+    """Local stand-in: ``config.database`` is a DuckDB file (or ':memory:')"""
+
+    name = "duckdb"
+    driver = "duckdb"
+    package = "duckdb"
+
+    def connect(self, config: Any) -> Any:
+        import duckdb
+
+        return duckdb.connect(config.database or ":memory:", read_only=bool(_metadata(config).get("read_only")))
+
+    def execute(self, client, query, params, batch_rows):
+        client.execute(query, params or None)
+        reader = client.fetch_record_batch(batch_rows)
+        return QueryHandle(schema=reader.schema, cancel=client.interrupt), iter(reader)
+
+
+# Postgres type OIDs with a fixed Arrow type; everything else is inferred per batch
+_PG_ARROW_TYPES = {
+    16: pa.bool_(), 20: pa.int64(), 21: pa.int64(), 23: pa.int64(), 700: pa.float64(), 701: pa.float64(),
+    25: pa.string(), 1042: pa.string(), 1043: pa.string(), 1082: pa.date32(),
+    1114: pa.timestamp("us"), 1184: pa.timestamp("us", tz="UTC"),
+}
+
+
+def _column(values: List[Any], arrow_type: Optional[pa.DataType]) -> pa.Array:
+    for candidate in (arrow_type, None):
+        try:
+            return pa.array(values, type=candidate)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+            continue
+    return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def rows_to_batch(rows: List[tuple], names: List[str], types: Optional[List[Optional[pa.DataType]]] = None) -> pa.RecordBatch:
+    """One DB-API ``fetchmany`` chunk as a record batch (columns converted one at a time)"""
+    types = types or [None] * len(names)
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    return pa.RecordBatch.from_arrays([_column(list(c), t) for c, t in zip(columns, types)], names=names)
+
+
+class PostgresArrowConnector(ArrowConnector):
+    """PostgreSQL via psycopg2 with a server-side cursor (rows arrive ``batch_rows`` at a time)"""
+
+    name = "postgresql"
+    driver = "psycopg2"
+    package = "psycopg2-binary"
+    default_port = 5432
+
+    def _ssl_mode(self, config: Any) -> Optional[str]:
+        return None
+
+    def connect(self, config: Any) -> Any:
+        import psycopg2
+
+        kwargs = dict(
+            host=config.host, port=config.port or self.default_port, dbname=config.database,
+            user=config.username, password=config.password, connect_timeout=config.timeout or 10,
+            application_name="aiser",
+        )
+        if self._ssl_mode(config):
+            kwargs["sslmode"] = self._ssl_mode(config)
+        client = psycopg2.connect(**kwargs)
+        client.autocommit = False
+        return client
+
+    def execute(self, client, query, params, batch_rows):
+        words = query.split(None, 1)
+        # Named (server-side) cursors only accept queries that return rows
+        streaming = bool(words) and words[0].upper() in ("SELECT", "WITH", "VALUES", "TABLE")
+        cursor = client.cursor(name=f"aiser_{uuid.uuid4().hex[:12]}") if streaming else client.cursor()
+        if streaming:
+            cursor.itersize = batch_rows
+        cursor.execute(query, params or None)
+        handle = QueryHandle(cancel=client.cancel)
+
+        def batches() -> Iterator[pa.RecordBatch]:
+            try:
+                names, types = None, None
+                while streaming or cursor.description is not None:
+                    rows = cursor.fetchmany(batch_rows)
+                    if names is None:
+                        # A named cursor only has a description after its first fetch
+                        names = [d.name for d in cursor.description]
+                        types = [_PG_ARROW_TYPES.get(d.type_code) for d in cursor.description]
+                    if not rows:
+                        break
+                    yield rows_to_batch(rows, names, types)
+                    if len(rows) < batch_rows:
+                        break
+            finally:
+                try:
+                    cursor.close()
+                    client.rollback()  # end the read transaction the cursor lived in
+                except Exception:
+                    pass
+
+        return handle, batches()
+
+
+class RedshiftArrowConnector(PostgresArrowConnector):
+    """Amazon Redshift speaks the PostgreSQL protocol"""
+
+    name = "redshift"
+    default_port = 5439
+
+    def _ssl_mode(self, config: Any) -> Optional[str]:
+        return "require" if getattr(config, "ssl_enabled", True) else "disable"
+
+
+class SnowflakeArrowConnector(ArrowConnector):
+    """Snowflake via snowflake-connector-python's native Arrow result chunks"""
+
+    name = "snowflake"
+    driver = "snowflake.connector"
+    package = "snowflake-connector-python[pandas]"
+
+    def connect(self, config: Any) -> Any:
+        import snowflake.connector
+
+        meta = _metadata(config)
+        # Same field mapping as EnterpriseConnectorsService._connect_snowflake
+        return snowflake.connector.connect(
+            account=config.host, user=config.username, password=config.password,
+            warehouse=config.database, database=config.schema, schema=meta.get("schema", "PUBLIC"),
+            role=meta.get("role", "PUBLIC"), login_timeout=config.timeout or 30, application="Aiser",
+        )
+
+    def execute(self, client, query, params, batch_rows):
+        cursor = client.cursor()
+        cursor.execute_async(query, params or None)
+        query_id = cursor.sfqid
+
+        def cancel():
+            client.cursor().execute("SELECT SYSTEM$CANCEL_QUERY(%s)", (query_id,))
+
+        def batches() -> Iterator[pa.RecordBatch]:
+            try:
+                cursor.get_results_from_sfqid(query_id)
+                for table in cursor.fetch_arrow_batches():
+                    yield from table.to_batches(max_chunksize=batch_rows)
+            finally:
+                cursor.close()
+
+        return QueryHandle(query_id=query_id, cancel=cancel), batches()
+
+
+class BigQueryArrowConnector(ArrowConnector):
+    """BigQuery via google-cloud-bigquery's Arrow page iterator"""
+
+    name = "bigquery"
+    driver = "google.cloud.bigquery"
+    package = "google-cloud-bigquery[pandas]"
+
+    def pool_key(self, config: Any) -> str:
+        return f"{config.database}|{_metadata(config).get('credentials_path') or ''}"
+
+    def connect(self, config: Any) -> Any:
+        from google.cloud import bigquery
+
+        meta = _metadata(config)
+        if meta.get("credentials_path"):
+            return bigquery.Client.from_service_account_json(
+                meta["credentials_path"], project=config.database, location=meta.get("location", "US")
+            )
+        return bigquery.Client(project=config.database, location=meta.get("location", "US"))
+
+    def execute(self, client, query, params, batch_rows):
+        from google.cloud import bigquery
+
+        job_config = None
+        if params:
+            kinds = {bool: "BOOL", int: "INT64", float: "FLOAT64"}
+            job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter(k, kinds.get(type(v), "STRING"), v) for k, v in params.items()
+            ])
+        job = client.query(query, job_config=job_config)
+
+        def batches() -> Iterator[pa.RecordBatch]:
+            yield from job.result(page_size=batch_rows).to_arrow_iterable()
+
+        return QueryHandle(query_id=job.job_id, cancel=job.cancel), batches()
+
+
+class DatabricksArrowConnector(ArrowConnector):
+    """Databricks SQL warehouses via databricks-sql-connector's Arrow fetches"""
+
+    name = "databricks"
+    driver = "databricks.sql"
+    package = "databricks-sql-connector"
+
+    def pool_key(self, config: Any) -> str:
+        return f"{config.host}|{_metadata(config).get('http_path') or ''}|{config.schema or ''}"
+
+    def connect(self, config: Any) -> Any:
+        from databricks import sql
+
+        meta = _metadata(config)
+        return sql.connect(
+            server_hostname=config.host, http_path=meta.get("http_path"), access_token=config.token,
+            catalog=meta.get("catalog", "hive_metastore"), schema=config.schema or "default",
+        )
+
+    def execute(self, client, query, params, batch_rows):
+        cursor = client.cursor(arraysize=batch_rows)
+        handle = QueryHandle(cancel=cursor.cancel)
+        cursor.execute(query, params or None)
+
+        def batches() -> Iterator[pa.RecordBatch]:
+            try:
+                while True:
+                    table = cursor.fetchmany_arrow(batch_rows)
+                    if not table.num_rows:
+                        break
+                    yield from table.to_batches()
+            finally:
+                cursor.close()
+
+        return handle, batches()
+
+
+ARROW_CONNECTORS: Dict[str, ArrowConnector] = {
+    "postgresql": PostgresArrowConnector(),
+    "redshift": RedshiftArrowConnector(),
+    "snowflake": SnowflakeArrowConnector(),
+    "bigquery": BigQueryArrowConnector(),
+    "databricks": DatabricksArrowConnector(),
+    "duckdb": DuckDBArrowConnector(),
+}
+
+
+def get_arrow_connector(connector_type: str) -> Optional[ArrowConnector]:
+    return ARROW_CONNECTORS.get(connector_type)
+
+
+def _append_batch(conn, table_name: str, batch: pa.RecordBatch, create: bool) -> None:
+    view = f"__arrow_batch_{uuid.uuid4().hex[:8]}"
+    conn.register(view, pa.Table.from_batches([batch]))  # DuckDB registers tables, not bare batches
+    try:
+        if create:
+            conn.execute(f'CREATE OR REPLACE TABLE "{table_name}" AS SELECT * FROM {view}')
+        else:
+            conn.execute(f'INSERT INTO "{table_name}" SELECT * FROM {view}')
+    finally:
+        conn.unregister(view)
+
+
+async def load_into_duckdb(stream: ArrowResultStream, conn: Any, table_name: str) -> Dict[str, Any]:
+    """Append every batch of ``stream`` to a DuckDB table as it arrives"""
+    from app.core.compute_executor import compute_executor
+
+    created = False
+    async with stream:
+        async for batch in stream:
+            await compute_executor.run_duckdb(_append_batch, conn, table_name, batch, not created)
+            created = True
+    if not created and stream.schema is not None and not stream.cancelled:
+        empty = pa.RecordBatch.from_pylist([], schema=stream.schema)
+        await compute_executor.run_duckdb(_append_batch, conn, table_name, empty, True)
+    return {"table": table_name, **stream.summary()}
@@ -0,0 +1,447 @@
+"""
+Data Browser
+Paginated reads over a cached columnar (Parquet) copy of a file data source.
+Projection, sorting and filtering are pushed into DuckDB; pages come back as
+JSON or are streamed as NDJSON / Arrow IPC record batches, so server memory is
+bounded by the batch size rather than the size of the data source.
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.compute_executor import compute_executor
+from app.core.compute_tasks import excel_reader_engine, excel_sheet_to_parquet
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BROWSE_FORMATS = ("json", "ndjson", "arrow")
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+STREAM_BATCH_ROWS = 8192
+
+_COMPARISONS = {"eq": "=", "ne": "<>", "lt": "<", "lte": "<=", "gt": ">", "gte": ">="}
+FILTER_OPS = tuple(_COMPARISONS) + ("in", "contains", "startswith", "isnull", "notnull")
+
+_ROW_NUMBER = "file_row_number"
+
+
+class BrowseError(ValueError):
+    """Invalid browse request (unknown column, bad filter or stale cursor)"""
+
+
+def _quote_ident(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _quote_path(path: str) -> str:
+    return path.replace("'", "''")
+
+
+@dataclass
+class BrowseRequest:
+    """One page (or stream) of a data source: projection, sort, filters and window"""
+
+    columns: Optional[List[str]] = None
+    sort: List[Tuple[str, bool]] = field(default_factory=list)  # (column, descending)
+    filters: List[Tuple[str, str, Optional[str]]] = field(default_factory=list)  # (column, op, value)
+    offset: int = 0
+    limit: Optional[int] = None
+
+    @classmethod
+    def parse(
+        cls,
+        columns: Optional[str] = None,
+        sort: Optional[str] = None,
+        filters: Optional[List[str]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> "BrowseRequest":
+        """Build a request from query parameters.
+
+        ``columns`` is comma separated, ``sort`` is comma separated with a ``-``
+        prefix for descending, and each filter is ``column:op:value``. A cursor
+        from a previous page overrides ``offset``.
+        """
+        request = cls(
+            columns=[c.strip() for c in columns.split(",") if c.strip()] if columns else None,
+            sort=[
+                (s.strip().lstrip("-+"), s.strip().startswith("-"))
+                for s in (sort or "").split(",")
+                if s.strip().lstrip("-+")
+            ],
+            offset=max(0, int(offset or 0)),
+            limit=limit,
+        )
+        for raw in filters or []:
+            parts = raw.split(":", 2)
+            if len(parts) < 2 or parts[1] not in FILTER_OPS:
+                raise BrowseError(f"Invalid filter '{raw}': expected column:op:value with op in {', '.join(FILTER_OPS)}")
+            value = parts[2] if len(parts) == 3 else None
+            if value is None and parts[1] not in ("isnull", "notnull"):
+                raise BrowseError(f"Filter '{raw}' needs a value")
+            request.filters.append((parts[0], parts[1], value))
+        if cursor:
+            request.offset = decode_cursor(cursor, request.fingerprint())
+        return request
+
+    def fingerprint(self) -> str:
+        """Identity of the result ordering; a cursor is only valid for the same fingerprint"""
+        payload = json.dumps([self.columns, self.sort, self.filters], default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def encode_cursor(offset: int, fingerprint: str) -> str:
+    raw = json.dumps({"o": offset, "f": fingerprint}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        offset = int(payload["o"])
+    except Exception:
+        raise BrowseError("Invalid cursor")
+    if payload.get("f") != fingerprint:
+        raise BrowseError("Cursor does not match the requested columns, sort and filters")
+    return max(0, offset)
+
+
+def build_browse_sql(
+    parquet_path: str, column_types: Dict[str, str], request: BrowseRequest, extra_rows: int = 0
+) -> Tuple[str, List[Any], str, List[Any]]:
+    """Compile a browse request into (page sql, params, count sql, params).
+
+    Every column name is checked against the Parquet schema and every filter
+    value is bound as a parameter, so no client text reaches the SQL.
+    """
+    def known(name: str) -> str:
+        if name not in column_types:
+            raise BrowseError(f"Unknown column: {name}")
+        return _quote_ident(name)
+
+    projection = [known(c) for c in request.columns] if request.columns else [_quote_ident(c) for c in column_types]
+
+    where, params = [], []
+    for column, op, value in request.filters:
+        ident = known(column)
+        col_type = column_types[column]
+        if op in _COMPARISONS:
+            where.append(f"{ident} {_COMPARISONS[op]} TRY_CAST(? AS {col_type})")
+            params.append(value)
+        elif op == "in":
+            values = [v for v in str(value).split(",")]
+            where.append(f"{ident} IN ({', '.join(f'TRY_CAST(? AS {col_type})' for _ in values)})")
+            params.extend(values)
+        elif op == "contains":
+            where.append(f"CAST({ident} AS VARCHAR) ILIKE '%' || ? || '%'")
+            params.append(value)
+        elif op == "startswith":
+            where.append(f"starts_with(CAST({ident} AS VARCHAR), ?)")
+            params.append(value)
+        elif op == "isnull":
+            where.append(f"{ident} IS NULL")
+        elif op == "notnull":
+            where.append(f"{ident} IS NOT NULL")
+
+    # The file row number keeps sorted pages stable when sort keys tie
+    row_number = "true" if request.sort and _ROW_NUMBER not in column_types else "false"
+    source = f"read_parquet('{_quote_path(parquet_path)}', file_row_number={row_number})"
+    where_sql = f" WHERE {' AND '.join(where)}" if where else ""
+
+    order_sql = ""
+    if request.sort:
+        keys = [f"{known(c)} {'DESC' if desc else 'ASC'} NULLS LAST" for c, desc in request.sort]
+        if row_number == "true":
+            keys.append(_ROW_NUMBER)
+        order_sql = f" ORDER BY {', '.join(keys)}"
+
+    window_sql = ""
+    if request.limit is not None:
+        window_sql = f" LIMIT {int(request.limit) + int(extra_rows)}"
+    if request.offset:
+        window_sql += f" OFFSET {int(request.offset)}"
+
+    sql = f"SELECT {', '.join(projection)} FROM {source}{where_sql}{order_sql}{window_sql}"
+    count_sql = f"SELECT COUNT(*) FROM {source}{where_sql}"
+    return sql, params, count_sql, list(params)
+
+
+def _describe_parquet(conn, parquet_path: str) -> Dict[str, str]:
+    rows = conn.execute(f"DESCRIBE SELECT * FROM read_parquet('{_quote_path(parquet_path)}')").fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def _json_safe(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class DataBrowser:
+    """Serves browse pages from columnar copies of file data sources"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_cache_mb: Optional[int] = None):
+        self.cache_dir = cache_dir or settings.DATA_BROWSE_CACHE_DIR
+        self.max_cache_bytes = (max_cache_mb if max_cache_mb is not None else settings.DATA_BROWSE_CACHE_MAX_MB) * 1024 * 1024
+        self._build_locks: Dict[str, asyncio.Lock] = {}
+
+    # ----- columnar copy -------------------------------------------------
+
+    async def resolve_parquet(
+        self, data_source: Dict[str, Any], user_id: str, sheet: Optional[str] = None
+    ) -> str:
+        """Local Parquet file holding the full data of a file data source.
+
+        Columnar-store objects (streamed uploads, Excel sheets) are used in
+        place; anything else is converted once and kept in the browse cache.
+        Falls back to the stored sample rows when the file is unavailable.
+        """
+        from app.modules.data.services.postgres_storage_service import COLUMNAR_PREFIX, PostgresStorageService
+
+        storage = PostgresStorageService()
+        schema = data_source.get("schema") or {}
+        object_key = data_source.get("file_path")
+
+        columnar_sheets = schema.get("columnar_sheets") or {}
+        if columnar_sheets:
+            if sheet is not None and sheet not in columnar_sheets:
+                raise BrowseError(f"Unknown sheet: {sheet}")
+            primary = next(
+                (s for s, t in (schema.get("duckdb_tables") or {}).items() if t == schema.get("table_name")), None
+            )
+            key = columnar_sheets.get(sheet) or columnar_sheets.get(primary) or next(iter(columnar_sheets.values()))
+            path = storage.columnar_path(key)
+            if os.path.exists(path):
+                return path
+        elif object_key and object_key.startswith(COLUMNAR_PREFIX):
+            path = storage.columnar_path(object_key)
+            if os.path.exists(path):
+                return path
+
+        if object_key:
+            try:
+                return await self._cached_copy(
+                    f"{object_key}|{sheet or ''}",
+                    lambda out: self._convert_object(storage, object_key, user_id, data_source.get("format") or "csv", sheet, out),
+                )
+            except BrowseError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Could not build columnar copy of {object_key}, using sample data: {e}")
+
+        rows = data_source.get("data") or data_source.get("sample_data") or []
+        if not rows:
+            raise LookupError("No data available for this data source")
+        digest = hashlib.sha256(json.dumps(rows, default=str, sort_keys=True).encode()).hexdigest()
+        return await self._cached_copy(
+            f"{data_source.get('id')}|sample|{digest}",
+            lambda out: compute_executor.run_duckdb(self._write_rows, rows, out),
+        )
+
+    async def _cached_copy(self, cache_key: str, build) -> str:
+        name = hashlib.sha256(cache_key.encode()).hexdigest()[:40]
+        path = os.path.join(self.cache_dir, f"{name}.parquet")
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+        lock = self._build_locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if not os.path.exists(path):
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                try:
+                    await build(tmp_path)
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.unlink(tmp_path)
+                logger.info(f"✅ Built browse copy {name} ({os.path.getsize(path)} bytes)")
+                await asyncio.to_thread(self._prune_cache, path)
+        self._build_locks.pop(name, None)
+        return path
+
+    async def _convert_object(
+        self, storage, object_key: str, user_id: str, file_format: str, sheet: Optional[str], out_path: str
+    ) -> None:
+        content = await storage.get_file(object_key, user_id)
+        fd, source_path = tempfile.mkstemp(suffix=f".{file_format}")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            del content
+            if file_format in ("xlsx", "xls"):
+                await compute_executor.run_cpu(
+                    excel_sheet_to_parquet, source_path, sheet if sheet is not None else 0, out_path,
+                    excel_reader_engine(source_path),
+                )
+            else:
+                await compute_executor.run_duckdb(self._convert_file, source_path, file_format, out_path)
+        finally:
+            os.unlink(source_path)
+
+    @staticmethod
+    def _convert_file(source_path: str, file_format: str, out_path: str) -> None:
+        """Rewrite a stored file as zstd Parquet (blocking)"""
+        import duckdb
+
+        safe = _quote_path(source_path)
+        readers = {
+            "csv": f"read_csv_auto('{safe}', header=true, sample_size=-1)",
+            "tsv": f"read_csv_auto('{safe}', delim='\t', header=true, sample_size=-1)",
+            "json": f"read_json_auto('{safe}')",
+            "parquet": f"read_parquet('{safe}')",
+        }
+        if file_format not in readers:
+            raise BrowseError(f"Unsupported format: {file_format}")
+        conn = duckdb.connect()
+        try:
+            conn.execute(
+                f"COPY (SELECT * FROM {readers[file_format]}) TO '{_quote_path(out_path)}' "
+                f"(FORMAT PARQUET, COMPRESSION ZSTD)"
+            )
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _write_rows(rows: List[Dict[str, Any]], out_path: str) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        names = list(dict.fromkeys(k for row in rows for k in row))
+        arrays = []
+        for name in names:
+            values = [row.get(name) for row in rows]
+            try:
+                arrays.append(pa.array(values))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Mixed-type sample columns are browsed as text
+                arrays.append(pa.array([None if v is None else str(v) for v in values], pa.string()))
+        table = pa.Table.from_arrays(arrays, names=names)
+        pq.write_table(table, out_path, compression="zstd")
+
+    def _prune_cache(self, keep: str) -> None:
+        """Drop least recently used browse copies beyond the size budget (blocking)"""
+        try:
+            entries = [
+                os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".parquet")
+            ]
+            stats = sorted(((p, os.stat(p)) for p in entries), key=lambda item: item[1].st_mtime)
+            total = sum(st.st_size for _, st in stats)
+            for path, st in stats:
+                if total <= self.max_cache_bytes:
+                    break
+                if path != keep:
+                    os.unlink(path)
+                    total -= st.st_size
+        except OSError as e:
+            logger.warning(f"⚠️ Browse cache pruning failed: {e}")
+
+    # ----- queries ---------------------------------------------------------
+
+    async def page(self, parquet_path: str, request: BrowseRequest, include_total: bool = True) -> Dict[str, Any]:
+        """One JSON page; fetches a single extra row to know whether more follow"""
+        import duckdb
+
+        conn = duckdb.connect()
+        try:
+            def run():
+                column_types = _describe_parquet(conn, parquet_path)
+                sql, params, count_sql, count_params = build_browse_sql(parquet_path, column_types, request, extra_rows=1)
+                result = conn.execute(sql, params)
+                names = [d[0] for d in result.description]
+                rows = result.fetchall()
+                total = conn.execute(count_sql, count_params).fetchone()[0] if include_total else None
+                return column_types, names, rows, total
+
+            column_types, names, rows, total = await compute_executor.run_duckdb(run, interrupt=conn)
+        finally:
+            conn.close()
+
+        has_more = request.limit is not None and len(rows) > request.limit
+        rows = rows[: request.limit] if request.limit is not None else rows
+        next_offset = request.offset + len(rows)
+        return {
+            "data": [{name: _json_safe(value) for name, value in zip(names, row)} for row in rows],
+            "columns": [{"name": name, "type": column_types[name]} for name in names],
+            "offset": request.offset,
+            "limit": request.limit,
+            "has_more": has_more,
+            "next_cursor": encode_cursor(next_offset, request.fingerprint()) if has_more else None,
+            "total_rows": total,
+        }
+
+    async def stream(self, parquet_path: str, request: BrowseRequest, fmt: str = "ndjson") -> AsyncIterator[bytes]:
+        """Open a streaming read and return its chunk iterator.
+
+        The query is compiled and started before this returns, so a bad
+        request raises ``BrowseError`` while an HTTP error can still be sent.
+        Rows are then produced as NDJSON lines or an Arrow IPC stream, one
+        record batch at a time.
+        """
+        import duckdb
+
+        if fmt not in ("ndjson", "arrow"):
+            raise BrowseError(f"Unsupported stream format: {fmt}")
+        conn = duckdb.connect()
+
+        def open_reader():
+            column_types = _describe_parquet(conn, parquet_path)
+            sql, params, _, _ = build_browse_sql(parquet_path, column_types, request)
+            return conn.execute(sql, params).fetch_record_batch(STREAM_BATCH_ROWS)
+
+        try:
+            reader = await compute_executor.run_duckdb(open_reader, interrupt=conn)
+        except BaseException:
+            conn.close()
+            raise
+        return self._iter_batches(conn, reader, fmt)
+
+    async def _iter_batches(self, conn, reader, fmt: str) -> AsyncIterator[bytes]:
+        import pyarrow as pa
+
+        def next_batch():
+            try:
+                return reader.read_next_batch()
+            except StopIteration:
+                return None
+
+        try:
+            sink = io.BytesIO()
+            writer = pa.ipc.new_stream(sink, reader.schema) if fmt == "arrow" else None
+            while True:
+                batch = await compute_executor.run_duckdb(next_batch, interrupt=conn)
+                if batch is None:
+                    break
+                if writer is not None:
+                    writer.write_batch(batch)
+                    chunk = sink.getvalue()
+                    sink.seek(0)
+                    sink.truncate()
+                    yield chunk
+                else:
+                    yield "".join(json.dumps(row, default=str) + "\n" for row in batch.to_pylist()).encode()
+            if writer is not None:
+                writer.close()
+                yield sink.getvalue()
+        finally:
+            conn.close()
+
+
+# Global instance
+data_browser = DataBrowser()
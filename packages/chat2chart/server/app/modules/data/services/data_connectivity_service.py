@@ -3,13 +3,14 @@ Universal Data Connectivity Service
 Handles file uploads, database connections, and data source management
 """
 
+import asyncio
 import logging
 import os
 import pandas as pd
 import json
 import re
 import sqlalchemy as sa
-from typing import Dict, List, Optional, Any, Union
+from typing import AsyncIterator, Dict, List, Optional, Any, Union
 from datetime import datetime, date
 import tempfile
 from pathlib import Path
@@ -17,6 +18,12 @@ from .database_connector_service import DatabaseConnectorService
 from app.modules.data.services.ai_schema_service import AISchemaService
 from app.db.session import async_operation_lock
 from app.modules.data.utils.credentials import encrypt_credentials, decrypt_credentials
+from app.core.compute_executor import compute_executor, ComputeCancelled
+from app.core.compute_tasks import load_json_file, read_csv_frame, read_excel_frame
+from app.modules.data.services import excel_ingest
+from app.modules.data.services.data_source_catalog import data_source_catalog
+from app.core.cache_invalidation import cache_tags, data_source_tag
+from app.modules.data.services.streaming_ingest import STREAMABLE_FORMATS, StreamingUploadIngest, sniff_delimiter
 
 logger = logging.getLogger(__name__)
 
@@ -514,79 +521,15 @@ class DataConnectivityService:
                 logger.info(f"✅ Found data source {source_id} in demo sources")
                 return self.data_sources[source_id]
             
-            # Then check database
-            from app.modules.data.models import DataSource
-            from app.db.session import async_session
+            # Then the catalog (cached per worker, one query on a miss)
+            source_dict = await data_source_catalog.get(source_id, include_sample=True, include_config=True)
+            if source_dict:
+                logger.info(f"✅ Found data source {source_id} in database (type: {source_dict['type']}, has_config: {bool(source_dict.get('connection_config'))})")
+                return source_dict
 
-            # Use async_session() which returns a session that can be used as context manager
-            from app.db.session import async_session
-            async with async_session() as db:
-                # Ensure a per-session operation lock exists when the caller used
-                # the async_session factory directly (not via get_async_session).
-                # This prevents asyncpg 'another operation is in progress' errors
-                # by serializing DB operations within this session.
-                try:
-                    if not getattr(db, '_op_lock', None):
-                        import asyncio as _asyncio
+            logger.warning(f"⚠️ Data source {source_id} not found in database or demo sources")
+            return None
 
-                        db._op_lock = _asyncio.Lock()
-                except Exception:
-                    db._op_lock = None
-                from sqlalchemy import select
-                query = select(DataSource).where(DataSource.id == source_id, DataSource.is_active == True)
-                result = await db.execute(query)
-                source = result.scalar_one_or_none()
-                
-                if source:
-                    source_dict = {
-                        'id': source.id,
-                        'name': source.name,
-                        'type': source.type,
-                        'format': source.format,
-                        # expose persisted inline/sample data and file path if present
-                        'sample_data': getattr(source, 'sample_data', None),
-                        'file_path': getattr(source, 'file_path', None),
-                        'db_type': source.db_type,
-                        'size': source.size,
-                        'row_count': source.row_count,
-                        'schema': source.schema,
-                        'user_id': getattr(source, 'user_id', None),
-                        'created_at': source.created_at.isoformat() if source.created_at else None,
-                        'updated_at': source.updated_at.isoformat() if source.updated_at else None,
-                        'is_active': source.is_active,
-                        'last_accessed': source.last_accessed.isoformat() if source.last_accessed else None
-                    }
-                    
-                    # CRITICAL: Include connection_config for database/warehouse sources and decrypt credentials
-                    if (source.type == 'database' or source.type == 'warehouse') and source.connection_config:
-                        try:
-                            import json
-                            config = json.loads(source.connection_config) if isinstance(source.connection_config, str) else source.connection_config
-                            
-                            # CRITICAL: Decrypt credentials before returning
-                            try:
-                                from app.modules.data.utils.credentials import decrypt_credentials
-                                config = decrypt_credentials(config)
-                                logger.debug(f"✅ Decrypted credentials for data source {source_id}")
-                            except Exception as decrypt_error:
-                                logger.warning(f"⚠️ Could not decrypt credentials for {source_id} (may not be encrypted): {decrypt_error}")
-                            
-                            # Add to multiple keys for compatibility with query engine
-                            source_dict['connection_config'] = config
-                            source_dict['connection_info'] = config
-                            source_dict['config'] = config
-                            source_dict['metadata'] = config  # Also add as metadata for compatibility
-                        except Exception as config_error:
-                            logger.error(f"❌ Error parsing connection_config for {source_id}: {config_error}")
-                            source_dict['connection_config'] = {}
-                            source_dict['connection_info'] = {}
-                    
-                    logger.info(f"✅ Found data source {source_id} in database (type: {source.type}, has_config: {bool(source_dict.get('connection_config'))})")
-                    return source_dict
-                
-                logger.warning(f"⚠️ Data source {source_id} not found in database or demo sources")
-                return None
-                
         except Exception as e:
             logger.error(f"❌ Failed to get data source {source_id}: {str(e)}")
             # Fallback to in-memory sources
@@ -598,55 +541,21 @@ class DataConnectivityService:
             logger.info(f"🔍 Getting data sources (offset: {offset}, limit: {limit})")
             logger.info(f"🔍 Available demo sources: {list(self.data_sources.keys())}")
             
-            from app.modules.data.models import DataSource
-            from app.db.session import async_session
+            # Database rows come first, so the page never needs more than offset + limit of them
+            result_list = await data_source_catalog.list_sources(limit=offset + limit)
+            logger.info(f"✅ Retrieved {len(result_list)} data sources from database")
+
+            # Always include demo data sources for testing
+            demo_sources = list(self.data_sources.values())
+            logger.info(f"🔍 Adding {len(demo_sources)} demo sources")
+            all_sources = result_list + demo_sources
+            logger.info(f"🔍 Total sources after combining: {len(all_sources)}")
+
+            # Apply pagination to combined sources
+            result = all_sources[offset:offset + limit]
+            logger.info(f"🔍 Returning {len(result)} sources after pagination")
+            return result
 
-            async with async_session() as db:
-                # Query database for data sources using async session
-                from sqlalchemy import select, func
-                
-                # Count total
-                count_query = select(func.count(DataSource.id)).where(DataSource.is_active == True)
-                total_result = await db.execute(count_query)
-                total = total_result.scalar()
-                
-                # Get paginated results
-                query = select(DataSource).where(DataSource.is_active == True).offset(offset).limit(limit)
-                result = await db.execute(query)
-                sources = result.scalars().all()
-                
-                # Convert to dictionary format
-                result_list = []
-                for source in sources:
-                    source_dict = {
-                        'id': source.id,
-                        'name': source.name,
-                        'type': source.type,
-                        'format': source.format,
-                        'db_type': source.db_type,
-                        'size': source.size,
-                        'row_count': source.row_count,
-                        'schema': source.schema,
-                        'created_at': source.created_at.isoformat() if source.created_at else None,
-                        'updated_at': source.updated_at.isoformat() if source.updated_at else None,
-                        'is_active': source.is_active,
-                        'last_accessed': source.last_accessed.isoformat() if source.last_accessed else None
-                    }
-                    result_list.append(source_dict)
-                
-                logger.info(f"✅ Retrieved {len(result_list)} data sources from database")
-                
-                # Always include demo data sources for testing
-                demo_sources = list(self.data_sources.values())
-                logger.info(f"🔍 Adding {len(demo_sources)} demo sources")
-                all_sources = result_list + demo_sources
-                logger.info(f"🔍 Total sources after combining: {len(all_sources)}")
-                
-                # Apply pagination to combined sources
-                result = all_sources[offset:offset + limit]
-                logger.info(f"🔍 Returning {len(result)} sources after pagination")
-                return result
-                
         except Exception as e:
             logger.error(f"❌ Failed to get data sources from database: {str(e)}")
             import traceback
@@ -708,7 +617,9 @@ class DataConnectivityService:
                     logger.info(f"✅ Saved new data source {data_source['id']} to database (user_id={user_id}).")
                 
                 await db.commit()
-                return True
+            # Cached catalog rows (and anything else tagged with the source) are now stale
+            await cache_tags.invalidate(data_source_tag(data_source['id']))
+            return True
                 
         except Exception as e:
             logger.error(f"❌ Failed to save data source to database: {str(e)}", exc_info=True)
@@ -744,9 +655,43 @@ class DataConnectivityService:
                 data, schema = await self._process_parquet_file(file_path)
             elif file_extension == 'json':
                 data, schema = await self._process_json_file(file_path)
+            elif file_extension in ('xlsx', 'xls'):
+                # Sheets are only persisted to the columnar store for real (non-preview) uploads
+                persist_user = None if options.get('preview_only') else options.get('user_id')
+                data, schema = await self._process_excel_file(file_path, options.get('sheet_name'), persist_user)
             else:
                 raise ValueError(f"Unsupported file format: {file_extension}")
             
+            # Get file size from temp file
+            file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+            
+            # The sample is capped; report the full sheet row count when it is known
+            extra = {'row_count': schema['row_count']} if schema.get('row_count') is not None else None
+            return await self._finalize_file_data_source(
+                data, schema, original_filename, file_extension, options, object_key, file_size, extra
+            )
+            
+        except Exception as error:
+            logger.error(f"❌ File processing failed: {str(error)}")
+            
+            return {
+                'success': False,
+                'error': str(error)
+            }
+
+    async def _finalize_file_data_source(
+        self,
+        data: List[Dict[str, Any]],
+        schema: Dict[str, Any],
+        original_filename: str,
+        file_extension: str,
+        options: Dict[str, Any],
+        object_key: Optional[str],
+        file_size: int,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Enhance the schema, build the data source record and persist it (unless preview-only)"""
+        try:
             # Enhance schema with AI insights (skip for preview-only or if disabled for performance)
             preview_only = options.get('preview_only', False)
             skip_ai_enhancement = preview_only or options.get('skip_ai_enhancement', False)
@@ -768,9 +713,6 @@ class DataConnectivityService:
             user_id = options.get('user_id') if options else None
             name = options.get('name') if options else original_filename
             
-            # Get file size from temp file
-            file_size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-            
             data_source = {
                 'id': f"file_{int(datetime.now().timestamp())}",
                 'name': name or original_filename,
@@ -789,6 +731,8 @@ class DataConnectivityService:
                 'storage_type': 'postgresql',  # Updated: now using PostgreSQL storage
                 'user_id': user_id  # Pass user_id from options
             }
+            if extra:
+                data_source.update(extra)
             
             # Conditional in-memory storage based on upload_with_prompt flag
             upload_with_prompt = options.get('upload_with_prompt', False)
@@ -818,7 +762,7 @@ class DataConnectivityService:
                     logger.error(f"❌ Failed to save data source {data_source.get('id')} to database")
                     raise Exception(f"Failed to save data source to database. Check logs for details.")
             
-            logger.info(f"✅ File processed successfully: {len(data)} rows, {len(enhanced_schema['columns'])} columns")
+            logger.info(f"✅ File processed successfully: {data_source['row_count']} rows, {len(enhanced_schema['columns'])} columns")
             
             return {
                 'success': True,
@@ -834,6 +778,119 @@ class DataConnectivityService:
                 'error': str(error)
             }
 
+    async def ingest_upload_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Ingest an upload from a stream of byte chunks, yielding progress events.
+
+        Events: ``preview`` (schema + sample parsed from the first chunk, CSV/TSV
+        only) as soon as it is available, then ``complete`` with the same
+        result dict as upload_file, or ``error``. The file is stored as
+        Parquet: in PostgreSQL when it fits the per-row limit, otherwise in
+        the local columnar store.
+        """
+        from app.core.config import settings
+        from app.modules.data.services.postgres_storage_service import PostgresStorageService
+
+        options = options or {}
+        ingest = None
+        try:
+            file_extension = self._get_file_extension(filename)
+            if file_extension not in STREAMABLE_FORMATS:
+                raise ValueError(f"Unsupported format for streaming upload: {file_extension}")
+            user_id = options.get('user_id')
+            if not user_id:
+                raise ValueError("user_id is required for file upload")
+
+            delimiter = options.get('delimiter')
+            ingest = StreamingUploadIngest(
+                file_extension,
+                delimiter=None if delimiter in (None, '', ',') else delimiter,
+                max_bytes=settings.STREAMING_UPLOAD_MAX_MB * 1024 * 1024,
+                tenant=str(user_id),
+            )
+            logger.info(f"📁 Streaming upload started: {filename}")
+            preview_sent = False
+            async for chunk in chunks:
+                preview = await ingest.feed(chunk)
+                if preview:
+                    preview_sent = True
+                    yield {'event': 'preview', 'bytes_received': ingest.bytes_received, **self._make_json_serializable(preview)}
+
+            summary = await ingest.finish()
+            if not preview_sent:
+                # Small files (or non-CSV formats) only have a preview once complete
+                yield {
+                    'event': 'preview',
+                    'bytes_received': ingest.bytes_received,
+                    'columns': summary['schema']['columns'],
+                    'sample': self._make_json_serializable(summary['sample']),
+                    'complete': True,
+                }
+
+            preview_only = options.get('preview_only', False)
+            max_sample_rows = 10000
+            sample = summary['sample']
+            if summary['row_count'] > len(sample) and not preview_only:
+                sample = await compute_executor.run_duckdb(ingest.read_sample, max_sample_rows, tenant=str(user_id))
+            data = self._make_json_serializable(sample)
+
+            object_key, storage_type = None, 'postgresql'
+            if not preview_only:
+                storage_service = PostgresStorageService()
+                if summary['parquet_size'] <= self.max_file_size:
+                    parquet_bytes = await asyncio.to_thread(Path(summary['parquet_path']).read_bytes)
+                    object_key = await storage_service.store_file(
+                        file_content=parquet_bytes,
+                        user_id=user_id,
+                        original_filename=filename,
+                        content_type="application/parquet",
+                    )
+                else:
+                    object_key = await asyncio.to_thread(
+                        storage_service.store_columnar_file, summary['parquet_path'], user_id
+                    )
+                    storage_type = 'columnar'
+                logger.info(f"💾 Stored streamed upload as Parquet: {object_key}")
+
+            schema = dict(summary['schema'])
+            result = await self._finalize_file_data_source(
+                data, schema, filename, 'parquet', options, object_key,
+                # size column is INTEGER
+                min(summary['size'], 2**31 - 1),
+                extra={
+                    'row_count': summary['row_count'],
+                    'original_format': file_extension,
+                    'content_hash': summary['content_hash'],
+                    'storage_type': storage_type,
+                    'content_type': "application/parquet",
+                },
+            )
+            yield {'event': 'complete' if result.get('success') else 'error', **result}
+
+        except Exception as error:
+            logger.error(f"❌ Streaming upload failed: {str(error)}")
+            yield {'event': 'error', 'success': False, 'error': str(error)}
+        finally:
+            if ingest is not None:
+                await asyncio.to_thread(ingest.cleanup)
+
+    async def ingest_upload(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Streaming ingest without progress events; returns the final upload result"""
+        result: Dict[str, Any] = {'success': False, 'error': 'Upload produced no result'}
+        async for event in self.ingest_upload_stream(chunks, filename, options):
+            if event.get('event') in ('complete', 'error'):
+                result = {k: v for k, v in event.items() if k != 'event'}
+        return result
+
     async def upload_file(
         self,
         file_content: bytes,
@@ -906,6 +963,34 @@ class DataConnectivityService:
                 except Exception as e:
                     logger.warning(f"⚠️ Failed to clean up temp file: {str(e)}")
 
+    def _duckdb_table_preview(self, conn, source_sql: str, sample_rows: int = 100) -> tuple:
+        """Materialise ``source_sql`` as table 'data' and return (sample rows, schema) (blocking)"""
+        conn.execute(f"CREATE TABLE data AS SELECT * FROM {source_sql}")
+
+        # Get schema from DuckDB (faster and more accurate)
+        schema_result = conn.execute("DESCRIBE data").fetchall()
+        total_rows = conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
+        schema = {
+            'columns': [{'name': col[0], 'type': col[1]} for col in schema_result],
+            'row_count': total_rows
+        }
+
+        # Get sample data (first rows for preview/schema enhancement)
+        sample_result = conn.execute(f"SELECT * FROM data LIMIT {int(sample_rows)}").fetchall()
+        columns = [col[0] for col in schema_result]
+
+        # Convert to list of dictionaries, with date/datetime objects as JSON-serializable strings
+        data = self._make_json_serializable([dict(zip(columns, row)) for row in sample_result])
+        return data, schema
+
+    def _frame_to_records(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        data = df.to_dict('records')
+        for row in data:
+            for key, value in row.items():
+                if pd.isna(value):
+                    row[key] = None
+        return data
+
     async def _process_csv_file(self, file_path: str, delimiter: str = ',', encoding: str = 'utf-8') -> tuple:
         """Process CSV/TSV files using DuckDB for fast, direct processing"""
         try:
@@ -918,7 +1003,7 @@ class DataConnectivityService:
                     delimiter = detected_delimiter
                     logger.info(f"🔍 Auto-detected delimiter: '{delimiter}'")
             
-            # Use DuckDB for direct CSV reading (10-100x faster than Pandas)
+            # Use DuckDB for direct CSV reading (10-100x faster than Pandas), on the compute thread pool
             conn = duckdb.connect()
             
             # Read CSV directly into DuckDB (auto-detects types, handles encoding)
@@ -926,52 +1011,28 @@ class DataConnectivityService:
                 # DuckDB's read_csv_auto uses 'delim' or 'sep', NOT 'delimiter'
                 # Escape single quotes in file path for SQL safety
                 safe_file_path = file_path.replace("'", "''")
-                conn.execute(f"""
-                    CREATE TABLE data AS 
-                    SELECT * FROM read_csv_auto('{safe_file_path}', 
-                        delim='{delimiter}',
-                        header=true,
-                        auto_detect=true
-                    )
-                """)
-                
-                # Get schema from DuckDB (faster and more accurate)
-                schema_result = conn.execute("DESCRIBE data").fetchall()
-                schema = {
-                    'columns': [{'name': col[0], 'type': col[1]} for col in schema_result],
-                    'row_count': conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
-                }
-                
-                # Get sample data (first 100 rows for preview/schema enhancement)
-                sample_result = conn.execute("SELECT * FROM data LIMIT 100").fetchall()
-                columns = [col[0] for col in schema_result]
-                
-                # Convert to list of dictionaries
-                data = [dict(zip(columns, row)) for row in sample_result]
-                
-                # Convert date/datetime objects to JSON-serializable strings
-                data = self._make_json_serializable(data)
-                
-                # Get full row count
-                total_rows = conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
-                schema['row_count'] = total_rows
-                
+                safe_delimiter = delimiter.replace("'", "''")
+                data, schema = await compute_executor.run_duckdb(
+                    self._duckdb_table_preview,
+                    conn,
+                    f"read_csv_auto('{safe_file_path}', delim='{safe_delimiter}', header=true, auto_detect=true)",
+                    interrupt=conn,
+                )
                 conn.close()
                 
-                logger.info(f"🦆 Processed CSV with DuckDB: {total_rows} rows, {len(columns)} columns")
+                logger.info(f"🦆 Processed CSV with DuckDB: {schema['row_count']} rows, {len(schema['columns'])} columns")
                 
                 return data, schema
                 
+            except ComputeCancelled:
+                conn.close()
+                raise
             except Exception as duckdb_error:
                 logger.warning(f"⚠️ DuckDB CSV read failed, falling back to Pandas: {duckdb_error}")
                 conn.close()
-                # Fallback to Pandas if DuckDB fails
-                df = pd.read_csv(file_path, delimiter=delimiter, encoding=encoding)
-                data = df.to_dict('records')
-                for row in data:
-                    for key, value in row.items():
-                        if pd.isna(value):
-                            row[key] = None
+                # Fallback to Pandas if DuckDB fails (parsed in the compute process pool)
+                df = await compute_executor.run_cpu(read_csv_frame, file_path, delimiter, encoding)
+                data = self._frame_to_records(df)
                 
                 # Convert date/datetime objects to JSON-serializable strings
                 data = self._make_json_serializable(data)
@@ -982,246 +1043,168 @@ class DataConnectivityService:
         except Exception as error:
             raise Exception(f"CSV processing failed: {str(error)}")
 
+    def _parquet_metadata(self, file_path: str, total_rows: int) -> Dict[str, Any]:
+        try:
+            import pyarrow.parquet as pq
+            metadata = pq.ParquetFile(file_path).metadata
+            return {
+                'row_groups': getattr(metadata, 'num_row_groups', 0),
+                'total_rows': total_rows,
+                'created_by': getattr(metadata, 'created_by', 'unknown'),
+                'schema_version': getattr(metadata, 'schema_version', 'unknown')
+            }
+        except Exception:
+            return {
+                'row_groups': 1,
+                'total_rows': total_rows,
+                'created_by': 'unknown',
+                'schema_version': 'unknown'
+            }
+
     async def _process_parquet_file(self, file_path: str) -> tuple:
         """Process Parquet files using DuckDB for native, fast processing"""
         try:
             import duckdb
             
-            # Use DuckDB for direct Parquet reading (native format, fastest)
+            # Use DuckDB for direct Parquet reading (native format, fastest), on the compute thread pool
             conn = duckdb.connect()
             
             try:
                 # Read Parquet directly into DuckDB (native format, no conversion needed)
-                conn.execute(f"CREATE TABLE data AS SELECT * FROM read_parquet('{file_path}')")
-                
-                # Get schema from DuckDB
-                schema_result = conn.execute("DESCRIBE data").fetchall()
-                schema = {
-                    'columns': [{'name': col[0], 'type': col[1]} for col in schema_result],
-                    'row_count': conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
-                }
-                
-                # Get sample data (first 100 rows)
-                sample_result = conn.execute("SELECT * FROM data LIMIT 100").fetchall()
-                columns = [col[0] for col in schema_result]
-                
-                # Convert to list of dictionaries
-                data = [dict(zip(columns, row)) for row in sample_result]
-                
-                # Convert date/datetime objects to JSON-serializable strings
-                data = self._make_json_serializable(data)
-                
-                # Get full row count
-                total_rows = conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
-                schema['row_count'] = total_rows
+                safe_file_path = file_path.replace("'", "''")
+                data, schema = await compute_executor.run_duckdb(
+                    self._duckdb_table_preview, conn, f"read_parquet('{safe_file_path}')", interrupt=conn
+                )
+                total_rows = schema['row_count']
                 
-                # Try to get Parquet metadata
-                try:
-                    import pyarrow.parquet as pq
-                    parquet_file = pq.ParquetFile(file_path)
-                    metadata = parquet_file.metadata
-                    schema['parquet_metadata'] = {
-                        'row_groups': getattr(metadata, 'num_row_groups', 0),
-                        'total_rows': total_rows,
-                        'created_by': getattr(metadata, 'created_by', 'unknown'),
-                        'schema_version': getattr(metadata, 'schema_version', 'unknown')
-                    }
-                except Exception:
-                    schema['parquet_metadata'] = {
-                        'row_groups': 1,
-                        'total_rows': total_rows,
-                        'created_by': 'unknown',
-                        'schema_version': 'unknown'
-                    }
+                # Try to get Parquet metadata (footer read only)
+                schema['parquet_metadata'] = await compute_executor.run_duckdb(
+                    self._parquet_metadata, file_path, total_rows
+                )
                 
                 conn.close()
                 
-                logger.info(f"🦆 Processed Parquet with DuckDB: {total_rows} rows, {len(columns)} columns")
+                logger.info(f"🦆 Processed Parquet with DuckDB: {total_rows} rows, {len(schema['columns'])} columns")
                 
                 return data, schema
                 
+            except ComputeCancelled:
+                conn.close()
+                raise
             except Exception as duckdb_error:
                 logger.warning(f"⚠️ DuckDB Parquet read failed, falling back to PyArrow: {duckdb_error}")
                 conn.close()
-                # Fallback to PyArrow/Pandas if DuckDB fails
+                # Fallback to PyArrow/Pandas if DuckDB fails (Arrow decodes without holding the GIL)
                 import pyarrow.parquet as pq
-                df = pq.read_table(file_path).to_pandas()
-                data = df.to_dict('records')
-                for row in data:
-                    for key, value in row.items():
-                        if pd.isna(value):
-                            row[key] = None
+                df = await compute_executor.run_duckdb(lambda: pq.read_table(file_path).to_pandas())
+                data = self._frame_to_records(df)
                 schema = self._infer_schema_from_dataframe(df)
                 return data, schema
             
         except Exception as error:
             raise Exception(f"Parquet processing failed: {str(error)}")
 
-    async def _process_excel_file(self, file_path: str, sheet_name: Optional[str] = None) -> tuple:
+    async def _process_excel_file(
+        self, file_path: str, sheet_name: Optional[str] = None, user_id: Optional[str] = None
+    ) -> tuple:
         """
-        Process Excel files with multi-sheet support using DuckDB.
-        Creates virtual tables for each sheet, enabling SQL queries across sheets.
+        Process Excel files with multi-sheet support.
+        Sheets are parsed in parallel worker processes (calamine when installed) and
+        written once to Parquet; row counts and types come from that single pass.
+        With a user_id each sheet is kept in the columnar store so query engines can
+        attach it as a DuckDB view without re-reading the workbook.
         """
+        workbook = None
         try:
-            import duckdb
-            import openpyxl  # For reading Excel sheet names
-            import re
-            
-            # Use DuckDB for Excel processing (supports multi-sheet)
-            conn = duckdb.connect()
-            
             try:
-                # Get all sheet names from Excel file
-                try:
-                    import openpyxl
-                    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
-                    sheet_names = wb.sheetnames
-                    wb.close()
-                except Exception as e:
-                    logger.warning(f"Could not read Excel sheet names with openpyxl: {e}, using default")
-                    # Fallback: try to read with pandas to get sheet names
-                    try:
-                        xl_file = pd.ExcelFile(file_path)
-                        sheet_names = xl_file.sheet_names
-                    except:
-                        sheet_names = ['Sheet1']  # Default sheet name
-                
-                logger.info(f"📊 Found {len(sheet_names)} sheet(s) in Excel file: {sheet_names}")
-                
-                # Process each sheet and create a virtual table
-                all_schemas = {}
-                primary_data = None
-                primary_schema = None
-                
-                for idx, sheet in enumerate(sheet_names):
-                    try:
-                        # Read sheet into pandas DataFrame
-                        df = pd.read_excel(file_path, sheet_name=sheet, engine='openpyxl')
-                        
-                        # Clean data (convert NaN to None)
-                        df = df.replace({pd.NA: None, pd.NaT: None})
-                        df = df.where(pd.notnull(df), None)
-                        
-                        # Create sanitized table name (DuckDB-safe)
-                        table_name = f"sheet_{idx}_{sheet.replace(' ', '_').replace('-', '_').replace('.', '_')[:50]}"
-                        # Remove special characters that might break SQL
-                        table_name = re.sub(r'[^a-zA-Z0-9_]', '_', table_name)
-                        
-                        # Register DataFrame in DuckDB
-                        conn.register(f"_temp_{table_name}", df)
-                        
-                        # Create persistent table in DuckDB
-                        conn.execute(f"CREATE TABLE {table_name} AS SELECT * FROM _temp_{table_name}")
-                        
-                        # Get schema for this sheet
-                        schema_result = conn.execute(f"DESCRIBE {table_name}").fetchall()
-                        sheet_schema = {
-                            'columns': [{'name': col[0], 'type': col[1]} for col in schema_result],
-                            'row_count': conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
-                        }
-                        
-                        all_schemas[sheet] = {
-                            'table_name': table_name,
-                            'schema': sheet_schema,
-                            'row_count': sheet_schema['row_count']
-                        }
-                        
-                        # Use first sheet as primary data (for backward compatibility)
-                        if idx == 0 or (sheet_name and sheet == sheet_name):
-                            primary_data = df.to_dict('records')
-                            # Convert date/datetime objects to JSON-serializable strings
-                            primary_data = self._make_json_serializable(primary_data)
-                            primary_schema = self._infer_schema_from_dataframe(df)
-                            primary_schema['row_count'] = sheet_schema['row_count']
-                            primary_schema['table_name'] = table_name
-                            primary_schema['all_sheets'] = all_schemas
-                        
-                        logger.info(f"✅ Created DuckDB table '{table_name}' for sheet '{sheet}' ({sheet_schema['row_count']} rows)")
-                        
-                    except Exception as sheet_error:
-                        logger.warning(f"⚠️ Failed to process sheet '{sheet}': {sheet_error}")
-                        continue
-                
-                if not primary_data:
+                workbook = await excel_ingest.ingest_workbook(file_path, tenant=user_id)
+                sheets = workbook['sheets']
+                if not sheets:
                     raise Exception("No sheets could be processed from Excel file")
                 
-                # Store DuckDB connection info in schema for later use
-                primary_schema['duckdb_tables'] = {sheet: info['table_name'] for sheet, info in all_schemas.items()}
-                primary_schema['duckdb_connection'] = 'in_memory'  # Mark that tables are in DuckDB
+                primary = next((s for s in sheets if sheet_name and s['sheet'] == sheet_name), sheets[0])
+                primary_data = await compute_executor.run_duckdb(excel_ingest.read_parquet_rows, primary['path'])
+                primary_data = self._make_json_serializable(primary_data)
                 
-                conn.close()
+                all_schemas = {
+                    s['sheet']: {
+                        'table_name': s['table_name'],
+                        'schema': {'columns': s['columns'], 'row_count': s['row_count']},
+                        'row_count': s['row_count']
+                    }
+                    for s in sheets
+                }
+                primary_schema = {
+                    'columns': primary['columns'],
+                    'row_count': primary['row_count'],
+                    'table_name': primary['table_name'],
+                    'all_sheets': all_schemas,
+                    'duckdb_tables': {s['sheet']: s['table_name'] for s in sheets},
+                    'excel_engine': workbook['engine'],
+                    'inferred_at': datetime.now().isoformat()
+                }
+                
+                if user_id:
+                    # Keep each sheet's Parquet file; it is the queryable copy of the workbook
+                    from app.modules.data.services.postgres_storage_service import PostgresStorageService
+                    storage = PostgresStorageService()
+                    primary_schema['columnar_sheets'] = {
+                        s['sheet']: await asyncio.to_thread(storage.store_columnar_file, s['path'], str(user_id))
+                        for s in sheets
+                    }
                 
-                logger.info(f"🦆 Processed Excel with DuckDB: {len(sheet_names)} sheets, primary: {primary_schema['row_count']} rows")
+                logger.info(
+                    f"🦆 Processed Excel ({workbook['engine']}): {len(sheets)} sheets, primary: {primary_schema['row_count']} rows"
+                )
                 
                 return primary_data, primary_schema
                 
-            except Exception as duckdb_error:
-                logger.warning(f"⚠️ DuckDB Excel processing failed, falling back to Pandas: {duckdb_error}")
-                conn.close()
+            except ComputeCancelled:
+                raise
+            except Exception as ingest_error:
+                logger.warning(f"⚠️ Parallel Excel ingest failed, falling back to Pandas: {ingest_error}")
                 # Fallback to original Pandas approach
-                if sheet_name:
-                    df = pd.read_excel(file_path, sheet_name=sheet_name)
-                else:
-                    df = pd.read_excel(file_path)
-                
-                data = df.to_dict('records')
-                for row in data:
-                    for key, value in row.items():
-                        if pd.isna(value):
-                            row[key] = None
-                
+                df = await compute_executor.run_cpu(read_excel_frame, file_path, sheet_name or 0, None)
+                data = self._frame_to_records(df)
                 schema = self._infer_schema_from_dataframe(df)
                 return data, schema
             
+        except ComputeCancelled:
+            raise
         except Exception as error:
             raise Exception(f"Excel processing failed: {str(error)}")
+        finally:
+            excel_ingest.cleanup_workbook(workbook)
 
     async def _process_json_file(self, file_path: str) -> tuple:
         """Process JSON files using DuckDB for fast, direct processing"""
         try:
             import duckdb
             
-            # Use DuckDB for direct JSON reading
+            # Use DuckDB for direct JSON reading, on the compute thread pool
             conn = duckdb.connect()
             
             try:
                 # Read JSON directly into DuckDB (handles nested structures)
-                conn.execute(f"CREATE TABLE data AS SELECT * FROM read_json_auto('{file_path}')")
-                
-                # Get schema from DuckDB
-                schema_result = conn.execute("DESCRIBE data").fetchall()
-                schema = {
-                    'columns': [{'name': col[0], 'type': col[1]} for col in schema_result],
-                    'row_count': conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
-                }
-                
-                # Get sample data (first 100 rows)
-                sample_result = conn.execute("SELECT * FROM data LIMIT 100").fetchall()
-                columns = [col[0] for col in schema_result]
-                
-                # Convert to list of dictionaries
-                data = [dict(zip(columns, row)) for row in sample_result]
-                
-                # Convert date/datetime objects to JSON-serializable strings
-                data = self._make_json_serializable(data)
-                
-                # Get full row count
-                total_rows = conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
-                schema['row_count'] = total_rows
+                safe_file_path = file_path.replace("'", "''")
+                data, schema = await compute_executor.run_duckdb(
+                    self._duckdb_table_preview, conn, f"read_json_auto('{safe_file_path}')", interrupt=conn
+                )
                 
                 conn.close()
                 
-                logger.info(f"🦆 Processed JSON with DuckDB: {total_rows} rows, {len(columns)} columns")
+                logger.info(f"🦆 Processed JSON with DuckDB: {schema['row_count']} rows, {len(schema['columns'])} columns")
                 
                 return data, schema
                 
+            except ComputeCancelled:
+                conn.close()
+                raise
             except Exception as duckdb_error:
                 logger.warning(f"⚠️ DuckDB JSON read failed, falling back to Pandas: {duckdb_error}")
                 conn.close()
                 # Fallback to Pandas if DuckDB fails
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    import json
-                    json_data = json.load(f)
+                json_data = await compute_executor.run_cpu(load_json_file, file_path)
                 
                 if isinstance(json_data, list):
                     data = json_data[:100]  # Sample
@@ -1854,7 +1837,7 @@ class DataConnectivityService:
                 # Try to get live schema from the database
                 try:
                     logger.info(f"🔍 Fetching live schema for {data_source_id}, db_type: {data_source.db_type}, type: {data_source.type}")
-                    live_schema = await self._fetch_live_database_schema(config)
+                    live_schema = await self._fetch_live_database_schema(config, data_source_id)
                     logger.info(f"📊 Live schema result: success={live_schema.get('success')}, tables_count={len(live_schema.get('tables', []))}, schemas_count={len(live_schema.get('schemas', []))}")
                     
                     if live_schema['success']:
@@ -1926,8 +1909,8 @@ class DataConnectivityService:
                 'error': str(e)
             }
     
-    async def _fetch_live_database_schema(self, config: Dict[str, Any]) -> Dict[str, Any]:
-        """Fetch live schema from the database connection"""
+    async def _fetch_live_database_schema(self, config: Dict[str, Any], data_source_id: Optional[str] = None) -> Dict[str, Any]:
+        """Fetch live schema from the database connection (incremental against the schema cache)"""
         try:
             # CRITICAL: Ensure credentials are decrypted before using
             try:
@@ -1950,7 +1933,7 @@ class DataConnectivityService:
             
             # Use DatabaseConnectorService to get schema
             try:
-                schema_result = await self.database_connector.get_schema(config)
+                schema_result = await self.database_connector.get_schema(config, cache_key=data_source_id)
                 if schema_result['success']:
                     return {
                         'success': True,
@@ -2087,23 +2070,7 @@ class DataConnectivityService:
         """Auto-detect CSV delimiter"""
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                first_line = f.readline().strip()
-            
-            if not first_line:
-                return ','
-            
-            # Common delimiters to test
-            delimiters = [',', ';', '\t', '|', ' ']
-            max_fields = 0
-            best_delimiter = ','
-            
-            for delimiter in delimiters:
-                fields = first_line.split(delimiter)
-                if len(fields) > max_fields:
-                    max_fields = len(fields)
-                    best_delimiter = delimiter
-            
-            return best_delimiter
+                return sniff_delimiter(f.readline())
             
         except Exception:
             return ','
@@ -2387,47 +2354,16 @@ class DataConnectivityService:
         try:
             logger.info(f"🔍 Getting project data sources for project {project_id} in organization {organization_id}")
             
-            from app.modules.data.models import DataSource
-            from app.modules.projects.models import ProjectDataSource
-            from app.db.session import async_session
-
-            async with async_session() as db:
-                from sqlalchemy import select, join
+            # Project links are keyed by the numeric project id
+            if not str(project_id).isdigit():
+                logger.warning(f"⚠️ Project id {project_id} is not numeric; no data sources linked")
+                return []
 
-                # Join data sources with project data sources
-                query = (
-                    select(DataSource)
-                    .join(ProjectDataSource, DataSource.id == ProjectDataSource.data_source_id)
-                    .where(
-                        # Accept numeric IDs or slugs; if not int, skip casting
-                        ProjectDataSource.project_id == (int(project_id) if str(project_id).isdigit() else ProjectDataSource.project_id),
-                        DataSource.is_active == True,
-                        ProjectDataSource.is_active == True
-                    )
-                    .offset(offset)
-                    .limit(limit)
-                )
-                
-                result = await db.execute(query)
-                data_sources = result.scalars().all()
-                
-                return [
-                    {
-                        'id': ds.id,
-                        'name': ds.name,
-                        'type': ds.type,
-                        'format': ds.format,
-                        'size': ds.size,
-                        'row_count': ds.row_count,
-                        'schema': ds.schema,
-                        'organization_id': organization_id,
-                        'project_id': project_id,
-                        'created_at': ds.created_at.isoformat() if ds.created_at else None,
-                        'updated_at': ds.updated_at.isoformat() if ds.updated_at else None,
-                        'last_accessed': ds.last_accessed.isoformat() if ds.last_accessed else None
-                    }
-                    for ds in data_sources
-                ]
+            sources = await data_source_catalog.list_sources(project_id=project_id, offset=offset, limit=limit)
+            for source in sources:
+                source['organization_id'] = organization_id
+                source['project_id'] = project_id
+            return sources
         except Exception as e:
             logger.error(f"❌ Failed to get project data sources: {str(e)}")
             return []
@@ -0,0 +1,243 @@
+"""
+Data Source Catalog
+Set-based loading of data source metadata. Listings select only the columns
+they show (sample rows and connection configs are loaded on request), any
+number of ids are resolved with one query, and rows are kept in a per-worker
+cache that is evicted through the ``ds:<id>`` cache tag on every write.
+"""
+
+import copy
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.core.cache_invalidation import cache_tags, data_source_tag
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Columns every listing shows; the heavy JSON columns are opt-in
+BASE_COLUMNS = (
+    "id", "name", "type", "format", "db_type", "size", "row_count", "description", "file_path",
+    "original_filename", "user_id", "created_at", "updated_at", "is_active", "last_accessed",
+)
+OPTIONAL_COLUMNS = {"schema": "schema", "sample": "sample_data", "config": "connection_config"}
+
+
+def _iso(value: Any) -> Optional[str]:
+    return value.isoformat() if value is not None and hasattr(value, "isoformat") else value
+
+
+def _decrypted_config(source_id: Any, raw: Any) -> Dict[str, Any]:
+    try:
+        config = json.loads(raw) if isinstance(raw, str) else (raw or {})
+    except ValueError as e:
+        logger.error(f"❌ Error parsing connection_config for {source_id}: {e}")
+        return {}
+    try:
+        from app.modules.data.utils.credentials import decrypt_credentials
+
+        return decrypt_credentials(config)
+    except Exception as e:
+        logger.debug(f"Could not decrypt credentials for {source_id} (may not be encrypted): {e}")
+        return dict(config) if isinstance(config, dict) else {}
+
+
+def format_data_source(row: Dict[str, Any], include_sample: bool = False, include_config: bool = False) -> Dict[str, Any]:
+    """API dict for a catalog row (timestamps as ISO strings, credentials decrypted)"""
+    source = {column: row.get(column) for column in BASE_COLUMNS}
+    for column in ("created_at", "updated_at", "last_accessed"):
+        source[column] = _iso(source[column])
+    if "schema" in row:
+        # Callers annotate the schema in place; keep the cached copy pristine
+        source["schema"] = copy.deepcopy(row["schema"])
+    if include_sample:
+        source["sample_data"] = row.get("sample_data")
+    if include_config and row.get("type") in ("database", "warehouse") and row.get("connection_config"):
+        config = _decrypted_config(row.get("id"), row["connection_config"])
+        # Same config under every key the query engines look for
+        source.update({"connection_config": config, "connection_info": config, "config": config, "metadata": config})
+    return source
+
+
+class DataSourceCatalog:
+    """Per-worker cache of data source rows with batched loading.
+
+    Metadata rows (base columns, schema, connection config) are cached up to
+    ``DATA_SOURCE_CATALOG_MAX_ENTRIES``; sample rows are large and get their
+    own smaller LRU. Both expire after ``DATA_SOURCE_CATALOG_TTL`` seconds as
+    a backstop to tag invalidation.
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Any]] = None):
+        self._session_factory = session_factory
+        self._rows: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._samples: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "queries": 0}
+        self._tier = cache_tags.register_tier("data_source_catalog", self._evict)
+
+    def _session(self):
+        if self._session_factory is None:
+            from app.db.session import async_session
+
+            return async_session()
+        return self._session_factory()
+
+    def _evict(self, keys: List[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._rows.pop(key, None)
+                self._samples.pop(key, None)
+
+    def invalidate(self, source_id: Any) -> None:
+        """Drop a source from this worker's cache (writes should invalidate its ``ds:`` tag instead)"""
+        self._evict([str(source_id)])
+
+    def _cached(self, source_id: str, groups: set) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._rows.get(source_id)
+            if entry is None or time.monotonic() - entry["_loaded_at"] > settings.DATA_SOURCE_CATALOG_TTL:
+                return None
+            if not (groups - {"sample"}) <= entry["_groups"]:
+                return None
+            row = dict(entry)
+            if "sample" in groups:
+                if source_id not in self._samples:
+                    return None
+                self._samples.move_to_end(source_id)
+                row["sample_data"] = self._samples[source_id]
+            self._rows.move_to_end(source_id)
+            return row
+
+    def _store(self, row: Dict[str, Any], groups: set) -> None:
+        source_id = str(row["id"])
+        with self._lock:
+            entry = self._rows.get(source_id)
+            merged = dict(entry) if entry and time.monotonic() - entry["_loaded_at"] <= settings.DATA_SOURCE_CATALOG_TTL else {"_groups": set()}
+            merged.update({k: v for k, v in row.items() if k != "sample_data"})
+            merged["_groups"] = set(merged["_groups"]) | (groups - {"sample"})
+            merged["_loaded_at"] = time.monotonic()
+            self._rows[source_id] = merged
+            self._rows.move_to_end(source_id)
+            while len(self._rows) > settings.DATA_SOURCE_CATALOG_MAX_ENTRIES:
+                self._rows.popitem(last=False)
+            if "sample" in groups:
+                self._samples[source_id] = row.get("sample_data")
+                self._samples.move_to_end(source_id)
+                while len(self._samples) > settings.DATA_SOURCE_CATALOG_MAX_SAMPLES:
+                    self._samples.popitem(last=False)
+        cache_tags.tag(self._tier, source_id, [data_source_tag(source_id)])
+
+    @staticmethod
+    def _groups(include_schema: bool, include_sample: bool, include_config: bool) -> set:
+        return {g for g, on in (("schema", include_schema), ("sample", include_sample), ("config", include_config)) if on}
+
+    @staticmethod
+    def _columns(groups: set):
+        from app.modules.data.models import DataSource
+
+        names = list(BASE_COLUMNS) + [OPTIONAL_COLUMNS[g] for g in sorted(groups)]
+        return [getattr(DataSource, name) for name in names]
+
+    async def _select(self, build: Callable[[Any], Any], groups: set) -> List[Dict[str, Any]]:
+        """Run one SELECT of the catalog columns (``build(stmt)`` adds filters) and cache the rows"""
+        from sqlalchemy import select
+
+        stmt = build(select(*self._columns(groups)))
+        async with self._session() as db:
+            result = await db.execute(stmt)
+            rows = [dict(row._mapping) for row in result.fetchall()]
+        self.stats["queries"] += 1
+        for row in rows:
+            self._store(row, groups)
+        return rows
+
+    async def get_many(
+        self,
+        ids: Iterable[Any],
+        include_schema: bool = True,
+        include_sample: bool = False,
+        include_config: bool = False,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Active data sources by id (missing ids are absent), loading all cache misses in one query"""
+        from app.modules.data.models import DataSource
+
+        groups = self._groups(include_schema, include_sample, include_config)
+        wanted = list(dict.fromkeys(str(i) for i in ids if i is not None))
+        rows: Dict[str, Dict[str, Any]] = {}
+        misses = []
+        for source_id in wanted:
+            row = self._cached(source_id, groups)
+            if row is None:
+                misses.append(source_id)
+            else:
+                rows[source_id] = row
+        self.stats["hits"] += len(rows)
+        self.stats["misses"] += len(misses)
+
+        if misses:
+            loaded = await self._select(
+                lambda stmt: stmt.where(DataSource.id.in_(misses), DataSource.is_active == True),  # noqa: E712
+                groups,
+            )
+            rows.update({str(row["id"]): row for row in loaded})
+
+        return {
+            source_id: format_data_source(rows[source_id], include_sample, include_config)
+            for source_id in wanted
+            if source_id in rows and rows[source_id].get("is_active") is not False
+        }
+
+    async def get(self, source_id: Any, **include) -> Optional[Dict[str, Any]]:
+        return (await self.get_many([source_id], **include)).get(str(source_id))
+
+    async def get_sample(self, source_id: Any) -> Any:
+        """Persisted sample rows of a data source (None if it has none)"""
+        source = await self.get(source_id, include_schema=False, include_sample=True)
+        return source.get("sample_data") if source else None
+
+    async def list_sources(
+        self,
+        owner_id: Optional[str] = None,
+        ids: Optional[List[Any]] = None,
+        project_id: Optional[Any] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        newest_first: bool = False,
+        include_schema: bool = True,
+        include_config: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Active data sources matching the filters with one query; sample rows are never loaded"""
+        from sqlalchemy import and_
+
+        from app.modules.data.models import DataSource
+
+        groups = self._groups(include_schema, False, include_config)
+
+        def build(stmt):
+            conditions = [DataSource.is_active == True]  # noqa: E712
+            if owner_id is not None:
+                conditions.append(DataSource.user_id == str(owner_id))
+            if ids is not None:
+                conditions.append(DataSource.id.in_([str(i) for i in ids]))
+            if project_id is not None:
+                from app.modules.projects.models import ProjectDataSource
+
+                stmt = stmt.join(ProjectDataSource, DataSource.id == ProjectDataSource.data_source_id)
+                conditions.extend([ProjectDataSource.project_id == int(project_id), ProjectDataSource.is_active == True])  # noqa: E712
+            stmt = stmt.where(and_(*conditions))
+            if newest_first:
+                stmt = stmt.order_by(DataSource.created_at.desc())
+            stmt = stmt.offset(offset)
+            return stmt.limit(limit) if limit is not None else stmt
+
+        rows = await self._select(build, groups)
+        return [format_data_source(row, include_config=include_config) for row in rows]
+
+
+# Global instance
+data_source_catalog = DataSourceCatalog()
@@ -21,6 +21,7 @@ from app.modules.data.models import DataSource, DataQuery
 from app.modules.projects.models import Organization, Project
 from app.core.real_data_sources import real_data_source_manager
 from app.modules.data.utils.credentials import encrypt_credentials
+from app.core.cache_invalidation import cache_tags, data_source_tag
 from app.core.metrics import DS_CREATE_COUNTER, DS_UPDATE_COUNTER, DS_DELETE_COUNTER, CONNECTION_TEST_COUNTER
 
 logger = logging.getLogger(__name__)
@@ -372,6 +373,8 @@ class DataSourcesCRUD:
                 DS_UPDATE_COUNTER.inc()
             except Exception:
                 pass
+            # Connection or schema may have changed - drop every cache derived from this source
+            await cache_tags.invalidate(data_source_tag(data_source_id))
 
             return DataSourceResponse(
                 id=data_source.id,
@@ -441,6 +444,7 @@ class DataSourcesCRUD:
                 DS_DELETE_COUNTER.inc()
             except Exception:
                 pass
+            await cache_tags.invalidate(data_source_tag(data_source_id))
 
             return True
             
@@ -33,6 +33,8 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
 from sqlalchemy.pool import QueuePool
 from sqlalchemy.engine import URL
 
+from .schema_introspection import connection_cache_key, schema_introspector
+
 # Database drivers
 try:
     import psycopg2
@@ -383,8 +385,8 @@ class DatabaseConnectorService:
         else:
             raise ValueError(f'Connection string builder not implemented for {db_type}')
     
-    async def get_schema(self, config: Dict[str, Any]) -> Dict[str, Any]:
-        """Get database schema using appropriate method"""
+    async def get_schema(self, config: Dict[str, Any], cache_key: Optional[str] = None) -> Dict[str, Any]:
+        """Get database schema using appropriate method (cached under ``cache_key``, e.g. the data source id)"""
         try:
             db_type = config.get('type', '').lower()
             
@@ -394,8 +396,8 @@ class DatabaseConnectorService:
             if db_type == 'clickhouse':
                 return await self._get_clickhouse_schema_http(config)
             
-            # Use SQLAlchemy Inspector for other databases
-            return await self._get_schema_sqlalchemy(config)
+            # Use bulk catalog introspection for other databases
+            return await self._get_schema_sqlalchemy(config, cache_key)
             
         except Exception as e:
             logger.error(f"❌ Schema retrieval failed: {str(e)}")
@@ -488,12 +490,12 @@ class DatabaseConnectorService:
                 'error': f"ClickHouse schema retrieval failed: {str(e)}"
             }
     
-    async def _get_schema_sqlalchemy(self, config: Dict[str, Any]) -> Dict[str, Any]:
-        """Get database schema using SQLAlchemy Inspector"""
+    async def _get_schema_sqlalchemy(self, config: Dict[str, Any], cache_key: Optional[str] = None) -> Dict[str, Any]:
+        """Get database schema with bulk catalog queries (SQLAlchemy Inspector as fallback)"""
         try:
             db_type = config.get('type', '').lower()
             
-            # Build connection string for sync engine (Inspector needs sync)
+            # Build connection string for sync engine (catalog reads and Inspector are sync)
             db_config = self.database_configs.get(db_type)
             if not db_config:
                 return {
@@ -501,81 +503,23 @@ class DatabaseConnectorService:
                     'error': f'Unsupported database type: {db_type}'
                 }
             
-            # Use sync driver for inspection
-            sync_driver = db_config.get('sync_driver', db_config['driver'])
-            config_copy = config.copy()
-            config_copy['driver'] = sync_driver
-            
-            # Build sync connection string
-            if db_type in ['postgresql', 'mysql', 'redshift']:
-                connection_string = db_config['connection_string'].replace(
-                    db_config['driver'], sync_driver
-                ).format(
-                    driver=sync_driver,
-                    username=config.get('username'),
-                    password=config.get('password'),
-                    host=config.get('host'),
-                    port=config.get('port', db_config['default_port']),
-                    database=config.get('database')
-                )
-            else:
+            connection_string = self._build_sync_connection_string(config)
+            if not connection_string:
                 return {
                     'success': False,
                     'error': f'Schema retrieval not yet implemented for {db_type}'
                 }
             
-            # Create sync engine and inspect
-            engine = create_engine(connection_string, pool_pre_ping=True, echo=False)
-            inspector = inspect(engine)
-            
-            tables = []
-            schemas_list = inspector.get_schema_names()
+            # Set-based catalog queries, refreshed incrementally against the schema cache
+            if schema_introspector.supports(db_type):
+                try:
+                    return await schema_introspector.introspect(
+                        db_type, connection_string, cache_key or connection_cache_key(config)
+                    )
+                except Exception as catalog_error:
+                    logger.warning(f"⚠️ Catalog introspection failed for {db_type}, using Inspector: {catalog_error}")
             
-            # Filter out system schemas
-            system_schemas = {
-                'postgresql': ['information_schema', 'pg_catalog', 'pg_toast'],
-                'mysql': ['information_schema', 'performance_schema', 'mysql', 'sys'],
-                'redshift': ['information_schema', 'pg_catalog', 'pg_toast']
-            }
-            excluded_schemas = system_schemas.get(db_type, ['information_schema', 'sys'])
-            
-            for schema_name in schemas_list:
-                if schema_name.lower() not in [s.lower() for s in excluded_schemas]:
-                    try:
-                        table_names = inspector.get_table_names(schema=schema_name)
-                        for table_name in table_names:
-                            columns = []
-                            try:
-                                for col in inspector.get_columns(table_name, schema=schema_name):
-                                    columns.append({
-                                        'name': col['name'],
-                                        'type': str(col['type']),
-                                        'nullable': col.get('nullable', True),
-                                        'primary_key': col.get('primary_key', False)
-                                    })
-                            except Exception as col_error:
-                                logger.warning(f"Failed to get columns for {schema_name}.{table_name}: {col_error}")
-                                columns = []
-                            
-                            tables.append({
-                                'schema': schema_name,
-                                'name': table_name,
-                                'columns': columns,
-                                'rowCount': 0  # Would need to query each table
-                            })
-                    except Exception as table_error:
-                        logger.warning(f"Failed to get tables for schema {schema_name}: {table_error}")
-                        continue
-            
-            engine.dispose()
-            
-            logger.info(f"✅ Retrieved schema for {len(tables)} tables")
-            return {
-                'success': True,
-                'tables': tables,
-                'schemas': list(set(t['schema'] for t in tables)),
-                'total_rows': 0  # Would need to query each table
-            }
+            return await asyncio.to_thread(self._inspect_schema, db_type, connection_string)
             
         except Exception as e:
             logger.error(f"❌ SQLAlchemy schema fetch failed: {str(e)}")
@@ -584,6 +528,79 @@ class DatabaseConnectorService:
                 'error': f'Schema retrieval failed: {str(e)}'
             }
     
+    def _build_sync_connection_string(self, config: Dict[str, Any]) -> Optional[str]:
+        """Sync-driver connection string for schema introspection (None if unsupported)"""
+        db_type = config.get('type', '').lower()
+        db_config = self.database_configs.get(db_type)
+        if db_type in ['postgresql', 'mysql', 'redshift', 'sqlserver']:
+            sync_driver = db_config.get('sync_driver', db_config['driver'])
+            return db_config['connection_string'].format(
+                driver=sync_driver,
+                username=config.get('username'),
+                password=config.get('password'),
+                host=config.get('host'),
+                port=config.get('port', db_config['default_port']),
+                database=config.get('database')
+            )
+        if db_type == 'snowflake':
+            return self._build_connection_string(config)
+        return None
+    
+    def _inspect_schema(self, db_type: str, connection_string: str) -> Dict[str, Any]:
+        """Per-table SQLAlchemy Inspector walk (blocking; run on a worker thread)"""
+        # Create sync engine and inspect
+        engine = create_engine(connection_string, pool_pre_ping=True, echo=False)
+        inspector = inspect(engine)
+        
+        tables = []
+        schemas_list = inspector.get_schema_names()
+        
+        # Filter out system schemas
+        system_schemas = {
+            'postgresql': ['information_schema', 'pg_catalog', 'pg_toast'],
+            'mysql': ['information_schema', 'performance_schema', 'mysql', 'sys'],
+            'redshift': ['information_schema', 'pg_catalog', 'pg_toast']
+        }
+        excluded_schemas = system_schemas.get(db_type, ['information_schema', 'sys'])
+        
+        for schema_name in schemas_list:
+            if schema_name.lower() not in [s.lower() for s in excluded_schemas]:
+                try:
+                    table_names = inspector.get_table_names(schema=schema_name)
+                    for table_name in table_names:
+                        columns = []
+                        try:
+                            for col in inspector.get_columns(table_name, schema=schema_name):
+                                columns.append({
+                                    'name': col['name'],
+                                    'type': str(col['type']),
+                                    'nullable': col.get('nullable', True),
+                                    'primary_key': col.get('primary_key', False)
+                                })
+                        except Exception as col_error:
+                            logger.warning(f"Failed to get columns for {schema_name}.{table_name}: {col_error}")
+                            columns = []
+                        
+                        tables.append({
+                            'schema': schema_name,
+                            'name': table_name,
+                            'columns': columns,
+                            'rowCount': 0  # Would need to query each table
+                        })
+                except Exception as table_error:
+                    logger.warning(f"Failed to get tables for schema {schema_name}: {table_error}")
+                    continue
+        
+        engine.dispose()
+        
+        logger.info(f"✅ Retrieved schema for {len(tables)} tables")
+        return {
+            'success': True,
+            'tables': tables,
+            'schemas': list(set(t['schema'] for t in tables)),
+            'total_rows': 0  # Would need to query each table
+        }
+    
     async def execute_query(self, connection_id: str, query: str, params: Optional[Dict] = None) -> Dict[str, Any]:
         """Execute query on database connection"""
         try:
@@ -12,6 +12,12 @@ from dataclasses import dataclass
 from enum import Enum
 import aiohttp
 from app.modules.data.utils.credentials import decrypt_credentials, encrypt_credentials
+from app.modules.data.services.arrow_connectors import (
+    ArrowResultStream,
+    StreamBudget,
+    get_arrow_connector,
+    load_into_duckdb,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -341,14 +347,78 @@ class EnterpriseConnectorsService:
             logger.error(f"❌ Schema retrieval failed: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    def stream_query(
+        self,
+        connection_id: str,
+        query: str,
+        params: Optional[Dict] = None,
+        budget: Optional[StreamBudget] = None,
+        batch_rows: Optional[int] = None,
+    ) -> ArrowResultStream:
+        """Stream a query's result as Arrow record batches (SQL warehouse connectors only)"""
+        if connection_id not in self.connections:
+            raise KeyError(f"Connection {connection_id} not found")
+        connection = self.connections[connection_id]
+        config = connection["config"]
+        connector = get_arrow_connector(config.connector_type.value)
+        if connector is None:
+            raise ValueError(f"Streaming is not supported for {config.connector_type.value}")
+        connection["last_used"] = datetime.now().isoformat()
+        return connector.stream(config, query, params, budget, batch_rows)
+
+    async def extract_to_duckdb(
+        self,
+        connection_id: str,
+        query: str,
+        duckdb_conn: Any,
+        table_name: str,
+        params: Optional[Dict] = None,
+        budget: Optional[StreamBudget] = None,
+    ) -> Dict[str, Any]:
+        """Load a warehouse extract into a DuckDB table batch by batch"""
+        try:
+            stream = self.stream_query(connection_id, query, params, budget)
+            result = await load_into_duckdb(stream, duckdb_conn, table_name)
+            logger.info(f"✅ Extracted {result['rows']} rows from {connection_id} into DuckDB table {table_name}")
+            return {"success": True, **result}
+        except Exception as e:
+            logger.error(f"❌ Extract to DuckDB failed: {str(e)}")
+            return {"success": False, "error": str(e)}
+
+    async def _execute_arrow_query(
+        self, connection: Dict, query: str, params: Optional[Dict], metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Run a query through the Arrow connector and shape it as a QueryResult dict"""
+        config = connection["config"]
+        connector = get_arrow_connector(config.connector_type.value)
+        stream = connector.stream(config, query, params)
+        table = await stream.to_table()
+        return {
+            "success": True,
+            "data": table.to_pylist(),
+            "columns": table.column_names,
+            "row_count": table.num_rows,
+            "query_id": stream.query_id,
+            "metadata": {**(metadata or {}), "stream": stream.summary()},
+        }
+
+    async def _ping_arrow_connector(self, config: ConnectionConfig) -> Dict[str, Any]:
+        """Connection test: run SELECT 1 on a pooled client"""
+        connector = get_arrow_connector(config.connector_type.value)
+        await connector.stream(config, "SELECT 1", budget=StreamBudget(max_rows=1)).to_table()
+        return {
+            "success": True,
+            "connection": None,
+            "message": f"{connector.name} connection test successful",
+        }
+
     # Snowflake Connector
     async def _connect_snowflake(
         self, config: ConnectionConfig, test_only: bool = False
     ) -> Dict[str, Any]:
         """Connect to Snowflake data warehouse"""
         try:
-            # For production, use snowflake-connector-python
-            # For now, simulate connection
+            # Clients are opened and pooled by the Arrow connector (arrow_connectors.py)
             connection_info = {
                 "account": config.host,
                 "warehouse": config.database,
@@ -362,17 +432,7 @@ class EnterpriseConnectorsService:
             }
 
             if test_only:
-                # Simulate connection test
-                await asyncio.sleep(0.1)
-                return {
-                    "success": True,
-                    "connection": None,
-                    "message": "Snowflake connection test successful",
-                }
-
-            # In production, create actual Snowflake connection
-            # import snowflake.connector
-            # conn = snowflake.connector.connect(**connection_info)
+                return await self._ping_arrow_connector(config)
 
             return {
                 "success": True,
@@ -389,29 +449,10 @@ class EnterpriseConnectorsService:
     ) -> Dict[str, Any]:
         """Execute query on Snowflake"""
         try:
-            # In production, use actual Snowflake connection
-            # For now, simulate query execution
-            await asyncio.sleep(0.5)  # Simulate query time
-
-            # Simulate query result
-            sample_data = [
-                {"id": 1, "name": "Product A", "sales": 1000.0, "date": "2024-01-01"},
-                {"id": 2, "name": "Product B", "sales": 1500.0, "date": "2024-01-02"},
-                {"id": 3, "name": "Product C", "sales": 800.0, "date": "2024-01-03"},
-            ]
-
-            return {
-                "success": True,
-                "data": sample_data,
-                "columns": ["id", "name", "sales", "date"],
-                "row_count": len(sample_data),
-                "query_id": f"sf_{int(datetime.now().timestamp())}",
-                "metadata": {
-                    "warehouse": connection["config"].database,
-                    "database": connection["config"].schema,
-                    "execution_time": 0.5,
-                },
-            }
+            return await self._execute_arrow_query(connection, query, params, {
+                "warehouse": connection["config"].database,
+                "database": connection["config"].schema,
+            })
 
         except Exception as e:
             logger.error(f"❌ Snowflake query execution failed: {str(e)}")
@@ -477,9 +518,6 @@ class EnterpriseConnectorsService:
     ) -> Dict[str, Any]:
         """Connect to Google BigQuery"""
         try:
-            # For production, use google-cloud-bigquery
-            # from google.cloud import bigquery
-
             connection_info = {
                 "project_id": config.database,
                 "credentials_path": config.metadata.get("credentials_path")
@@ -491,12 +529,7 @@ class EnterpriseConnectorsService:
             }
 
             if test_only:
-                await asyncio.sleep(0.1)
-                return {
-                    "success": True,
-                    "connection": None,
-                    "message": "BigQuery connection test successful",
-                }
+                return await self._ping_arrow_connector(config)
 
             return {
                 "success": True,
@@ -513,43 +546,12 @@ class EnterpriseConnectorsService:
     ) -> Dict[str, Any]:
         """Execute query on BigQuery"""
         try:
-            await asyncio.sleep(0.3)  # Simulate query time
-
-            sample_data = [
-                {
-                    "user_id": "user_001",
-                    "event_type": "purchase",
-                    "amount": 99.99,
-                    "timestamp": "2024-01-01T10:00:00Z",
-                },
-                {
-                    "user_id": "user_002",
-                    "event_type": "view",
-                    "amount": 0.0,
-                    "timestamp": "2024-01-01T11:00:00Z",
-                },
-                {
-                    "user_id": "user_003",
-                    "event_type": "purchase",
-                    "amount": 149.99,
-                    "timestamp": "2024-01-01T12:00:00Z",
-                },
-            ]
-
-            return {
-                "success": True,
-                "data": sample_data,
-                "columns": ["user_id", "event_type", "amount", "timestamp"],
-                "row_count": len(sample_data),
-                "query_id": f"bq_{int(datetime.now().timestamp())}",
-                "metadata": {
-                    "project_id": connection["config"].database,
-                    "location": connection["config"].metadata.get("location", "US")
-                    if connection["config"].metadata
-                    else "US",
-                    "execution_time": 0.3,
-                },
-            }
+            return await self._execute_arrow_query(connection, query, params, {
+                "project_id": connection["config"].database,
+                "location": connection["config"].metadata.get("location", "US")
+                if connection["config"].metadata
+                else "US",
+            })
 
         except Exception as e:
             logger.error(f"❌ BigQuery query execution failed: {str(e)}")
@@ -613,12 +615,7 @@ class EnterpriseConnectorsService:
             }
 
             if test_only:
-                await asyncio.sleep(0.1)
-                return {
-                    "success": True,
-                    "connection": None,
-                    "message": "Redshift connection test successful",
-                }
+                return await self._ping_arrow_connector(config)
 
             return {
                 "success": True,
@@ -635,73 +632,19 @@ class EnterpriseConnectorsService:
     ) -> Dict[str, Any]:
         """Execute query on Redshift"""
         try:
-            await asyncio.sleep(0.4)  # Simulate query time
-
-            sample_data = [
-                {
-                    "order_id": "ORD001",
-                    "customer_id": "CUST001",
-                    "total": 299.99,
-                    "order_date": "2024-01-01",
-                },
-                {
-                    "order_id": "ORD002",
-                    "customer_id": "CUST002",
-                    "total": 149.99,
-                    "order_date": "2024-01-02",
-                },
-                {
-                    "order_id": "ORD003",
-                    "customer_id": "CUST001",
-                    "total": 79.99,
-                    "order_date": "2024-01-03",
-                },
-            ]
-
-            return {
-                "success": True,
-                "data": sample_data,
-                "columns": ["order_id", "customer_id", "total", "order_date"],
-                "row_count": len(sample_data),
-                "query_id": f"rs_{int(datetime.now().timestamp())}",
-                "metadata": {
-                    "cluster": connection["config"].host,
-                    "database": connection["config"].database,
-                    "execution_time": 0.4,
-                },
-            }
+            return await self._execute_arrow_query(connection, query, params, {
+                "cluster": connection["config"].host,
+                "database": connection["config"].database,
+            })
 
         except Exception as e:
             logger.error(f"❌ Redshift query execution failed: {str(e)}")
             return {"success": False, "error": str(e)}
 
     async def _execute_postgresql_query(self, connection: Dict, query: str, params: Optional[Dict]) -> Dict[str, Any]:
-        """Execute a real query against PostgreSQL using psycopg2 in a thread."""
+        """Execute a real query against PostgreSQL through the streaming connector (server-side cursor)."""
         try:
-            cfg = connection.get('config')
-
-            def run():
-                import psycopg2
-                import psycopg2.extras
-
-                conn = psycopg2.connect(
-                    host=cfg.host,
-                    port=cfg.port or 5432,
-                    dbname=cfg.database,
-                    user=cfg.username,
-                    password=cfg.password,
-                    connect_timeout=10,
-                )
-                cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-                cur.execute(query)
-                rows = cur.fetchall()
-                cols = list(rows[0].keys()) if rows else []
-                cur.close()
-                conn.close()
-                return {"success": True, "data": rows, "columns": cols, "row_count": len(rows)}
-
-            res = await asyncio.to_thread(run)
-            return res
+            return await self._execute_arrow_query(connection, query, params)
         except Exception as e:
             logger.error(f"❌ Postgres query execution failed: {e}")
             return {"success": False, "error": str(e)}
@@ -763,12 +706,7 @@ class EnterpriseConnectorsService:
             }
 
             if test_only:
-                await asyncio.sleep(0.1)
-                return {
-                    "success": True,
-                    "connection": None,
-                    "message": "Databricks connection test successful",
-                }
+                return await self._ping_arrow_connector(config)
 
             return {
                 "success": True,
@@ -785,46 +723,15 @@ class EnterpriseConnectorsService:
     ) -> Dict[str, Any]:
         """Execute query on Databricks"""
         try:
-            await asyncio.sleep(0.6)  # Simulate query time
-
-            sample_data = [
-                {
-                    "product_id": "P001",
-                    "category": "Electronics",
-                    "price": 999.99,
-                    "in_stock": True,
-                },
-                {
-                    "product_id": "P002",
-                    "category": "Clothing",
-                    "price": 49.99,
-                    "in_stock": False,
-                },
-                {
-                    "product_id": "P003",
-                    "category": "Books",
-                    "price": 19.99,
-                    "in_stock": True,
-                },
-            ]
-
-            return {
-                "success": True,
-                "data": sample_data,
-                "columns": ["product_id", "category", "price", "in_stock"],
-                "row_count": len(sample_data),
-                "query_id": f"db_{int(datetime.now().timestamp())}",
-                "metadata": {
-                    "workspace": connection["config"].host,
-                    "catalog": connection["config"].metadata.get(
-                        "catalog", "hive_metastore"
-                    )
-                    if connection["config"].metadata
-                    else "hive_metastore",
-                    "schema": connection["config"].schema,
-                    "execution_time": 0.6,
-                },
-            }
+            return await self._execute_arrow_query(connection, query, params, {
+                "workspace": connection["config"].host,
+                "catalog": connection["config"].metadata.get(
+                    "catalog", "hive_metastore"
+                )
+                if connection["config"].metadata
+                else "hive_metastore",
+                "schema": connection["config"].schema,
+            })
 
         except Exception as e:
             logger.error(f"❌ Databricks query execution failed: {str(e)}")
@@ -1192,9 +1099,11 @@ class EnterpriseConnectorsService:
         """Delete enterprise connection"""
         try:
             if connection_id in self.connections:
-                # Close connection if needed
-                self.connections[connection_id]
-                # Add connection cleanup logic here
+                # Close pooled driver clients of this connection
+                config = self.connections[connection_id]["config"]
+                connector = get_arrow_connector(config.connector_type.value)
+                if connector is not None:
+                    connector.close(config)
 
                 # Remove from memory
                 del self.connections[connection_id]
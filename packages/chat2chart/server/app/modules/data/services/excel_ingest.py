@@ -0,0 +1,198 @@
+"""
+Excel Ingest
+Parses every worksheet of a workbook in parallel worker processes (calamine
+when installed, openpyxl/xlrd otherwise), writes each sheet once to Parquet and
+records row counts and column types from that single pass. Query engines
+attach the stored sheets as DuckDB views instead of re-reading the workbook.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.compute_executor import ComputeCancelled, compute_executor
+from app.core.compute_tasks import excel_reader_engine, excel_sheet_to_parquet, read_excel_sheet_names
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_ROWS = 10000
+
+
+def sheet_table_name(index: int, sheet: str) -> str:
+    """DuckDB-safe table name for a worksheet"""
+    table_name = f"sheet_{index}_{str(sheet).replace(' ', '_').replace('-', '_').replace('.', '_')[:50]}"
+    return re.sub(r'[^a-zA-Z0-9_]', '_', table_name)
+
+
+def _quote_path(path: str) -> str:
+    return path.replace("'", "''")
+
+
+def _describe_parquet(path: str) -> List[Dict[str, str]]:
+    """DuckDB column types of a Parquet file (footer read only, blocking)"""
+    import duckdb
+
+    conn = duckdb.connect()
+    try:
+        rows = conn.execute(f"DESCRIBE SELECT * FROM read_parquet('{_quote_path(path)}')").fetchall()
+        return [{'name': row[0], 'type': row[1]} for row in rows]
+    finally:
+        conn.close()
+
+
+def read_parquet_rows(path: str, limit: int = SAMPLE_ROWS) -> List[Dict[str, Any]]:
+    """First ``limit`` rows of a sheet's Parquet file as records (blocking)"""
+    import duckdb
+
+    conn = duckdb.connect()
+    try:
+        result = conn.execute(f"SELECT * FROM read_parquet('{_quote_path(path)}') LIMIT {int(limit)}")
+        columns = [desc[0] for desc in result.description]
+        return [dict(zip(columns, row)) for row in result.fetchall()]
+    finally:
+        conn.close()
+
+
+async def ingest_workbook(file_path: str, tenant: Optional[str] = None) -> Dict[str, Any]:
+    """Convert every sheet of a workbook to Parquet in parallel.
+
+    Returns ``{'work_dir', 'engine', 'sheets', 'failed'}`` where each sheet entry
+    holds its table name, Parquet path, row count and DuckDB column types. The
+    caller owns ``work_dir`` and must remove it (see ``cleanup_workbook``).
+    """
+    engine = excel_reader_engine(file_path)
+    try:
+        sheet_names = await compute_executor.run_cpu(read_excel_sheet_names, file_path, tenant=tenant)
+    except ComputeCancelled:
+        raise
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read Excel sheet names: {e}, using first sheet")
+        sheet_names = [0]
+
+    logger.info(f"📊 Found {len(sheet_names)} sheet(s) in Excel file (engine={engine or 'default'}): {sheet_names}")
+
+    work_dir = tempfile.mkdtemp(prefix="aiser_excel_")
+    results = await asyncio.gather(
+        *(
+            compute_executor.run_cpu(
+                excel_sheet_to_parquet,
+                file_path,
+                sheet,
+                os.path.join(work_dir, f"sheet_{idx}.parquet"),
+                engine,
+                tenant=tenant,
+            )
+            for idx, sheet in enumerate(sheet_names)
+        ),
+        return_exceptions=True,
+    )
+    if any(isinstance(result, ComputeCancelled) for result in results):
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise ComputeCancelled("Client disconnected during Excel parsing")
+
+    sheets, failed = [], {}
+    for idx, (sheet, result) in enumerate(zip(sheet_names, results)):
+        if isinstance(result, BaseException):
+            logger.warning(f"⚠️ Failed to process sheet '{sheet}': {result}")
+            failed[str(sheet)] = str(result)
+            continue
+        sheets.append({
+            'sheet': str(sheet),
+            'table_name': sheet_table_name(idx, sheet),
+            'path': result['path'],
+            'row_count': result['row_count'],
+        })
+
+    # Types come from the Parquet footers written above; no second pass over the data
+    described = await asyncio.gather(
+        *(compute_executor.run_duckdb(_describe_parquet, s['path'], tenant=tenant) for s in sheets)
+    )
+    for sheet, columns in zip(sheets, described):
+        sheet['columns'] = columns
+        logger.info(f"✅ Converted sheet '{sheet['sheet']}' to Parquet ({sheet['row_count']} rows, {len(columns)} columns)")
+
+    return {'work_dir': work_dir, 'engine': engine or 'default', 'sheets': sheets, 'failed': failed}
+
+
+def cleanup_workbook(workbook: Optional[Dict[str, Any]]) -> None:
+    if workbook and workbook.get('work_dir'):
+        shutil.rmtree(workbook['work_dir'], ignore_errors=True)
+
+
+def read_parquet_source(conn, path: str) -> str:
+    """Relation over a Parquet file scanned by DuckDB itself"""
+    return f"read_parquet('{_quote_path(path)}')"
+
+
+def arrow_parquet_source(conn, path: str) -> str:
+    """Relation over a Parquet file scanned through pyarrow (works with DuckDB external access disabled)"""
+    import uuid
+
+    import pyarrow.dataset as ds
+
+    name = f"_aiser_parquet_{uuid.uuid4().hex[:12]}"
+    conn.register(name, ds.dataset(path, format="parquet"))
+    return name
+
+
+def seal_connection(conn) -> None:
+    """Last step before a user statement on a DuckDB connection: no file, network or extension access
+    (COPY TO, read_csv('/path'), ATTACH, INSTALL all fail) and no SET that could turn it back on"""
+    conn.execute("SET enable_external_access = false")
+    conn.execute("SET lock_configuration = true")
+
+
+def table_parquet_source(conn, path: str) -> str:
+    """Parquet file copied into a table of the connection's database.
+
+    For databases that are checkpointed and reopened with external access
+    disabled, where neither read_parquet views nor registered Arrow objects
+    survive.
+    """
+    import uuid
+
+    name = f"_aiser_parquet_{uuid.uuid4().hex[:12]}"
+    conn.execute(f"CREATE TABLE {name} AS SELECT * FROM read_parquet('{_quote_path(path)}')")
+    return name
+
+
+def attach_columnar_sheets(
+    conn,
+    schema: Dict[str, Any],
+    resolve_path: Optional[Callable[[str], str]] = None,
+    primary_view: str = "data",
+    parquet_source: Callable[[Any, str], str] = read_parquet_source,
+) -> bool:
+    """Expose stored sheets as views on ``conn`` (blocking).
+
+    Creates one view per sheet under its recorded table name plus
+    ``primary_view`` over the primary sheet. Returns False when the schema has
+    no columnar sheets or a sheet file is missing, so callers can fall back to
+    parsing the workbook.
+    """
+    columnar_sheets = (schema or {}).get('columnar_sheets') or {}
+    tables = (schema or {}).get('duckdb_tables') or {}
+    if not columnar_sheets:
+        return False
+    if resolve_path is None:
+        from app.modules.data.services.postgres_storage_service import PostgresStorageService
+        resolve_path = PostgresStorageService().columnar_path
+
+    paths = {sheet: resolve_path(key) for sheet, key in columnar_sheets.items()}
+    if not all(os.path.exists(path) for path in paths.values()):
+        logger.warning("⚠️ Columnar sheet files missing, falling back to workbook parsing")
+        return False
+
+    sources = {sheet: parquet_source(conn, path) for sheet, path in paths.items()}
+    for idx, sheet in enumerate(paths):
+        table_name = tables.get(sheet) or sheet_table_name(idx, sheet)
+        conn.execute(f"CREATE OR REPLACE VIEW {table_name} AS SELECT * FROM {sources[sheet]}")
+
+    primary_table = schema.get('table_name')
+    primary_sheet = next((s for s, t in tables.items() if t == primary_table), None) or next(iter(paths))
+    conn.execute(f"CREATE OR REPLACE VIEW {primary_view} AS SELECT * FROM {sources[primary_sheet]}")
+    return True
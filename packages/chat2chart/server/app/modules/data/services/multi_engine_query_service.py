@@ -7,7 +7,7 @@ import logging
 import asyncio
 import os
 import json
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional
 from datetime import datetime
 from enum import Enum
 import pandas as pd
@@ -19,10 +19,36 @@ import duckdb
 import shutil
 import importlib.util
 
+from app.core.tracing import traced, STAGE_QUERY_EXECUTION
+from app.core.cache_invalidation import cache_tags, tags_for_data_source
+from app.core.compute_executor import ComputeCancelled, compute_executor
+from app.core.compute_tasks import read_excel_frame
+from app.modules.charts.utils.data_reduction import ReductionSpec, pushed_down_reduction, reduce_rows, reduction_sql
+from app.modules.data.services.excel_ingest import (
+    arrow_parquet_source,
+    attach_columnar_sheets,
+    read_parquet_source,
+    seal_connection,
+    table_parquet_source,
+)
+from app.modules.data.services.query_cost_model import (
+    QueryPerformanceMonitor,
+    query_cost_model,
+    query_performance_monitor,
+)
+from app.modules.data.services.api_workspace import api_workspace_manager
+from app.modules.data.services.data_source_catalog import data_source_catalog
+from app.modules.data.services.result_spill import ResultBudget, ResultCollector, collect_cursor
+from app.modules.data.services.sql_pipeline import normalize_dialect, sql_pipeline
+from app.modules.data.services.rollup_manager import rollup_manager
+
 # Spark for big data processing - import lazily inside SparkEngine to avoid heavy startup at import time
 
 logger = logging.getLogger(__name__)
 
+# Rollup builds run in the background; keep references so they are not collected mid-run
+_background_tasks: set = set()
+
 
 class QueryEngine(Enum):
     """Supported query engines"""
@@ -31,40 +57,7 @@ class QueryEngine(Enum):
     CUBE = "cube"
     SPARK = "spark"
     DIRECT_SQL = "direct_sql"
-    PANDAS = "pandas"
-
-
-class QueryOptimizer:
-    """Query optimization and engine selection"""
-
-    @staticmethod
-    def select_optimal_engine(
-        query: str, data_size: int, complexity: str
-    ) -> QueryEngine:
-        """Select optimal query engine based on query characteristics"""
-
-        # Normalize inputs to avoid TypeErrors when values are None or unexpected
-        try:
-            ds = int(data_size) if data_size is not None else 0
-        except Exception:
-            ds = 0
-        comp = (complexity or "").lower()
-
-        # Small datasets (< 1M rows) - prefer DuckDB for reliable SQL support
-        # DuckDB is fast and supports full SQL so use it as the default for small/medium datasets
-        if ds < 1_000_000:
-            return QueryEngine.DUCKDB
-
-        # Medium datasets (1M - 100M rows) - use DuckDB or Cube.js
-        elif ds < 100_000_000:
-            if "aggregation" in query.lower() or "group by" in query.lower():
-                return QueryEngine.CUBE
-            else:
-                return QueryEngine.DUCKDB
-
-        # Large datasets (> 100M rows) - use Spark
-        else:
-            return QueryEngine.SPARK
+    PANDAS = "pandas"  # API sources, queried in their DuckDB workspace
 
 
 class MultiEngineQueryService:
@@ -76,11 +69,22 @@ class MultiEngineQueryService:
             QueryEngine.DUCKDB: DuckDBEngine(),
             QueryEngine.CUBE: CubeEngine(),
             QueryEngine.DIRECT_SQL: DirectSQLEngine(),
-            QueryEngine.PANDAS: PandasEngine(),
         }
+        # "pandas" is kept as the engine name API clients send for API sources
+        self.engines[QueryEngine.PANDAS] = ApiSourceEngine(
+            self.engines[QueryEngine.DUCKDB], self.engines[QueryEngine.DIRECT_SQL]
+        )
+
+        from app.core.config import settings
 
         self.query_cache = {}
-        self.cache_ttl = 300  # 5 minutes
+        # Entries are evicted by tag when their data source changes, so the TTL can be long
+        self.cache_ttl = settings.QUERY_RESULT_CACHE_TTL
+        self._cache_tier = cache_tags.register_tier(f"multi_engine_query:{id(self)}", self._evict_cached)
+
+    def _evict_cached(self, keys: List[str]) -> None:
+        for key in keys:
+            self.query_cache.pop(key, None)
 
     def _is_spark_available(self) -> bool:
         """Detect whether Spark (pyspark) and a Java runtime are available.
@@ -104,18 +108,30 @@ class MultiEngineQueryService:
             logger.debug(f"Spark availability check failed: {e}")
             return False
 
+    @traced(STAGE_QUERY_EXECUTION)
     async def execute_query(
         self,
         query: str,
         data_source: Dict[str, Any],
         engine: Optional[QueryEngine] = None,
         optimization: bool = True,
+        approximate: Optional[bool] = False,
+        budget: Optional[ResultBudget] = None,
     ) -> Dict[str, Any]:
-        """Execute query using optimal or specified engine"""
+        """Execute query using optimal or specified engine.
+
+        ``approximate=True`` answers eligible aggregates from a sample with
+        error bounds (see ``execute_approximate``); ``approximate=None`` lets
+        the cost model decide whether sampling is the faster strategy.
+        ``budget`` bounds the rows/bytes returned inline and the statement
+        timeout; results past it come back with a ``spill`` handle.
+        """
+        if approximate:
+            return await self.execute_approximate(query, data_source, engine)
         try:
             logger.info(f"🔍 Executing query with optimization: {optimization}")
             # Org/Project scoped cache (Redis-backed if available) in addition to in-memory TTL cache
-            from app.core.cache import cache
+            from app.core.cache import async_cache
 
             cache_key_scoped = None
             try:
@@ -133,13 +149,14 @@ class MultiEngineQueryService:
                         "engine": engine_tag,
                         "optimization": optimization,
                         "query": query,
+                        "budget": (budget.max_rows, budget.max_bytes) if budget else None,
                     },
                     sort_keys=True,
                 )
                 import hashlib as _hash
 
                 cache_key_scoped = f"qe:{_hash.md5(key_payload.encode()).hexdigest()}"
-                scoped_cached = cache.get(cache_key_scoped) if cache else None
+                scoped_cached = await async_cache.get(cache_key_scoped) if async_cache else None
                 if optimization and scoped_cached is not None:
                     logger.info("✅ Returning Redis-scoped cached result")
                     return {**scoped_cached, "cached": True}
@@ -147,7 +164,8 @@ class MultiEngineQueryService:
                 cache_key_scoped = None
 
             # Analyze query and data source
-            query_analysis = self._analyze_query(query, data_source)
+            profile = query_cost_model.profile(query, data_source, _sql_dialect(data_source))
+            query_analysis = self._analyze_query(query, data_source, profile)
 
             # CRITICAL: For file data sources, validate and optionally rewrite table names
             # Support THREE naming conventions:
@@ -155,70 +173,37 @@ class MultiEngineQueryService:
             # 2. 'file_XXXXX' - multi-file support, each file as separate table
             # 3. Unrelated tables - rewrite to 'data' for backward compat (fallback)
             if data_source.get('type') == 'file':
-                import re
-                # Pattern to match: FROM "table" or FROM table or FROM "schema"."table"
-                # Handles both quoted identifiers (double quotes) and unquoted, including file_* patterns
-                table_pattern = r'(?i)(from|join)\s+(?:"([^"]+)"|`([^`]+)`|([a-zA-Z0-9_\.]+))'
-                matches = list(re.finditer(table_pattern, query))
-                table_names_found = []
-                for match in matches:
-                    # match.group(1) = FROM/JOIN keyword, match.group(2) = double-quoted, match.group(3) = backtick-quoted, match.group(4) = unquoted
-                    table_name = match.group(2) or match.group(3) or match.group(4)
-                    keyword = match.group(1).upper()
-                    # Only rewrite if table name is NOT one of:
-                    # - 'data' (backward compatible)
-                    # - 'file_*' (file ID for multi-file support)
-                    # - '_aiser_inline_df' (inline data)
-                    is_valid_file_table = (
-                        table_name.lower() in ("data", "_aiser_inline_df") or
-                        table_name.lower().startswith("file_")
-                    )
-                    if table_name and not is_valid_file_table:
-                        # This is an invalid table name - needs rewriting to 'data' or appropriate file_id
-                        table_names_found.append((table_name, keyword, match.start(), match.end()))
-                
-                if table_names_found:
-                    # Rewrite query to use 'data' table
-                    logger.warning(f"🔄 File data source detected - rewriting table name(s) {[t[0] for t in table_names_found]} to 'data'")
-                    try:
-                        import re as _re
-                        rewritten = query
-                        # Replace in reverse order to preserve positions
-                        for table_name, keyword, start, end in reversed(table_names_found):
-                            # Match the entire FROM/JOIN clause with the table name
-                            # Handle all quote styles: "table", `table`, or unquoted table
-                            # More robust pattern that handles all cases
-                            if '"' in query[start:end]:
-                                # Double-quoted identifier
-                                pattern = rf'(?i)({keyword})\s+"{_re.escape(table_name)}"'
-                                replacement = f'{keyword} "data"'
-                            elif '`' in query[start:end]:
-                                # Backtick-quoted identifier
-                                pattern = rf'(?i)({keyword})\s+`{_re.escape(table_name)}`'
-                                replacement = f'{keyword} "data"'
-                            else:
-                                # Unquoted identifier - use word boundary
-                                pattern = rf'(?i)({keyword})\s+{_re.escape(table_name)}\b'
-                                replacement = f'{keyword} "data"'
-                            
-                            rewritten = _re.sub(pattern, replacement, rewritten)
-                        
-                        if rewritten != query:
-                            logger.info(f"✅ Rewritten query for file data source:\nOriginal: {query}\nRewritten: {rewritten}")
-                            query_analysis['original_query'] = query
-                            query = rewritten
-                            query_analysis['note'] = f"Query table name(s) {[t[0] for t in table_names_found]} rewritten to 'data' for file data source"
-                        else:
-                            logger.warning(f"⚠️ Query rewriting didn't change query - pattern might not match")
-                    except Exception as _e:
-                        logger.error(f"❌ Failed to rewrite query table name: {_e}", exc_info=True)
-                        # Don't fail the query, but log the error for debugging
-
-            # Select engine if not specified
+                rewritten, replaced_tables = self._rewrite_file_table_names(query)
+                if replaced_tables:
+                    query_analysis['original_query'] = query
+                    query = rewritten
+                    query_analysis['note'] = f"Query table name(s) {replaced_tables} rewritten to 'data' for file data source"
+
+            # Frequent aggregate shapes may already be pre-aggregated in a rollup
+            if optimization and not engine:
+                served = await self._execute_on_rollup(query, data_source, query_analysis)
+                if served is not None:
+                    return served
+
+            # Select engine if not specified: lowest predicted latency among the engines that can serve this source
             if not engine:
-                engine = QueryOptimizer.select_optimal_engine(
-                    query, query_analysis["data_size"], query_analysis["complexity"]
+                decision = query_cost_model.decide(
+                    query,
+                    data_source,
+                    self._candidate_engines(data_source, query_analysis),
+                    allow_approximate=approximate is None and self._can_approximate(data_source),
+                    profile=profile,
                 )
+                logger.info(f"🧮 Cost model: {decision.reason}")
+                if decision.strategy == "approximate":
+                    return await self.execute_approximate(query, data_source)
+                engine = QueryEngine(decision.engine)
+                query_analysis["engine_decision"] = {
+                    "engine": decision.engine,
+                    "strategy": decision.strategy,
+                    "predicted_seconds": decision.predicted_seconds,
+                    "reason": decision.reason,
+                }
             
             # Route file sources to appropriate engines (DuckDB or Pandas, not Direct SQL)
             if data_source.get("type") == "file":
@@ -229,18 +214,18 @@ class MultiEngineQueryService:
                     logger.info("File data source detected; switching from Cube.js to DuckDB engine")
                     engine = QueryEngine.DUCKDB
             
-            # Route API sources to appropriate engines (Pandas for REST API data, DuckDB for structured data)
+            # Route API sources to their workspace engine (QueryEngine.PANDAS)
             elif data_source.get("type") == "api":
                 if engine == QueryEngine.DIRECT_SQL:
-                    logger.info("API data source detected; switching from Direct SQL to Pandas engine")
+                    logger.info("API data source detected; switching from Direct SQL to the API workspace engine")
                     engine = QueryEngine.PANDAS
                 elif engine == QueryEngine.CUBE:
-                    logger.info("API data source detected; switching from Cube.js to Pandas engine")
+                    logger.info("API data source detected; switching from Cube.js to the API workspace engine")
                     engine = QueryEngine.PANDAS
                 elif engine == QueryEngine.DUCKDB:
-                    # DuckDB can work with API data if it's structured, but Pandas is more flexible
-                    logger.info("API data source detected; using DuckDB (can handle structured API responses)")
-                    # Keep DuckDB - it can handle structured data from APIs
+                    # API responses are queried with DuckDB inside the source's workspace
+                    logger.info("API data source detected; running DuckDB in the API source workspace")
+                    engine = QueryEngine.PANDAS
             
             # If DuckDB was selected but the data source is a remote database, prefer Direct SQL
             elif engine == QueryEngine.DUCKDB and data_source.get("type") in ("database", "warehouse"):
@@ -253,7 +238,7 @@ class MultiEngineQueryService:
 
             # Check cache first
             cache_key = self._generate_cache_key(query, data_source, engine)
-            if optimization and cache_key in self.query_cache:
+            if optimization and budget is None and cache_key in self.query_cache:
                 cached_result = self.query_cache[cache_key]
                 try:
                     ts = cached_result.get("timestamp")
@@ -286,19 +271,37 @@ class MultiEngineQueryService:
 
             # Execute query
             start_time = datetime.now()
-            result = await self.engines[engine].execute(query, data_source, query_analysis)
+            query_analysis["budget"] = budget or ResultBudget.default()
+            try:
+                result = await self.engines[engine].execute(query, data_source, query_analysis)
+            finally:
+                query_analysis.pop("budget", None)
             execution_time = (datetime.now() - start_time).total_seconds()
+            query_performance_monitor.record_query_performance(
+                engine,
+                execution_time,
+                query_analysis["data_size"],
+                query_analysis["complexity"],
+                data_source_id=data_source.get("id") or data_source.get("data_source_id"),
+                work_units=query_analysis["work_units"],
+                success=bool(result.get("success")),
+            )
+            if result.get("success"):
+                self._observe_for_rollups(query, data_source)
 
-            # Cache result if optimization is enabled
-            if optimization and result["success"]:
+            # Cache result if optimization is enabled (spilled results are paged from their file instead)
+            if optimization and result["success"] and "spill" not in result and not result.get("truncated"):
                 self.query_cache[cache_key] = {
                     "data": result["data"],
                     "timestamp": datetime.now().timestamp(),
                 }
+                dependency_tags = tags_for_data_source(data_source)
+                cache_tags.tag(self._cache_tier, cache_key, dependency_tags)
                 # Persist to Redis-scoped cache with TTL
                 try:
-                    if cache_key_scoped and cache:
-                        cache.set(cache_key_scoped, result, ttl=self.cache_ttl)
+                    if cache_key_scoped and async_cache:
+                        await async_cache.set(cache_key_scoped, result, ttl=self.cache_ttl)
+                        await cache_tags.tag_redis_key(cache_key_scoped, dependency_tags, ttl=self.cache_ttl)
                 except Exception:
                     pass
 
@@ -323,6 +326,37 @@ class MultiEngineQueryService:
                 "engine": selected_engine_value if 'selected_engine_value' in locals() else (engine.value if engine else "unknown"),
             }
 
+    async def execute_chart_query(
+        self,
+        query: str,
+        data_source: Dict[str, Any],
+        reduction: ReductionSpec,
+        engine: Optional[QueryEngine] = None,
+        optimization: bool = True,
+    ) -> Dict[str, Any]:
+        """Execute a chart's query with its data reduced to what the chart can show.
+
+        SQL sources run the reduction as part of the query (M4, binning or
+        top-N aggregation); otherwise, or if that query fails, the full result
+        is reduced in memory. ``result["reduction"]`` records what was applied.
+        """
+        dialect = _sql_dialect(data_source) if data_source.get("type") != "api" else None
+        pushed = reduction_sql(query, reduction, dialect) if dialect else None
+        if pushed:
+            result = await self.execute_query(pushed, data_source, engine, optimization)
+            if result.get("success"):
+                result["reduction"] = pushed_down_reduction(reduction, result.get("data") or [])
+                return result
+            logger.warning(f"⚠️ Pushed-down chart reduction failed, reducing in memory: {result.get('error')}")
+
+        result = await self.execute_query(query, data_source, engine, optimization)
+        if result.get("success"):
+            reduced = reduce_rows(result.get("data") or [], reduction)
+            result["data"] = reduced["rows"]
+            result["row_count"] = len(reduced["rows"])
+            result["reduction"] = reduced["reduction"]
+        return result
+
     async def execute_parallel_queries(
         self, queries: List[Dict[str, Any]], data_source: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
@@ -362,25 +396,345 @@ class MultiEngineQueryService:
             logger.error(f"❌ Parallel query execution failed: {str(e)}")
             return [{"success": False, "error": str(e)} for _ in queries]
 
-    def _analyze_query(self, query: str, data_source: Dict[str, Any]) -> Dict[str, Any]:
+    async def execute_queries_shared(
+        self,
+        queries: List[str],
+        data_source: Dict[str, Any],
+        max_parallel: Optional[int] = None,
+        optimization: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Run several queries against one data source concurrently.
+
+        File sources are loaded once into a shared read-only DuckDB database
+        and every query runs on its own cursor; other sources fall back to
+        concurrent execute_query calls. Results are returned in query order.
+        """
+        from app.core.config import settings
+
+        max_parallel = max_parallel or settings.ANALYSIS_MAX_PARALLEL_QUERIES
+        if data_source.get("type") != "file":
+            semaphore = asyncio.Semaphore(max(1, max_parallel))
+
+            async def _bounded(q: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.execute_query(q, data_source, optimization=optimization)
+
+            return list(await asyncio.gather(*(_bounded(q) for q in queries)))
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        pending: List[tuple] = []
+        now = datetime.now().timestamp()
+        for i, query in enumerate(queries):
+            rewritten, _ = self._rewrite_file_table_names(query)
+            cache_key = self._generate_cache_key(rewritten, data_source, QueryEngine.DUCKDB)
+            cached = self.query_cache.get(cache_key) if optimization else None
+            if cached and now - cached.get("timestamp", 0) < self.cache_ttl:
+                data = cached.get("data") or []
+                results[i] = {
+                    "success": True,
+                    "data": data,
+                    "columns": list(data[0].keys()) if data else [],
+                    "row_count": len(data),
+                    "engine": QueryEngine.DUCKDB.value,
+                    "cached": True,
+                    "execution_time": 0.001,
+                }
+            else:
+                pending.append((i, rewritten, cache_key))
+
+        if pending:
+            engine: DuckDBEngine = self.engines[QueryEngine.DUCKDB]
+            try:
+                async with await engine.open_shared_dataset(data_source, max_parallel) as dataset:
+                    executed = await dataset.execute_many([q for _, q, _ in pending])
+            except Exception as e:
+                logger.error(f"❌ Shared dataset load failed: {e}")
+                executed = [{"success": False, "error": str(e)} for _ in pending]
+
+            dependency_tags = tags_for_data_source(data_source)
+            for (i, _, cache_key), result in zip(pending, executed):
+                result["engine"] = QueryEngine.DUCKDB.value
+                # Spilled/truncated results are partial inline; only complete results are cached
+                if optimization and result.get("success") and "spill" not in result and not result.get("truncated"):
+                    self.query_cache[cache_key] = {"data": result["data"], "timestamp": datetime.now().timestamp()}
+                    cache_tags.tag(self._cache_tier, cache_key, dependency_tags)
+                results[i] = result
+
+        logger.info(f"✅ Executed {len(queries)} queries on a shared dataset ({len(pending)} ran, {len(queries) - len(pending)} cached)")
+        return results
+
+    async def execute_approximate(
+        self,
+        query: str,
+        data_source: Dict[str, Any],
+        engine: Optional[QueryEngine] = None,
+    ) -> Dict[str, Any]:
+        """Answer an aggregate query from a sample, with 95% error bounds.
+
+        File sources read the maintained stratified sample; warehouses sample
+        inside the query. Queries or sources that cannot be approximated run
+        exactly and report why under ``approximation.reason``.
+        """
+        from app.modules.data.services import approximate_query as aq
+
+        start_time = datetime.now()
+        try:
+            source_type = data_source.get("type")
+            if source_type == "file":
+                rewritten, _ = self._rewrite_file_table_names(query)
+                plan = aq.plan_approximate_query(rewritten, "duckdb", weight_column=aq.WEIGHT_COLUMN)
+                duck: DuckDBEngine = self.engines[QueryEngine.DUCKDB]
+                sample = await aq.sample_store.get_sample(data_source, duck._load_file_dataset, tenant=_tenant_of(data_source))
+                if not sample:
+                    raise aq.ApproximationNotApplicable("Dataset is small enough to run exactly")
+                result = await duck.execute_on_parquet(plan.sql, sample["path"], data_source)
+                method, sample_percent = "stratified_sample", sample["sample_rate"] * 100
+            elif source_type in ("database", "warehouse") and aq.sampling_dialect(data_source):
+                sample_percent = aq.table_sample_percent(data_source.get("row_count"))
+                plan = aq.plan_approximate_query(
+                    query, aq.sampling_dialect(data_source), table_sample_percent=sample_percent
+                )
+                result = await self.engines[QueryEngine.DIRECT_SQL].execute(
+                    plan.sql, data_source, self._analyze_query(plan.sql, data_source)
+                )
+                method, sample = "table_sample", {}
+            else:
+                raise aq.ApproximationNotApplicable("Sampling is not supported for this data source")
+            if not result.get("success"):
+                raise aq.ApproximationNotApplicable(f"Sampled query failed: {result.get('error')}")
+        except aq.ApproximationNotApplicable as e:
+            logger.info(f"🎯 Running exactly: {e}")
+            result = await self.execute_query(query, data_source, engine)
+            result["approximate"] = False
+            result["approximation"] = {"applied": False, "reason": str(e)}
+            return result
+
+        approximation = aq.finalize_rows(result["data"], plan)
+        approximation.update({
+            "applied": True,
+            "method": method,
+            "sample_percent": sample_percent,
+            "sample_rows": sample.get("sample_rows"),
+            "population_rows": sample.get("population_rows") or data_source.get("row_count"),
+            "strata_column": sample.get("strata_column"),
+            "exact_query": plan.exact_sql,
+        })
+        result["columns"] = [c for c in result.get("columns", []) if not c.startswith("__approx_")]
+        result.update({
+            "approximate": True,
+            "approximation": approximation,
+            "engine": QueryEngine.DUCKDB.value if method == "stratified_sample" else QueryEngine.DIRECT_SQL.value,
+            "execution_time": (datetime.now() - start_time).total_seconds(),
+        })
+        logger.info(
+            f"🎯 Approximate query answered from a {method} ({sample_percent:.3g}% sample, "
+            f"{approximation['unreliable_groups']} low-sample groups)"
+        )
+        return result
+
+    async def refine_to_exact(self, query: str, data_source: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Follow-up to an approximate answer: progressively larger samples, then the exact result.
+
+        Yields one result per stage; the last one has ``final: True``. File
+        sources are loaded once and every stage runs on that shared dataset.
+        """
+        from app.modules.data.services import approximate_query as aq
+
+        stage = 0
+
+        def staged(result: Dict[str, Any], percent: Optional[float], plan=None) -> Dict[str, Any]:
+            nonlocal stage
+            stage += 1
+            if plan is not None and result.get("success"):
+                result["approximation"] = aq.finalize_rows(result["data"], plan)
+                result["columns"] = [c for c in result.get("columns", []) if not c.startswith("__approx_")]
+            result.update({"stage": stage, "final": percent is None, "sample_percent": percent})
+            return result
+
+        source_type = data_source.get("type")
+        try:
+            if source_type == "file":
+                rewritten, _ = self._rewrite_file_table_names(query)
+                exact_sql = aq.plan_approximate_query(rewritten, "duckdb", weight_column=aq.WEIGHT_COLUMN).exact_sql
+                duck: DuckDBEngine = self.engines[QueryEngine.DUCKDB]
+                sample = await aq.sample_store.get_sample(data_source, duck._load_file_dataset, tenant=_tenant_of(data_source))
+                async with await duck.open_shared_dataset(data_source) as dataset:
+                    for percent in aq.refine_percents(sample["sample_rate"] * 100 if sample else 100):
+                        plan = aq.plan_approximate_query(rewritten, "duckdb", table_sample_percent=percent)
+                        yield staged(await dataset.execute(plan.sql), percent, plan)
+                    yield staged(await dataset.execute(exact_sql), None)
+                return
+
+            dialect = aq.sampling_dialect(data_source)
+            if source_type in ("database", "warehouse") and dialect:
+                exact_sql = aq.plan_approximate_query(query, dialect, table_sample_percent=100).exact_sql
+                start = aq.table_sample_percent(data_source.get("row_count"))
+                direct = self.engines[QueryEngine.DIRECT_SQL]
+                for percent in aq.refine_percents(start):
+                    plan = aq.plan_approximate_query(query, dialect, table_sample_percent=percent)
+                    yield staged(await direct.execute(plan.sql, data_source, self._analyze_query(plan.sql, data_source)), percent, plan)
+                yield staged(await self.execute_query(exact_sql, data_source), None)
+                return
+        except aq.ApproximationNotApplicable as e:
+            logger.info(f"🎯 Refining directly to exact: {e}")
+        yield staged(await self.execute_query(query, data_source), None)
+
+    async def _execute_on_rollup(
+        self, query: str, data_source: Dict[str, Any], query_analysis: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Answer an aggregate from a matching rollup; None to run it on the raw data"""
+        try:
+            matched = rollup_manager.match(query, data_source, _sql_dialect(data_source))
+        except Exception as e:
+            logger.warning(f"⚠️ Rollup matching failed: {e}")
+            return None
+        if not matched:
+            return None
+        rollup, rollup_sql = matched
+
+        start_time = datetime.now()
+        if rollup.kind == "parquet":
+            engine = QueryEngine.DUCKDB
+            result = await self.engines[engine].execute_on_parquet(rollup_sql, rollup.location, data_source)
+        else:
+            engine = QueryEngine.DIRECT_SQL
+            result = await self.engines[engine].execute(rollup_sql, data_source, query_analysis)
+        if not result.get("success"):
+            logger.warning(f"⚠️ Rollup {rollup.name} failed, querying raw data: {result.get('error')}")
+            return None
+
+        execution_time = (datetime.now() - start_time).total_seconds()
+        query_analysis["rollup"] = {"name": rollup.name, "kind": rollup.kind, "rows": rollup.rows}
+        result.update({"engine": engine.value, "execution_time": execution_time, "query_analysis": query_analysis})
+        logger.info(f"🧱 Query answered from rollup {rollup.name} ({rollup.rows} rows) in {execution_time:.2f}s")
+        return result
+
+    def _observe_for_rollups(self, query: str, data_source: Dict[str, Any]) -> None:
+        """Count the query's shape and build rollups in the background once it recurs"""
+        try:
+            dialect = _sql_dialect(data_source)
+            if rollup_manager.observe(query, data_source, dialect) or rollup_manager.stale_views(data_source):
+                task = asyncio.get_running_loop().create_task(self.maintain_rollups(data_source))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+        except Exception as e:
+            logger.debug(f"Rollup observation skipped: {e}")
+
+    async def maintain_rollups(self, data_source: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Build rollups for the source's frequent query patterns and refresh stale ones"""
+        from dataclasses import asdict
+
+        duck: DuckDBEngine = self.engines[QueryEngine.DUCKDB]
+
+        async def run_sql(sql: str) -> Dict[str, Any]:
+            return await self.execute_maintenance_sql(sql, data_source)
+
+        built = await rollup_manager.maintain(
+            data_source,
+            _sql_dialect(data_source),
+            load=duck._load_file_dataset,
+            run_sql=run_sql,
+            tenant=_tenant_of(data_source),
+        )
+        return [asdict(rollup) for rollup in built]
+
+    @staticmethod
+    def sql_dialect(data_source: Dict[str, Any]) -> Optional[str]:
+        return _sql_dialect(data_source)
+
+    async def execute_maintenance_sql(self, sql: str, data_source: Dict[str, Any]) -> Dict[str, Any]:
+        """Run server-issued DDL (materialized views) on a database source, bypassing the read-only guard"""
+        return await self.engines[QueryEngine.DIRECT_SQL].execute(sql, data_source, {"allow_ddl": True})
+
+    def _rewrite_file_table_names(self, query: str):
+        """Rewrite table names a file data source cannot have to 'data'.
+
+        Returns (query, replaced_table_names); the query is unchanged when
+        nothing needed rewriting. Tables are rebound on the parsed AST; the
+        text-level rewrite only handles SQL the parser rejects.
+        """
+        compiled = sql_pipeline.compile(query, read="duckdb", rebind_file_tables=True)
+        if compiled.parsed:
+            if compiled.rebound_tables:
+                logger.warning(f"🔄 File data source detected - rewriting table name(s) {compiled.rebound_tables} to 'data'")
+            return compiled.sql, compiled.rebound_tables
+        return self._rewrite_file_table_names_text(query)
+
+    def _rewrite_file_table_names_text(self, query: str):
+        """Regex fallback of ``_rewrite_file_table_names`` for unparsable SQL"""
+        import re
+        # Pattern to match: FROM "table" or FROM table or FROM "schema"."table"
+        # Handles both quoted identifiers (double quotes) and unquoted, including file_* patterns
+        table_pattern = r'(?i)(from|join)\s+(?:"([^"]+)"|`([^`]+)`|([a-zA-Z0-9_\.]+))'
+        matches = list(re.finditer(table_pattern, query))
+        # Names the query defines itself (WITH name AS (...)) are not file tables
+        cte_names = {
+            (m.group(1) or m.group(2)).lower()
+            for m in re.finditer(r'(?i)(?:\bwith|,)\s*(?:recursive\s+)?(?:"([^"]+)"|([a-zA-Z_][a-zA-Z0-9_]*))\s+as\s*\(', query)
+        }
+        table_names_found = []
+        for match in matches:
+            # match.group(1) = FROM/JOIN keyword, match.group(2) = double-quoted, match.group(3) = backtick-quoted, match.group(4) = unquoted
+            table_name = match.group(2) or match.group(3) or match.group(4)
+            keyword = match.group(1).upper()
+            # Only rewrite if table name is NOT one of:
+            # - 'data' (backward compatible)
+            # - 'file_*' (file ID for multi-file support)
+            # - '_aiser_inline_df' (inline data)
+            is_valid_file_table = (
+                table_name.lower() in ("data", "_aiser_inline_df") or
+                table_name.lower().startswith("file_") or
+                table_name.lower() in cte_names
+            )
+            if table_name and not is_valid_file_table:
+                # This is an invalid table name - needs rewriting to 'data' or appropriate file_id
+                table_names_found.append((table_name, keyword, match.start(), match.end()))
+        
+        if not table_names_found:
+            return query, []
+        
+        # Rewrite query to use 'data' table
+        logger.warning(f"🔄 File data source detected - rewriting table name(s) {[t[0] for t in table_names_found]} to 'data'")
+        try:
+            rewritten = query
+            # Replace in reverse order to preserve positions
+            for table_name, keyword, start, end in reversed(table_names_found):
+                # Match the entire FROM/JOIN clause with the table name
+                # Handle all quote styles: "table", `table`, or unquoted table
+                if '"' in query[start:end]:
+                    # Double-quoted identifier
+                    pattern = rf'(?i)({keyword})\s+"{re.escape(table_name)}"'
+                elif '`' in query[start:end]:
+                    # Backtick-quoted identifier
+                    pattern = rf'(?i)({keyword})\s+`{re.escape(table_name)}`'
+                else:
+                    # Unquoted identifier - use word boundary
+                    pattern = rf'(?i)({keyword})\s+{re.escape(table_name)}\b'
+                rewritten = re.sub(pattern, f'{keyword} "data"', rewritten)
+            
+            if rewritten != query:
+                logger.info(f"✅ Rewritten query for file data source:\nOriginal: {query}\nRewritten: {rewritten}")
+                return rewritten, [t[0] for t in table_names_found]
+            logger.warning(f"⚠️ Query rewriting didn't change query - pattern might not match")
+        except Exception as _e:
+            logger.error(f"❌ Failed to rewrite query table name: {_e}", exc_info=True)
+            # Don't fail the query, but log the error for debugging
+        return query, []
+
+    def _analyze_query(self, query: str, data_source: Dict[str, Any], profile=None) -> Dict[str, Any]:
         """Analyze query characteristics for optimization"""
-        query_lower = query.lower()
+        features, stats, work = profile or query_cost_model.profile(query, data_source, _sql_dialect(data_source))
 
         analysis = {
-            "data_size": data_source.get("row_count", 0),
+            "data_size": data_source.get("row_count") or sum(t["rows"] for t in stats["tables"].values()),
             "complexity": "simple",
-            "has_joins": "join" in query_lower,
-            "has_aggregations": any(
-                op in query_lower
-                for op in ["sum", "count", "avg", "max", "min", "group by"]
-            ),
-            "has_subqueries": "select" in query_lower
-            and query_lower.count("select") > 1,
-            "has_window_functions": any(
-                func in query_lower
-                for func in ["row_number", "rank", "dense_rank", "over"]
-            ),
+            "has_joins": features.joins > 0,
+            "has_aggregations": bool(features.aggregates or features.group_by),
+            "has_subqueries": features.subqueries > 0,
+            "has_window_functions": features.window_functions > 0,
             "estimated_complexity": "simple",
+            "tables": features.tables,
+            "work_units": work,
         }
 
         # Calculate complexity score
@@ -403,6 +757,56 @@ class MultiEngineQueryService:
 
         return analysis
 
+    def _candidate_engines(self, data_source: Dict[str, Any], query_analysis: Dict[str, Any]) -> List[str]:
+        """Engines able to serve this data source, for the cost model to choose from"""
+        source_type = data_source.get("type")
+        if source_type == "file":
+            candidates = [QueryEngine.DUCKDB]
+            if data_source.get("format", "csv") in ("csv", "parquet", "json") and self._is_spark_available():
+                candidates.append(QueryEngine.SPARK)
+        elif source_type == "api":
+            candidates = [QueryEngine.PANDAS]
+        elif source_type in ("database", "warehouse"):
+            candidates = [QueryEngine.DIRECT_SQL]
+            # Cube.js only serves single-table aggregations, and only where it is deployed
+            if query_analysis["has_aggregations"] and not query_analysis["has_joins"] and os.getenv("CUBE_API_URL"):
+                candidates.append(QueryEngine.CUBE)
+        else:
+            candidates = [QueryEngine.DUCKDB]
+        return [c.value for c in candidates]
+
+    def _can_approximate(self, data_source: Dict[str, Any]) -> bool:
+        """Whether a sampled answer is available for this source (see approximate_query)"""
+        from app.core.config import settings
+        from app.modules.data.services import approximate_query as aq
+
+        row_count = data_source.get("row_count")
+        if data_source.get("type") == "file":
+            return bool(row_count) and row_count >= settings.APPROX_MIN_ROWS
+        if data_source.get("type") in ("database", "warehouse") and aq.sampling_dialect(data_source):
+            return not row_count or row_count >= settings.APPROX_MIN_ROWS
+        return False
+
+    async def explain_query(
+        self, query: str, data_source: Dict[str, Any], allow_approximate: bool = False
+    ) -> Dict[str, Any]:
+        """Engine/strategy decision for a query without running it"""
+        try:
+            if data_source.get("type") == "file":
+                query, _ = self._rewrite_file_table_names(query)
+            profile = query_cost_model.profile(query, data_source, _sql_dialect(data_source))
+            decision = query_cost_model.decide(
+                query,
+                data_source,
+                self._candidate_engines(data_source, self._analyze_query(query, data_source, profile)),
+                allow_approximate=allow_approximate and self._can_approximate(data_source),
+                profile=profile,
+            )
+            return {"success": True, "decision": decision.to_dict()}
+        except Exception as e:
+            logger.error(f"❌ Query explain failed: {str(e)}")
+            return {"success": False, "error": str(e)}
+
     def _generate_cache_key(
         self, query: str, data_source: Dict[str, Any], engine: QueryEngine
     ) -> str:
@@ -413,6 +817,76 @@ class MultiEngineQueryService:
         return hashlib.md5(key_data.encode()).hexdigest()
 
 
+def _sql_dialect(data_source: Dict[str, Any]) -> Optional[str]:
+    """sqlglot dialect the query is written in (file and API sources run on DuckDB)"""
+    if data_source.get("type") in ("file", "api"):
+        return "duckdb"
+    from app.modules.data.services.approximate_query import sampling_dialect
+
+    return sampling_dialect(data_source)
+
+
+def _tenant_of(data_source: Dict[str, Any]) -> Optional[str]:
+    """Fairness key for offloaded work; None falls back to the request's tenant"""
+    tenant = data_source.get("organization_id") or data_source.get("user_id")
+    return str(tenant) if tenant else None
+
+
+def _budget_of(analysis: Optional[Dict[str, Any]]) -> ResultBudget:
+    """The request's result budget (server defaults when the caller set none)"""
+    return (analysis or {}).get("budget") or ResultBudget.default()
+
+
+def _statement_timeout_sql(dialect: str, budget: ResultBudget) -> Optional[str]:
+    """Session statement that makes the database itself enforce the budget's timeout"""
+    if not budget.timeout_ms:
+        return None
+    if dialect in ("postgresql", "redshift"):
+        return f"SET statement_timeout = {budget.timeout_ms}"
+    if dialect in ("mysql", "mariadb"):
+        return f"SET SESSION max_execution_time = {budget.timeout_ms}"
+    if dialect == "snowflake":
+        return f"ALTER SESSION SET STATEMENT_TIMEOUT_IN_SECONDS = {max(1, int(budget.timeout_seconds))}"
+    return None
+
+
+def _read_only_sql(dialect: str) -> Optional[str]:
+    """Statement, issued first on a fresh connection, that makes the database itself reject the query's writes.
+
+    PostgreSQL: the driver has already opened the transaction, so SET TRANSACTION applies to the
+    one the query runs in. MySQL: START TRANSACTION READ ONLY opens that transaction explicitly
+    (SET TRANSACTION would only describe the next one). SQLite: query_only is connection-wide,
+    which is safe because the connection belongs to a per-call engine that is disposed afterwards.
+    """
+    if dialect == "postgresql":
+        return "SET TRANSACTION READ ONLY"
+    if dialect in ("mysql", "mariadb"):
+        return "START TRANSACTION READ ONLY"
+    if dialect == "sqlite":
+        return "PRAGMA query_only = ON"
+    return None
+
+
+def _read_only_error(query: str, dialect: Optional[str]) -> Optional[str]:
+    """Error for a query the read-only guard rejects, None when it may run"""
+    check = sql_pipeline.check_read_only(query, dialect)
+    if check.allowed:
+        return None
+    logger.error(f"❌ Blocked non-read-only query ({check.reason}): {query[:200]}")
+    return f"Read-only mode: {check.reason}. Only SELECT queries are permitted."
+
+
+async def _within_timeout(awaitable, budget: ResultBudget) -> Dict[str, Any]:
+    """Await engine work under the statement timeout; cancelling it interrupts the engine"""
+    if not budget.timeout_seconds:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, budget.timeout_seconds)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️ Query exceeded the {budget.timeout_seconds:g}s statement timeout")
+        return {"success": False, "error": f"Query exceeded the {budget.timeout_seconds:g}s statement timeout", "timed_out": True}
+
+
 class BaseQueryEngine:
     """Base class for query engines"""
 
@@ -423,6 +897,57 @@ class BaseQueryEngine:
         raise NotImplementedError
 
 
+class SharedDuckDBDataset:
+    """A file data source loaded once and shared by several concurrent queries.
+
+    The data is loaded into a temporary on-disk DuckDB database which is then
+    reopened read-only and sealed (no file, network or extension access); each
+    query runs on its own cursor in a worker thread, with at most
+    ``max_parallel`` queries in flight.
+    """
+
+    def __init__(self, engine: "DuckDBEngine", conn, tmp_dir: str, max_parallel: int = 4, tenant: Optional[str] = None):
+        self.engine = engine
+        self.conn = conn
+        self.tmp_dir = tmp_dir
+        self.tenant = tenant
+        self._semaphore = asyncio.Semaphore(max(1, int(max_parallel)))
+
+    async def execute(self, query: str) -> Dict[str, Any]:
+        duckdb_query, error = self.engine._prepare_query(query)
+        if error:
+            return {"success": False, "error": error}
+        async with self._semaphore:
+            cursor = self.conn.cursor()
+            start_time = datetime.now()
+            try:
+                result = await compute_executor.run_duckdb(
+                    self.engine._run_query, cursor, duckdb_query, query,
+                    tenant=self.tenant, interrupt=cursor,
+                )
+                result["execution_time"] = (datetime.now() - start_time).total_seconds()
+                return result
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+            finally:
+                cursor.close()
+
+    async def execute_many(self, queries: List[str]) -> List[Dict[str, Any]]:
+        return list(await asyncio.gather(*(self.execute(q) for q in queries)))
+
+    def close(self) -> None:
+        try:
+            self.conn.close()
+        finally:
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    async def __aenter__(self) -> "SharedDuckDBDataset":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+
 class DuckDBEngine(BaseQueryEngine):
     """DuckDB engine for fast analytical queries"""
 
@@ -441,8 +966,9 @@ class DuckDBEngine(BaseQueryEngine):
             conn = duckdb.connect()
             
             # CRITICAL: Enforce read-only mode for safety
-            # DuckDB doesn't have explicit read-only mode, but we can prevent DDL/DML operations
-            # by validating queries before execution (handled in query validation)
+            # The connection is a private in-memory database dropped after the query; statements are
+            # checked by _prepare_query, and once the data is loaded the connection is sealed: no file,
+            # network or extension access (Parquet is read through pyarrow) and a locked configuration
             logger.debug("🔒 DuckDB connection created (read-only enforced via query validation)")
 
             # Load data into DuckDB
@@ -455,127 +981,189 @@ class DuckDBEngine(BaseQueryEngine):
                 # 1. Current data_source (always included)
                 # 2. Any additional files detected in query
                 primary_file_id = data_source.get('id', 'data')
-                files_to_load = {primary_file_id: data_source}
-                
-                # If query references additional files, we'd load them here
-                # For now, we just load the primary file and create aliases
-                # TODO: In future, fetch and load referenced files from database
                 
                 # Load the current (primary) file
-                await self._load_file_data(conn, data_source)
+                await self._load_file_dataset(conn, data_source, parquet_source=arrow_parquet_source)
                 
-                # IMPORTANT: Create an alias for multi-file support
-                # Allow queries to reference table by file_id (e.g., file_1765031881)
-                if primary_file_id and primary_file_id != 'data':
-                    try:
-                        # Create a view with the file_id as table name (for multi-file queries)
-                        conn.execute(f'CREATE OR REPLACE VIEW "{primary_file_id}" AS SELECT * FROM "data"')
-                        logger.info(f"✅ Created table alias '{primary_file_id}' pointing to 'data' table")
-                    except Exception as e:
-                        logger.warning(f"⚠️ Could not create file_id alias: {e}")
-                
-                # Verify table exists and has data
-                try:
-                    test_result = conn.execute("SELECT COUNT(*) as count FROM data LIMIT 1").fetchone()
-                    row_count = test_result[0] if test_result else 0
-                    logger.info(f"✅ Verified 'data' table exists with {row_count} rows")
-                    if row_count == 0:
-                        logger.warning("⚠️ 'data' table is empty - query may return no results")
-                except Exception as verify_error:
-                    logger.error(f"❌ Failed to verify 'data' table: {verify_error}")
-                    raise Exception(f"Data table not loaded properly: {verify_error}")
+                # Load the other referenced files with one catalog lookup
+                extra_ids = [file_id for file_id in detected_file_ids if file_id != str(primary_file_id).lower()]
+                if extra_ids:
+                    await self._load_referenced_files(conn, data_source, extra_ids, parquet_source=arrow_parquet_source)
             elif data_source["type"] == "database":
                 await self._load_database_data(conn, data_source)
 
-            # CRITICAL: Validate query for read-only safety (prevent DDL/DML operations)
-            query_upper = query.upper().strip()
-            dangerous_keywords = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE TABLE', 'TRUNCATE', 'GRANT', 'REVOKE']
-            if any(keyword in query_upper for keyword in dangerous_keywords):
-                logger.error(f"❌ Blocked dangerous query operation: {query[:200]}")
-                return {
-                    "success": False,
-                    "error": "Read-only mode: DDL/DML operations are not allowed. Only SELECT queries are permitted."
-                }
-            
-            # CRITICAL: DuckDB uses date_trunc (lowercase) but PostgreSQL uses DATE_TRUNC
-            # Convert DATE_TRUNC to date_trunc for DuckDB compatibility
-            duckdb_query = query
-            if 'DATE_TRUNC' in query.upper():
-                import re
-                # Replace DATE_TRUNC with date_trunc (DuckDB function name)
-                duckdb_query = re.sub(r'DATE_TRUNC\s*\(', 'date_trunc(', query, flags=re.IGNORECASE)
-                if duckdb_query != query:
-                    logger.info(f"🔄 Converted DATE_TRUNC to date_trunc for DuckDB compatibility")
-            
-            # CRITICAL: Convert ClickHouse SUBSTRING syntax to DuckDB syntax
-            # ClickHouse: SUBSTRING("Email" FROM "@" + 1)
-            # DuckDB: SUBSTRING("Email", POSITION('@' IN "Email") + 1)
-            if 'SUBSTRING' in duckdb_query and ' FROM ' in duckdb_query:
-                # Handle: SUBSTRING(col FROM pattern + offset)
-                # Convert to: SUBSTRING(col, POSITION(pattern IN col) + offset)
-                import re as regex
-                # Pattern: SUBSTRING("col" FROM "pattern" + offset)
-                substring_pattern = r'SUBSTRING\s*\(([^,]+?)\s+FROM\s+(".*?"\(.*?\))\s*\)'
-                duckdb_query = regex.sub(substring_pattern, r'SUBSTRING(\1, POSITION(\2)', duckdb_query, flags=regex.IGNORECASE)
-                
-                # Also handle simpler cases: SUBSTRING(col FROM num)
-                simple_pattern = r'SUBSTRING\s*\(([^,]+?)\s+FROM\s+(\d+)\s*\)'
-                duckdb_query = regex.sub(simple_pattern, r'SUBSTRING(\1, \2)', duckdb_query, flags=regex.IGNORECASE)
-                
-                if duckdb_query != query:
-                    logger.info(f"🔄 Converted ClickHouse SUBSTRING to DuckDB SUBSTRING syntax")
-            
-            # Execute query
+            duckdb_query, error = self._prepare_query(query, _sql_dialect(data_source))
+            if error:
+                conn.close()
+                return {"success": False, "error": error}
+            seal_connection(conn)
+
+            budget = _budget_of(analysis)
             try:
-                result = conn.execute(duckdb_query).fetchall()
-                # Get column names from the result description
-                columns = []
-                if conn.description:
-                    columns = [desc[0] for desc in conn.description]
-                elif result and len(result) > 0:
-                    # Fallback: infer columns from first row if description not available
-                    first_row = result[0]
-                    if isinstance(first_row, dict):
-                        columns = list(first_row.keys())
-                    elif isinstance(first_row, (list, tuple)):
-                        # Try to get column names from query if possible
-                        import re
-                        select_match = re.search(r'select\s+(.+?)\s+from', duckdb_query, re.IGNORECASE)
-                        if select_match:
-                            select_clause = select_match.group(1)
-                            # Parse column names from SELECT clause
-                            cols = [c.strip().split(' AS ')[-1].strip().strip('"').strip("'") 
-                                   for c in select_clause.split(',')]
-                            columns = cols[:len(first_row)] if cols else [f'column_{i}' for i in range(len(first_row))]
-                        else:
-                            columns = [f'column_{i}' for i in range(len(first_row))]
-            except Exception as query_error:
-                logger.error(f"❌ DuckDB query execution error: {str(query_error)}")
-                logger.error(f"❌ Query: {duckdb_query}")
-                logger.error(f"❌ Original query: {query}")
-                raise
+                return await _within_timeout(compute_executor.run_duckdb(
+                    self._run_query, conn, duckdb_query, query, budget,
+                    tenant=_tenant_of(data_source), interrupt=conn,
+                ), budget)
+            finally:
+                conn.close()
 
-            # Convert to list of dictionaries
-            data = [dict(zip(columns, row)) for row in result]
+        except Exception as e:
+            logger.error(f"❌ DuckDB query execution failed: {str(e)}")
+            return {"success": False, "error": str(e)}
 
+    async def execute_on_parquet(self, query: str, parquet_path: str, data_source: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a query against a Parquet file exposed as 'data' (and the file id alias)"""
+        duckdb_query, error = self._prepare_query(query)
+        if error:
+            return {"success": False, "error": error}
+        conn = duckdb.connect()
+        try:
+            conn.execute(f"CREATE VIEW data AS SELECT * FROM {arrow_parquet_source(conn, parquet_path)}")
+            file_id = data_source.get("id")
+            if file_id and file_id != "data":
+                conn.execute(f'CREATE VIEW "{file_id}" AS SELECT * FROM data')
+            seal_connection(conn)
+            return await compute_executor.run_duckdb(
+                self._run_query, conn, duckdb_query, query,
+                tenant=_tenant_of(data_source), interrupt=conn,
+            )
+        except ComputeCancelled:
+            raise
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
             conn.close()
 
-            return {
-                "success": True,
-                "data": data,
-                "columns": columns,
-                "row_count": len(data),
-            }
+    async def open_shared_dataset(self, data_source: Dict[str, Any], max_parallel: int = 4) -> SharedDuckDBDataset:
+        """Load a file data source once into a sealed read-only database for concurrent queries"""
+        import tempfile
 
-        except Exception as e:
-            logger.error(f"❌ DuckDB query execution failed: {str(e)}")
-            return {"success": False, "error": str(e)}
+        tmp_dir = tempfile.mkdtemp(prefix="aiser_dataset_")
+        db_path = os.path.join(tmp_dir, "dataset.duckdb")
+        try:
+            conn = duckdb.connect(db_path)
+            try:
+                # Parquet is copied in: the reopened database cannot scan files
+                await self._load_file_dataset(conn, data_source, parquet_source=table_parquet_source)
+                await compute_executor.run_duckdb(conn.execute, "CHECKPOINT", tenant=_tenant_of(data_source))
+            finally:
+                conn.close()
+            read_only_conn = duckdb.connect(db_path, read_only=True)
+            # Settings are database-wide, so every cursor handed to a query is sealed too
+            seal_connection(read_only_conn)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        logger.info(f"🦆 Shared read-only dataset ready for {data_source.get('id')} (max {max_parallel} concurrent queries)")
+        return SharedDuckDBDataset(self, read_only_conn, tmp_dir, max_parallel, tenant=_tenant_of(data_source))
+
+    async def _load_file_dataset(self, conn, data_source: Dict[str, Any], parquet_source=read_parquet_source) -> None:
+        """Load the primary file as 'data', alias it by file id and verify it has rows"""
+        primary_file_id = data_source.get('id', 'data')
+        await self._load_file_data(conn, data_source, parquet_source=parquet_source)
+        
+        # IMPORTANT: Create an alias for multi-file support
+        # Allow queries to reference table by file_id (e.g., file_1765031881)
+        if primary_file_id and primary_file_id != 'data':
+            try:
+                # Create a view with the file_id as table name (for multi-file queries)
+                conn.execute(f'CREATE OR REPLACE VIEW "{primary_file_id}" AS SELECT * FROM "data"')
+                logger.info(f"✅ Created table alias '{primary_file_id}' pointing to 'data' table")
+            except Exception as e:
+                logger.warning(f"⚠️ Could not create file_id alias: {e}")
+        
+        # Verify table exists and has data
+        try:
+            test_result = conn.execute("SELECT COUNT(*) as count FROM data LIMIT 1").fetchone()
+            row_count = test_result[0] if test_result else 0
+            logger.info(f"✅ Verified 'data' table exists with {row_count} rows")
+            if row_count == 0:
+                logger.warning("⚠️ 'data' table is empty - query may return no results")
+        except Exception as verify_error:
+            logger.error(f"❌ Failed to verify 'data' table: {verify_error}")
+            raise Exception(f"Data table not loaded properly: {verify_error}")
+
+    async def _load_referenced_files(
+        self, conn, data_source: Dict[str, Any], file_ids: List[str], parquet_source=read_parquet_source
+    ) -> None:
+        """Expose other files of the same owner as views named by file id.
+
+        Each file is loaded into its own attached in-memory database so its
+        'data' table does not clash with the primary one.
+        """
+        owner = data_source.get('user_id')
+        if not owner:
+            logger.info(f"⚠️ Primary source has no owner; not loading referenced files {file_ids}")
+            return
+        extras = await data_source_catalog.get_many(file_ids, include_sample=True)
+        for index, (file_id, extra) in enumerate(extras.items(), start=1):
+            if extra.get('type') != 'file' or str(extra.get('user_id')) != str(owner):
+                logger.warning(f"⚠️ Skipping referenced file {file_id}: not a file source of the same owner")
+                continue
+            alias = f"extra_{index}"
+            try:
+                conn.execute(f"ATTACH ':memory:' AS {alias}")
+                conn.execute(f"USE {alias}")
+                try:
+                    await self._load_file_data(conn, extra, parquet_source=parquet_source)
+                finally:
+                    conn.execute("USE memory")
+                conn.execute(f'CREATE OR REPLACE VIEW "{file_id}" AS SELECT * FROM {alias}.data')
+                try:
+                    conn.execute(f'SELECT * FROM "{file_id}" LIMIT 0')
+                except duckdb.Error:
+                    # 'data' is a view over other tables of the attached database, which DuckDB
+                    # binds against the default database: copy the rows instead
+                    conn.execute(f'DROP VIEW "{file_id}"')
+                    conn.execute(f"USE {alias}")
+                    try:
+                        conn.execute(f'CREATE TABLE memory.main."{file_id}" AS SELECT * FROM data')
+                    finally:
+                        conn.execute("USE memory")
+                logger.info(f"✅ Loaded referenced file '{file_id}'")
+            except Exception as e:
+                logger.warning(f"⚠️ Could not load referenced file {file_id}: {e}")
+
+    def _prepare_query(self, query: str, read_dialect: Optional[str] = None):
+        """Validate a query for read-only safety and adapt dialect differences for DuckDB.
+
+        Returns (duckdb_query, error); error is set when the query is rejected.
+        """
+        # CRITICAL: Validate query for read-only safety (one SELECT/WITH statement, no DDL/DML in the tree)
+        error = _read_only_error(query, read_dialect or "duckdb")
+        if error:
+            return None, error
+        
+        # Queries written for another dialect are transpiled from the parsed AST;
+        # DuckDB itself accepts DATE_TRUNC and SUBSTRING(x FROM n) as written
+        compiled = sql_pipeline.compile(query, read=read_dialect or "duckdb", write="duckdb")
+        if compiled.parsed and compiled.sql != query:
+            logger.info(f"🔄 Transpiled query from {read_dialect} to DuckDB")
+        return compiled.sql, None
+
+    def _run_query(
+        self, conn, duckdb_query: str, original_query: Optional[str] = None, budget: Optional[ResultBudget] = None
+    ) -> Dict[str, Any]:
+        """Execute a prepared query on a DuckDB connection or cursor (blocking), fetching in batches under ``budget``"""
+        budget = budget or ResultBudget.default()
+        try:
+            conn.execute(duckdb_query)
+            columns = [desc[0] for desc in conn.description or []]
+            return collect_cursor(conn, columns, budget)
+        except Exception as query_error:
+            logger.error(f"❌ DuckDB query execution error: {str(query_error)}")
+            logger.error(f"❌ Query: {duckdb_query}")
+            logger.error(f"❌ Original query: {original_query or duckdb_query}")
+            raise
 
     def _detect_file_references(self, query: str) -> list:
         """
         Detect all file_* table references in a SQL query.
         Returns list of detected file IDs (e.g., ['file_1765031881', 'file_1765033843'])
         """
+        compiled = sql_pipeline.compile(query, read="duckdb")
+        if compiled.parsed:
+            return list(dict.fromkeys(t.lower() for t in compiled.file_references))
         import re
         # Pattern to match file_* table references (quoted or unquoted)
         # Matches: file_1234567890, "file_1234567890", `file_1234567890`
@@ -585,11 +1173,13 @@ class DuckDBEngine(BaseQueryEngine):
         return list(set(m.lower() for m in matches))
     
     async def _load_file_data(
-        self, conn: duckdb.DuckDBPyConnection, data_source: Dict[str, Any]
+        self, conn: duckdb.DuckDBPyConnection, data_source: Dict[str, Any], parquet_source=read_parquet_source
     ):
         """
         Load file data into DuckDB with multi-sheet Excel support.
         For Excel files, creates virtual tables for each sheet.
+        ``parquet_source`` builds the relation Parquet files are read through
+        (``arrow_parquet_source`` for connections sealed before the user query).
         """
         file_path = data_source.get("file_path")
         file_format = data_source.get("format", "csv")
@@ -598,40 +1188,38 @@ class DuckDBEngine(BaseQueryEngine):
         # Check if schema contains DuckDB table info (from multi-sheet Excel processing)
         duckdb_tables = schema.get("duckdb_tables") if isinstance(schema, dict) else None
         
-        # For Excel files with multi-sheet support, use pre-created tables
+        # Multi-sheet Excel uploads keep one Parquet file per sheet in the columnar store:
+        # attach every sheet as a view (plus 'data' over the primary sheet) without re-reading the workbook
         if file_format in ("xlsx", "xls") and duckdb_tables:
-            logger.info(f"🦆 Loading multi-sheet Excel file with {len(duckdb_tables)} sheets")
-            # Tables are already created during file processing
-            # Just verify they exist and create a main 'data' view from the first sheet
-            if duckdb_tables:
-                first_sheet_table = list(duckdb_tables.values())[0]
-                try:
-                    # Create a view 'data' pointing to the first sheet (for backward compatibility)
-                    conn.execute(f"CREATE OR REPLACE VIEW data AS SELECT * FROM {first_sheet_table}")
-                    logger.info(f"✅ Created 'data' view from table '{first_sheet_table}'")
-                except Exception as e:
-                    logger.warning(f"⚠️ Could not create view from {first_sheet_table}, using direct table: {e}")
-                    # Fallback: create alias
-                    conn.execute(f"CREATE OR REPLACE VIEW data AS SELECT * FROM {first_sheet_table}")
-            return
+            try:
+                if await compute_executor.run_duckdb(
+                    attach_columnar_sheets, conn, schema, parquet_source=parquet_source, tenant=_tenant_of(data_source)
+                ):
+                    logger.info(f"🦆 Attached multi-sheet Excel file with {len(duckdb_tables)} sheets")
+                    return
+            except ComputeCancelled:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Could not attach Excel sheets, falling back to file data: {e}")
+
+        # Streamed uploads too large for PostgreSQL are Parquet files in the columnar store:
+        # query them in place instead of the 10k-row sample
+        if (file_path or "").startswith("columnar/"):
+            try:
+                from app.modules.data.services.postgres_storage_service import PostgresStorageService
+                parquet_path = PostgresStorageService().columnar_path(file_path)
+                if os.path.exists(parquet_path):
+                    conn.execute(f"CREATE VIEW data AS SELECT * FROM {parquet_source(conn, parquet_path)}")
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️ Could not open columnar file {file_path}, falling back to sample data: {e}")
 
         # Prefer inline/sample data when available (avoids IO errors when file_path is missing)
         inline_data = data_source.get("data") or data_source.get("sample_data")
-        # If inline_data missing, try to load persisted sample_data directly from DB
+        # If inline_data missing, load persisted sample_data through the catalog
         if not inline_data:
             try:
-                def fetch_sample_from_db(source_id: str):
-                    from app.db.session import get_sync_engine
-                    import sqlalchemy as _sa
-                    eng = get_sync_engine()
-                    with eng.connect() as conn:
-                        r = conn.execute(_sa.text("SELECT sample_data FROM data_sources WHERE id = :id LIMIT 1"), {"id": source_id})
-                        row = r.fetchone()
-                        if row:
-                            return row[0]
-                    return None
-
-                sample = await asyncio.to_thread(fetch_sample_from_db, data_source.get('id'))
+                sample = await data_source_catalog.get_sample(data_source.get('id'))
                 if sample:
                     inline_data = sample
                     # attach back to data_source for downstream use
@@ -675,20 +1263,26 @@ class DuckDBEngine(BaseQueryEngine):
                             tmp_path = tmp.name
                         
                         try:
-                            # Use temp file with DuckDB
+                            # Use temp file with DuckDB (scans and parsing run off the event loop)
                             safe_path = tmp_path.replace("'", "''")
-                            if file_format == "csv":
-                                conn.execute(f"CREATE TABLE data AS SELECT * FROM read_csv_auto('{safe_path}')")
-                            elif file_format == "parquet":
-                                conn.execute(f"CREATE TABLE data AS SELECT * FROM read_parquet('{safe_path}')")
-                            elif file_format == "json":
-                                conn.execute(f"CREATE TABLE data AS SELECT * FROM read_json_auto('{safe_path}')")
+                            tenant = _tenant_of(data_source)
+                            readers = {
+                                "csv": f"read_csv_auto('{safe_path}')",
+                                "parquet": f"read_parquet('{safe_path}')",
+                                "json": f"read_json_auto('{safe_path}')",
+                            }
+                            if file_format in readers:
+                                await compute_executor.run_duckdb(
+                                    conn.execute, f"CREATE TABLE data AS SELECT * FROM {readers[file_format]}",
+                                    tenant=tenant, interrupt=conn,
+                                )
                             elif file_format in ("xlsx", "xls"):
                                 # For Excel files, use pandas to read and then register in DuckDB
-                                df = pd.read_excel(tmp_path, engine='openpyxl', sheet_name=0)
-                                df = df.replace({pd.NA: None, pd.NaT: None})
+                                df = await compute_executor.run_cpu(read_excel_frame, tmp_path, 0, tenant=tenant)
                                 conn.register("_excel_df", df)
-                                conn.execute("CREATE TABLE data AS SELECT * FROM _excel_df")
+                                await compute_executor.run_duckdb(
+                                    conn.execute, "CREATE TABLE data AS SELECT * FROM _excel_df", tenant=tenant
+                                )
                             logger.info(f"✅ Loaded file from PostgreSQL storage into DuckDB")
                             return
                         finally:
@@ -934,21 +1528,17 @@ class DirectSQLEngine(BaseQueryEngine):
                     except:
                         pass
 
-            # CRITICAL: Validate query for read-only safety
-            query_upper = query.upper().strip()
-            dangerous_keywords = ['DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE', 'TRUNCATE', 'GRANT', 'REVOKE']
-            if any(keyword in query_upper for keyword in dangerous_keywords):
-                logger.error(f"❌ Blocked dangerous query operation: {query[:200]}")
-                return {
-                    "success": False,
-                    "error": "Read-only mode: DDL/DML operations are not allowed. Only SELECT queries are permitted."
-                }
-            
             # Prefer a full connection URI if provided
             conn_uri = conn_info.get('uri') or conn_info.get('connection_string') or conn_info.get('connection_string_uri')
 
             # Check if this is ClickHouse - use HTTP API instead of SQLAlchemy
             db_type = (conn_info.get('db_type') or conn_info.get('type') or data_source.get('db_type') or 'postgresql').lower()
+
+            # CRITICAL: Validate query for read-only safety (maintenance SQL opts out with allow_ddl)
+            if not (analysis or {}).get("allow_ddl"):
+                error = _read_only_error(query, normalize_dialect(db_type))
+                if error:
+                    return {"success": False, "error": error}
             
             if db_type == 'clickhouse':
                 # Use HTTP API for ClickHouse queries
@@ -1029,38 +1619,40 @@ class DirectSQLEngine(BaseQueryEngine):
                         )
                         logger.info(f"✅ Converted lag() to neighbor(): {formatted_query[:200]}...")
                     
-                    if not formatted_query.upper().endswith('FORMAT JSON'):
-                        formatted_query = f"{formatted_query} FORMAT JSON"
-                    
-                    async with aiohttp.ClientSession() as session:
+                    # Stream rows as JSON arrays (names and types first) instead of one JSON document
+                    formatted_query = re.sub(r'\s+FORMAT\s+\w+\s*$', '', formatted_query, flags=re.IGNORECASE)
+                    formatted_query = f"{formatted_query} FORMAT JSONCompactEachRowWithNamesAndTypes"
+                    budget = _budget_of(analysis)
+                    # Server-side limits: stop (not fail) past the spill cap, abort past the statement timeout
+                    params = {"result_overflow_mode": "break", "max_result_rows": str(budget.spill_max_rows)}
+                    if budget.timeout_seconds:
+                        params["max_execution_time"] = str(int(budget.timeout_seconds) or 1)
+                    timeout = aiohttp.ClientTimeout(total=budget.timeout_seconds + 30 if budget.timeout_seconds else None)
+
+                    async with aiohttp.ClientSession(timeout=timeout) as session:
                         auth = aiohttp.BasicAuth(username, password) if password else None
-                        async with session.post(f"{http_url}/", data=formatted_query, auth=auth) as resp:
-                            if resp.status == 200:
-                                data = await resp.json()
-                                # ClickHouse JSON format: {"meta": [...], "data": [...], "rows": N}
-                                meta = data.get('meta', [])
-                                columns = [col.get('name', '') for col in meta] if meta else []
-                                rows_data = data.get('data', [])
-                                rows = []
-                                
-                                # Parse rows - ClickHouse returns list of dicts or list of lists
-                                for row_data in rows_data:
-                                    if isinstance(row_data, dict):
-                                        rows.append(row_data)
-                                    elif isinstance(row_data, list) and columns:
-                                        rows.append(dict(zip(columns, row_data)))
-                                    else:
-                                        rows.append({'value': row_data})
-                                
-                                return {
-                                    "success": True,
-                                    "data": rows,
-                                    "columns": columns,
-                                    "row_count": len(rows),
-                                }
-                            else:
+                        async with session.post(f"{http_url}/", data=formatted_query, params=params, auth=auth) as resp:
+                            if resp.status != 200:
                                 error_text = await resp.text()
                                 return {"success": False, "error": f"ClickHouse HTTP error {resp.status}: {error_text}"}
+                            columns = json.loads(await resp.content.readline() or b"[]")
+                            await resp.content.readline()  # column types
+                            collector = ResultCollector(columns, budget)
+                            chunk = []
+                            try:
+                                async for line in resp.content:
+                                    if line.strip():
+                                        chunk.append(json.loads(line))
+                                    if len(chunk) >= budget.batch_rows:
+                                        if not await asyncio.to_thread(collector.add, chunk):
+                                            break
+                                        chunk = []
+                                if chunk:
+                                    await asyncio.to_thread(collector.add, chunk)
+                            except BaseException:
+                                collector.abort()
+                                raise
+                            return collector.result()
                 except ImportError:
                     return {"success": False, "error": "aiohttp package required for ClickHouse queries"}
                 except Exception as clickhouse_error:
@@ -1128,389 +1720,87 @@ class DirectSQLEngine(BaseQueryEngine):
             # User-scoped queries only (no tenant isolation needed)
             
             # Run blocking DB calls in a thread to avoid blocking the event loop
-            def run_sync_query(uri: str, sql: str) -> Dict[str, Any]:
+            budget = _budget_of(analysis)
+
+            def run_sync_query(uri: str, sql: str, commit: bool = False) -> Dict[str, Any]:
                 try:
-                    # CRITICAL: Set connection to read-only mode if supported
-                    # For PostgreSQL: SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY
-                    # For MySQL: SET SESSION TRANSACTION READ ONLY
-                    # This is handled per-database type in the connection setup
                     eng = sa.create_engine(uri, pool_pre_ping=True)
-                    with eng.connect() as conn:
-                        res = conn.execute(sa.text(sql))
-                        try:
-                            cols = list(res.keys())
-                        except Exception:
-                            cols = []
-                        rows = []
-                        try:
-                            fetched = res.fetchall()
-                            for row in fetched:
-                                # support RowProxy and tuples
-                                if hasattr(row, '_mapping'):
-                                    rows.append(dict(row._mapping))
-                                else:
-                                    rows.append(dict(zip(cols, row)))
-                        except Exception:
-                            # no rows to fetch (e.g., DDL) - return empty
-                            rows = []
                     try:
+                        with (eng.begin() if commit else eng.connect()) as conn:
+                            # CRITICAL: The database itself rejects writes in this transaction where it can
+                            # (must be the first statement on the connection; see _read_only_sql)
+                            read_only_sql = None if commit else _read_only_sql(eng.dialect.name)
+                            if read_only_sql:
+                                try:
+                                    conn.exec_driver_sql(read_only_sql)
+                                except Exception as read_only_error:
+                                    conn.rollback()
+                                    logger.warning(f"⚠️ Could not make the {eng.dialect.name} transaction read-only: {read_only_error}")
+                            timeout_sql = _statement_timeout_sql(eng.dialect.name, budget)
+                            if timeout_sql:
+                                conn.exec_driver_sql(timeout_sql)
+                            # Server-side cursor where the driver has one; rows are fetched in batches
+                            res = conn.execution_options(stream_results=True).execute(sa.text(sql))
+                            if not res.returns_rows:
+                                # no rows to fetch (e.g., DDL) - return empty
+                                return {"success": True, "data": [], "columns": [], "row_count": 0}
+                            result = collect_cursor(res, list(res.keys()), budget)
+                            res.close()
+                            return result
+                    finally:
                         eng.dispose()
-                    except Exception:
-                        pass
-                    return {"success": True, "data": rows, "columns": cols, "row_count": len(rows)}
                 except Exception as e:
                     return {"success": False, "error": str(e)}
 
-            result = await asyncio.to_thread(run_sync_query, conn_uri, query)
-
-            if result.get('success'):
-                return {
-                    "success": True,
-                    "data": result.get('data', []),
-                    "columns": result.get('columns', []),
-                    "row_count": result.get('row_count', 0),
-                }
-            else:
-                return {"success": False, "error": result.get('error')}
+            return await _within_timeout(
+                asyncio.to_thread(run_sync_query, conn_uri, query, bool((analysis or {}).get("allow_ddl"))), budget
+            )
 
         except Exception as e:
             logger.error(f"❌ Direct SQL query execution failed: {str(e)}")
             return {"success": False, "error": str(e)}
 
 
-class PandasEngine(BaseQueryEngine):
-    """Pandas engine for small dataset operations"""
+class ApiSourceEngine(BaseQueryEngine):
+    """API sources queried in their DuckDB workspace (see api_workspace).
+
+    Responses are fetched once per refresh TTL and stored as Parquet parts;
+    SQL runs on a cursor of the source's sealed workspace connection. File and
+    database sources sent to this engine are handed to DuckDB / Direct SQL.
+    """
+
+    def __init__(self, duckdb_engine: "DuckDBEngine", direct_sql_engine: "DirectSQLEngine"):
+        self.duckdb_engine = duckdb_engine
+        self.direct_sql_engine = direct_sql_engine
 
     async def execute(
         self, query: str, data_source: Dict[str, Any], analysis: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Execute query using Pandas"""
+        """Execute query against the API source's workspace"""
+        if data_source.get("type") != "api":
+            if data_source.get("type") in ("database", "warehouse", "enterprise_connector"):
+                return await self.direct_sql_engine.execute(query, data_source, analysis)
+            return await self.duckdb_engine.execute(query, data_source, analysis)
         try:
-            logger.info("🐼 Executing query with Pandas")
-
-            # Load data into Pandas DataFrame
-            df = await self._load_data_to_pandas(data_source)
-
-            if df is None or (hasattr(df, 'empty') and df.empty):
-                return {"success": False, "error": "No data available to run the query (empty DataFrame)"}
-
-            # If SQL is provided, try to execute it against the DataFrame using DuckDB (safe, fast)
-            q_lower = (query or "").lower()
-            if "select" in q_lower:
-                conn = duckdb.connect()
-                try:
-                    # register dataframe for SQL execution
-                    conn.register("_aiser_inline_df", df)
-                    try:
-                        # execute user SQL; user may reference 'data' or inline table names
-                        result_df = conn.execute(query).df()
-                    except Exception:
-                        # Attempt a best-effort rewrite: map unknown table references to the inline table
-                        import re as _re
-                        m = _re.search(r"from\s+([a-zA-Z0-9_\.]+)", query, _re.IGNORECASE)
-                        if m:
-                            tbl = m.group(1)
-                            rewritten = _re.sub(rf"\b{_re.escape(tbl)}\b", "_aiser_inline_df", query, flags=_re.IGNORECASE)
-                            result_df = conn.execute(rewritten).df()
-                        else:
-                            raise
-                finally:
-                    conn.close()
-            else:
-                # No SQL - return the loaded dataframe as-is (limited to first 1000 rows for safety)
-                result_df = df.head(1000)
-
-            # Convert to list of dictionaries
-            data = result_df.to_dict("records")
-            columns = result_df.columns.tolist()
-
-            return {
-                "success": True,
-                "data": data,
-                "columns": columns,
-                "row_count": len(data),
-            }
-
+            logger.info("🌐 Executing query on API source workspace")
+            duckdb_query, error = self.duckdb_engine._prepare_query(query)
+            if error:
+                return {"success": False, "error": error}
+            workspace = await api_workspace_manager.workspace(data_source)
+            if not workspace.parts:
+                return {"success": False, "error": "No data available to run the query (the API returned no records)"}
+
+            budget = _budget_of(analysis)
+            cursor = workspace.cursor()
+            try:
+                return await _within_timeout(compute_executor.run_duckdb(
+                    self.duckdb_engine._run_query, cursor, duckdb_query, query, budget,
+                    tenant=_tenant_of(data_source), interrupt=cursor,
+                ), budget)
+            finally:
+                cursor.close()
+        except ComputeCancelled:
+            raise
         except Exception as e:
-            logger.error(f"❌ Pandas query execution failed: {str(e)}")
+            logger.error(f"❌ API source query execution failed: {str(e)}")
             return {"success": False, "error": str(e)}
-
-    async def _load_data_to_pandas(self, data_source: Dict[str, Any]) -> pd.DataFrame:
-        """Load data into Pandas DataFrame"""
-        # API-based sources: fetch from API endpoint
-        if data_source.get("type") == "api":
-            try:
-                import aiohttp
-                config = data_source.get("connection_config") or data_source.get("config") or {}
-                api_url = config.get("url") or config.get("endpoint") or data_source.get("api_url")
-                
-                if not api_url:
-                    logger.error("API data source missing URL/endpoint configuration")
-                    return pd.DataFrame()
-                
-                # Decrypt credentials if encrypted
-                try:
-                    from app.modules.data.utils.credentials import decrypt_credentials
-                    config = decrypt_credentials(config)
-                except Exception:
-                    pass
-                
-                headers = config.get("headers", {})
-                method = config.get("method", "GET").upper()
-                params = config.get("params", {})
-                auth = None
-                
-                # Handle authentication
-                if config.get("api_key"):
-                    api_key_header = config.get("api_key_header", "X-API-Key")
-                    headers[api_key_header] = config["api_key"]
-                elif config.get("bearer_token"):
-                    headers["Authorization"] = f"Bearer {config['bearer_token']}"
-                elif config.get("username") and config.get("password"):
-                    import aiohttp
-                    auth = aiohttp.BasicAuth(config["username"], config["password"])
-                
-                async with aiohttp.ClientSession() as session:
-                    async with session.request(method, api_url, headers=headers, params=params, auth=auth) as response:
-                        if response.status != 200:
-                            logger.error(f"API request failed with status {response.status}")
-                            return pd.DataFrame()
-                        
-                        content_type = response.headers.get("Content-Type", "").lower()
-                        text = await response.text()
-                        
-                        # Parse response based on content type
-                        if "json" in content_type:
-                            data = await response.json()
-                            # Handle various JSON structures
-                            if isinstance(data, list):
-                                return pd.DataFrame(data)
-                            elif isinstance(data, dict):
-                                # Check for common API response patterns
-                                if "data" in data:
-                                    return pd.DataFrame(data["data"])
-                                elif "results" in data:
-                                    return pd.DataFrame(data["results"])
-                                elif "items" in data:
-                                    return pd.DataFrame(data["items"])
-                                else:
-                                    # Flatten single object
-                                    return pd.DataFrame([data])
-                        elif "csv" in content_type:
-                            import io
-                            return pd.read_csv(io.StringIO(text))
-                        else:
-                            # Try JSON first, then CSV
-                            try:
-                                import json
-                                data = json.loads(text)
-                                if isinstance(data, list):
-                                    return pd.DataFrame(data)
-                                elif isinstance(data, dict):
-                                    return pd.DataFrame([data])
-                            except:
-                                try:
-                                    import io
-                                    return pd.read_csv(io.StringIO(text))
-                                except:
-                                    logger.warning(f"Could not parse API response as JSON or CSV")
-                                    return pd.DataFrame()
-            except Exception as e:
-                logger.error(f"Failed to load API data source: {e}")
-                return pd.DataFrame()
-        
-        # File-based sources: prefer inline/sample data, then persisted sample_data in DB, then file_path
-        if data_source.get("type") == "file":
-            inline_data = data_source.get("data") or data_source.get("sample_data")
-
-            # Inline list/dict/string handling
-            if inline_data is not None:
-                try:
-                    # list/tuple of rows
-                    if isinstance(inline_data, (list, tuple)):
-                        return pd.DataFrame(inline_data)
-
-                    # single dict representing a row or column-oriented dict
-                    if isinstance(inline_data, dict):
-                        return pd.DataFrame([inline_data])
-
-                    # string (CSV content) - try parse
-                    if isinstance(inline_data, str):
-                        import io, json as _json
-                        try:
-                            return pd.read_csv(io.StringIO(inline_data))
-                        except Exception:
-                            try:
-                                parsed = _json.loads(inline_data)
-                                if isinstance(parsed, (list, dict)):
-                                    return pd.DataFrame(parsed)
-                            except Exception:
-                                logger.warning("Inline string data could not be parsed as CSV or JSON")
-                except Exception as e:
-                    logger.warning(f"Failed to convert inline sample data to DataFrame: {e}")
-
-            # Attempt to fetch persisted sample_data from database (server-side storage)
-            try:
-                def fetch_sample_from_db(source_id: str):
-                    from app.db.session import get_sync_engine
-                    import sqlalchemy as _sa
-                    eng = get_sync_engine()
-                    with eng.connect() as conn:
-                        r = conn.execute(_sa.text("SELECT sample_data FROM data_sources WHERE id = :id LIMIT 1"), {"id": source_id})
-                        row = r.fetchone()
-                        if row:
-                            return row[0]
-                    return None
-
-                sample = await asyncio.to_thread(fetch_sample_from_db, data_source.get('id'))
-                if sample is not None:
-                    try:
-                        if isinstance(sample, (list, tuple)):
-                            return pd.DataFrame(sample)
-                        if isinstance(sample, dict):
-                            return pd.DataFrame([sample])
-                        if isinstance(sample, str):
-                            import io, json as _json
-                            try:
-                                return pd.read_csv(io.StringIO(sample))
-                            except Exception:
-                                try:
-                                    parsed = _json.loads(sample)
-                                    return pd.DataFrame(parsed)
-                                except Exception:
-                                    logger.warning("Persisted sample_data string could not be parsed")
-                    except Exception as e:
-                        logger.warning(f"Failed to convert persisted sample_data to DataFrame: {e}")
-            except Exception:
-                logger.debug("Failed to fetch persisted sample_data; continuing to file_path fallback")
-
-            # Try to load from PostgreSQL storage
-            object_key = data_source.get("file_path")  # Now it's object_key
-            file_format = data_source.get("format", "csv")
-            
-            if object_key:
-                try:
-                    from app.modules.data.services.postgres_storage_service import PostgresStorageService
-                    storage_service = PostgresStorageService()
-                    user_id = data_source.get('user_id')
-                    
-                    if not user_id:
-                        logger.warning("⚠️ user_id not found in data_source, cannot load from PostgreSQL storage")
-                    else:
-                        # Load file from PostgreSQL
-                        file_content = await storage_service.get_file(object_key, user_id)
-                        
-                        # Write to temp file for Pandas
-                        import tempfile
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_format}") as tmp:
-                            tmp.write(file_content)
-                            tmp_path = tmp.name
-                        
-                        try:
-                            if file_format == "csv":
-                                return pd.read_csv(tmp_path)
-                            elif file_format == "parquet":
-                                return pd.read_parquet(tmp_path)
-                            elif file_format == "json":
-                                return pd.read_json(tmp_path)
-                            elif file_format in ("xlsx", "xls"):
-                                return pd.read_excel(tmp_path)
-                        finally:
-                            if os.path.exists(tmp_path):
-                                os.unlink(tmp_path)
-                except Exception as e:
-                    logger.warning(f"Failed to load from PostgreSQL storage: {e}")
-
-            # If still no data, raise error
-            raise Exception("No data available for file data source")
-
-        # Database sources: try to use SQLAlchemy connection and load a table or run provided query
-        elif data_source["type"] == "database" or data_source.get('type') == 'enterprise_connector':
-            conn_info = data_source.get('connection_info') or data_source.get('metadata') or {}
-
-            # Prefer a full connection URI
-            conn_uri = conn_info.get('uri') or conn_info.get('connection_string') or conn_info.get('connection_string_uri')
-            if not conn_uri:
-                db_type = (conn_info.get('db_type') or conn_info.get('type') or data_source.get('db_type') or 'postgresql').lower()
-                user = conn_info.get('username') or conn_info.get('user')
-                password = conn_info.get('password') or conn_info.get('pass')
-                host = conn_info.get('host') or conn_info.get('hostname') or 'localhost'
-                port = conn_info.get('port')
-                database = conn_info.get('database') or conn_info.get('db')
-
-                if not database:
-                    raise Exception("Database data source requires a 'database' in connection_info or a full connection URI")
-
-                driver = 'psycopg2' if db_type.startswith('postgres') else ''
-                scheme = f"postgresql+{driver}" if driver else db_type
-
-                auth = ''
-                if user:
-                    auth = user
-                    if password:
-                        auth += f":{password}"
-                    auth += '@'
-
-                hostpart = host
-                if port:
-                    hostpart = f"{host}:{port}"
-
-                conn_uri = f"{scheme}://{auth}{hostpart}/{database}"
-
-            # If a default table is provided, load it, otherwise attempt to run a lightweight SELECT (expecting user to pick table)
-            table = data_source.get('table') or conn_info.get('table')
-            try:
-                eng = sa.create_engine(conn_uri)
-                if table:
-                    df = pd.read_sql_table(table, eng)
-                else:
-                    # fallback: try to read a small sample using a generic query - user should select a table for heavier operations
-                    df = pd.read_sql_query('SELECT * FROM information_schema.tables LIMIT 0', eng)
-                try:
-                    eng.dispose()
-                except Exception:
-                    pass
-                return df
-            except Exception as e:
-                raise Exception(f"Failed to load data from database source: {e}")
-
-        else:
-            raise Exception(f"Unsupported data source type for Pandas engine: {data_source.get('type')}")
-
-
-class QueryPerformanceMonitor:
-    """Monitor query performance across engines"""
-
-    def __init__(self):
-        self.performance_metrics = {}
-
-    def record_query_performance(
-        self,
-        engine: QueryEngine,
-        execution_time: float,
-        data_size: int,
-        query_complexity: str,
-    ):
-        """Record query performance metrics"""
-        if engine.value not in self.performance_metrics:
-            self.performance_metrics[engine.value] = {
-                "total_queries": 0,
-                "total_time": 0,
-                "avg_time": 0,
-                "min_time": float("inf"),
-                "max_time": 0,
-            }
-
-        metrics = self.performance_metrics[engine.value]
-        metrics["total_queries"] += 1
-        metrics["total_time"] += execution_time
-        metrics["avg_time"] = metrics["total_time"] / metrics["total_queries"]
-        metrics["min_time"] = min(metrics["min_time"], execution_time)
-        metrics["max_time"] = max(metrics["max_time"], execution_time)
-
-    def get_performance_report(self) -> Dict[str, Any]:
-        """Get performance report for all engines"""
-        return {
-            "engines": self.performance_metrics,
-            "generated_at": datetime.now().isoformat(),
-        }
@@ -3,8 +3,12 @@ PostgreSQL-based object storage service
 Stores file binary data in PostgreSQL using BYTEA type
 """
 
+import asyncio
 import logging
+import os
+import shutil
 import uuid
+from pathlib import Path
 from typing import Optional
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -14,6 +18,9 @@ from app.modules.data.models import FileStorage
 
 logger = logging.getLogger(__name__)
 
+# Object keys for streamed uploads kept as local Parquet instead of a BYTEA row
+COLUMNAR_PREFIX = "columnar/"
+
 
 class PostgresStorageService:
     """PostgreSQL-based object storage service"""
@@ -66,8 +73,33 @@ class PostgresStorageService:
                 logger.error(f"❌ Failed to store file in PostgreSQL: {str(e)}")
                 raise
     
+    def columnar_path(self, object_key: str) -> str:
+        """Local path of a columnar (Parquet) object: columnar/<user_id>/<uuid>.parquet"""
+        from app.core.config import settings
+        relative = os.path.normpath(object_key[len(COLUMNAR_PREFIX):])
+        if relative.startswith("..") or os.path.isabs(relative):
+            raise ValueError(f"Invalid columnar object key: {object_key}")
+        return os.path.join(settings.UPLOAD_COLUMNAR_DIR, relative)
+
+    def store_columnar_file(self, parquet_path: str, user_id: str) -> str:
+        """Move a Parquet file too large for a BYTEA row into the columnar store (blocking)"""
+        object_key = f"{COLUMNAR_PREFIX}{user_id}/{uuid.uuid4()}.parquet"
+        target = self.columnar_path(object_key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(parquet_path, target)
+        logger.info(f"✅ Stored columnar file: {object_key} ({os.path.getsize(target)} bytes)")
+        return object_key
+
     async def get_file(self, object_key: str, user_id: str) -> bytes:
         """Retrieve file from PostgreSQL with ownership verification"""
+        if object_key.startswith(COLUMNAR_PREFIX):
+            if not object_key.startswith(f"{COLUMNAR_PREFIX}{user_id}/"):
+                raise ValueError(f"File not found or access denied: {object_key}")
+            path = self.columnar_path(object_key)
+            if not os.path.exists(path):
+                raise ValueError(f"File not found or access denied: {object_key}")
+            return await asyncio.to_thread(Path(path).read_bytes)
+
         async with async_session() as session:
             try:
                 result = await session.execute(
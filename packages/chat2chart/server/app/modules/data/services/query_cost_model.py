@@ -0,0 +1,424 @@
+"""
+Query Cost Model
+Cost-based engine and strategy selection. Queries are parsed with sqlglot into
+structural features, combined with table cardinalities and column distinct
+counts from the data source schema (or the schema cache), and priced per
+candidate engine with a latency model fitted to the runtimes recorded by
+QueryPerformanceMonitor. Every decision carries the numbers it was made from
+so it can be explained through the API.
+"""
+
+import logging
+import math
+import threading
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from sqlglot import exp
+
+    SQLGLOT_AVAILABLE = True
+except ImportError:  # pragma: no cover - sqlglot ships with the server requirements
+    SQLGLOT_AVAILABLE = False
+
+from app.modules.data.services.sql_pipeline import sql_pipeline
+
+# (fixed overhead seconds, seconds per work unit) used until an engine has history
+ENGINE_PRIORS: Dict[str, Tuple[float, float]] = {
+    "duckdb": (0.02, 2e-8),
+    "pandas": (0.05, 1e-7),
+    "direct_sql": (0.10, 1e-8),
+    "cube": (0.30, 5e-9),
+    "spark": (5.00, 2e-9),
+}
+# Share of a full scan an approximate answer reads (see approximate_query)
+APPROXIMATE_WORK_FRACTION = 0.02
+MIN_HISTORY_SAMPLES = 3
+DEFAULT_ROW_COUNT = 10_000
+
+
+@dataclass
+class QueryFeatures:
+    """Structural features of a SELECT statement"""
+
+    tables: List[str] = field(default_factory=list)
+    joins: int = 0
+    subqueries: int = 0
+    group_by: List[str] = field(default_factory=list)
+    aggregates: int = 0
+    window_functions: int = 0
+    predicates: int = 0
+    order_by: int = 0
+    limit: Optional[int] = None
+    distinct: bool = False
+    parsed: bool = True
+
+
+@dataclass
+class CandidateCost:
+    engine: str
+    strategy: str
+    predicted_seconds: float
+    basis: str  # "history" (fitted on this source or engine) or "prior"
+    samples: int
+    failure_rate: float
+
+
+@dataclass
+class EngineDecision:
+    engine: str
+    strategy: str
+    predicted_seconds: float
+    work_units: float
+    features: QueryFeatures
+    statistics: Dict[str, Any]
+    candidates: List[CandidateCost]
+    reason: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def analyze_sql(query: str, dialect: Optional[str] = None) -> QueryFeatures:
+    """Parse a query into features; falls back to keyword checks when it cannot be parsed"""
+    if SQLGLOT_AVAILABLE:
+        try:
+            tree = sql_pipeline.parse(query, dialect, copy=False)
+            select = tree if isinstance(tree, exp.Select) else tree.find(exp.Select)
+            ctes = {cte.alias_or_name for cte in tree.find_all(exp.CTE)}
+            selects = list(tree.find_all(exp.Select))
+            # Grouping and filtering anywhere in the statement (CTEs, derived tables) does the work
+            groups = [s.args["group"] for s in selects if s.args.get("group")]
+            limit = select.args.get("limit") if select is not None else None
+            order = select.args.get("order") if select is not None else None
+            return QueryFeatures(
+                tables=sorted({_table_name(t) for t in tree.find_all(exp.Table) if t.name not in ctes}),
+                joins=len(list(tree.find_all(exp.Join))),
+                subqueries=max(0, len(selects) - 1),
+                group_by=[e.sql() for e in groups[-1].expressions] if groups else [],
+                aggregates=len(list(tree.find_all(exp.AggFunc))),
+                window_functions=len(list(tree.find_all(exp.Window))),
+                predicates=sum(_count_predicates(s) for s in selects),
+                order_by=len(order.expressions) if order else 0,
+                limit=_literal_int(limit.expression) if limit is not None else None,
+                distinct=bool(select is not None and select.args.get("distinct")),
+            )
+        except Exception as e:
+            logger.debug(f"Cost model could not parse query, using keyword analysis: {e}")
+
+    lowered = query.lower()
+    return QueryFeatures(
+        joins=lowered.count(" join "),
+        subqueries=max(0, lowered.count("select") - 1),
+        group_by=["?"] if "group by" in lowered else [],
+        aggregates=sum(lowered.count(f"{fn}(") for fn in ("sum", "count", "avg", "min", "max")),
+        window_functions=lowered.count(" over "),
+        order_by=1 if "order by" in lowered else 0,
+        parsed=False,
+    )
+
+
+def _table_name(table) -> str:
+    return ".".join(part for part in (table.db, table.name) if part)
+
+
+def _literal_int(node) -> Optional[int]:
+    try:
+        return int(node.this) if isinstance(node, exp.Literal) else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _count_predicates(select) -> int:
+    if select is None or not select.args.get("where"):
+        return 0
+    where = select.args["where"].this
+    return 1 + len(list(where.find_all(exp.And))) + len(list(where.find_all(exp.Or)))
+
+
+def table_statistics(
+    features: QueryFeatures, data_source: Dict[str, Any], schema: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Row counts per referenced table and distinct counts of the GROUP BY columns"""
+    schema = schema if isinstance(schema, dict) else (data_source.get("schema") or {})
+    if not isinstance(schema, dict):
+        schema = {}
+
+    tables: Dict[str, Dict[str, Any]] = {}
+    for table in schema.get("tables") or []:
+        if not isinstance(table, dict) or not table.get("name"):
+            continue
+        info = {
+            "rows": _as_int(table.get("rowCount", table.get("row_count"))),
+            "columns": {c.get("name"): c for c in table.get("columns") or [] if isinstance(c, dict)},
+        }
+        tables[str(table["name"]).lower()] = info
+        if table.get("schema"):
+            tables[f"{table['schema']}.{table['name']}".lower()] = info
+
+    # File/API sources are a single table whatever the query calls it
+    single = {
+        "rows": _as_int(data_source.get("row_count") or schema.get("row_count")),
+        "columns": {c.get("name"): c for c in schema.get("columns") or [] if isinstance(c, dict)},
+    }
+
+    stats: Dict[str, Any] = {"tables": {}, "group_by_ndv": {}, "estimated": []}
+    for name in features.tables or ["data"]:
+        info = tables.get(name.lower()) or tables.get(name.split(".")[-1].lower()) or single
+        rows = info["rows"]
+        if rows is None:
+            rows = DEFAULT_ROW_COUNT
+            stats["estimated"].append(name)
+        stats["tables"][name] = {"rows": rows, "columns": info["columns"]}
+
+    all_columns = {}
+    for info in stats["tables"].values():
+        all_columns.update(info.pop("columns"))
+    for key in features.group_by:
+        column = all_columns.get(key.strip('"').split(".")[-1])
+        ndv = _distinct_count(column) if column else None
+        stats["group_by_ndv"][key] = ndv
+    return stats
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _distinct_count(column: Dict[str, Any]) -> Optional[int]:
+    for source in (column, column.get("statistics") or {}):
+        for key in ("distinct_count", "unique_count", "ndv", "approx_unique"):
+            value = _as_int(source.get(key))
+            if value is not None:
+                return value
+    return None
+
+
+def estimate_work(features: QueryFeatures, stats: Dict[str, Any]) -> float:
+    """Abstract work units (~ rows touched) for a query"""
+    table_rows = [t["rows"] for t in stats["tables"].values()] or [DEFAULT_ROW_COUNT]
+    scanned = float(sum(table_rows))
+    # Each join probes the largest input once more
+    work = scanned + features.joins * max(table_rows)
+    if features.group_by or features.aggregates:
+        groups = 1.0
+        for ndv in stats["group_by_ndv"].values():
+            groups *= ndv if ndv else math.sqrt(scanned)
+        work += scanned * 0.2 + min(groups, scanned)
+        output_rows = min(groups, scanned) if features.group_by else 1.0
+    else:
+        output_rows = scanned
+    if features.window_functions:
+        work += features.window_functions * scanned * math.log2(max(scanned, 2))
+    if features.order_by and not features.limit:
+        work += output_rows * math.log2(max(output_rows, 2))
+    elif features.order_by:
+        work += output_rows
+    work += features.subqueries * scanned * 0.5
+    return max(work, 1.0)
+
+
+class QueryPerformanceMonitor:
+    """Monitor query performance across engines.
+
+    Besides the per-engine summary, keeps the recent (work units, latency)
+    observations per engine and per (engine, data source) so the cost model
+    can fit ``latency = overhead + rate * work`` from real runtimes.
+    """
+
+    def __init__(self, max_observations: int = 50, max_keys: int = 5000):
+        self.performance_metrics = {}
+        self.max_observations = max_observations
+        self.max_keys = max_keys
+        self._history: "OrderedDict[Tuple[str, str], Deque[Tuple[float, float]]]" = OrderedDict()
+        self._outcomes: Dict[Tuple[str, str], List[int]] = {}
+        self._lock = threading.Lock()
+
+    def record_query_performance(
+        self,
+        engine: Any,
+        execution_time: float,
+        data_size: int,
+        query_complexity: str,
+        data_source_id: Optional[str] = None,
+        work_units: Optional[float] = None,
+        success: bool = True,
+    ):
+        """Record query performance metrics"""
+        engine_name = getattr(engine, "value", engine)
+        with self._lock:
+            if engine_name not in self.performance_metrics:
+                self.performance_metrics[engine_name] = {
+                    "total_queries": 0,
+                    "total_time": 0,
+                    "avg_time": 0,
+                    "min_time": float("inf"),
+                    "max_time": 0,
+                    "failures": 0,
+                }
+
+            metrics = self.performance_metrics[engine_name]
+            metrics["total_queries"] += 1
+            if not success:
+                metrics["failures"] += 1
+            else:
+                metrics["total_time"] += execution_time
+                succeeded = metrics["total_queries"] - metrics["failures"]
+                metrics["avg_time"] = metrics["total_time"] / succeeded
+                metrics["min_time"] = min(metrics["min_time"], execution_time)
+                metrics["max_time"] = max(metrics["max_time"], execution_time)
+
+            for key in ((engine_name, "*"), (engine_name, str(data_source_id or "*"))):
+                outcome = self._outcomes.setdefault(key, [0, 0])
+                outcome[0 if success else 1] += 1
+                if success and work_units is not None:
+                    history = self._history.get(key)
+                    if history is None:
+                        history = self._history[key] = deque(maxlen=self.max_observations)
+                    self._history.move_to_end(key)
+                    history.append((float(work_units), float(execution_time)))
+            while len(self._history) > self.max_keys:
+                old_key, _ = self._history.popitem(last=False)
+                self._outcomes.pop(old_key, None)
+
+    def latency_model(self, engine: str, data_source_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Fitted (overhead, rate) for an engine, preferring this data source's own history"""
+        with self._lock:
+            for key, scope in (((engine, str(data_source_id)), "data_source"), ((engine, "*"), "engine")):
+                if data_source_id is None and scope == "data_source":
+                    continue
+                observations = list(self._history.get(key) or [])
+                if len(observations) >= MIN_HISTORY_SAMPLES:
+                    overhead, rate = _fit_latency(observations)
+                    return {"overhead": overhead, "rate": rate, "samples": len(observations), "scope": scope}
+        return None
+
+    def failure_rate(self, engine: str, data_source_id: Optional[str] = None) -> float:
+        with self._lock:
+            succeeded, failed = self._outcomes.get((engine, str(data_source_id or "*"))) or (0, 0)
+        total = succeeded + failed
+        return failed / total if total else 0.0
+
+    def get_performance_report(self) -> Dict[str, Any]:
+        """Get performance report for all engines"""
+        with self._lock:
+            engines = {name: dict(metrics) for name, metrics in self.performance_metrics.items()}
+        for name in engines:
+            engines[name]["latency_model"] = self.latency_model(name)
+        return {
+            "engines": engines,
+            "generated_at": datetime.now().isoformat(),
+        }
+
+
+def _fit_latency(observations: Iterable[Tuple[float, float]]) -> Tuple[float, float]:
+    """Least-squares fit of latency = overhead + rate * work, both clamped at zero"""
+    points = list(observations)
+    n = len(points)
+    mean_w = sum(w for w, _ in points) / n
+    mean_t = sum(t for _, t in points) / n
+    var_w = sum((w - mean_w) ** 2 for w, _ in points)
+    if var_w <= 0:
+        # All observations have the same size: attribute the latency to throughput
+        return 0.0, mean_t / max(mean_w, 1.0)
+    rate = max(0.0, sum((w - mean_w) * (t - mean_t) for w, t in points) / var_w)
+    overhead = max(0.0, mean_t - rate * mean_w)
+    return overhead, rate
+
+
+class CostBasedOptimizer:
+    """Chooses the engine and strategy with the lowest predicted latency"""
+
+    def __init__(self, monitor: Optional[QueryPerformanceMonitor] = None):
+        self.monitor = monitor or query_performance_monitor
+
+    def decide(
+        self,
+        query: str,
+        data_source: Dict[str, Any],
+        candidates: List[str],
+        allow_approximate: bool = False,
+        dialect: Optional[str] = None,
+        profile: Optional[Tuple[QueryFeatures, Dict[str, Any], float]] = None,
+    ) -> EngineDecision:
+        features, stats, work = profile or self.profile(query, data_source, dialect)
+        source_id = data_source.get("id") or data_source.get("data_source_id")
+
+        strategies = ["exact"]
+        if allow_approximate and (features.aggregates and not features.joins and not features.subqueries):
+            strategies.append("approximate")
+
+        costs: List[CandidateCost] = []
+        for engine in candidates:
+            model = self.monitor.latency_model(engine, source_id)
+            overhead, rate = (model["overhead"], model["rate"]) if model else ENGINE_PRIORS.get(engine, (1.0, 1e-7))
+            failure_rate = self.monitor.failure_rate(engine, source_id)
+            for strategy in strategies:
+                units = work * (APPROXIMATE_WORK_FRACTION if strategy == "approximate" else 1.0)
+                predicted = overhead + rate * units
+                # A failing engine costs a retry on the next one
+                predicted = predicted / max(1e-3, 1.0 - failure_rate)
+                costs.append(CandidateCost(
+                    engine=engine,
+                    strategy=strategy,
+                    predicted_seconds=predicted,
+                    basis=f"history:{model['scope']}" if model else "prior",
+                    samples=model["samples"] if model else 0,
+                    failure_rate=failure_rate,
+                ))
+
+        costs.sort(key=lambda c: c.predicted_seconds)
+        best = costs[0]
+        runner_up = next((c for c in costs[1:] if c.engine != best.engine or c.strategy != best.strategy), None)
+        reason = (
+            f"{best.engine}/{best.strategy} predicted {best.predicted_seconds:.3f}s for ~{work:,.0f} work units "
+            f"({best.basis})"
+        )
+        if runner_up:
+            reason += f"; next best {runner_up.engine}/{runner_up.strategy} at {runner_up.predicted_seconds:.3f}s"
+        return EngineDecision(
+            engine=best.engine,
+            strategy=best.strategy,
+            predicted_seconds=best.predicted_seconds,
+            work_units=work,
+            features=features,
+            statistics=stats,
+            candidates=costs,
+            reason=reason,
+        )
+
+    def profile(
+        self, query: str, data_source: Dict[str, Any], dialect: Optional[str] = None
+    ) -> Tuple[QueryFeatures, Dict[str, Any], float]:
+        """Features, table statistics and estimated work units of a query"""
+        features = analyze_sql(query, dialect)
+        stats = table_statistics(features, data_source, self._cached_schema(data_source))
+        return features, stats, estimate_work(features, stats)
+
+    @staticmethod
+    def _cached_schema(data_source: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Schema with table statistics from the schema cache, when the source itself carries none"""
+        schema = data_source.get("schema")
+        if isinstance(schema, dict) and (schema.get("tables") or schema.get("columns")):
+            return schema
+        source_id = data_source.get("id") or data_source.get("data_source_id")
+        if not source_id:
+            return None
+        try:
+            from app.modules.ai.services.schema_cache_service import get_schema_cache_service
+
+            return get_schema_cache_service().get_schema(str(source_id))
+        except Exception:
+            return None
+
+
+# Global instances: runtimes are shared by every MultiEngineQueryService in this worker
+query_performance_monitor = QueryPerformanceMonitor()
+query_cost_model = CostBasedOptimizer(query_performance_monitor)
@@ -11,6 +11,8 @@ from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy import select, and_, or_, text
 from app.db.session import async_session
 from app.modules.data.models import DataSource
+from app.core.tracing import traced, STAGE_RBAC
+from app.modules.data.services.data_source_catalog import data_source_catalog
 # Import models directly to avoid triggering dashboard model imports
 # from app.modules.projects.models import Project, Organization, UserOrganization
 # from app.modules.user.models import User
@@ -128,6 +130,7 @@ class DataSourceRBACService:
                 "has_admin_access": False
             }
     
+    @traced(STAGE_RBAC)
     async def get_accessible_data_sources(
         self, 
         user_id: str, 
@@ -151,34 +154,26 @@ class DataSourceRBACService:
             List of accessible data sources
         """
         try:
-            async with async_session() as db:
-                # Get user context - handle errors gracefully
-                try:
-                    user_context = await self.get_user_context(user_id)
-                    if "error" in user_context:
-                        # If user context fails, still try to get user's own data sources
-                        user_project_ids = []
-                        user_org_ids = []
-                    else:
-                        user_org_ids = [org["id"] for org in user_context.get("organizations", [])]
-                        user_project_ids = [proj["id"] for proj in user_context.get("projects", [])]
-                except Exception as ctx_error:
-                    self.logger.warning(f"Could not get user context, falling back to user-owned sources only: {ctx_error}")
+            # Get user context - handle errors gracefully
+            try:
+                user_context = await self.get_user_context(user_id)
+                if "error" in user_context:
+                    # If user context fails, still try to get user's own data sources
                     user_project_ids = []
                     user_org_ids = []
-                
-                # Build query conditions - CRITICAL: Always filter by user_id first
-                # Security: Never return data sources from other users
-                conditions = []
-                
-                # 1. Data sources owned by user (convert to string for comparison)
-                # This is MANDATORY - all results must be owned by this user
-                user_owned_condition = DataSource.user_id == str(user_id)
-                
-                # 2. Data sources in user's projects - use direct SQL
-                project_data_source_ids = []
-                if user_project_ids:
-                    try:
+                else:
+                    user_org_ids = [org["id"] for org in user_context.get("organizations", [])]
+                    user_project_ids = [proj["id"] for proj in user_context.get("projects", [])]
+            except Exception as ctx_error:
+                self.logger.warning(f"Could not get user context, falling back to user-owned sources only: {ctx_error}")
+                user_project_ids = []
+                user_org_ids = []
+            
+            # Data sources in user's projects - use direct SQL
+            project_data_source_ids = []
+            if user_project_ids:
+                try:
+                    async with async_session() as db:
                         project_ds_result = await db.execute(
                             text("""
                                 SELECT data_source_id
@@ -188,92 +183,33 @@ class DataSourceRBACService:
                             {"project_ids": user_project_ids}
                         )
                         project_data_source_ids = [row[0] for row in project_ds_result.fetchall()]
-                    except Exception as proj_error:
-                        self.logger.warning(f"Could not get project data sources: {proj_error}")
-                
-                # Build final query - ALWAYS require user_id match
-                # Only include project sources if they ALSO belong to the user
-                if project_data_source_ids:
-                    # Get project sources that are ALSO owned by the user
-                    result = await db.execute(
-                        select(DataSource).where(
-                            and_(
-                                user_owned_condition,  # MUST be owned by user
-                                DataSource.id.in_(project_data_source_ids),  # AND in user's projects
-                                DataSource.is_active == True
-                            )
-                        ).order_by(DataSource.created_at.desc())
-                    )
-                else:
-                    # Only user-owned sources (no project sources)
-                    result = await db.execute(
-                        select(DataSource).where(
-                            and_(
-                                user_owned_condition,  # MUST be owned by user
-                                DataSource.is_active == True
-                            )
-                        ).order_by(DataSource.created_at.desc())
-                    )
-                
-                data_sources = result.scalars().all()
-                
-                # Convert to response format
-                accessible_sources = []
-                for ds in data_sources:
-                    source_data = {
-                        "id": ds.id,
-                        "name": ds.name,
-                        "type": ds.type,
-                        "format": ds.format,
-                        "db_type": ds.db_type,
-                        "size": ds.size,
-                        "row_count": ds.row_count,
-                        "schema": ds.schema,
-                        "description": ds.description,
-                        "user_id": ds.user_id,
-                        "created_at": ds.created_at.isoformat() if ds.created_at else None,
-                        "updated_at": ds.updated_at.isoformat() if ds.updated_at else None,
-                        "is_active": ds.is_active,
-                        "last_accessed": ds.last_accessed.isoformat() if ds.last_accessed else None
-                    }
-                    
-                    # Add config for database/warehouse sources - CRITICAL: Decrypt credentials
-                    if (ds.type == 'database' or ds.type == 'warehouse') and ds.connection_config:
-                        try:
-                            import json
-                            config = json.loads(ds.connection_config) if isinstance(ds.connection_config, str) else ds.connection_config
-                            
-                            # CRITICAL: Decrypt credentials before returning
-                            try:
-                                from app.modules.data.utils.credentials import decrypt_credentials
-                                config = decrypt_credentials(config)
-                            except Exception as decrypt_error:
-                                self.logger.debug(f"Could not decrypt credentials (may not be encrypted): {decrypt_error}")
-                            
-                            # Add to both config and connection_config for compatibility
-                            source_data["config"] = config
-                            source_data["connection_config"] = config
-                            source_data["connection_info"] = config  # Also add as connection_info for query engine
-                            source_data["status"] = "connected"
-                            source_data["connection_status"] = "connected"  # Add connection_status for frontend
-                        except Exception as config_error:
-                            self.logger.warning(f"Error parsing connection_config for data source {ds.id}: {config_error}")
-                            source_data["config"] = {}
-                            source_data["connection_config"] = {}
-                            source_data["status"] = "disconnected"
-                            source_data["connection_status"] = "disconnected"  # Add connection_status for frontend
-                    
+                except Exception as proj_error:
+                    self.logger.warning(f"Could not get project data sources: {proj_error}")
+            
+            # One catalog query - CRITICAL: always filtered by owner, so project
+            # sources are only included if they ALSO belong to the user
+            accessible_sources = await data_source_catalog.list_sources(
+                owner_id=user_id,
+                ids=project_data_source_ids or None,
+                newest_first=True,
+                include_config=True,
+            )
+            
+            for source_data in accessible_sources:
+                if source_data["type"] == 'file':
                     # For file sources, check if they're active
-                    if ds.type == 'file':
-                        source_data["status"] = "connected" if ds.is_active else "disconnected"
-                        source_data["connection_status"] = "connected" if ds.is_active else "disconnected"
-                    elif "connection_status" not in source_data:
-                        # Default status for other types
-                        source_data["connection_status"] = source_data.get("status", "unknown")
-                    
-                    accessible_sources.append(source_data)
-                
-                return accessible_sources
+                    status = "connected" if source_data.get("is_active") else "disconnected"
+                elif "connection_config" in source_data:
+                    # Database/warehouse config was parsed and decrypted by the catalog
+                    status = "connected" if source_data["connection_config"] else "disconnected"
+                else:
+                    # Default status for other types
+                    status = "unknown"
+                if status != "unknown":
+                    source_data["status"] = status
+                source_data["connection_status"] = status  # Add connection_status for frontend
+            
+            return accessible_sources
                 
         except Exception as e:
             self.logger.error(f"Error getting accessible data sources: {e}")
@@ -282,6 +218,7 @@ class DataSourceRBACService:
             # Return empty list instead of raising to allow UI to continue
             return []
     
+    @traced(STAGE_RBAC)
     async def can_access_data_source(
         self, 
         user_id: str, 
@@ -0,0 +1,325 @@
+"""
+Query Result Budgets and Spill-to-Disk
+Bound what one query can hold in memory and page through oversized results
+
+Engines fetch rows in batches into a ``ResultCollector``. Results within the
+inline row/byte budget are returned as before; larger ones are written to a
+temporary Parquet file and the response carries the first page plus a handle
+that ``spill_store`` pages through. A hard cap stops fetching altogether and
+marks the result truncated. The budget also carries the statement timeout the
+engines forward to the database.
+"""
+
+import logging
+import os
+import secrets
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.config import settings
+from app.modules.data.services.arrow_connectors import rows_to_batch
+
+logger = logging.getLogger(__name__)
+
+_SAMPLE_ROWS = 64  # rows per batch sized to estimate its bytes
+_HANDLE_PREFIX = "res_"
+
+
+@dataclass
+class ResultBudget:
+    """Per-request limits: inline rows/bytes, a hard cap on total rows/bytes and the statement timeout"""
+
+    max_rows: int
+    max_bytes: int
+    spill_max_rows: int
+    spill_max_bytes: int
+    timeout_seconds: Optional[float] = None
+    batch_rows: int = 5000
+
+    @classmethod
+    def default(cls) -> "ResultBudget":
+        return cls(
+            max_rows=settings.QUERY_RESULT_MAX_ROWS,
+            max_bytes=settings.QUERY_RESULT_MAX_BYTES,
+            spill_max_rows=settings.QUERY_SPILL_MAX_ROWS,
+            spill_max_bytes=settings.QUERY_SPILL_MAX_BYTES,
+            timeout_seconds=settings.QUERY_STATEMENT_TIMEOUT or None,
+            batch_rows=settings.QUERY_FETCH_BATCH_ROWS,
+        )
+
+    @classmethod
+    def from_options(cls, options: Optional[Dict[str, Any]]) -> "ResultBudget":
+        """Request overrides, clamped to the server's limits"""
+        budget = cls.default()
+        options = options or {}
+
+        def clamp(key: str, ceiling):
+            value = options.get(key)
+            try:
+                value = float(value) if key == "timeout_seconds" else int(value)
+            except (TypeError, ValueError):
+                return ceiling
+            if value <= 0:
+                return ceiling
+            return min(value, ceiling) if ceiling else value
+
+        budget.max_rows = clamp("max_rows", budget.max_rows)
+        budget.max_bytes = clamp("max_bytes", budget.max_bytes)
+        budget.timeout_seconds = clamp("timeout_seconds", budget.timeout_seconds)
+        return budget
+
+    @property
+    def timeout_ms(self) -> Optional[int]:
+        return int(self.timeout_seconds * 1000) if self.timeout_seconds else None
+
+
+def estimate_row_bytes(rows: Sequence[Sequence[Any]]) -> float:
+    """Approximate in-memory size of a row, from a sample of the batch"""
+    if not rows:
+        return 0.0
+    step = max(1, len(rows) // _SAMPLE_ROWS)
+    sample = rows[::step][:_SAMPLE_ROWS]
+    total = 0
+    for row in sample:
+        total += 16 + 8 * len(row)
+        for value in row:
+            if isinstance(value, (str, bytes)):
+                total += len(value)
+            elif value is not None:
+                total += 16
+    return total / len(sample)
+
+
+def _conform(array: pa.Array, arrow_type: pa.DataType) -> pa.Array:
+    """A later batch's column as the spill file's column type"""
+    if array.type == arrow_type:
+        return array
+    try:
+        return array.cast(arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        if pa.types.is_string(arrow_type):
+            return pa.array([None if v is None else str(v) for v in array.to_pylist()], type=arrow_type)
+        raise
+
+
+class ResultCollector:
+    """Accumulates fetched rows under a ``ResultBudget``; spills past the inline limits"""
+
+    def __init__(self, columns: List[str], budget: ResultBudget):
+        self.columns = list(columns)
+        self.budget = budget
+        self.rows: List[tuple] = []
+        self.row_count = 0
+        self.bytes = 0
+        self.truncated = False
+        self.handle: Optional[str] = None
+        self.path: Optional[str] = None
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._schema: Optional[pa.Schema] = None
+
+    def add(self, chunk: Sequence[Sequence[Any]]) -> bool:
+        """Take one fetched batch; False once the hard cap is reached (stop fetching)"""
+        if self.truncated or not chunk:
+            return not self.truncated
+        chunk = [tuple(r) for r in chunk]
+        per_row = estimate_row_bytes(chunk)
+        room = self.budget.spill_max_rows - self.row_count
+        if self.budget.spill_max_bytes and per_row:
+            room = min(room, int((self.budget.spill_max_bytes - self.bytes) / per_row))
+        if len(chunk) > room:
+            chunk = chunk[:max(room, 0)]
+            self.truncated = True
+        self.row_count += len(chunk)
+        self.bytes += int(per_row * len(chunk))
+
+        if self._writer is None:
+            self.rows.extend(chunk)
+            if len(self.rows) > self.budget.max_rows or self.bytes > self.budget.max_bytes:
+                self._start_spill()
+        else:
+            self._write(chunk)
+        if self.truncated:
+            logger.warning(f"✂️ Result truncated at {self.row_count} rows (~{self.bytes} bytes)")
+        return not self.truncated
+
+    def _start_spill(self) -> None:
+        os.makedirs(settings.QUERY_SPILL_DIR, exist_ok=True)
+        self.handle = f"{_HANDLE_PREFIX}{secrets.token_hex(16)}"
+        self.path = spill_store.path_for(self.handle)
+        self._write(self.rows)
+        # Only the first page (within both inline limits) stays in memory
+        keep = min(self.budget.max_rows, max(1, self.budget.max_bytes * len(self.rows) // max(self.bytes, 1)))
+        self.rows = self.rows[:keep]
+        logger.info(f"💾 Spilling query result to {self.path}")
+
+    def _batch(self, chunk: List[tuple]) -> pa.RecordBatch:
+        if self._schema is None:
+            batch = rows_to_batch(chunk, self.columns)
+            # All-null columns in the first batch are stored as text
+            arrays = [a.cast(pa.string()) if pa.types.is_null(a.type) else a for a in batch.columns]
+            batch = pa.RecordBatch.from_arrays(arrays, names=self.columns)
+            self._schema = batch.schema
+            return batch
+        batch = rows_to_batch(chunk, self.columns, self._schema.types)
+        return pa.RecordBatch.from_arrays(
+            [_conform(array, field.type) for array, field in zip(batch.columns, self._schema)], schema=self._schema
+        )
+
+    def _write(self, chunk: List[tuple]) -> None:
+        batch = self._batch(chunk)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self._schema, compression="zstd")
+        self._writer.write_table(pa.Table.from_batches([batch]), row_group_size=self.budget.batch_rows)
+
+    def abort(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self.path:
+            spill_store.release(self.handle)
+
+    def result(self) -> Dict[str, Any]:
+        """Result dict: the inline rows, plus the spill handle when the result did not fit"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        data = [dict(zip(self.columns, row)) for row in self.rows]
+        result = {
+            "success": True,
+            "data": data,
+            "columns": self.columns,
+            "row_count": self.row_count if self.handle else len(data),
+        }
+        if self.truncated:
+            result["truncated"] = True
+        if self.handle:
+            result["spill"] = {
+                "handle": self.handle,
+                "rows": self.row_count,
+                "inline_rows": len(data),
+                "bytes": os.path.getsize(self.path),
+                "expires_in": settings.QUERY_SPILL_TTL,
+            }
+        return result
+
+
+def collect_cursor(cursor: Any, columns: List[str], budget: ResultBudget) -> Dict[str, Any]:
+    """Drain a DB-API style cursor (``fetchmany``) into a budgeted result"""
+    collector = ResultCollector(columns, budget)
+    try:
+        while True:
+            chunk = cursor.fetchmany(budget.batch_rows)
+            if not chunk or not collector.add(chunk):
+                break
+    except Exception:
+        collector.abort()
+        raise
+    return collector.result()
+
+
+class SpillStore:
+    """Spilled results on the shared upload volume, paged by handle from any worker"""
+
+    def path_for(self, handle: str) -> str:
+        if not handle.startswith(_HANDLE_PREFIX) or not handle[len(_HANDLE_PREFIX):].isalnum():
+            raise ValueError("Invalid result handle")
+        return os.path.join(settings.QUERY_SPILL_DIR, f"{handle}.parquet")
+
+    def _open(self, handle: str) -> Optional[pq.ParquetFile]:
+        path = self.path_for(handle)
+        try:
+            if time.time() - os.path.getmtime(path) > settings.QUERY_SPILL_TTL:
+                self.release(handle)
+                return None
+            return pq.ParquetFile(path)
+        except FileNotFoundError:
+            return None
+
+    def page(self, handle: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Rows ``offset``..``offset+limit`` of a spilled result, reading only the row groups involved"""
+        parquet = self._open(handle)
+        if parquet is None:
+            return {"success": False, "error": "Result handle not found or expired"}
+        total = parquet.metadata.num_rows
+        offset = max(0, int(offset))
+        limit = max(1, min(int(limit or settings.QUERY_RESULT_MAX_ROWS), settings.QUERY_RESULT_MAX_ROWS))
+        groups, start, first_row = [], 0, None
+        for index in range(parquet.num_row_groups):
+            rows = parquet.metadata.row_group(index).num_rows
+            if start + rows > offset and start < offset + limit:
+                groups.append(index)
+                first_row = start if first_row is None else first_row
+            start += rows
+        table = parquet.read_row_groups(groups) if groups else parquet.schema_arrow.empty_table()
+        if groups:
+            table = table.slice(offset - first_row, limit)
+        return {
+            "success": True,
+            "data": table.to_pylist(),
+            "columns": table.column_names,
+            "offset": offset,
+            "row_count": table.num_rows,
+            "total_rows": total,
+            "has_more": offset + table.num_rows < total,
+        }
+
+    def read_all(self, handle: str) -> Optional[List[Dict[str, Any]]]:
+        """Every row of a spilled result (None when the handle is unknown or expired)"""
+        parquet = self._open(handle)
+        return parquet.read().to_pylist() if parquet is not None else None
+
+    def release(self, handle: str) -> bool:
+        try:
+            os.remove(self.path_for(handle))
+            return True
+        except (FileNotFoundError, ValueError):
+            return False
+
+    def cleanup_expired(self) -> int:
+        """Delete spill files older than the TTL"""
+        removed = 0
+        try:
+            names = os.listdir(settings.QUERY_SPILL_DIR)
+        except FileNotFoundError:
+            return 0
+        cutoff = time.time() - settings.QUERY_SPILL_TTL
+        for name in names:
+            path = os.path.join(settings.QUERY_SPILL_DIR, name)
+            try:
+                if name.startswith(_HANDLE_PREFIX) and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"🧹 Removed {removed} expired spilled results")
+        return removed
+
+
+# Global instance
+spill_store = SpillStore()
+
+
+def complete_rows(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """All rows of a successful engine result for callers that persist it.
+
+    A spilled remainder is read back and its file released; a result cut at
+    the hard cap raises ``ValueError`` instead of passing as complete.
+    """
+    if result.get("truncated"):
+        raise ValueError(
+            f"Query result exceeds the {settings.QUERY_SPILL_MAX_ROWS} row / "
+            f"{settings.QUERY_SPILL_MAX_BYTES} byte limit and was truncated"
+        )
+    spill = result.get("spill")
+    if not spill:
+        return result.get("data") or []
+    rows = spill_store.read_all(spill["handle"])
+    spill_store.release(spill["handle"])
+    if rows is None:
+        raise ValueError("Spilled query result expired before it was read")
+    return rows
@@ -0,0 +1,560 @@
+"""
+Rollup Manager
+Mines executed queries and snapshot history for recurring GROUP BY/measure
+patterns per data source and pre-aggregates them: rollup Parquet files built
+with DuckDB for file sources, materialized views for Postgres sources.
+Matching queries are rewritten to re-aggregate the rollup instead of the raw
+rows (SUM of sums, SUM of counts, MIN of mins, ...).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.cache_invalidation import cache_tags, tags_for_data_source
+from app.core.compute_executor import compute_executor
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from sqlglot import exp
+
+    SQLGLOT_AVAILABLE = True
+except ImportError:  # pragma: no cover - sqlglot ships with the server requirements
+    SQLGLOT_AVAILABLE = False
+
+from app.modules.data.services.sql_pipeline import sql_pipeline
+
+ROWS_COLUMN = "__rollup_rows"
+# Aggregate -> rollup columns it is re-aggregated from
+_MEASURE_FUNCS = {"sum": ("sum",), "count": ("count",), "min": ("min",), "max": ("max",), "avg": ("sum", "count")}
+# Only Postgres rollups are materialized views; other warehouses keep querying raw tables
+ROLLUP_DIALECTS = {"postgres"}
+MAX_PATTERNS_PER_SOURCE = 200
+# Plain (unquoted) identifier accepted for client-named schemas and views
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{0,62}")
+
+
+@dataclass(frozen=True)
+class QueryPattern:
+    """Table, grouping/filter columns and measures of one aggregate query"""
+
+    table: str
+    dimensions: Tuple[str, ...]
+    measures: Tuple[Tuple[str, Tuple[str, ...]], ...]  # (column, rollup funcs)
+
+    @property
+    def measure_map(self) -> Dict[str, Tuple[str, ...]]:
+        return dict(self.measures)
+
+
+@dataclass
+class Rollup:
+    name: str
+    table: str
+    dimensions: List[str]
+    measures: Dict[str, List[str]]
+    kind: str  # "parquet" | "materialized_view"
+    location: str  # Parquet path or qualified view name
+    rows: int = 0
+    source_rows: Optional[int] = None
+    built_at: float = field(default_factory=time.time)
+
+    def covers(self, pattern: QueryPattern) -> bool:
+        if pattern.table != self.table or not set(pattern.dimensions) <= set(self.dimensions):
+            return False
+        return all(set(funcs) <= set(self.measures.get(col, ())) for col, funcs in pattern.measures)
+
+
+def _identifier_name(sql: str) -> str:
+    return sql[1:-1].replace('""', '"') if len(sql) > 1 and sql[0] == sql[-1] == '"' else sql
+
+
+def _quoted(name: str):
+    return exp.to_identifier(name, quoted=True)
+
+
+def _parse_single_select(query: str, dialect: Optional[str]):
+    if not SQLGLOT_AVAILABLE:
+        return None
+    try:
+        tree = sql_pipeline.parse(query, dialect)
+    except Exception:
+        return None
+    if not isinstance(tree, exp.Select) or tree.args.get("with") or tree.args.get("joins"):
+        return None
+    if len(list(tree.find_all(exp.Select))) > 1 or tree.find(exp.Window):
+        return None
+    from_ = tree.args.get("from")
+    if not from_ or not isinstance(from_.this, exp.Table):
+        return None
+    if any(isinstance(p.unalias(), exp.Star) for p in tree.expressions):
+        return None
+    return tree
+
+
+def extract_pattern(query: str, dialect: Optional[str] = None, file_source: bool = False) -> Optional[QueryPattern]:
+    """Rollup pattern of a single-table aggregate query; None when a rollup cannot answer it"""
+    tree = _parse_single_select(query, dialect)
+    if tree is None:
+        return None
+    return _pattern_of(tree, dialect, file_source)
+
+
+def _pattern_of(tree, dialect: Optional[str], file_source: bool) -> Optional[QueryPattern]:
+    measures: Dict[str, set] = {}
+    for agg in tree.find_all(exp.AggFunc):
+        kind = {exp.Sum: "sum", exp.Count: "count", exp.Min: "min", exp.Max: "max", exp.Avg: "avg"}.get(type(agg))
+        arg = agg.this
+        if kind is None or isinstance(arg, exp.Distinct):
+            return None
+        if kind == "count" and (arg is None or isinstance(arg, exp.Star)):
+            continue  # COUNT(*) is always available as ROWS_COLUMN
+        if not isinstance(arg, exp.Column):
+            return None
+        measures.setdefault(arg.this.sql(dialect=dialect), set()).update(_MEASURE_FUNCS[kind])
+    if not tree.args.get("group") and not tree.find(exp.AggFunc):
+        return None
+
+    aliases = {p.alias for p in tree.expressions if p.alias}
+    dimensions = set()
+    for column in tree.find_all(exp.Column):
+        if column.find_ancestor(exp.AggFunc):
+            continue
+        # ORDER BY / HAVING may name projection aliases rather than table columns
+        if not column.table and column.name in aliases and column.find_ancestor(exp.Order, exp.Having):
+            continue
+        dimensions.add(column.this.sql(dialect=dialect))
+
+    table = tree.args["from"].this.copy()
+    table.set("alias", None)
+    return QueryPattern(
+        table="data" if file_source else table.sql(dialect=dialect),
+        dimensions=tuple(sorted(dimensions)),
+        measures=tuple(sorted((col, tuple(sorted(funcs))) for col, funcs in measures.items())),
+    )
+
+
+def rollup_select_sql(rollup: Rollup, dialect: Optional[str] = None) -> str:
+    """SELECT that materializes a rollup from its source table"""
+    columns = list(rollup.dimensions) + [f'COUNT(*) AS "{ROWS_COLUMN}"']
+    for column, funcs in sorted(rollup.measures.items()):
+        name = _identifier_name(column)
+        for func in funcs:
+            columns.append(f"{func.upper()}({column}) AS {_quoted(f'{func}__{name}').sql(dialect=dialect)}")
+    sql = f"SELECT {', '.join(columns)} FROM {rollup.table}"
+    if rollup.dimensions:
+        sql += f" GROUP BY {', '.join(rollup.dimensions)}"
+    return sql
+
+
+def rewrite_for_rollup(query: str, rollup: Rollup, dialect: Optional[str] = None, file_source: bool = False) -> Optional[str]:
+    """Re-aggregate ``query`` over ``rollup``; None when the rollup does not cover it.
+
+    Unaliased aggregates keep the output name the approximate rewrite uses
+    (the lowercased expression), so both paths name columns alike.
+    """
+    tree = _parse_single_select(query, dialect)
+    if tree is None:
+        return None
+    pattern = _pattern_of(tree, dialect, file_source)
+    if pattern is None or not rollup.covers(pattern):
+        return None
+
+    projections = []
+    for projection in tree.expressions:
+        if not projection.alias and projection.find(exp.AggFunc):
+            projection = exp.alias_(projection, projection.sql(dialect="duckdb").lower(), quoted=True)
+        projections.append(projection)
+    tree.set("expressions", projections)
+
+    def reaggregate(node):
+        if not isinstance(node, (exp.Sum, exp.Count, exp.Min, exp.Max, exp.Avg)):
+            return node
+        arg = node.this
+        if isinstance(node, exp.Count) and (arg is None or isinstance(arg, exp.Star)):
+            return exp.Coalesce(this=exp.Sum(this=exp.column(_quoted(ROWS_COLUMN))), expressions=[exp.Literal.number(0)])
+
+        def ref(func: str):
+            return exp.column(_quoted(f"{func}__{arg.name}"), table=arg.args.get("table"))
+
+        if isinstance(node, exp.Sum):
+            return exp.Sum(this=ref("sum"))
+        if isinstance(node, exp.Count):
+            return exp.Coalesce(this=exp.Sum(this=ref("count")), expressions=[exp.Literal.number(0)])
+        if isinstance(node, exp.Min):
+            return exp.Min(this=ref("min"))
+        if isinstance(node, exp.Max):
+            return exp.Max(this=ref("max"))
+        return exp.Div(
+            this=exp.Cast(this=exp.Sum(this=ref("sum")), to=exp.DataType.build("DOUBLE")),
+            expression=exp.Nullif(this=exp.Sum(this=ref("count")), expression=exp.Literal.number(0)),
+        )
+
+    tree = tree.transform(reaggregate)
+    if rollup.kind == "materialized_view":
+        table = tree.args["from"].this
+        replacement = exp.to_table(rollup.location, dialect=dialect)
+        replacement.set("alias", table.args.get("alias"))
+        table.replace(replacement)
+    return tree.sql(dialect=dialect)
+
+
+def plan_rollups(patterns: Counter, min_count: Optional[int] = None) -> List[Rollup]:
+    """Greedily merge frequent patterns of each table into at most ROLLUP_MAX_PER_SOURCE rollups"""
+    min_count = min_count or settings.ROLLUP_MIN_QUERY_COUNT
+    planned: List[Rollup] = []
+    for pattern, count in patterns.most_common():
+        if count < min_count or len(pattern.dimensions) > settings.ROLLUP_MAX_DIMENSIONS:
+            continue
+        for rollup in planned:
+            dimensions = set(rollup.dimensions) | set(pattern.dimensions)
+            if rollup.table == pattern.table and len(dimensions) <= settings.ROLLUP_MAX_DIMENSIONS:
+                rollup.dimensions = sorted(dimensions)
+                for column, funcs in pattern.measures:
+                    rollup.measures[column] = sorted(set(rollup.measures.get(column, [])) | set(funcs))
+                break
+        else:
+            if len(planned) < settings.ROLLUP_MAX_PER_SOURCE:
+                planned.append(Rollup(
+                    name="", table=pattern.table, dimensions=list(pattern.dimensions),
+                    measures={c: list(f) for c, f in pattern.measures}, kind="", location="",
+                ))
+    for rollup in planned:
+        signature = json.dumps([rollup.table, rollup.dimensions, rollup.measures], sort_keys=True)
+        rollup.name = "aiser_rollup_" + hashlib.sha1(signature.encode()).hexdigest()[:12]
+    return planned
+
+
+def qualified_view_name(name: str, schema: Optional[str] = None) -> str:
+    """``schema.name`` for client-supplied identifiers; ValueError unless each is a plain identifier"""
+    for part in (name, schema):
+        if part is not None and not IDENTIFIER_PATTERN.fullmatch(part):
+            raise ValueError(f"Invalid identifier: {part!r}")
+    return f"{schema}.{name}" if schema else name
+
+
+def materialized_view_select(sql: str, dialect: Optional[str]) -> str:
+    """Client SQL for a materialized view, re-rendered from its parse tree.
+
+    Raises ValueError unless it is exactly one read-only SELECT, so only the
+    DDL generated around it runs with write access.
+    """
+    check = sql_pipeline.check_read_only(sql, dialect, allow_explain=False)
+    if not check.allowed:
+        raise ValueError(check.reason)
+    if not check.parsed:
+        raise ValueError("the query could not be parsed")
+    return sql_pipeline.parse(sql, dialect).sql(dialect=dialect)
+
+
+def create_materialized_view_sql(qualified: str, sql: str) -> str:
+    return f"CREATE MATERIALIZED VIEW {qualified} AS {sql}"
+
+
+def refresh_materialized_view_sql(qualified: str, concurrently: bool = False) -> str:
+    return f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{qualified}"
+
+
+def drop_materialized_view_sql(qualified: str) -> str:
+    return f"DROP MATERIALIZED VIEW IF EXISTS {qualified}"
+
+
+class RollupManager:
+    """Per-source query patterns and the rollups built from them.
+
+    Patterns are counted in memory per worker; built rollups are recorded in
+    a manifest under ``ROLLUP_DIR`` so every worker can use them. File
+    rollups are dropped when their data source is invalidated; materialized
+    views are refreshed once older than ``ROLLUP_MAX_STALENESS_SECONDS``.
+    """
+
+    def __init__(self, rollup_dir: Optional[str] = None):
+        self.rollup_dir = rollup_dir or settings.ROLLUP_DIR
+        self._patterns: Dict[str, Counter] = {}
+        self._manifests: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._tier = cache_tags.register_tier("rollups", self._evict)
+
+    def _key(self, data_source: Dict[str, Any]) -> str:
+        identity = f"{data_source.get('id')}|{data_source.get('file_path')}|{data_source.get('size')}"
+        return hashlib.sha256(identity.encode()).hexdigest()[:40]
+
+    def _manifest_path(self, key: str) -> str:
+        return os.path.join(self.rollup_dir, key, "manifest.json")
+
+    def _evict(self, keys: List[str]) -> None:
+        for key in keys:
+            manifest = self._manifests.pop(key, None) or self._read_manifest(key)
+            for entry in manifest.get("rollups", []):
+                if entry.get("kind") == "parquet":
+                    try:
+                        os.unlink(entry["location"])
+                    except OSError:
+                        pass
+            try:
+                os.unlink(self._manifest_path(key))
+            except OSError:
+                pass
+
+    def _read_manifest(self, key: str) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"rollups": [], "rejected": []}
+
+    def _write_manifest(self, key: str, manifest: Dict[str, Any]) -> None:
+        path = self._manifest_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(path + ".tmp", path)
+
+    def _manifest(self, data_source: Dict[str, Any]) -> Dict[str, Any]:
+        key = self._key(data_source)
+        if key not in self._manifests:
+            self._manifests[key] = self._read_manifest(key)
+            cache_tags.tag(self._tier, key, tags_for_data_source(data_source))
+        return self._manifests[key]
+
+    def rollups(self, data_source: Dict[str, Any]) -> List[Rollup]:
+        return [Rollup(**entry) for entry in self._manifest(data_source).get("rollups", [])]
+
+    def observe(self, query: str, data_source: Dict[str, Any], dialect: Optional[str] = None) -> bool:
+        """Count an executed query's pattern; True when a new rollup became worth building"""
+        if not settings.ROLLUP_ENABLED or not self.supports(data_source, dialect):
+            return False
+        pattern = extract_pattern(query, dialect, file_source=data_source.get("type") == "file")
+        if pattern is None:
+            return False
+        counter = self._patterns.setdefault(self._key(data_source), Counter())
+        if pattern not in counter and len(counter) >= MAX_PATTERNS_PER_SOURCE:
+            # Forget the rarest pattern to bound memory
+            del counter[min(counter, key=counter.get)]
+        counter[pattern] += 1
+        return counter[pattern] == settings.ROLLUP_MIN_QUERY_COUNT and not any(
+            r.covers(pattern) for r in self.rollups(data_source)
+        )
+
+    def observe_history(self, entries: List[Dict[str, Any]], data_source: Dict[str, Any], dialect: Optional[str] = None) -> int:
+        """Count past queries (e.g. saved snapshots: ``{'sql': ...}``) of this source"""
+        observed = 0
+        for entry in entries:
+            if entry.get("sql") and extract_pattern(entry["sql"], dialect, data_source.get("type") == "file"):
+                self.observe(entry["sql"], data_source, dialect)
+                observed += 1
+        return observed
+
+    @staticmethod
+    def supports(data_source: Dict[str, Any], dialect: Optional[str]) -> bool:
+        row_count = data_source.get("row_count")
+        if row_count and row_count < settings.ROLLUP_MIN_SOURCE_ROWS:
+            return False
+        source_type = data_source.get("type")
+        if source_type == "file":
+            return True
+        return source_type in ("database", "warehouse") and dialect in ROLLUP_DIALECTS
+
+    def match(
+        self, query: str, data_source: Dict[str, Any], dialect: Optional[str] = None
+    ) -> Optional[Tuple[Rollup, str]]:
+        """Smallest fresh rollup answering ``query`` and the rewritten SQL"""
+        if not settings.ROLLUP_ENABLED or not self.supports(data_source, dialect):
+            return None
+        file_source = data_source.get("type") == "file"
+        now = time.time()
+        for rollup in sorted(self.rollups(data_source), key=lambda r: r.rows):
+            if rollup.kind == "parquet" and not os.path.exists(rollup.location):
+                continue
+            if rollup.kind == "materialized_view" and now - rollup.built_at > settings.ROLLUP_MAX_STALENESS_SECONDS:
+                continue
+            rewritten = rewrite_for_rollup(query, rollup, dialect, file_source)
+            if rewritten:
+                return rollup, rewritten
+        return None
+
+    def stale_views(self, data_source: Dict[str, Any]) -> List[Rollup]:
+        now = time.time()
+        return [
+            r for r in self.rollups(data_source)
+            if r.kind == "materialized_view" and now - r.built_at > settings.ROLLUP_MAX_STALENESS_SECONDS
+        ]
+
+    def status(self, data_source: Dict[str, Any]) -> Dict[str, Any]:
+        counter = self._patterns.get(self._key(data_source), Counter())
+        return {
+            "rollups": [asdict(r) for r in self.rollups(data_source)],
+            "candidates": [asdict(r) for r in plan_rollups(counter)],
+            "patterns": [
+                {"table": p.table, "dimensions": list(p.dimensions), "measures": p.measure_map, "count": n}
+                for p, n in counter.most_common(20)
+            ],
+        }
+
+    async def maintain(
+        self,
+        data_source: Dict[str, Any],
+        dialect: Optional[str] = None,
+        load: Optional[Callable[[Any, Dict[str, Any]], Awaitable[None]]] = None,
+        run_sql: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None,
+        tenant: Optional[str] = None,
+    ) -> List[Rollup]:
+        """Build planned rollups that no existing one covers; refresh stale views.
+
+        File sources need ``load(conn, data_source)`` (creates ``data`` on a
+        DuckDB connection); database sources need ``run_sql(sql)`` able to run
+        DDL. Returns the rollups built.
+        """
+        if not settings.ROLLUP_ENABLED or not self.supports(data_source, dialect):
+            return []
+        key = self._key(data_source)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        built: List[Rollup] = []
+        async with lock:
+            manifest = self._manifest(data_source)
+            existing = self.rollups(data_source)
+            for view in self.stale_views(data_source):
+                if run_sql and (await run_sql(refresh_materialized_view_sql(view.location))).get("success"):
+                    self._update_entry(manifest, view.name, built_at=time.time())
+
+            for planned in plan_rollups(self._patterns.get(key, Counter())):
+                if planned.name in manifest["rejected"] or any(r.covers(_as_pattern(planned)) for r in existing):
+                    continue
+                try:
+                    rollup = (
+                        await self._build_parquet(planned, data_source, key, load, tenant)
+                        if data_source.get("type") == "file"
+                        else await self._build_view(planned, data_source, dialect, run_sql)
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ Rollup {planned.name} could not be built: {e}")
+                    rollup = None
+                if rollup is None:
+                    manifest["rejected"].append(planned.name)
+                    continue
+                # Narrower rollups the new one covers are redundant
+                for old in [r for r in existing if rollup.covers(_as_pattern(r))]:
+                    await self._drop(old, run_sql)
+                    manifest["rollups"] = [e for e in manifest["rollups"] if e["name"] != old.name]
+                    existing.remove(old)
+                manifest["rollups"].append(asdict(rollup))
+                existing.append(rollup)
+                built.append(rollup)
+                logger.info(
+                    f"🧱 Built rollup {rollup.name} for {data_source.get('id')}: {rollup.rows} rows over "
+                    f"{rollup.dimensions} ({rollup.kind})"
+                )
+            await asyncio.to_thread(self._write_manifest, key, manifest)
+        return built
+
+    @staticmethod
+    def _update_entry(manifest: Dict[str, Any], name: str, **changes) -> None:
+        for entry in manifest["rollups"]:
+            if entry["name"] == name:
+                entry.update(changes)
+
+    async def _build_parquet(self, planned: Rollup, data_source, key: str, load, tenant) -> Optional[Rollup]:
+        import duckdb
+
+        if load is None:
+            raise ValueError("File rollups need a dataset loader")
+        out_path = os.path.join(self.rollup_dir, key, planned.name + ".parquet")
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        conn = duckdb.connect()
+        try:
+            await load(conn, data_source)
+            source_rows, rows = await compute_executor.run_duckdb(
+                self._write_parquet, conn, rollup_select_sql(planned, "duckdb"), out_path, tenant=tenant, interrupt=conn
+            )
+        finally:
+            conn.close()
+        if source_rows < settings.ROLLUP_MIN_SOURCE_ROWS or rows > source_rows * settings.ROLLUP_MAX_ROW_RATIO:
+            logger.info(f"🧱 Rollup {planned.name} not worth keeping ({rows} of {source_rows} rows)")
+            os.unlink(out_path)
+            return None
+        planned.kind, planned.location = "parquet", out_path
+        planned.rows, planned.source_rows = rows, source_rows
+        return planned
+
+    @staticmethod
+    def _write_parquet(conn, select_sql: str, out_path: str) -> Tuple[int, int]:
+        """Write the rollup of table 'data' (blocking); returns (source rows, rollup rows)"""
+        source_rows = conn.execute("SELECT COUNT(*) FROM data").fetchone()[0]
+        safe_path = out_path.replace("'", "''")
+        conn.execute(f"COPY ({select_sql}) TO '{safe_path}' (FORMAT PARQUET, COMPRESSION ZSTD)")
+        rows = conn.execute(f"SELECT COUNT(*) FROM read_parquet('{safe_path}')").fetchone()[0]
+        return source_rows, rows
+
+    async def _build_view(self, planned: Rollup, data_source, dialect, run_sql) -> Optional[Rollup]:
+        if run_sql is None:
+            raise ValueError("Materialized view rollups need a SQL runner")
+        table = exp.to_table(planned.table, dialect=dialect)
+        qualified = exp.table_(planned.name, db=table.db or None).sql(dialect=dialect)
+        await run_sql(drop_materialized_view_sql(qualified))
+        result = await run_sql(create_materialized_view_sql(qualified, rollup_select_sql(planned, dialect)))
+        if not result.get("success"):
+            raise RuntimeError(result.get("error"))
+        counts = await run_sql(
+            f"SELECT (SELECT COUNT(*) FROM {qualified}) AS rollup_rows, (SELECT COUNT(*) FROM {planned.table}) AS source_rows"
+        )
+        row = (counts.get("data") or [{}])[0]
+        rows, source_rows = int(row.get("rollup_rows") or 0), int(row.get("source_rows") or 0)
+        planned.kind, planned.location = "materialized_view", qualified
+        planned.rows, planned.source_rows = rows, source_rows
+        if source_rows < settings.ROLLUP_MIN_SOURCE_ROWS or rows > source_rows * settings.ROLLUP_MAX_ROW_RATIO:
+            logger.info(f"🧱 Rollup {planned.name} not worth keeping ({rows} of {source_rows} rows)")
+            await self._drop(planned, run_sql)
+            return None
+        return planned
+
+    @staticmethod
+    async def _drop(rollup: Rollup, run_sql) -> None:
+        if rollup.kind == "parquet":
+            try:
+                os.unlink(rollup.location)
+            except OSError:
+                pass
+        elif run_sql is not None:
+            await run_sql(drop_materialized_view_sql(rollup.location))
+
+
+def load_snapshot_history(data_source_id: str, limit: int = 500) -> List[Dict[str, Any]]:
+    """SQL of the most recent query snapshots taken on a data source (blocking)"""
+    import sqlalchemy as sa
+
+    from app.db.session import get_sync_engine
+
+    try:
+        with get_sync_engine().connect() as conn:
+            rows = conn.execute(
+                sa.text(
+                    "SELECT sql FROM query_snapshots WHERE data_source_id = :id AND sql IS NOT NULL "
+                    "ORDER BY created_at DESC LIMIT :limit"
+                ),
+                {"id": str(data_source_id), "limit": int(limit)},
+            ).fetchall()
+        return [{"sql": row[0]} for row in rows]
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read snapshot history for {data_source_id}: {e}")
+        return []
+
+
+def _as_pattern(rollup: Rollup) -> QueryPattern:
+    return QueryPattern(
+        table=rollup.table,
+        dimensions=tuple(rollup.dimensions),
+        measures=tuple((c, tuple(f)) for c, f in rollup.measures.items()),
+    )
+
+
+# Global instance
+rollup_manager = RollupManager()
@@ -0,0 +1,440 @@
+"""
+Schema Introspection
+Bulk catalog reads for SQL database connectors with incremental refresh
+
+One objects query lists every table and view with its row estimate and a DDL
+version marker; columns, primary keys and foreign keys then come from one
+set-based catalog query each instead of an inspector call per table. A refresh
+re-reads only objects whose marker changed (or that have none) and reuses the
+rest from the schema cache. Blocking catalog work runs on a worker thread.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, create_engine, text
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TableKey = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class CatalogQueries:
+    """Catalog SQL for one dialect.
+
+    Every query returns ``table_schema`` and ``table_name``. ``objects`` adds
+    ``table_type``, ``row_estimate`` and ``ddl_version`` (NULL when the dialect
+    has no usable marker); ``columns`` adds ``column_name``, ``data_type``,
+    ``is_nullable`` ('YES'/'NO') and ``ordinal_position``; ``primary_keys``
+    adds ``column_name``; ``foreign_keys`` adds ``column_name``, ``ref_schema``,
+    ``ref_table`` and ``ref_column``. SELECT queries must not ORDER BY: they are
+    wrapped in a derived table to restrict an incremental refresh.
+    """
+
+    objects: str
+    columns: str
+    primary_keys: Optional[str] = None
+    foreign_keys: Optional[str] = None
+
+
+_PG_SYSTEM = "('information_schema', 'pg_catalog', 'pg_toast')"
+_MYSQL_SYSTEM = "('information_schema', 'performance_schema', 'mysql', 'sys')"
+
+_PG_COLUMNS = f"""
+SELECT n.nspname AS table_schema, c.relname AS table_name, a.attname AS column_name,
+       format_type(a.atttypid, a.atttypmod) AS data_type,
+       CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END AS is_nullable, a.attnum AS ordinal_position
+FROM pg_attribute a
+JOIN pg_class c ON c.oid = a.attrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE a.attnum > 0 AND NOT a.attisdropped AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+  AND n.nspname NOT IN {_PG_SYSTEM} AND n.nspname NOT LIKE 'pg_temp%'
+"""
+
+_ANSI_PRIMARY_KEYS = """
+SELECT k.table_schema AS table_schema, k.table_name AS table_name, k.column_name AS column_name
+FROM information_schema.table_constraints t
+JOIN information_schema.key_column_usage k
+  ON k.constraint_schema = t.constraint_schema AND k.constraint_name = t.constraint_name
+ AND k.table_name = t.table_name
+WHERE t.constraint_type = 'PRIMARY KEY'
+"""
+
+CATALOG_QUERIES: Dict[str, CatalogQueries] = {
+    # pg_class.xmin moves on ALTER TABLE, pg_attribute.xmin on column renames / type changes
+    'postgresql': CatalogQueries(
+        objects=f"""
+SELECT n.nspname AS table_schema, c.relname AS table_name,
+       CASE WHEN c.relkind IN ('v', 'm') THEN 'view' ELSE 'table' END AS table_type,
+       GREATEST(c.reltuples, 0)::bigint AS row_estimate,
+       c.xmin::text || ':' || COALESCE(
+           (SELECT max(a.xmin::text::bigint) FROM pg_attribute a WHERE a.attrelid = c.oid), 0
+       )::text AS ddl_version
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+  AND n.nspname NOT IN {_PG_SYSTEM} AND n.nspname NOT LIKE 'pg_temp%'
+""",
+        columns=_PG_COLUMNS,
+        primary_keys=_ANSI_PRIMARY_KEYS,
+        foreign_keys="""
+SELECT n.nspname AS table_schema, c.relname AS table_name, a.attname AS column_name,
+       rn.nspname AS ref_schema, rc.relname AS ref_table, ra.attname AS ref_column
+FROM pg_constraint k
+JOIN pg_class c ON c.oid = k.conrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_class rc ON rc.oid = k.confrelid
+JOIN pg_namespace rn ON rn.oid = rc.relnamespace
+CROSS JOIN LATERAL unnest(k.conkey, k.confkey) AS u(attnum, ref_attnum)
+JOIN pg_attribute a ON a.attrelid = k.conrelid AND a.attnum = u.attnum
+JOIN pg_attribute ra ON ra.attrelid = k.confrelid AND ra.attnum = u.ref_attnum
+WHERE k.contype = 'f'
+""",
+    ),
+    # Redshift has no xmin on catalog rows, so every refresh re-reads (still in bulk)
+    'redshift': CatalogQueries(
+        objects=f"""
+SELECT n.nspname AS table_schema, c.relname AS table_name,
+       CASE WHEN c.relkind = 'v' THEN 'view' ELSE 'table' END AS table_type,
+       CAST(c.reltuples AS BIGINT) AS row_estimate, CAST(NULL AS VARCHAR) AS ddl_version
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'v') AND n.nspname NOT IN {_PG_SYSTEM} AND n.nspname NOT LIKE 'pg_temp%'
+""",
+        columns=_PG_COLUMNS,
+        primary_keys=_ANSI_PRIMARY_KEYS,
+    ),
+    # InnoDB rebuilds (and so re-stamps create_time) on most ALTER TABLEs; views have no timestamp
+    'mysql': CatalogQueries(
+        objects=f"""
+SELECT table_schema AS table_schema, table_name AS table_name,
+       CASE WHEN table_type = 'VIEW' THEN 'view' ELSE 'table' END AS table_type,
+       table_rows AS row_estimate, CAST(create_time AS CHAR) AS ddl_version
+FROM information_schema.tables
+WHERE table_schema NOT IN {_MYSQL_SYSTEM}
+""",
+        columns=f"""
+SELECT table_schema AS table_schema, table_name AS table_name, column_name AS column_name,
+       column_type AS data_type, is_nullable AS is_nullable, ordinal_position AS ordinal_position
+FROM information_schema.columns
+WHERE table_schema NOT IN {_MYSQL_SYSTEM}
+""",
+        primary_keys=f"""
+SELECT table_schema AS table_schema, table_name AS table_name, column_name AS column_name
+FROM information_schema.key_column_usage
+WHERE constraint_name = 'PRIMARY' AND table_schema NOT IN {_MYSQL_SYSTEM}
+""",
+        foreign_keys=f"""
+SELECT table_schema AS table_schema, table_name AS table_name, column_name AS column_name,
+       referenced_table_schema AS ref_schema, referenced_table_name AS ref_table,
+       referenced_column_name AS ref_column
+FROM information_schema.key_column_usage
+WHERE referenced_table_name IS NOT NULL AND table_schema NOT IN {_MYSQL_SYSTEM}
+""",
+    ),
+    'sqlserver': CatalogQueries(
+        objects="""
+SELECT s.name AS table_schema, o.name AS table_name,
+       CASE WHEN o.type = 'V' THEN 'view' ELSE 'table' END AS table_type,
+       (SELECT SUM(p.rows) FROM sys.partitions p WHERE p.object_id = o.object_id AND p.index_id IN (0, 1)) AS row_estimate,
+       CONVERT(varchar(33), o.modify_date, 126) AS ddl_version
+FROM sys.objects o
+JOIN sys.schemas s ON s.schema_id = o.schema_id
+WHERE o.type IN ('U', 'V') AND o.is_ms_shipped = 0
+""",
+        columns="""
+SELECT s.name AS table_schema, o.name AS table_name, c.name AS column_name,
+       TYPE_NAME(c.user_type_id) AS data_type,
+       CASE WHEN c.is_nullable = 1 THEN 'YES' ELSE 'NO' END AS is_nullable, c.column_id AS ordinal_position
+FROM sys.columns c
+JOIN sys.objects o ON o.object_id = c.object_id
+JOIN sys.schemas s ON s.schema_id = o.schema_id
+WHERE o.type IN ('U', 'V') AND o.is_ms_shipped = 0
+""",
+        primary_keys="""
+SELECT s.name AS table_schema, o.name AS table_name, c.name AS column_name
+FROM sys.indexes i
+JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+JOIN sys.objects o ON o.object_id = i.object_id
+JOIN sys.schemas s ON s.schema_id = o.schema_id
+WHERE i.is_primary_key = 1
+""",
+        foreign_keys="""
+SELECT s.name AS table_schema, o.name AS table_name, c.name AS column_name,
+       rs.name AS ref_schema, ro.name AS ref_table, rc.name AS ref_column
+FROM sys.foreign_key_columns f
+JOIN sys.objects o ON o.object_id = f.parent_object_id
+JOIN sys.schemas s ON s.schema_id = o.schema_id
+JOIN sys.columns c ON c.object_id = f.parent_object_id AND c.column_id = f.parent_column_id
+JOIN sys.objects ro ON ro.object_id = f.referenced_object_id
+JOIN sys.schemas rs ON rs.schema_id = ro.schema_id
+JOIN sys.columns rc ON rc.object_id = f.referenced_object_id AND rc.column_id = f.referenced_column_id
+""",
+    ),
+    # LAST_ALTERED also moves on DML, so Snowflake refreshes err on the side of re-reading
+    'snowflake': CatalogQueries(
+        objects="""
+SELECT table_schema AS table_schema, table_name AS table_name,
+       CASE WHEN table_type = 'VIEW' THEN 'view' ELSE 'table' END AS table_type,
+       row_count AS row_estimate, TO_VARCHAR(last_altered) AS ddl_version
+FROM information_schema.tables
+WHERE table_schema <> 'INFORMATION_SCHEMA'
+""",
+        columns="""
+SELECT table_schema AS table_schema, table_name AS table_name, column_name AS column_name,
+       data_type AS data_type, is_nullable AS is_nullable, ordinal_position AS ordinal_position
+FROM information_schema.columns
+WHERE table_schema <> 'INFORMATION_SCHEMA'
+""",
+        primary_keys="SHOW PRIMARY KEYS IN DATABASE",
+        foreign_keys="SHOW IMPORTED KEYS IN DATABASE",
+    ),
+}
+
+# SHOW commands name their columns differently; map them onto the common names
+_COLUMN_ALIASES = {
+    'schema_name': 'table_schema',
+    'fk_schema_name': 'table_schema',
+    'fk_table_name': 'table_name',
+    'fk_column_name': 'column_name',
+    'pk_schema_name': 'ref_schema',
+    'pk_table_name': 'ref_table',
+    'pk_column_name': 'ref_column',
+}
+
+
+def connection_cache_key(config: Dict[str, Any]) -> str:
+    """Schema cache key for a connection config that has no data source id"""
+    identity = '|'.join(
+        str(config.get(k) or '') for k in ('type', 'host', 'port', 'account', 'database', 'username')
+    )
+    return f"conn_{hashlib.md5(identity.encode()).hexdigest()}"
+
+
+def _normalize(row: Dict[str, Any]) -> Dict[str, Any]:
+    normalized = {}
+    for key, value in row.items():
+        key = key.lower()
+        normalized.setdefault(_COLUMN_ALIASES.get(key, key), value)
+    return normalized
+
+
+def _as_int(value: Any) -> int:
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def catalog_fingerprint(objects: List[Dict[str, Any]]) -> Optional[str]:
+    """Change token over every object's DDL marker; None when some object has no marker"""
+    markers = []
+    for obj in objects:
+        if obj.get('ddl_version') is None:
+            return None
+        markers.append(f"{obj['table_schema']}.{obj['table_name']}:{obj['ddl_version']}")
+    return hashlib.md5('\n'.join(sorted(markers)).encode()).hexdigest()
+
+
+class SchemaIntrospector:
+    """Bulk, incremental schema reads; results are stored in the schema cache"""
+
+    def __init__(self, schema_cache: Any = None, engine_factory: Optional[Callable[[str], Any]] = None):
+        self._schema_cache = schema_cache
+        self._engine_factory = engine_factory or self._create_engine
+        self._engines: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'full': 0, 'incremental': 0, 'unchanged': 0, 'queries': 0}
+
+    def supports(self, dialect: str) -> bool:
+        return dialect in CATALOG_QUERIES
+
+    @property
+    def schema_cache(self):
+        if self._schema_cache is None:
+            from app.modules.ai.services.schema_cache_service import get_schema_cache_service
+
+            self._schema_cache = get_schema_cache_service()
+        return self._schema_cache
+
+    async def introspect(self, dialect: str, url: str, cache_key: str) -> Dict[str, Any]:
+        """Read the schema (incrementally when a cached one exists) and cache it under ``cache_key``"""
+        # The shared tier lets any worker refresh incrementally from the last schema read anywhere
+        previous = await self.schema_cache.get_shared_schema(cache_key)
+        if not isinstance(previous, dict) or previous.get('catalog_dialect') != dialect:
+            previous = None
+        schema, refresh = await asyncio.to_thread(self._introspect_sync, dialect, url, previous)
+        await self.schema_cache.store_schema(cache_key, schema, probe=refresh.get('probe'))
+        logger.info(
+            f"✅ Introspected {dialect} schema ({refresh['mode']}): {len(schema['tables'])} objects, "
+            f"{refresh['reread']} re-read in {refresh['queries']} catalog queries"
+        )
+        return {'success': True, **schema, 'refresh': refresh}
+
+    async def probe(self, dialect: str, url: str) -> Optional[str]:
+        """Cheap change check: the objects query alone, fingerprinted (see ``catalog_fingerprint``)"""
+
+        def read() -> Optional[str]:
+            with self._engine(url).connect() as conn:
+                return catalog_fingerprint(self._read(conn, CATALOG_QUERIES[dialect].objects))
+
+        return await asyncio.to_thread(read)
+
+    # Engines
+
+    @staticmethod
+    def _create_engine(url: str):
+        return create_engine(url, pool_pre_ping=True, pool_size=1, max_overflow=1, pool_recycle=1800, echo=False)
+
+    def _engine(self, url: str):
+        with self._lock:
+            engine = self._engines.pop(url, None) or self._engine_factory(url)
+            self._engines[url] = engine
+            while len(self._engines) > settings.SCHEMA_INTROSPECTION_MAX_ENGINES:
+                _, evicted = self._engines.popitem(last=False)
+                evicted.dispose()
+        return engine
+
+    def close(self) -> None:
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+
+    # Catalog reads
+
+    def _read(self, conn, sql: str, keys: Optional[List[TableKey]] = None) -> List[Dict[str, Any]]:
+        """Run one catalog query, restricted to ``keys`` when given"""
+        statement = text(sql)
+        if keys is not None and sql.lstrip()[:6].upper() == 'SELECT':
+            statement = text(
+                f"SELECT * FROM ({sql}) catalog WHERE catalog.table_schema IN :schemas AND catalog.table_name IN :tables"
+            ).bindparams(bindparam('schemas', expanding=True), bindparam('tables', expanding=True))
+            params = {'schemas': sorted({k[0] for k in keys}), 'tables': sorted({k[1] for k in keys})}
+        else:
+            params = {}
+        self.stats['queries'] += 1
+        rows = [_normalize(dict(row._mapping)) for row in conn.execute(statement, params)]
+        if keys is None:
+            return rows
+        # The IN lists match a superset (schema x table); keep the exact pairs
+        wanted = set(keys)
+        return [r for r in rows if (r.get('table_schema'), r.get('table_name')) in wanted]
+
+    def _introspect_sync(
+        self, dialect: str, url: str, previous: Optional[Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        queries = CATALOG_QUERIES[dialect]
+        with self._engine(url).connect() as conn:
+            objects = {(r['table_schema'], r['table_name']): r for r in self._read(conn, queries.objects)}
+            known = {(t['schema'], t['name']): t for t in (previous or {}).get('tables', [])}
+            stale = [
+                key for key, obj in objects.items()
+                if obj.get('ddl_version') is None or key not in known
+                or known[key].get('ddl_version') != str(obj['ddl_version'])
+            ]
+            if previous is None or len(stale) > settings.SCHEMA_INTROSPECTION_INCREMENTAL_MAX_TABLES:
+                mode, keys, stale = 'full', None, list(objects)
+            elif stale:
+                mode, keys = 'incremental', stale
+            else:
+                mode, keys = 'unchanged', []
+            details, reads = self._read_details(conn, queries, keys) if stale else ({}, 0)
+
+        tables = []
+        for key, obj in objects.items():
+            if key in details:
+                table = details[key]
+            elif key in known:
+                table = {**known[key], 'columns': [dict(c) for c in known[key].get('columns', [])]}
+            else:
+                table = {'columns': [], 'primary_key': [], 'foreign_keys': []}
+            table.update({
+                'schema': key[0],
+                'name': key[1],
+                'type': obj.get('table_type') or 'table',
+                'rowCount': _as_int(obj.get('row_estimate')),
+                'ddl_version': None if obj.get('ddl_version') is None else str(obj['ddl_version']),
+            })
+            tables.append(table)
+        tables.sort(key=lambda t: (t['schema'], t['name']))
+
+        self.stats[mode] += 1
+        schema = {
+            'tables': tables,
+            'schemas': sorted({t['schema'] for t in tables}),
+            'total_rows': sum(t['rowCount'] for t in tables),
+            'catalog_dialect': dialect,
+        }
+        refresh = {
+            'mode': mode,
+            'reread': len(stale),
+            'dropped': len(set(known) - set(objects)),
+            'queries': 1 + reads,
+            'probe': catalog_fingerprint(list(objects.values())),
+        }
+        return schema, refresh
+
+    def _read_details(
+        self, conn, queries: CatalogQueries, keys: Optional[List[TableKey]]
+    ) -> Tuple[Dict[TableKey, Dict[str, Any]], int]:
+        """Columns and keys of the given objects (all objects when ``keys`` is None), and the query count"""
+        details: Dict[TableKey, Dict[str, Any]] = {}
+
+        def table(row) -> Dict[str, Any]:
+            key = (row['table_schema'], row['table_name'])
+            if key not in details:
+                details[key] = {'columns': [], 'primary_key': [], 'foreign_keys': []}
+            return details[key]
+
+        for key in keys or []:
+            table({'table_schema': key[0], 'table_name': key[1]})
+        columns = sorted(self._read(conn, queries.columns, keys), key=lambda r: _as_int(r.get('ordinal_position')))
+        reads = 1
+        for row in columns:
+            table(row)['columns'].append({
+                'name': row['column_name'],
+                'type': str(row.get('data_type') or ''),
+                'nullable': str(row.get('is_nullable', 'YES')).upper() in ('YES', 'Y', 'TRUE', '1'),
+                'primary_key': False,
+            })
+        for name, sql in (('primary_keys', queries.primary_keys), ('foreign_keys', queries.foreign_keys)):
+            if not sql:
+                continue
+            reads += 1
+            try:
+                rows = self._read(conn, sql, keys)
+            except Exception as e:
+                # Key metadata is optional (e.g. no privilege on the constraint catalog)
+                logger.warning(f"⚠️ Catalog {name} query failed, continuing without: {e}")
+                conn.rollback()
+                continue
+            for row in rows:
+                entry = table(row)
+                if name == 'primary_keys':
+                    entry['primary_key'].append(row['column_name'])
+                else:
+                    entry['foreign_keys'].append({
+                        'column': row['column_name'],
+                        'ref_schema': row.get('ref_schema'),
+                        'ref_table': row.get('ref_table'),
+                        'ref_column': row.get('ref_column'),
+                    })
+        for entry in details.values():
+            pk = set(entry['primary_key'])
+            for column in entry['columns']:
+                column['primary_key'] = column['name'] in pk
+        return details, reads
+
+
+# Global instance
+schema_introspector = SchemaIntrospector()
@@ -160,36 +160,23 @@ class SQLDialectTranslator:
             # Parse and transpile
             warnings = []
             
-            # Try to parse the query
-            try:
-                parsed = parse_one(query, dialect=source_dialect)
-            except Exception as parse_error:
+            # Parsed once (and cached) by the SQL pipeline, then generated for the target
+            from app.modules.data.services.sql_pipeline import sql_pipeline
+
+            compiled = sql_pipeline.compile(query, read=source_dialect, write=target_dialect)
+            if not compiled.parsed:
                 # If parsing fails, try without dialect
-                try:
-                    parsed = parse_one(query)
-                    warnings.append('Source dialect detection failed, using generic parser')
-                except Exception:
-                    raise Exception(f'Failed to parse SQL query: {parse_error}')
+                compiled = sql_pipeline.compile(query, write=target_dialect)
+                if not compiled.parsed:
+                    raise Exception(f"Failed to parse SQL query: {'; '.join(compiled.errors)}")
+                warnings.append('Source dialect detection failed, using generic parser')
             
-            # Transpile to target dialect
-            try:
-                translated = transpile(
-                    query,
-                    read=source_dialect,
-                    write=target_dialect,
-                    pretty=False
-                )
-                
-                if translated and len(translated) > 0:
-                    translated_query = translated[0]
-                else:
-                    translated_query = query
-                    warnings.append('Translation returned empty result, using original')
-                    
-            except Exception as transpile_error:
+            if compiled.errors:
                 # If transpilation fails, try basic fixes
                 translated_query = self._apply_basic_fixes(query, target_dialect)
-                warnings.append(f'Full translation failed, applied basic fixes: {transpile_error}')
+                warnings.append(f'Full translation failed, applied basic fixes: {compiled.errors[0]}')
+            else:
+                translated_query = compiled.sql
             
             # Validate translated query
             validation_result = self._validate_translated_query(translated_query, target_dialect)
@@ -0,0 +1,351 @@
+"""
+SQL Compilation Pipeline
+Parse a query once into a sqlglot AST and run every rewrite as an AST pass
+
+Validation, dialect translation, file-table rebinding, statement classification
+and optimizer hints used to re-scan the same SQL string with regexes and
+re-parse it at each step. ``sql_pipeline.compile`` parses once, runs the passes
+on the tree and caches the result per (sql, read dialect, write dialect,
+options); ``sql_pipeline.parse`` shares the parse cache with modules that walk
+the AST themselves (cost model, rollups, approximate answers). SQL that
+sqlglot cannot parse comes back with ``parsed=False`` and the original text, so
+callers can keep their text-level fallback for it. ``check_read_only`` is the
+engines' read-only guard: a single SELECT/WITH statement with no data-changing
+node anywhere in the tree (a keyword scan also rejected columns like
+``updated_at``).
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import sqlglot
+    from sqlglot import exp
+
+    SQLGLOT_AVAILABLE = True
+except ImportError:  # pragma: no cover - sqlglot ships with the server requirements
+    SQLGLOT_AVAILABLE = False
+
+# Names a file data source can query besides its CTEs (see MultiEngineQueryService)
+FILE_TABLE_NAMES = ("data", "_aiser_inline_df")
+FILE_TABLE_PREFIX = "file_"
+
+# Statements and clauses that change data, schema, session or transaction state
+_WRITE_NODE_NAMES = (
+    "Insert", "Update", "Delete", "Merge", "Create", "Drop", "Alter", "AlterTable", "TruncateTable",
+    "Copy", "LoadData", "Into", "Lock", "Set", "Use", "Pragma", "Transaction", "Commit", "Rollback",
+    "Cache", "Uncache", "Refresh", "Kill", "Command",
+)
+_WRITE_NODES = tuple(getattr(exp, name) for name in _WRITE_NODE_NAMES if hasattr(exp, name)) if SQLGLOT_AVAILABLE else ()
+_NODE_LABELS = {
+    "altertable": "ALTER", "truncatetable": "TRUNCATE", "loaddata": "LOAD DATA",
+    "into": "SELECT INTO", "lock": "FOR UPDATE/SHARE",
+}
+_READ_COMMANDS = ("SHOW", "DESCRIBE", "DESC", "EXPLAIN")
+# Text-level guard for SQL sqlglot cannot parse
+_WRITE_KEYWORDS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|UPSERT|DROP|ALTER|CREATE|TRUNCATE|GRANT|REVOKE|COPY|ATTACH|DETACH|"
+    r"VACUUM|INSTALL|PRAGMA|CALL|EXEC|EXECUTE)\b",
+    re.IGNORECASE,
+)
+# DuckDB table functions and replacement scans that read the host filesystem or a remote store
+_FILE_FUNCTIONS = re.compile(
+    r"(read_\w+|\w+_scan|\w+_attach|parquet_\w+|iceberg_\w+|glob|sniff_csv|st_read\w*)", re.IGNORECASE
+)
+_FILE_FUNCTION_CALL = re.compile(rf"\b{_FILE_FUNCTIONS.pattern}\s*\(", re.IGNORECASE)
+_FILE_PATH = re.compile(r"[/\\:]|\.(csv|tsv|txt|parquet|json|ndjson|jsonl|xlsx?|gz|zst)$", re.IGNORECASE)
+_QUOTED_OR_COMMENT = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_EXPLAIN_PREFIX = re.compile(
+    r"^\s*EXPLAIN\b(?:\s*\([^()]*\)|\s*\w+\s*=\s*\w+|\s+(?:ANALY[SZ]E|VERBOSE|PLAN|QUERY|FOR|EXTENDED|FORMATTED|"
+    r"CODEGEN|COST|ESTIMATE|PIPELINE|SYNTAX|AST|LOGICAL|PHYSICAL|FORMAT\s+\w+)\b)*\s*",
+    re.IGNORECASE,
+)
+
+_DIALECT_ALIASES = {
+    "postgresql": "postgres",
+    "pg": "postgres",
+    "mariadb": "mysql",
+    "sqlserver": "tsql",
+    "mssql": "tsql",
+    "databricks": "spark",
+    "file": "duckdb",
+    "api": "duckdb",
+}
+
+
+def normalize_dialect(dialect: Optional[str]) -> Optional[str]:
+    """sqlglot dialect name for a data source db_type (None for unknown/generic SQL)"""
+    if not dialect or not SQLGLOT_AVAILABLE:
+        return None
+    name = _DIALECT_ALIASES.get(dialect.lower(), dialect.lower())
+    try:
+        sqlglot.Dialect.get_or_raise(name)
+    except Exception:
+        return None
+    return name
+
+
+@dataclass
+class CompiledQuery:
+    """Output of one pipeline run; ``sql`` is what should be executed"""
+
+    sql: str
+    source_sql: str
+    read_dialect: Optional[str]
+    write_dialect: Optional[str]
+    parsed: bool
+    statement_type: str = "unknown"
+    statements: int = 0
+    tables: List[str] = field(default_factory=list)
+    ctes: List[str] = field(default_factory=list)
+    rebound_tables: List[str] = field(default_factory=list)
+    facts: Dict[str, Any] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def file_references(self) -> List[str]:
+        return [t for t in self.tables if t.lower().startswith(FILE_TABLE_PREFIX)]
+
+
+@dataclass
+class ReadOnlyCheck:
+    """Verdict of the read-only guard; ``modifies`` marks statements that would change state"""
+
+    allowed: bool
+    reason: Optional[str] = None
+    modifies: bool = False
+    parsed: bool = True
+
+
+def _node_label(node: "exp.Expression") -> str:
+    if isinstance(node, exp.Command):
+        return str(node.this).upper()
+    return _NODE_LABELS.get(node.key, node.key.upper())
+
+
+def _check_text(sql: str, dialect: Optional[str] = None) -> ReadOnlyCheck:
+    """Word-boundary keyword guard for SQL that does not parse (literals and comments removed)"""
+    text = _QUOTED_OR_COMMENT.sub(" ", sql).strip().rstrip(";").strip()
+    text = _EXPLAIN_PREFIX.sub("", text, count=1)
+    if ";" in text:
+        return ReadOnlyCheck(False, "only a single statement is allowed", parsed=False)
+    match = _WRITE_KEYWORDS.search(text)
+    if match:
+        return ReadOnlyCheck(False, f"{match.group(1).upper()} is not allowed", modifies=True, parsed=False)
+    match = _FILE_FUNCTION_CALL.search(text) if dialect in (None, "duckdb") else None
+    if match:
+        return ReadOnlyCheck(False, f"{match.group(1).lower()} reads files and is not allowed", parsed=False)
+    if not re.match(r"^[(\s]*(SELECT|WITH)\b", text, re.IGNORECASE):
+        return ReadOnlyCheck(False, "only SELECT statements are allowed", parsed=False)
+    return ReadOnlyCheck(True, parsed=False)
+
+
+def _file_read(tree: "exp.Expression") -> Optional[str]:
+    """First DuckDB file-reading table function or quoted file path (FROM 'x.csv') in the tree"""
+    for func in tree.find_all(exp.Func):
+        name = func.name if isinstance(func, exp.Anonymous) else func.sql_name()
+        if _FILE_FUNCTIONS.fullmatch(name):
+            return name.lower()
+    for table in tree.find_all(exp.Table):
+        if isinstance(table.this, exp.Identifier) and table.this.quoted and _FILE_PATH.search(table.name):
+            return f"'{table.name}'"
+    return None
+
+
+def _table_name(table: "exp.Table") -> str:
+    return ".".join(part for part in (table.catalog, table.db, table.name) if part)
+
+
+def _source_tables(tree: "exp.Expression", ctes: set) -> List["exp.Table"]:
+    """Table references that read a stored relation (not a CTE or table function)"""
+    return [
+        t for t in tree.find_all(exp.Table)
+        if isinstance(t.this, exp.Identifier) and (t.db or t.name.lower() not in ctes)
+    ]
+
+
+def _statement_type(tree: "exp.Expression") -> str:
+    if isinstance(tree, (exp.Select, exp.Union, exp.Subquery)):
+        return "select"
+    return type(tree).__name__.lower()
+
+
+def _facts(tree: "exp.Expression") -> Dict[str, Any]:
+    """Structural facts the optimizer hints are derived from"""
+    select = tree if isinstance(tree, exp.Select) else tree.find(exp.Select)
+    windows = [w.this.sql_name().lower() for w in tree.find_all(exp.Window) if isinstance(w.this, exp.Func)]
+    return {
+        "joins": len(list(tree.find_all(exp.Join))),
+        "selects": len(list(tree.find_all(exp.Select))),
+        "has_where": tree.find(exp.Where) is not None,
+        "has_equality_filter": any(w.find(exp.EQ) for w in tree.find_all(exp.Where)),
+        "has_group_by": tree.find(exp.Group) is not None,
+        "has_order_by": bool(select is not None and select.args.get("order")) or isinstance(tree.args.get("order"), exp.Order),
+        "has_limit": tree.args.get("limit") is not None or bool(select is not None and select.args.get("limit")),
+        "aggregates": len(list(tree.find_all(exp.AggFunc))),
+        "count_distinct": any(isinstance(c.this, exp.Distinct) for c in tree.find_all(exp.Count)),
+        "select_star": bool(select is not None and any(isinstance(p, exp.Star) for p in select.expressions)),
+        "window_functions": windows,
+        "has_from": bool(select is not None and select.args.get("from")),
+    }
+
+
+class SQLPipeline:
+    """Parse-once compilation with per-(sql, dialect) caches"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.SQL_COMPILE_CACHE_SIZE
+        self._trees: "OrderedDict[Tuple[str, Optional[str]], Any]" = OrderedDict()
+        self._compiled: "OrderedDict[Tuple, CompiledQuery]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"parses": 0, "parse_hits": 0, "compiles": 0, "compile_hits": 0, "parse_errors": 0}
+
+    def _remember(self, cache: OrderedDict, key, value) -> None:
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.max_entries:
+                cache.popitem(last=False)
+
+    def _parse_all(self, sql: str, dialect: Optional[str]) -> List["exp.Expression"]:
+        """All statements of ``sql`` (cached, shared); raises sqlglot's ParseError for invalid SQL"""
+        key = (sql, dialect)
+        with self._lock:
+            cached = self._trees.get(key)
+            if cached is not None:
+                self._trees.move_to_end(key)
+                self.stats["parse_hits"] += 1
+        if cached is None:
+            self.stats["parses"] += 1
+            try:
+                cached = [s for s in sqlglot.parse(sql, read=dialect) if s is not None]
+            except Exception as e:
+                self.stats["parse_errors"] += 1
+                cached = e
+            self._remember(self._trees, key, cached)
+        if isinstance(cached, Exception):
+            raise cached
+        return cached
+
+    def parse(self, sql: str, dialect: Optional[str] = None, copy: bool = True) -> "exp.Expression":
+        """The first statement's AST; pass ``copy=False`` only when the tree is not modified"""
+        statements = self._parse_all(sql, dialect)
+        if not statements:
+            raise ValueError("Empty SQL statement")
+        return statements[0].copy() if copy else statements[0]
+
+    def compile(
+        self,
+        sql: str,
+        read: Optional[str] = None,
+        write: Optional[str] = None,
+        rebind_file_tables: bool = False,
+    ) -> CompiledQuery:
+        """Run the passes over ``sql``; the output text is only regenerated when a pass or the dialect changes it"""
+        key = (sql, read, write, rebind_file_tables)
+        with self._lock:
+            cached = self._compiled.get(key)
+            if cached is not None:
+                self._compiled.move_to_end(key)
+                self.stats["compile_hits"] += 1
+                return cached
+        self.stats["compiles"] += 1
+        compiled = self._compile(sql, read, write, rebind_file_tables)
+        self._remember(self._compiled, key, compiled)
+        return compiled
+
+    def _compile(self, sql: str, read: Optional[str], write: Optional[str], rebind_file_tables: bool) -> CompiledQuery:
+        if not SQLGLOT_AVAILABLE:
+            return CompiledQuery(sql, sql, read, write, parsed=False, errors=["sqlglot not available"])
+        try:
+            statements = self._parse_all(sql, read)
+        except Exception as e:
+            return CompiledQuery(sql, sql, read, write, parsed=False, errors=[str(e).splitlines()[0]])
+        if not statements:
+            return CompiledQuery(sql, sql, read, write, parsed=False, errors=["Empty SQL statement"])
+
+        tree = statements[0].copy()
+        ctes = {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+        compiled = CompiledQuery(
+            sql, sql, read, write, parsed=True,
+            statement_type=_statement_type(tree),
+            statements=len(statements),
+            ctes=sorted(ctes),
+        )
+        changed = False
+        if rebind_file_tables:
+            compiled.rebound_tables = self._rebind_file_tables(tree, ctes)
+            changed = bool(compiled.rebound_tables)
+        compiled.tables = list(dict.fromkeys(_table_name(t) for t in _source_tables(tree, ctes)))
+        compiled.facts = _facts(tree)
+
+        if changed or (write is not None and write != read):
+            try:
+                compiled.sql = tree.sql(dialect=write or read)
+            except Exception as e:
+                compiled.errors.append(f"Could not generate {write or read} SQL: {e}")
+        return compiled
+
+    @staticmethod
+    def _rebind_file_tables(tree: "exp.Expression", ctes: set) -> List[str]:
+        """Point tables a file data source cannot have at its 'data' table"""
+        replaced = []
+        for table in _source_tables(tree, ctes):
+            name = table.name.lower()
+            if name in FILE_TABLE_NAMES or name.startswith(FILE_TABLE_PREFIX):
+                continue
+            replaced.append(_table_name(table))
+            if not table.alias:
+                # Columns qualified with the old name keep resolving
+                table.set("alias", exp.TableAlias(this=exp.to_identifier(table.name)))
+            table.set("this", exp.to_identifier("data", quoted=True))
+            table.set("db", None)
+            table.set("catalog", None)
+        return list(dict.fromkeys(replaced))
+
+    def check_read_only(self, sql: str, dialect: Optional[str] = None, allow_explain: bool = True) -> ReadOnlyCheck:
+        """Allow only one SELECT/WITH statement (or an EXPLAIN of one) with no write anywhere in its tree"""
+        if not SQLGLOT_AVAILABLE:
+            return _check_text(sql, dialect)
+        try:
+            statements = self._parse_all(sql, dialect)
+        except Exception:
+            return _check_text(sql, dialect)
+        if not statements:
+            return ReadOnlyCheck(False, "the query is empty")
+        writes = [node for statement in statements for node in statement.find_all(*_WRITE_NODES)]
+        modifies = any(not (isinstance(n, exp.Command) and _node_label(n) in _READ_COMMANDS) for n in writes)
+        if len(statements) > 1:
+            return ReadOnlyCheck(False, "only a single statement is allowed", modifies=modifies)
+
+        tree = statements[0]
+        if allow_explain and isinstance(tree, exp.Command) and _node_label(tree) == "EXPLAIN":
+            # EXPLAIN ANALYZE runs the statement, so the explained statement must pass too
+            explained = _EXPLAIN_PREFIX.sub("", sql.strip(), count=1)
+            return self.check_read_only(explained, dialect, allow_explain=False)
+        if writes:
+            node = writes[0]
+            return ReadOnlyCheck(False, f"{_node_label(node)} is not allowed", modifies=modifies)
+        if _statement_type(tree) != "select":
+            return ReadOnlyCheck(False, "only SELECT statements are allowed")
+        file_read = _file_read(tree) if dialect in (None, "duckdb") else None
+        if file_read:
+            return ReadOnlyCheck(False, f"{file_read} reads files and is not allowed")
+        return ReadOnlyCheck(True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._trees.clear()
+            self._compiled.clear()
+
+
+# Global instance
+sql_pipeline = SQLPipeline()
@@ -0,0 +1,455 @@
+"""
+Streaming Upload Ingestion
+Consumes an upload as a stream of byte chunks instead of one buffered body:
+chunks are spooled to disk and hashed incrementally, CSV/TSV bytes are fed
+to an Arrow streaming CSV reader that writes Parquet record batches while the
+upload is still arriving, and a schema + sample preview is produced from the
+first chunk. Memory stays bounded by the chunk size and pipe depth no matter
+how large the file is.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from starlette.responses import StreamingResponse
+
+from app.core.compute_executor import compute_executor
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20  # coalesce network reads into 1MB writes
+PREVIEW_ROWS = 100
+STREAMABLE_FORMATS = ("csv", "tsv", "json", "parquet")
+_DELIMITERS = [',', ';', '\t', '|', ' ']
+
+
+def sniff_delimiter(first_line: str) -> str:
+    """Pick the delimiter that splits the header line into the most fields"""
+    first_line = (first_line or "").strip()
+    if not first_line:
+        return ','
+    max_fields = 0
+    best_delimiter = ','
+    for delimiter in _DELIMITERS:
+        fields = first_line.split(delimiter)
+        if len(fields) > max_fields:
+            max_fields = len(fields)
+            best_delimiter = delimiter
+    return best_delimiter
+
+
+def _sql_path(path: str) -> str:
+    return path.replace("'", "''")
+
+
+class _ChunkPipe(io.RawIOBase):
+    """Blocking, bounded byte pipe between the upload and a reader thread"""
+
+    def __init__(self, max_chunks: int = 8):
+        super().__init__()
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=max_chunks)
+        self._current = memoryview(b"")
+        self._eof = False
+        self.reader_closed = False
+        self.aborted = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not len(self._current) and not self._eof:
+            try:
+                chunk = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self.aborted:
+                    raise OSError("Upload aborted")
+                continue
+            if chunk is None:
+                self._eof = True
+            else:
+                self._current = memoryview(chunk)
+        n = min(len(buffer), len(self._current))
+        buffer[:n] = self._current[:n]
+        self._current = self._current[n:]
+        return n
+
+    def put(self, chunk: Optional[bytes]) -> None:
+        """Hand a chunk (None = end of stream) to the reader; gives up once the reader stopped"""
+        while not self.reader_closed:
+            try:
+                self._queue.put(chunk, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+class StreamingUploadIngest:
+    """Incremental ingest of one uploaded file into a local Parquet file.
+
+    Call ``feed`` for every received chunk (it returns the preview once, as
+    soon as enough bytes arrived to parse it) and ``finish`` at end of body.
+    Formats other than CSV/TSV are spooled and converted once complete.
+    """
+
+    def __init__(
+        self,
+        file_format: str,
+        delimiter: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        preview_bytes: int = 64 * 1024,
+        tenant: Optional[str] = None,
+    ):
+        self.file_format = file_format
+        self.delimiter = '\t' if file_format == 'tsv' else delimiter
+        self.max_bytes = max_bytes
+        self.preview_bytes = preview_bytes
+        self.tenant = tenant
+        self.work_dir = tempfile.mkdtemp(prefix="aiser_upload_")
+        self.raw_path = os.path.join(self.work_dir, f"upload.{file_format}")
+        self.parquet_path = os.path.join(self.work_dir, "upload.parquet")
+        self.bytes_received = 0
+        self.preview: Optional[Dict[str, Any]] = None
+        self._preview_attempted = False
+        self._raw = open(self.raw_path, "wb")
+        self._sha256 = hashlib.sha256()
+        self._pending: List[bytes] = []
+        self._pending_size = 0
+        self._head = bytearray()
+        self._pipe: Optional[_ChunkPipe] = None
+        self._convert_task: Optional[asyncio.Future] = None
+        self._convert_error: Optional[BaseException] = None
+        self.rows_converted = 0
+
+    @property
+    def streams_csv(self) -> bool:
+        return self.file_format in ("csv", "tsv")
+
+    async def feed(self, chunk: bytes) -> Optional[Dict[str, Any]]:
+        if not chunk:
+            return None
+        self.bytes_received += len(chunk)
+        if self.max_bytes and self.bytes_received > self.max_bytes:
+            raise ValueError(f"File too large. Maximum size: {self.max_bytes / (1024 * 1024):.1f}MB")
+        self._pending.append(chunk)
+        self._pending_size += len(chunk)
+        if len(self._head) < self.preview_bytes:
+            self._head += chunk[: self.preview_bytes - len(self._head)]
+        if self._pending_size >= CHUNK_SIZE:
+            await self._flush()
+        if not self._preview_attempted and self.streams_csv and len(self._head) >= self.preview_bytes:
+            self._preview_attempted = True
+            return await self._build_preview()
+        return None
+
+    async def _flush(self) -> None:
+        if not self._pending:
+            return
+        data = b"".join(self._pending)
+        self._pending, self._pending_size = [], 0
+        if self.streams_csv and self._pipe is None:
+            self._start_converter(data)
+        await asyncio.to_thread(self._write, data)
+
+    def _write(self, data: bytes) -> None:
+        self._raw.write(data)
+        self._sha256.update(data)
+        if self._pipe is not None:
+            self._pipe.put(data)
+
+    def _start_converter(self, first_bytes: bytes) -> None:
+        if not self.delimiter:
+            first_line = first_bytes.split(b"\n", 1)[0].decode("utf-8", errors="ignore")
+            self.delimiter = sniff_delimiter(first_line)
+            logger.info(f"🔍 Auto-detected delimiter: '{self.delimiter}'")
+        self._pipe = _ChunkPipe()
+        # A dedicated thread, not a compute slot: the converter blocks on the upload for its whole
+        # duration, so slots held by converters would starve the preview queries feed() awaits
+        loop = asyncio.get_running_loop()
+        self._convert_task = loop.create_future()
+        threading.Thread(
+            target=self._run_converter, args=(loop, self._convert_task), name="aiser-upload-convert", daemon=True
+        ).start()
+
+    def _run_converter(self, loop: asyncio.AbstractEventLoop, done: asyncio.Future) -> None:
+        try:
+            self._convert_csv()
+        finally:
+            try:
+                loop.call_soon_threadsafe(lambda: done.done() or done.set_result(None))
+            except RuntimeError:
+                pass  # the loop closed after the upload was abandoned
+
+    def _convert_csv(self) -> None:
+        """Arrow streaming CSV -> Parquet, batch by batch as bytes arrive (blocking)"""
+        import pyarrow.csv as pacsv
+        import pyarrow.parquet as pq
+
+        try:
+            reader = pacsv.open_csv(
+                self._pipe,
+                read_options=pacsv.ReadOptions(block_size=CHUNK_SIZE),
+                parse_options=pacsv.ParseOptions(delimiter=self.delimiter),
+            )
+            with pq.ParquetWriter(self.parquet_path, reader.schema, compression="zstd") as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+                    self.rows_converted += batch.num_rows
+        except Exception as e:
+            # Typically a type inferred from the first block that later rows violate
+            self._convert_error = e
+        finally:
+            self._pipe.reader_closed = True
+
+    async def _build_preview(self) -> Optional[Dict[str, Any]]:
+        # Only complete lines; the last one may be cut mid-record
+        head = bytes(self._head)
+        head = head[: head.rfind(b"\n") + 1]
+        if not head.strip():
+            return None
+        try:
+            self.preview = await compute_executor.run_duckdb(
+                _preview_csv_head, head, self.delimiter or sniff_delimiter(head.split(b"\n", 1)[0].decode("utf-8", "ignore")),
+                tenant=self.tenant,
+            )
+            self.preview["complete"] = False
+        except Exception as e:
+            logger.warning(f"⚠️ Could not parse upload preview: {e}")
+            self.preview = None
+        return self.preview
+
+    async def finish(self) -> Dict[str, Any]:
+        """Flush, finish conversion and describe the resulting Parquet file"""
+        await self._flush()
+        await asyncio.to_thread(self._raw.close)
+        if self.bytes_received == 0:
+            raise ValueError("File is empty")
+
+        if self._pipe is not None:
+            await asyncio.to_thread(self._pipe.put, None)
+            await self._convert_task
+
+        if self.file_format == "parquet":
+            self.parquet_path = self.raw_path
+        elif self._convert_error is not None or not self.streams_csv:
+            if self._convert_error is not None:
+                logger.warning(f"⚠️ Streaming CSV conversion failed, re-reading with DuckDB: {self._convert_error}")
+            await compute_executor.run_duckdb(self._convert_with_duckdb, tenant=self.tenant)
+
+        summary = await compute_executor.run_duckdb(self._describe_parquet, tenant=self.tenant)
+        summary.update({
+            "content_hash": self._sha256.hexdigest(),
+            "size": self.bytes_received,
+            "parquet_path": self.parquet_path,
+            "parquet_size": os.path.getsize(self.parquet_path),
+            "delimiter": self.delimiter,
+        })
+        return summary
+
+    def _convert_with_duckdb(self) -> None:
+        import duckdb
+
+        # Type detection over the whole file: a drift past the first block is what got us here
+        delimiter = (self.delimiter or ',').replace("'", "''")
+        readers = {
+            "csv": f"read_csv_auto('{_sql_path(self.raw_path)}', delim='{delimiter}', header=true, sample_size=-1)",
+            "tsv": f"read_csv_auto('{_sql_path(self.raw_path)}', delim='\t', header=true, sample_size=-1)",
+            "json": f"read_json_auto('{_sql_path(self.raw_path)}')",
+        }
+        conn = duckdb.connect()
+        try:
+            conn.execute(
+                f"COPY (SELECT * FROM {readers[self.file_format]}) "
+                f"TO '{_sql_path(self.parquet_path)}' (FORMAT PARQUET, COMPRESSION ZSTD)"
+            )
+        finally:
+            conn.close()
+
+    def _describe_parquet(self, sample_rows: int = PREVIEW_ROWS) -> Dict[str, Any]:
+        import duckdb
+
+        conn = duckdb.connect()
+        try:
+            source = f"read_parquet('{_sql_path(self.parquet_path)}')"
+            described = conn.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {source}").fetchone()[0]
+            columns = [c[0] for c in described]
+            rows = conn.execute(f"SELECT * FROM {source} LIMIT {int(sample_rows)}").fetchall()
+            return {
+                "schema": {"columns": [{"name": c[0], "type": c[1]} for c in described], "row_count": row_count},
+                "row_count": row_count,
+                "sample": [dict(zip(columns, row)) for row in rows],
+            }
+        finally:
+            conn.close()
+
+    def read_sample(self, limit: int) -> List[Dict[str, Any]]:
+        """First ``limit`` rows of the converted file (blocking)"""
+        return self._describe_parquet(limit)["sample"]
+
+    def cleanup(self) -> None:
+        try:
+            if not self._raw.closed:
+                self._raw.close()
+        except Exception:
+            pass
+        if self._pipe is not None:
+            # Unblocks a converter still waiting for bytes that will never come
+            self._pipe.aborted = True
+            self._pipe.reader_closed = True
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def _preview_csv_head(head: bytes, delimiter: str, sample_rows: int = PREVIEW_ROWS) -> Dict[str, Any]:
+    """Schema (DuckDB types) and sample rows from the first bytes of a CSV (blocking)"""
+    import duckdb
+    import pyarrow.csv as pacsv
+
+    table = pacsv.read_csv(io.BytesIO(head), parse_options=pacsv.ParseOptions(delimiter=delimiter))
+    conn = duckdb.connect()
+    try:
+        conn.register("_aiser_upload_head", table)
+        described = conn.execute("DESCRIBE _aiser_upload_head").fetchall()
+        columns = [c[0] for c in described]
+        rows = conn.execute(f"SELECT * FROM _aiser_upload_head LIMIT {int(sample_rows)}").fetchall()
+    finally:
+        conn.close()
+    return {
+        "columns": [{"name": c[0], "type": c[1]} for c in described],
+        "sample": [dict(zip(columns, row)) for row in rows],
+        "rows_parsed": table.num_rows,
+        "delimiter": delimiter,
+    }
+
+
+class MultipartFileStream:
+    """Incremental multipart/form-data reader yielding one file field's bytes.
+
+    ``start()`` reads until the file part's headers (collecting any form
+    fields sent before it); ``chunks()`` then yields file data as it arrives.
+    Fields sent after the file are available in ``fields`` once drained.
+    """
+
+    def __init__(self, request, file_field: str = "file", max_field_bytes: int = 64 * 1024):
+        try:
+            from python_multipart.multipart import MultipartParser, parse_options_header
+        except ImportError:  # python-multipart < 0.0.13
+            from multipart.multipart import MultipartParser, parse_options_header
+
+        self._parse_options_header = parse_options_header
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+            raise ValueError("Expected a multipart/form-data request with a boundary")
+
+        self.file_field = file_field
+        self.max_field_bytes = max_field_bytes
+        self.fields: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self._body = request.stream().__aiter__()
+        self._pending: Deque[bytes] = deque()
+        self._done = False
+        self._file_seen = False
+        self._part_headers: Dict[bytes, bytes] = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._part_name: Optional[str] = None
+        self._part_is_target = False
+        self._part_value = bytearray()
+        self._parser = MultipartParser(
+            params[b"boundary"],
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+                "on_header_field": lambda data, start, end: self._header_field.extend(data[start:end]),
+                "on_header_value": lambda data, start, end: self._header_value.extend(data[start:end]),
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+            },
+        )
+
+    def _on_part_begin(self) -> None:
+        self._part_headers = {}
+        self._part_name = None
+        self._part_is_target = False
+        self._part_value = bytearray()
+
+    def _on_header_end(self) -> None:
+        self._part_headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_headers_finished(self) -> None:
+        _, options = self._parse_options_header(self._part_headers.get(b"content-disposition", b""))
+        self._part_name = (options.get(b"name") or b"").decode("utf-8", errors="replace")
+        filename = options.get(b"filename")
+        if filename is not None and self._part_name == self.file_field and not self._file_seen:
+            self._file_seen = True
+            self._part_is_target = True
+            self.filename = os.path.basename(filename.decode("utf-8", errors="replace"))
+
+    def _on_part_data(self, data, start: int, end: int) -> None:
+        if self._part_is_target:
+            self._pending.append(bytes(data[start:end]))
+        elif len(self._part_value) < self.max_field_bytes:
+            self._part_value.extend(data[start:end][: self.max_field_bytes - len(self._part_value)])
+
+    def _on_part_end(self) -> None:
+        if not self._part_is_target and self._part_name:
+            self.fields[self._part_name] = self._part_value.decode("utf-8", errors="replace")
+
+    async def _pump(self) -> None:
+        try:
+            chunk = await self._body.__anext__()
+        except StopAsyncIteration:
+            self._done = True
+            self._parser.finalize()
+            return
+        if chunk:
+            self._parser.write(chunk)
+
+    async def start(self) -> "MultipartFileStream":
+        while self.filename is None and not self._done:
+            await self._pump()
+        if self.filename is None:
+            raise ValueError(f"File field '{self.file_field}' is missing from request")
+        return self
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            while self._pending:
+                yield self._pending.popleft()
+            if self._done:
+                return
+            await self._pump()
+
+
+async def iter_upload_file(upload_file, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Read a FastAPI UploadFile in chunks instead of ``await file.read()``"""
+    while True:
+        chunk = await upload_file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+class IngestEventStreamResponse(StreamingResponse):
+    """NDJSON event stream that does not listen for disconnects.
+
+    StreamingResponse normally reads ``receive`` concurrently to detect a
+    disconnect, which would swallow request body messages the ingest is
+    still consuming while preview events are sent.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -19,6 +19,8 @@ from fastapi import status
 import inspect
 import types
 
+from app.modules.queries.snapshot_store import snapshot_store, build_incremental_query, compute_watermark, serialize_watermark
+
 router = APIRouter(tags=["queries"])
 
 # Guard to prevent concurrent DDL execution in development mode which can
@@ -333,6 +335,70 @@ async def create_schedule(
     return {"success": True}
 
 
+async def _execute_snapshot_sql(data_source_id: Optional[str], sql: str, fresh: bool = False):
+    """Execute snapshot SQL against a data source and return the full result.
+
+    Returns (rows, columns, row_count, engine, execution_time). Creation runs
+    with query optimization (and its result cache); refreshes pass ``fresh``
+    so they bypass the cache and always see current data.
+    """
+    # Resolve data source info (uses existing service function)
+    from app.modules.data.services.data_connectivity_service import DataConnectivityService
+    data_service = DataConnectivityService()
+
+    # Resolve data source id as provided by the client
+    # Some test monkeypatches may replace the method with functions that
+    # return awaitables or async generators. Normalize here.
+    ds_maybe = data_service.get_data_source_by_id(data_source_id)
+    if inspect.isawaitable(ds_maybe):
+        ds = await ds_maybe
+    elif inspect.isasyncgen(ds_maybe) or isinstance(ds_maybe, types.AsyncGeneratorType):
+        # consume async generator
+        ds = None
+        async for item in ds_maybe:
+            ds = item
+            break
+    else:
+        ds = ds_maybe
+    if not ds:
+        # In test and some dev flows a data source may be provided by
+        # a mocked service rather than the DB. Be tolerant: if the
+        # data source record is missing, treat it as a generic
+        # database source so downstream execution path (multi-engine)
+        # can be used (tests often patch the multi-engine executor).
+        logger.warning(f"Data source {data_source_id} not found; falling back to synthetic database source")
+        ds = {"id": data_source_id, "type": "database"}
+    # If demo/file source without physical file, use connectivity_service parser
+    if ds.get('source') == 'demo_data' or ds.get('id','').startswith('demo_') or (ds.get('type') == 'file' and not ds.get('file_path')):
+        try:
+            exec_result = await data_service.execute_query_on_source(data_source_id, sql or '')
+        except Exception as qe:
+            raise HTTPException(status_code=400, detail=f"Query execution failed: {qe}")
+        if not exec_result or not exec_result.get('success'):
+            raise HTTPException(status_code=400, detail=exec_result.get('error', 'Query execution failed'))
+        rows = exec_result.get('data', [])
+        columns = exec_result.get('columns') or ([] if not rows else list((rows[0] or {}).keys()))
+        return rows, columns, exec_result.get('total_rows', len(rows)), 'demo', None
+
+    # Use multi-engine execution path
+    from app.modules.data.services.multi_engine_query_service import MultiEngineQueryService
+    multi = MultiEngineQueryService()
+    exec_maybe = multi.execute_query(sql, ds, engine=None, optimization=not fresh)
+    exec_result = await exec_maybe if inspect.isawaitable(exec_maybe) else exec_maybe
+
+    if not exec_result.get('success'):
+        raise HTTPException(status_code=400, detail=exec_result.get('error', 'Query execution failed'))
+
+    # Results past the inline budget come back spilled: persist all rows, never a truncated set
+    from app.modules.data.services.result_spill import complete_rows
+    try:
+        rows = await asyncio.to_thread(complete_rows, exec_result)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=f"Snapshot not stored: {e}")
+    columns = exec_result.get('columns') or ([] if not rows else list(rows[0].keys()))
+    return rows, columns, len(rows), exec_result.get('engine'), exec_result.get('execution_time')
+
+
 @router.post("/snapshots")
 async def create_snapshot(
     request_body: Dict[str, Any] = Body(...),
@@ -341,7 +407,11 @@ async def create_snapshot(
     current_token: str = Depends(JWTCookieBearer()),
     db: AsyncSession = Depends(get_async_session)
 ):
-    """Create a query snapshot by executing SQL and persisting a small result set"""
+    """Create a query snapshot by executing SQL and persisting a preview plus the full columnar result.
+
+    Pass `incremental_column` (a monotonic timestamp or id column) to enable
+    delta refreshes via POST /snapshots/{id}/refresh.
+    """
     await ensure_tables(db)
     # Decode JWT to get user context. Tests may patch JWTCookieBearer to return
     # a dict directly instead of a token string, so accept both shapes.
@@ -409,6 +479,8 @@ async def create_snapshot(
     # results of ad-hoc/client-executed queries without re-executing on server.
     pre_rows = request.get("rows")
     pre_cols = request.get("columns")
+    # Optional monotonic column (timestamp or id) enabling incremental refresh
+    incremental_column = request.get("incremental_column") or None
 
     if not sql and not pre_rows:
         raise HTTPException(status_code=400, detail="sql or rows are required")
@@ -419,66 +491,23 @@ async def create_snapshot(
     try:
         if pre_rows:
             # Use provided results directly
+            full_rows = pre_rows
             rows = pre_rows[:preview_rows]
             columns = pre_cols or ([] if not rows else list((rows[0] or {}).keys()))
             row_count = len(rows)
             exec_engine = 'client'
             exec_time = None
         else:
-            # Resolve data source info (uses existing service function)
-            from app.modules.data.services.data_connectivity_service import DataConnectivityService
-            data_service = DataConnectivityService()
-
-            # Resolve data source id as provided by the client
-            # Some test monkeypatches may replace the method with functions that
-            # return awaitables or async generators. Normalize here.
-            ds_maybe = data_service.get_data_source_by_id(data_source_id)
-            if inspect.isawaitable(ds_maybe):
-                ds = await ds_maybe
-            elif inspect.isasyncgen(ds_maybe) or isinstance(ds_maybe, types.AsyncGeneratorType):
-                # consume async generator
-                ds = None
-                async for item in ds_maybe:
-                    ds = item
-                    break
-            else:
-                ds = ds_maybe
-            if not ds:
-                # In test and some dev flows a data source may be provided by
-                # a mocked service rather than the DB. Be tolerant: if the
-                # data source record is missing, treat it as a generic
-                # database source so downstream execution path (multi-engine)
-                # can be used (tests often patch the multi-engine executor).
-                logger.warning(f"Data source {data_source_id} not found; falling back to synthetic database source")
-                ds = {"id": data_source_id, "type": "database"}
-            # If demo/file source without physical file, use connectivity_service parser
-            if ds.get('source') == 'demo_data' or ds.get('id','').startswith('demo_') or (ds.get('type') == 'file' and not ds.get('file_path')):
-                try:
-                    exec_result = await data_service.execute_query_on_source(data_source_id, sql or '')
-                except Exception as qe:
-                    raise HTTPException(status_code=400, detail=f"Query execution failed: {qe}")
-                if not exec_result or not exec_result.get('success'):
-                    raise HTTPException(status_code=400, detail=exec_result.get('error', 'Query execution failed'))
-                rows = exec_result.get('data', [])[:preview_rows]
-                columns = exec_result.get('columns') or ([] if not rows else list((rows[0] or {}).keys()))
-                row_count = exec_result.get('total_rows', len(rows))
-                exec_engine = 'demo'
-                exec_time = None
-            else:
-                # Use multi-engine execution path
-                from app.modules.data.services.multi_engine_query_service import MultiEngineQueryService
-                multi = MultiEngineQueryService()
-                exec_maybe = multi.execute_query(sql, ds, engine=None, optimization=True)
-                exec_result = await exec_maybe if inspect.isawaitable(exec_maybe) else exec_maybe
-
-                if not exec_result.get('success'):
-                    raise HTTPException(status_code=400, detail=exec_result.get('error', 'Query execution failed'))
-
-                rows = exec_result.get('data', [])[:preview_rows]
-                columns = exec_result.get('columns') or ([] if not rows else list(rows[0].keys()))
-                row_count = exec_result.get('row_count', len(rows))
-                exec_engine = exec_result.get('engine')
-                exec_time = exec_result.get('execution_time')
+            rows, columns, row_count, exec_engine, exec_time = await _execute_snapshot_sql(data_source_id, sql)
+            if incremental_column and rows and incremental_column not in columns:
+                raise HTTPException(status_code=400, detail=f"Incremental column '{incremental_column}' is not in the query result")
+            full_rows = rows
+            rows = rows[:preview_rows]
+
+        snapshot_metadata = {"engine": exec_engine, "execution_time": exec_time, "preview_rows": preview_rows}
+        if incremental_column:
+            snapshot_metadata["incremental_column"] = incremental_column
+            snapshot_metadata["watermark"] = serialize_watermark(compute_watermark(full_rows, incremental_column))
 
         # Persist snapshot
         # Enforce per-user snapshot size limit (rows stored)
@@ -514,7 +543,7 @@ async def create_snapshot(
                 cur = conn.cursor()
                 cur.execute(
                     "INSERT INTO query_snapshots (user_id, organization_id, project_id, name, data_source_id, sql, columns, rows, row_count, metadata, created_at, updated_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW()) RETURNING id",
-                    (user_id, organization_id, project_id, name, data_source_id, sql, json.dumps(columns), json.dumps(rows), row_count, json.dumps({"engine": exec_engine, "execution_time": exec_time}))
+                    (user_id, organization_id, project_id, name, data_source_id, sql, json.dumps(columns), json.dumps(rows), row_count, json.dumps(snapshot_metadata))
                 )
                 rid = cur.fetchone()
                 if rid:
@@ -554,7 +583,7 @@ async def create_snapshot(
                         "columns": json.dumps(columns),
                         "rows": json.dumps(rows),
                         "row_count": row_count,
-                        "metadata": json.dumps({"engine": exec_engine, "execution_time": exec_time})
+                        "metadata": json.dumps(snapshot_metadata)
                     })
                     row = res_ins.first()
                     new_id = row[0] if row else None
@@ -593,7 +622,7 @@ async def create_snapshot(
             "columns": json.dumps(columns),
             "rows": json.dumps(rows),
             "row_count": row_count,
-            "metadata": json.dumps({"engine": exec_engine, "execution_time": exec_time})
+            "metadata": json.dumps(snapshot_metadata)
         })
                     row = res_ins.first()
                     new_id = row[0] if row else None
@@ -617,7 +646,7 @@ async def create_snapshot(
                 cur = conn.cursor()
                 cur.execute(
                     "INSERT INTO query_snapshots (user_id, organization_id, project_id, name, data_source_id, sql, columns, rows, row_count, metadata, created_at, updated_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW()) RETURNING id",
-                    (user_id, organization_id, project_id, name, data_source_id, sql, json.dumps(columns), json.dumps(rows), row_count, json.dumps({"engine": exec_engine, "execution_time": exec_time}))
+                    (user_id, organization_id, project_id, name, data_source_id, sql, json.dumps(columns), json.dumps(rows), row_count, json.dumps(snapshot_metadata))
                 )
                 rid = cur.fetchone()
                 if rid:
@@ -641,6 +670,16 @@ async def create_snapshot(
                 new_id = new_id
         await db.commit()
 
+        # Keep the complete result in the columnar store so refreshes can
+        # append deltas instead of re-running the full query.
+        if new_id is not None and sql:
+            try:
+                stored = await asyncio.to_thread(snapshot_store.replace, new_id, full_rows, columns)
+                snapshot_metadata["storage"] = {"format": "parquet", "stored_rows": stored}
+                await _update_snapshot_metadata(new_id, snapshot_metadata)
+            except Exception as store_error:
+                logger.warning(f"⚠️ Failed to store full snapshot result for {new_id}: {store_error}")
+
         return {
             "success": True,
             "snapshot_id": new_id,
@@ -745,6 +784,7 @@ async def delete_snapshot(
         """
     ), {"snapshot_id": snapshot_id, "user_id": user_id, "org_id": organization_id, "proj_id": project_id})
     await db.commit()
+    await asyncio.to_thread(snapshot_store.delete, snapshot_id)
     return {"success": True, "message": "Snapshot deleted successfully"}
 
 
@@ -800,6 +840,135 @@ async def get_snapshot(snapshot_id: int,
     }
 
 
+async def _update_snapshot_metadata(snapshot_id: int, metadata: Dict[str, Any], extra: Optional[Dict[str, Any]] = None):
+    """Persist snapshot metadata (and optionally preview rows/row_count) on a dedicated connection"""
+    from app.db.session import async_engine
+    assignments = ["metadata = CAST(:metadata AS JSONB)", "updated_at = NOW()"]
+    params: Dict[str, Any] = {"id": snapshot_id, "metadata": json.dumps(metadata, default=str)}
+    for column, value in (extra or {}).items():
+        if column in ("columns", "rows"):
+            assignments.append(f"{column} = CAST(:{column} AS JSONB)")
+            params[column] = json.dumps(value, default=str)
+        else:
+            assignments.append(f"{column} = :{column}")
+            params[column] = value
+    async with async_engine.begin() as conn:
+        await conn.execute(text(f"UPDATE query_snapshots SET {', '.join(assignments)} WHERE id = :id"), params)
+
+
+@router.post("/snapshots/{snapshot_id}/refresh")
+async def refresh_snapshot(
+    snapshot_id: int,
+    request_body: Optional[Dict[str, Any]] = Body(None),
+    current_token: str = Depends(JWTCookieBearer()),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Refresh a snapshot. Body: { mode?: 'incremental' | 'full' }
+
+    Incremental mode (default when the snapshot declares an incremental_column)
+    only fetches rows past the stored watermark and appends them to the
+    columnar store; full mode re-executes the SQL and replaces the store.
+    """
+    await ensure_tables(db)
+    user_payload = _resolve_user_payload(current_token)
+    try:
+        user_id = int(user_payload.get("id") or user_payload.get('sub') or 1)
+    except Exception:
+        user_id = 1
+    res = await db.execute(text(
+        "SELECT data_source_id, sql, columns, row_count, metadata FROM query_snapshots WHERE id = :id AND user_id = :user_id LIMIT 1"
+    ), {"id": snapshot_id, "user_id": user_id})
+    row = res.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    data_source_id, sql, stored_columns, row_count, metadata = row
+    metadata = dict(metadata or {})
+    if not sql:
+        raise HTTPException(status_code=400, detail="Snapshot was created from client rows and cannot be refreshed")
+
+    incremental_column = metadata.get("incremental_column")
+    mode = ((request_body or {}).get("mode") or ("incremental" if incremental_column else "full")).lower()
+    if mode not in ("incremental", "full"):
+        raise HTTPException(status_code=400, detail="mode must be 'incremental' or 'full'")
+    if mode == "incremental" and not incremental_column:
+        raise HTTPException(status_code=400, detail="Snapshot has no incremental_column; use mode 'full'")
+
+    watermark = metadata.get("watermark")
+    # Fall back to a full refresh when there is nothing to append to
+    if mode == "incremental" and (watermark is None or not snapshot_store.exists(snapshot_id)):
+        mode = "full"
+
+    try:
+        preview_rows = int(metadata.get("preview_rows") or 100)
+        if mode == "incremental":
+            delta_sql = build_incremental_query(sql, incremental_column, watermark)
+            new_rows, columns, _, exec_engine, exec_time = await _execute_snapshot_sql(data_source_id, delta_sql, fresh=True)
+            appended = await asyncio.to_thread(snapshot_store.write_part, snapshot_id, new_rows, stored_columns or columns)
+            total_rows = int(row_count or 0) + appended
+            extra: Dict[str, Any] = {"row_count": total_rows}
+        else:
+            new_rows, columns, _, exec_engine, exec_time = await _execute_snapshot_sql(data_source_id, sql, fresh=True)
+            appended = await asyncio.to_thread(snapshot_store.replace, snapshot_id, new_rows, columns)
+            total_rows = len(new_rows)
+            watermark = None
+            extra = {"row_count": total_rows, "columns": columns, "rows": new_rows[:preview_rows]}
+
+        if incremental_column:
+            watermark = serialize_watermark(compute_watermark(new_rows, incremental_column, watermark))
+            metadata["watermark"] = watermark
+        metadata.update({
+            "engine": exec_engine,
+            "execution_time": exec_time,
+            "last_refresh_mode": mode,
+            "last_refreshed_at": datetime.utcnow().isoformat(),
+            "storage": {"format": "parquet", "stored_rows": total_rows},
+        })
+        await _update_snapshot_metadata(snapshot_id, metadata, extra)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Snapshot refresh failed for {snapshot_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "success": True,
+        "snapshot_id": snapshot_id,
+        "mode": mode,
+        "rows_added": appended,
+        "row_count": total_rows,
+        "watermark": watermark,
+    }
+
+
+@router.get("/snapshots/{snapshot_id}/data")
+async def get_snapshot_data(
+    snapshot_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    current_token: str = Depends(JWTCookieBearer()),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Page through the complete stored snapshot result (not only the preview)"""
+    await ensure_tables(db)
+    user_payload = _resolve_user_payload(current_token)
+    try:
+        user_id = int(user_payload.get("id") or user_payload.get('sub') or 1)
+    except Exception:
+        user_id = 1
+    res = await db.execute(text(
+        "SELECT columns, rows, row_count FROM query_snapshots WHERE id = :id AND user_id = :user_id LIMIT 1"
+    ), {"id": snapshot_id, "user_id": user_id})
+    row = res.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    if not snapshot_store.exists(snapshot_id):
+        # Legacy snapshots only have the JSONB preview
+        preview = (row[1] or [])[offset:offset + limit]
+        return {"success": True, "columns": row[0], "rows": preview, "total_rows": len(row[1] or []), "offset": offset, "limit": limit}
+    page = await asyncio.to_thread(snapshot_store.read, snapshot_id, offset, limit)
+    return {"success": True, **page, "offset": offset, "limit": limit}
+
+
 # --- Compatibility endpoints registered under legacy prefix `/api/queries/*` ---
 # Some tests and external callers include this router without a prefix and still
 # call endpoints under `/api/queries/...`. Provide thin wrappers to maintain
@@ -895,10 +1064,14 @@ async def perform_snapshot_cleanup(db: AsyncSession, retention_days: int = 30, o
             res = await db.execute(text("DELETE FROM query_snapshots WHERE created_at < :cutoff RETURNING id"), {"cutoff": cutoff})
         # res.fetchall may not be available for all engines; try to get rowcount
         try:
-            deleted = len(res.fetchall())
+            deleted_ids = [r[0] for r in res.fetchall()]
+            deleted = len(deleted_ids)
         except Exception:
+            deleted_ids = []
             deleted = getattr(res, 'rowcount', 0) or 0
         await db.commit()
+        for snapshot_id in deleted_ids:
+            await asyncio.to_thread(snapshot_store.delete, snapshot_id)
         _logger.info(f"✅ Snapshot cleanup removed {deleted} rows (retention_days={retention_days}, org={organization_id})")
         return deleted
     except Exception as e:
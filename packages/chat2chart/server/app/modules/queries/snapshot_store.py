@@ -0,0 +1,197 @@
+"""
+Columnar Snapshot Store
+Keeps the complete result of a query snapshot as parquet parts on disk so a
+refresh can append only new rows (incremental mode) instead of re-running and
+re-storing the full query.
+"""
+
+import glob
+import logging
+import os
+import shutil
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Insertion sequence stored with every row so pages come back in a stable order
+ROW_SEQ_COLUMN = "_aiser_row"
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a column identifier for use in generated SQL"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def sql_literal(value: Any) -> str:
+    """Render a watermark value as a SQL literal"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def build_incremental_query(sql: str, column: str, watermark: Any) -> str:
+    """Wrap the snapshot SQL so only rows past the stored watermark are fetched.
+
+    The snapshot column must be monotonic (append-only timestamp or id): rows
+    are selected with a strict ``>`` so nothing already stored is re-fetched.
+    """
+    base_sql = (sql or "").strip().rstrip(";")
+    if watermark is None:
+        return base_sql
+    return (
+        f"SELECT * FROM ({base_sql}) AS _aiser_snapshot "
+        f"WHERE {quote_identifier(column)} > {sql_literal(watermark)}"
+    )
+
+
+def compute_watermark(rows: List[Dict[str, Any]], column: str, current: Any = None) -> Any:
+    """Return the highest value of ``column`` across rows and the current watermark"""
+    watermark = current
+    for row in rows or []:
+        value = (row or {}).get(column)
+        if value is None:
+            continue
+        try:
+            if watermark is None or value > watermark:
+                watermark = value
+        except TypeError:
+            # Mixed types (e.g. stored ISO string vs datetime) - compare as text
+            if str(value) > str(watermark):
+                watermark = value
+    return watermark
+
+
+def serialize_watermark(value: Any) -> Any:
+    """Make a watermark JSON-serializable for snapshot metadata"""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+class SnapshotStore:
+    """Parquet-backed storage for full snapshot results (one directory per snapshot)"""
+
+    def __init__(self, base_dir: Optional[str] = None, max_parts: Optional[int] = None):
+        self.base_dir = base_dir or settings.SNAPSHOT_STORAGE_DIR
+        self.max_parts = max_parts or settings.SNAPSHOT_MAX_PARTS
+
+    def _snapshot_dir(self, snapshot_id: Any) -> str:
+        return os.path.join(self.base_dir, str(snapshot_id))
+
+    def _parts(self, snapshot_id: Any) -> List[str]:
+        return sorted(glob.glob(os.path.join(self._snapshot_dir(snapshot_id), "part-*.parquet")))
+
+    def exists(self, snapshot_id: Any) -> bool:
+        return len(self._parts(snapshot_id)) > 0
+
+    def write_part(self, snapshot_id: Any, rows: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> int:
+        """Append rows as a new parquet part; returns the number of rows written"""
+        if not rows:
+            return 0
+        snapshot_dir = self._snapshot_dir(snapshot_id)
+        os.makedirs(snapshot_dir, exist_ok=True)
+        cols = columns or list((rows[0] or {}).keys())
+        existing = self._parts(snapshot_id)
+        start = sum(pq.ParquetFile(part).metadata.num_rows for part in existing)
+        table = pa.Table.from_pylist([{c: (r or {}).get(c) for c in cols} for r in rows])
+        table = table.append_column(ROW_SEQ_COLUMN, pa.array(range(start, start + len(rows)), pa.int64()))
+        next_index = 0
+        if existing:
+            next_index = int(os.path.basename(existing[-1])[5:10]) + 1
+        part_path = os.path.join(snapshot_dir, f"part-{next_index:05d}.parquet")
+        # Write to a temp name first so readers never see a partial part
+        tmp_path = part_path + ".tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, part_path)
+        logger.info(f"📦 Snapshot {snapshot_id}: wrote {len(rows)} rows to {os.path.basename(part_path)}")
+        if len(existing) + 1 > self.max_parts:
+            self.compact(snapshot_id)
+        return len(rows)
+
+    def replace(self, snapshot_id: Any, rows: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> int:
+        """Drop any stored parts and store rows as the full result"""
+        self.delete(snapshot_id)
+        return self.write_part(snapshot_id, rows, columns)
+
+    def delete(self, snapshot_id: Any) -> None:
+        shutil.rmtree(self._snapshot_dir(snapshot_id), ignore_errors=True)
+
+    def compact(self, snapshot_id: Any) -> None:
+        """Merge all parts into a single parquet file.
+
+        The merged file is written in full and swapped in over the first part
+        before the remaining parts are removed, so a failed write never loses
+        stored rows.
+        """
+        parts = self._parts(snapshot_id)
+        if len(parts) <= 1:
+            return
+        snapshot_dir = self._snapshot_dir(snapshot_id)
+        merged_tmp = os.path.join(snapshot_dir, "compacted.parquet.tmp")
+        conn = duckdb.connect()
+        try:
+            conn.execute(
+                f"COPY (SELECT * FROM read_parquet({self._glob_literal(snapshot_id)}, union_by_name=true) "
+                f"ORDER BY {quote_identifier(ROW_SEQ_COLUMN)}) "
+                f"TO '{merged_tmp.replace(chr(39), chr(39) * 2)}' (FORMAT PARQUET, COMPRESSION ZSTD)"
+            )
+        finally:
+            conn.close()
+        os.replace(merged_tmp, parts[0])
+        for part in parts[1:]:
+            os.unlink(part)
+        logger.info(f"🗜️ Snapshot {snapshot_id}: compacted {len(parts)} parts")
+
+    def _glob_literal(self, snapshot_id: Any) -> str:
+        pattern = os.path.join(self._snapshot_dir(snapshot_id), "part-*.parquet")
+        return "'" + pattern.replace("'", "''") + "'"
+
+    def count(self, snapshot_id: Any) -> int:
+        if not self.exists(snapshot_id):
+            return 0
+        conn = duckdb.connect()
+        try:
+            return conn.execute(
+                f"SELECT COUNT(*) FROM read_parquet({self._glob_literal(snapshot_id)}, union_by_name=true)"
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def read(self, snapshot_id: Any, offset: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """Read a page of the stored snapshot result"""
+        if not self.exists(snapshot_id):
+            return {"columns": [], "rows": [], "total_rows": 0}
+        conn = duckdb.connect()
+        try:
+            source = f"read_parquet({self._glob_literal(snapshot_id)}, union_by_name=true)"
+            total = conn.execute(f"SELECT COUNT(*) FROM {source}").fetchone()[0]
+            seq = quote_identifier(ROW_SEQ_COLUMN)
+            cur = conn.execute(
+                f"SELECT * EXCLUDE ({seq}) FROM {source} ORDER BY {seq} LIMIT {int(limit)} OFFSET {int(offset)}"
+            )
+            columns = [d[0] for d in cur.description] if cur.description else []
+            rows = [dict(zip(columns, r)) for r in cur.fetchall()]
+            return {"columns": columns, "rows": rows, "total_rows": total}
+        finally:
+            conn.close()
+
+
+snapshot_store = SnapshotStore()
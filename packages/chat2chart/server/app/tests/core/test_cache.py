@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+from app.core.cache import AsyncRedisCache, decode_value, encode_value
+
+
+def test_encode_decode_round_trip_and_legacy_json():
+    small = {"rows": [1, 2, 3], "name": "q"}
+    large = {"rows": [{"id": i, "value": "x" * 20} for i in range(200)]}
+
+    assert decode_value(encode_value(small)) == small
+    encoded_large = encode_value(large, compress_min_bytes=1024)
+    assert decode_value(encoded_large) == large
+    assert len(encoded_large) < len(json.dumps(large))
+    # Values written by the sync client are plain JSON
+    assert decode_value(json.dumps(small).encode()) == small
+
+
+def test_async_cache_falls_back_to_memory_without_redis():
+    async def run():
+        cache = AsyncRedisCache(redis_url="redis://127.0.0.1:1/0", retry_interval=60)
+        await cache.set_many({"qe:a": 1, "qe:b": {"x": 2}, "conv:c": 3}, ttl=60)
+        assert await cache.get_many(["qe:a", "qe:b", "missing"]) == {"qe:a": 1, "qe:b": {"x": 2}}
+        assert await cache.clear_pattern("qe:*") == 2
+        assert await cache.get("qe:a") is None
+        assert await cache.get("conv:c") == 3
+        assert cache.get_cache_stats()["redis_connected"] is False
+
+    asyncio.run(run())
+
+
+class _RecordingRedis:
+    """Just enough of redis.asyncio.Redis to see which keys the async cache touches"""
+
+    def __init__(self):
+        self.store = {}
+
+    async def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+
+def test_async_cache_keeps_its_binary_values_out_of_the_sync_keyspace():
+    async def run():
+        cache = AsyncRedisCache(redis_url="redis://127.0.0.1:1/0")
+        cache.redis_client = _RecordingRedis()
+        await cache.set("qe:a", {"rows": [1]}, ttl=60)
+        assert list(cache.redis_client.store) == ["acache:qe:a"]
+        assert await cache.get("qe:a") == {"rows": [1]}
+        assert await cache.get_many(["qe:a", "qe:b"]) == {"qe:a": {"rows": [1]}}
+
+    asyncio.run(run())
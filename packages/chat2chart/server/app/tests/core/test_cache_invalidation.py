@@ -0,0 +1,46 @@
+import asyncio
+import gc
+import json
+
+from app.core.cache_invalidation import CacheTagRegistry, data_source_tag, tags_for_data_source
+
+
+class _Tier:
+    def __init__(self):
+        self.store = {}
+
+    def evict(self, keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+
+def test_invalidate_fans_out_across_tiers_by_tag():
+    registry = CacheTagRegistry()
+    queries, schemas = _Tier(), _Tier()
+    registry.register_tier("queries", queries.evict)
+    registry.register_tier("schemas", schemas.evict)
+
+    queries.store.update({"q1": 1, "q2": 2})
+    schemas.store["s1"] = "schema"
+    registry.tag("queries", "q1", tags_for_data_source({"id": "ds1", "organization_id": "o1"}))
+    registry.tag("queries", "q2", [data_source_tag("ds2")])
+    registry.tag("schemas", "s1", [data_source_tag("ds1")])
+
+    assert registry.invalidate_local(data_source_tag("ds1")) == 2
+    assert queries.store == {"q2": 2}
+    assert schemas.store == {}
+    # Remote broadcasts from this worker are ignored; others are applied
+    assert registry.handle_message(json.dumps({"origin": registry.worker_id, "tags": ["ds:ds2"]})) == 0
+    assert registry.handle_message(json.dumps({"origin": "other", "tags": ["ds:ds2"]})) == 1
+    assert queries.store == {}
+
+
+def test_registry_does_not_keep_tier_instances_alive():
+    registry = CacheTagRegistry()
+    tier = _Tier()
+    registry.register_tier("short_lived", tier.evict)
+    registry.tag("short_lived", "k", ["ds:x"])
+    del tier
+    gc.collect()
+    assert registry.get_stats()["tiers"] == 0
+    assert asyncio.run(registry.invalidate("ds:x", broadcast=False)) == 0
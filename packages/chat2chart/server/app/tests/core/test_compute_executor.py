@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+import duckdb
+import pytest
+
+from app.core.compute_executor import (
+    ComputeCancelled,
+    ComputeExecutor,
+    ComputeContextMiddleware,
+    FairScheduler,
+    current_tenant,
+    set_request_context,
+)
+from app.core.compute_tasks import load_json_file
+
+
+def test_scheduler_round_robins_between_tenants():
+    async def scenario():
+        scheduler = FairScheduler(slots=1, per_tenant=1)
+        order = []
+
+        async def job(tenant, label):
+            await scheduler.acquire(tenant)
+            order.append(label)
+            await asyncio.sleep(0)
+            scheduler.release(tenant)
+
+        await scheduler.acquire("busy")  # hold the only slot while work queues up
+        tasks = [asyncio.ensure_future(job("a", f"a{i}")) for i in range(3)]
+        tasks.append(asyncio.ensure_future(job("b", "b0")))
+        await asyncio.sleep(0)
+        assert scheduler.snapshot()["queued"] == 4
+        scheduler.release("busy")
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["a0", "b0", "a1", "a2"]
+
+
+def test_per_tenant_cap_limits_concurrency():
+    executor = ComputeExecutor(thread_workers=4, process_workers=0, max_per_tenant=2)
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def work():
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return True
+
+    async def scenario():
+        return await asyncio.gather(*(executor.run_duckdb(work, tenant="t1") for _ in range(6)))
+
+    try:
+        assert all(asyncio.run(scenario()))
+        assert active["peak"] == 2
+        stats = executor.get_stats()["duckdb"]
+        assert stats["completed"] == 6 and stats["running"] == 0 and stats["queued"] == 0
+    finally:
+        executor.shutdown(wait=True)
+
+
+def test_disconnect_interrupts_running_duckdb_query():
+    executor = ComputeExecutor(thread_workers=2, process_workers=0)
+    conn = duckdb.connect()
+
+    async def scenario():
+        disconnected = asyncio.Event()
+        set_request_context("t1", disconnected)
+        asyncio.get_running_loop().call_later(0.2, disconnected.set)
+        slow = "SELECT COUNT(*) FROM range(10000000000) a, range(1000) b"
+        await executor.run_duckdb(lambda: conn.execute(slow).fetchall(), interrupt=conn)
+
+    try:
+        with pytest.raises(ComputeCancelled):
+            asyncio.run(scenario())
+        assert executor.get_stats()["duckdb"]["cancelled"] == 1
+    finally:
+        executor.shutdown(wait=True)
+        conn.close()
+
+
+def test_cpu_work_runs_in_process_pool(tmp_path):
+    path = tmp_path / "rows.json"
+    path.write_text('[{"a": 1}, {"a": 2}]')
+    executor = ComputeExecutor(thread_workers=1, process_workers=1)
+    try:
+        assert asyncio.run(executor.run_cpu(load_json_file, str(path))) == [{"a": 1}, {"a": 2}]
+        assert executor.get_stats()["cpu"]["backend"] == "processes"
+    finally:
+        executor.shutdown(wait=True)
+
+
+def test_tenant_comes_from_the_authenticated_principal_not_the_header():
+    import httpx
+    from fastapi import Depends, FastAPI
+
+    from app.modules.authentication.deps.auth_bearer import JWTCookieBearer
+
+    app = FastAPI()
+    app.add_middleware(ComputeContextMiddleware)
+
+    @app.get("/public")
+    async def public():
+        return {"tenant": current_tenant()}
+
+    @app.get("/private")
+    async def private(user=Depends(JWTCookieBearer())):
+        return {"tenant": current_tenant()}
+
+    async def scenario():
+        spoofed = {"X-Tenant-ID": "someone-else"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            public_response = await client.get("/public", headers=spoofed)
+            private_response = await client.get("/private", headers={**spoofed, "Authorization": "test-token"})
+        return public_response.json(), private_response.json()
+
+    assert asyncio.run(scenario()) == ({"tenant": "anonymous"}, {"tenant": "1"})
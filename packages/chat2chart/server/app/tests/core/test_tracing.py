@@ -0,0 +1,65 @@
+import asyncio
+
+from app.core.tracing import (
+    LatencyHistogram,
+    StageLatencyRegistry,
+    client_trace_id,
+    current_trace,
+    span,
+    start_trace,
+    traced,
+)
+
+
+def test_histogram_percentiles_within_relative_error():
+    hist = LatencyHistogram()
+    for value in range(1, 1001):
+        hist.record(float(value))
+    summary = hist.summary()
+    assert summary["count"] == 1000
+    assert abs(summary["p50_ms"] - 500) / 500 < 0.05
+    assert abs(summary["p99_ms"] - 990) / 990 < 0.05
+    assert summary["max_ms"] == 1000
+
+
+def test_spans_are_recorded_on_the_request_trace():
+    @traced("query_execution")
+    async def run_query():
+        await asyncio.sleep(0)
+        return "ok"
+
+    async def handler():
+        trace = start_trace()
+        with span("llm_call") as s:
+            s.set(total_tokens=42)
+        assert await run_query() == "ok"
+        return trace
+
+    trace = asyncio.run(handler())
+    assert [s.name for s in trace.spans] == ["llm_call", "query_execution"]
+    header = trace.server_timing_header()
+    assert header.startswith("llm_call;dur=")
+    assert 'desc="tokens=42"' in header
+
+    registry = StageLatencyRegistry()
+    registry.record_trace(trace)
+    assert set(registry.report()) == {"llm_call", "query_execution"}
+
+
+def test_span_without_trace_is_noop():
+    assert current_trace() is None
+    with span("auth"):
+        pass
+
+
+def test_client_trace_ids_are_validated_and_never_become_the_trace_id():
+    assert client_trace_id("req-42.a:b_c") == "req-42.a:b_c"
+    assert client_trace_id("x" * 129) is None
+    assert client_trace_id("bad id\r\nSet-Cookie: a=b") is None
+    assert client_trace_id(None) is None
+
+    async def handler():
+        return start_trace(client_trace_id="req-42")
+
+    trace = asyncio.run(handler())
+    assert trace.client_trace_id == "req-42" and trace.trace_id != "req-42" and len(trace.trace_id) == 32
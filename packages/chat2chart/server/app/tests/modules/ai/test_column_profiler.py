@@ -0,0 +1,56 @@
+import duckdb
+
+from app.modules.ai.utils.column_profiler import content_hash, profile_cache_key, profile_table
+
+
+def _conn_with_data(rows: int):
+    conn = duckdb.connect()
+    conn.execute(
+        f"""
+        CREATE TABLE data AS
+        SELECT i AS "id",
+               CASE WHEN i % 10 = 0 THEN NULL ELSE i * 1.5 END AS "amount",
+               CASE WHEN i % 3 = 0 THEN 'north' WHEN i % 3 = 1 THEN 'south' ELSE 'west' END AS "region name"
+        FROM range({rows}) t(i)
+        """
+    )
+    return conn
+
+
+def test_profile_small_table_is_exact_and_single_pass():
+    conn = _conn_with_data(1000)
+    profile = profile_table(conn, "data")
+    columns = {c["name"]: c for c in profile["columns"]}
+
+    assert profile["row_count"] == 1000
+    assert profile["profiling"]["sampled"] is False
+    assert profile["profiling"]["scans"] <= 2
+    assert columns["amount"]["null_count"] == 100
+    assert columns["amount"]["min"] == 1.5
+    assert set(columns["region name"]["sample_values"]) == {"north", "south", "west"}
+    assert abs(columns["id"]["distinct_count"] - 1000) / 1000 < 0.05
+
+
+def test_profile_large_table_samples_with_confidence():
+    conn = _conn_with_data(50_000)
+    profile = profile_table(conn, "data", sample_threshold=10_000, sample_rows=5_000)
+    columns = {c["name"]: c for c in profile["columns"]}
+    meta = profile["profiling"]
+
+    assert meta["sampled"] is True and meta["sample_rows"] == 5_000
+    assert 0 < meta["max_null_fraction_margin"] < 0.02
+    # Null fraction (10%) is scaled to the full table within the reported margin
+    assert abs(columns["amount"]["null_count"] / 50_000 - 0.1) <= columns["amount"]["null_fraction_margin"] * 2
+    assert columns["id"]["distinct_count"] > 40_000
+
+
+def test_content_hash_is_stable():
+    assert content_hash(content=b"a,b\n1,2\n") == content_hash(content=b"a,b\n1,2\n")
+    assert content_hash() is None
+
+
+def test_profile_cache_key_includes_table_and_sheet():
+    digest = content_hash(content=b"workbook")
+    keys = {profile_cache_key(digest, "xlsx", "data", 0), profile_cache_key(digest, "xlsx", "data", 1),
+            profile_cache_key(digest, "xlsx", "sheet_2", 1), profile_cache_key(digest, "csv")}
+    assert len(keys) == 4
@@ -0,0 +1,44 @@
+import asyncio
+
+from app.core.config import settings
+from app.modules.ai.services.schema_cache_service import SchemaCacheService
+
+
+def test_schemas_are_shared_and_revalidated_in_the_background(monkeypatch):
+    monkeypatch.setattr(settings, "SCHEMA_CACHE_FRESH_SECONDS", 0)
+    schema = {"tables": [{"name": "orders", "columns": [{"name": "id", "type": "INTEGER"}]}]}
+    calls = {"load": 0, "probe": 0}
+    token = {"value": "v1"}
+
+    async def load():
+        calls["load"] += 1
+        return dict(schema)
+
+    async def probe():
+        calls["probe"] += 1
+        return token["value"]
+
+    async def scenario():
+        worker_a, worker_b = SchemaCacheService(), SchemaCacheService()
+        first = await worker_a.get_or_load("ds_shared", load, probe=probe, kind="source")
+        await worker_a.set_formatted("ds_shared", "llm_prompt", "TABLE orders", kind="source")
+
+        # Another worker reads the shared entry; it is stale, so a probe runs behind the response
+        second = await worker_b.get_or_load("ds_shared", load, probe=probe, kind="source")
+        await asyncio.sleep(0.01)
+        formatted = await worker_b.get_formatted("ds_shared", "llm_prompt", kind="source")
+        after_probe = dict(calls)
+
+        schema["tables"] = schema["tables"] + [{"name": "customers", "columns": []}]
+        token["value"] = "v2"
+        stale = await worker_b.get_or_load("ds_shared", load, probe=probe, kind="source")
+        await asyncio.sleep(0.01)
+        refreshed = await worker_a.get_shared_schema("ds_shared", kind="source")
+        dropped = await worker_b.get_formatted("ds_shared", "llm_prompt", kind="source")
+        return first, second, formatted, after_probe, stale, refreshed, dropped, worker_b.get_stats()
+
+    first, second, formatted, after_probe, stale, refreshed, dropped, stats = asyncio.run(scenario())
+    assert first == second and formatted == "TABLE orders"
+    assert after_probe == {"load": 1, "probe": 2} and stats["shared_hits"] >= 1 and stats["probe_unchanged"] == 1
+    assert len(stale["tables"]) == 1  # served immediately while the change reloads
+    assert len(refreshed["tables"]) == 2 and dropped is None
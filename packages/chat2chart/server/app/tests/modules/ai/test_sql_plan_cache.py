@@ -0,0 +1,35 @@
+import asyncio
+
+from app.core.cache_invalidation import cache_tags, data_source_tag
+from app.modules.ai.services.sql_plan_cache import SQLPlanCache, parameterize_question
+
+
+def test_plans_are_reused_as_templates_and_dropped_with_the_source():
+    cache = SQLPlanCache()
+    sql = ("SELECT region, SUM(amount) AS total FROM sales "
+           "WHERE EXTRACT(MONTH FROM sale_date) = 3 AND channel = 'Online' GROUP BY region LIMIT 10")
+
+    async def scenario():
+        await cache.store("Sales by region for March via 'online'", "ds_plan", "h1", "postgresql", sql,
+                          sqlglot_dialect="postgres")
+        april = await cache.lookup("sales by region for April via 'Retail'?", "ds_plan", "h1", "postgresql")
+        other_schema = await cache.lookup("sales by region for April via 'Retail'", "ds_plan", "h2", "postgresql")
+
+        # 10 appears twice in the SQL, so the plan is kept for the exact question only
+        await cache.store("top 10 rows", "ds_plan", "h1", "postgresql", "SELECT * FROM t LIMIT 10 OFFSET 10",
+                          sqlglot_dialect="postgres")
+        same = await cache.lookup("Top 10 rows", "ds_plan", "h1", "postgresql")
+        different = await cache.lookup("top 20 rows", "ds_plan", "h1", "postgresql")
+
+        await cache_tags.invalidate(data_source_tag("ds_plan"))
+        dropped = await cache.lookup("sales by region for march via 'online'", "ds_plan", "h1", "postgresql")
+        return april, other_schema, same, different, dropped
+
+    april, other_schema, same, different, dropped = asyncio.run(scenario())
+    assert parameterize_question("Sales for March 2024?") == ("sales for <month> <num>", [("month", "March"), ("number", "2024")])
+    assert april["template"] and april["columns"] == ["region", "total"]
+    assert "EXTRACT(MONTH FROM sale_date) = 4" in april["sql"] and "channel = 'Retail'" in april["sql"]
+    assert "LIMIT 10" in april["sql"]
+    assert other_schema is None
+    assert same["sql"] == "SELECT * FROM t LIMIT 10 OFFSET 10" and not same["template"] and different is None
+    assert dropped is None
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.modules.ai.utils import stats_engine
+from app.modules.ai.utils.stats_engine import ColumnarStats
+
+
+def _rows(n: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    day = pd.Timestamp("2024-01-01")
+    rows = []
+    for i in range(n):
+        rows.append({
+            "date": (day + pd.Timedelta(days=i)).strftime("%Y-%m-%d"),
+            "sales": 100.0 + 2.0 * i + rng.normal(0, 5),
+            "cost": None if i % 7 == 3 else float(rng.normal(50, 10)),
+            "region": ["north", "south", "east"][i % 3],
+        })
+    return rows
+
+
+def test_statistics_match_pandas_reference():
+    rows = _rows(500)
+    rows[10]["sales"] = 10_000.0  # an obvious outlier
+    stats = ColumnarStats(rows)
+    frame = pd.DataFrame(rows)
+
+    assert stats.types == {"date": "date", "sales": "numeric", "cost": "numeric", "region": "categorical"}
+    summary = stats.numeric_summary()
+    assert summary["cost"]["count"] == frame["cost"].count()
+    assert summary["cost"]["mean"] == pytest.approx(frame["cost"].mean())
+    assert summary["cost"]["std_dev"] == pytest.approx(frame["cost"].std(ddof=0))
+    assert summary["sales"]["median"] == pytest.approx(frame["sales"].median())
+
+    # Pairwise-complete correlation, as pandas computes it
+    assert stats.correlations()["sales_vs_cost"] == pytest.approx(frame["sales"].corr(frame["cost"]))
+
+    trend = stats.trends()["sales_over_date"]
+    assert trend["direction"] == "upward" and trend["slope_per_day"] == pytest.approx(2.0, rel=0.2)
+    assert trend["first_half_avg"] < trend["second_half_avg"]
+
+    anomalies = stats.outliers()
+    assert anomalies["sales"]["outlier_indices"] == [10] and anomalies["sales"]["zscore_outlier_count"] == 1
+    assert stats.categorical_summary()["region"]["most_common"] == ("north", 167)
+
+
+def test_large_results_estimate_quantiles_from_a_sample(monkeypatch):
+    monkeypatch.setattr(stats_engine, "APPROX_QUANTILE_ROWS", 5_000)
+    monkeypatch.setattr(stats_engine, "QUANTILE_SAMPLE_ROWS", 2_000)
+    rows = [{"value": float(i)} for i in range(20_000)]
+    summary = ColumnarStats(rows).numeric_summary()["value"]
+
+    assert summary["median_approximate"] is True
+    assert summary["median"] == pytest.approx(9_999.5, rel=0.05)
+    assert summary["mean"] == 9_999.5 and summary["max"] == 19_999.0
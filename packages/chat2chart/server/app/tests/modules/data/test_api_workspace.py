@@ -0,0 +1,87 @@
+import asyncio
+
+import duckdb
+import pytest
+from aiohttp import web
+
+from app.modules.data.services import api_workspace as aw
+from app.modules.data.services import multi_engine_query_service as mes
+from app.modules.data.services.multi_engine_query_service import MultiEngineQueryService, QueryEngine
+
+ORDERS = [{"id": i, "region": "north" if i % 2 else "south", "amount": i * 10, "updated_at": f"2026-01-0{i}"}
+          for i in range(1, 6)]
+
+
+def test_api_source_is_fetched_once_and_refreshed_incrementally(tmp_path, monkeypatch):
+    manager = aw.ApiWorkspaceManager(workspace_dir=str(tmp_path / "ws"))
+    monkeypatch.setattr(mes, "api_workspace_manager", manager)
+    orders_data = [dict(r) for r in ORDERS]
+    requests = []
+
+    async def orders(request):
+        requests.append(dict(request.query))
+        since = request.query.get("since", "")
+        rows = [r for r in orders_data if r["updated_at"] > since]
+        page, size = int(request.query["page"]), int(request.query["page_size"])
+        return web.json_response({"payload": {"items": rows[(page - 1) * size:page * size]}})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get("/orders", orders)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        source = {"id": "api_orders", "type": "api", "connection_config": {
+            "url": f"http://127.0.0.1:{port}/orders",
+            "records_path": "payload.items",
+            "pagination": {"type": "page", "page_size": 2},
+            "incremental": {"field": "updated_at", "param": "since", "key": "id"},
+        }}
+        service = MultiEngineQueryService()
+        sql = "SELECT region, SUM(amount) AS total, COUNT(*) AS n FROM data GROUP BY 1 ORDER BY 1"
+        try:
+            first = await service.execute_query(sql, source, QueryEngine.PANDAS, optimization=False)
+            fetched = len(requests)
+            again = await service.execute_query('SELECT MAX(amount) AS top FROM "api_orders"', source, optimization=False)
+            cached_requests = len(requests)
+
+            orders_data[1] = {**orders_data[1], "amount": 1000, "updated_at": "2026-02-01"}
+            source["connection_config"]["refresh_ttl"] = 0.001
+            refreshed = await service.execute_query(sql, source, QueryEngine.DUCKDB, optimization=False)
+        finally:
+            manager.close()
+            await runner.cleanup()
+        return first, fetched, again, cached_requests, refreshed
+
+    first, fetched, again, cached_requests, refreshed = asyncio.run(scenario())
+    assert first["success"] and first["data"] == [
+        {"region": "north", "total": 90, "n": 3}, {"region": "south", "total": 60, "n": 2}
+    ]
+    assert fetched == 3 and [r["page"] for r in requests[:3]] == ["1", "2", "3"]
+    assert again["data"] == [{"top": 50}] and cached_requests == fetched
+    assert requests[-1]["since"] == "2026-01-05" and manager.stats["incremental"] == 1
+    assert refreshed["engine"] == "pandas" and refreshed["data"] == [
+        {"region": "north", "total": 90, "n": 3}, {"region": "south", "total": 1040, "n": 2}
+    ]
+
+
+def test_workspace_cursors_read_parts_but_no_host_files(tmp_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pq.write_table(pa.Table.from_pylist(ORDERS[:3]), str(tmp_path / "g000001-000000.parquet"))
+    pq.write_table(pa.Table.from_pylist([{**ORDERS[0], "amount": 99}]), str(tmp_path / "g000001-000001.parquet"))
+    workspace = aw.ApiWorkspace("k", str(tmp_path))
+    workspace.attach({"generation": 1, "parts": ["g000001-000000.parquet", "g000001-000001.parquet"],
+                      "incremental": {"key": "id"}}, ["api_orders"])
+    cursor = workspace.cursor()
+    try:
+        assert cursor.execute('SELECT id, amount FROM "api_orders" ORDER BY id').fetchall() == [(1, 99), (2, 20), (3, 30)]
+        for sql in ("SELECT * FROM read_csv_auto('/etc/hostname')", f"COPY data TO '{tmp_path / 'out.csv'}'"):
+            with pytest.raises(duckdb.Error, match="disabled"):
+                cursor.execute(sql)
+    finally:
+        cursor.close()
+        workspace.close()
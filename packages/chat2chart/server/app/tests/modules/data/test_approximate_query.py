@@ -0,0 +1,80 @@
+import asyncio
+import math
+
+import pytest
+
+from app.core.config import settings
+from app.modules.data.services import approximate_query as aq
+from app.modules.data.services.multi_engine_query_service import MultiEngineQueryService
+
+
+def _file_source(rows=60_000):
+    # "rare" holds 0.5% of the rows; stratification must still sample it well
+    data = [
+        {"region": "rare" if i % 200 == 0 else ("north" if i % 2 else "south"), "amount": float(i % 100)}
+        for i in range(rows)
+    ]
+    return {"id": "file_77", "type": "file", "format": "csv", "file_path": "user_files/u/77", "data": data}
+
+
+@pytest.fixture
+def small_thresholds(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "APPROX_MIN_ROWS", 10_000)
+    monkeypatch.setattr(settings, "APPROX_SAMPLE_TARGET_ROWS", 3_000)
+    monkeypatch.setattr(settings, "APPROX_MIN_STRATUM_ROWS", 400)
+    monkeypatch.setattr(aq, "sample_store", aq.StratifiedSampleStore(str(tmp_path / "samples")))
+
+
+def test_plan_rejects_queries_a_sample_cannot_answer():
+    for sql in (
+        "SELECT COUNT(DISTINCT a) FROM t",
+        "SELECT a, SUM(b) FROM t GROUP BY a HAVING SUM(b) > 10",
+        "SELECT t.a, COUNT(*) FROM t JOIN u ON t.id = u.id GROUP BY t.a",
+        "SELECT a, SUM(b) / COUNT(*) FROM t GROUP BY a",
+        "SELECT a, b FROM t",
+    ):
+        with pytest.raises(aq.ApproximationNotApplicable):
+            aq.plan_approximate_query(sql, weight_column=aq.WEIGHT_COLUMN)
+
+    plan = aq.plan_approximate_query(
+        "SELECT a, SUM(b) FROM events GROUP BY a ORDER BY SUM(b) DESC", "clickhouse", table_sample_percent=1
+    )
+    assert "SAMPLE 0.01" in plan.sql and 'ORDER BY "sum(b)" DESC' in plan.sql
+    assert plan.exact_sql == 'SELECT a, SUM(b) AS "sum(b)" FROM events GROUP BY a ORDER BY SUM(b) DESC'
+
+
+def test_stratified_estimates_cover_the_exact_answer(small_thresholds):
+    service = MultiEngineQueryService()
+    source = _file_source()
+    query = "SELECT region, COUNT(*) AS n, SUM(amount) AS total, AVG(amount) AS mean FROM sales GROUP BY region ORDER BY region"
+
+    result = asyncio.run(service.execute_approximate(query, source))
+    exact = {r["region"]: r for r in asyncio.run(service.execute_query(query, source, optimization=False))["data"]}
+
+    approximation = result["approximation"]
+    assert result["approximate"] and approximation["strata_column"] == "region"
+    assert approximation["sample_rows"] < 6_000 and approximation["unreliable_groups"] == 0
+    assert result["columns"] == ["region", "n", "total", "mean"]
+    for row, info in zip(result["data"], approximation["error_bounds"]):
+        for column in ("n", "total", "mean"):
+            bound = info["bounds"][column]
+            # four standard errors: effectively never fails by chance
+            margin = (bound["high"] - bound["estimate"]) / aq.Z_95 * 4
+            assert math.isclose(row[column], exact[row["region"]][column], abs_tol=margin + 1e-9)
+    rare = next(info for row, info in zip(result["data"], approximation["error_bounds"]) if row["region"] == "rare")
+    assert rare["bounds"]["n"]["relative_error"] == 0  # the small stratum is kept whole
+
+
+def test_small_sources_and_refine_fall_back_to_exact(small_thresholds):
+    service = MultiEngineQueryService()
+    small = dict(_file_source(rows=500), id="file_78", file_path="user_files/u/78")
+    result = asyncio.run(service.execute_approximate("SELECT COUNT(*) AS n FROM data", small))
+    assert result["approximate"] is False and result["data"] == [{"n": 500}]
+
+    async def collect():
+        return [s async for s in service.refine_to_exact("SELECT region, COUNT(*) AS n FROM data GROUP BY region", _file_source())]
+
+    stages = asyncio.run(collect())
+    assert [s["final"] for s in stages] == [False] * (len(stages) - 1) + [True]
+    assert len(stages) >= 2 and "approximation" in stages[0]
+    assert sum(r["n"] for r in stages[-1]["data"]) == 60_000
@@ -0,0 +1,66 @@
+import asyncio
+
+import duckdb
+
+from app.modules.data.services import arrow_connectors as ac
+from app.modules.data.services.enterprise_connectors_service import (
+    ConnectionConfig,
+    ConnectorType,
+    EnterpriseConnectorsService,
+)
+
+
+def _warehouse(tmp_path, rows=100_000):
+    path = str(tmp_path / "warehouse.duckdb")
+    with duckdb.connect(path) as conn:
+        conn.execute(f"CREATE TABLE sales AS SELECT range AS id, range % 7 AS region, range * 1.5 AS amount FROM range({rows})")
+    return ConnectionConfig(connector_type=ConnectorType.POSTGRESQL, name="local", database=path, max_connections=2)
+
+
+def test_stream_enforces_budgets_cancels_and_reuses_pooled_clients(tmp_path):
+    config = _warehouse(tmp_path)
+    connector = ac.DuckDBArrowConnector()
+
+    async def scenario():
+        limited = connector.stream(config, "SELECT * FROM sales ORDER BY id", budget=ac.StreamBudget(max_rows=25_000),
+                                   batch_rows=10_000)
+        sizes = [batch.num_rows async for batch in limited]
+
+        by_bytes = connector.stream(config, "SELECT * FROM sales", budget=ac.StreamBudget(max_bytes=100_000),
+                                    batch_rows=2_048)
+        table = await by_bytes.to_table()
+
+        early = connector.stream(config, "SELECT * FROM sales", budget=ac.StreamBudget(), batch_rows=1_000)
+        async with early:
+            async for batch in early:
+                break
+
+        full = await connector.stream(config, "SELECT region, SUM(amount) AS total FROM sales GROUP BY 1").to_table()
+        return limited, sizes, by_bytes, table, early, full
+
+    limited, sizes, by_bytes, table, early, full = asyncio.run(scenario())
+    assert sizes == [10_000, 10_000, 5_000] and limited.truncated and not limited.cancelled
+    assert by_bytes.truncated and by_bytes.bytes <= 100_000 and table.num_rows == by_bytes.rows > 0
+    assert early.cancelled and early.rows <= 1_000 * (ac.QUEUE_DEPTH + 1)
+    assert full.num_rows == 7  # clients returned after truncation/cancel still run queries
+    assert connector.stats["reused"] >= 2 and connector.stats["opened"] <= 3
+    assert connector.close() >= 1
+
+
+def test_service_executes_and_extracts_through_the_arrow_interface(tmp_path, monkeypatch):
+    stand_in = ac.DuckDBArrowConnector()
+    monkeypatch.setitem(ac.ARROW_CONNECTORS, "postgresql", stand_in)
+    service = EnterpriseConnectorsService()
+    service.connections["pg_local"] = {"config": _warehouse(tmp_path, rows=10_000), "connection": {}}
+
+    async def scenario():
+        result = await service.execute_query("pg_local", "SELECT region, COUNT(*) AS n FROM sales GROUP BY 1 ORDER BY 1")
+        target = duckdb.connect()
+        extract = await service.extract_to_duckdb("pg_local", "SELECT * FROM sales WHERE region = 3", target, "sales_extract")
+        count = target.execute('SELECT COUNT(*), MIN(id) FROM sales_extract').fetchone()
+        return result, extract, count
+
+    result, extract, count = asyncio.run(scenario())
+    assert result.success and result.row_count == 7 and result.columns == ["region", "n"]
+    assert result.data[3] == {"region": 3, "n": 1_429} and result.metadata["stream"]["truncated"] is False
+    assert extract["success"] and extract["rows"] == 1_429 and count == (1_429, 3)
@@ -0,0 +1,54 @@
+import asyncio
+import math
+
+import numpy as np
+
+from app.modules.charts.utils import data_reduction as dr
+from app.modules.data.services.multi_engine_query_service import MultiEngineQueryService
+
+
+def _series(n):
+    return [{"t": i, "v": math.sin(i / 500) * 100 + (500 if i == n // 3 else 0)} for i in range(n)]
+
+
+def test_in_memory_reductions_keep_the_shape_of_the_data():
+    rows = _series(50_000)
+    for method in ("auto", "m4"):
+        reduced = dr.reduce_rows(rows, dr.ReductionSpec("line", x="t", y=["v"], method=method, max_points=400))
+        kept = reduced["rows"]
+        assert len(kept) <= 400 and reduced["reduction"]["input_rows"] == 50_000
+        assert kept[0]["t"] == 0 and kept[-1]["t"] == 49_999
+        assert max(r["v"] for r in kept) == max(r["v"] for r in rows)  # the spike survives
+
+    points = [{"x": float(i % 97), "y": float(i % 89)} for i in range(10_000)]
+    binned = dr.reduce_rows(points, dr.ReductionSpec("scatter", x="x", y=["y"], max_points=1000, bins=10))
+    assert binned["reduction"]["method"] == "bin" and len(binned["rows"]) <= 100
+    assert sum(r[dr.BIN_COUNT_FIELD] for r in binned["rows"]) == 10_000
+
+    bars = [{"c": f"c{i % 30}", "v": i % 30} for i in range(300)]
+    top = dr.reduce_rows(bars, dr.ReductionSpec("bar", x="c", y=["v"], max_categories=5))["rows"]
+    assert [r["c"] for r in top] == ["c29", "c28", "c27", "c26", dr.OTHER_LABEL]
+    assert sum(r["v"] for r in top) == sum(r["v"] for r in bars)
+
+    small = dr.reduce_rows(bars[:10], dr.ReductionSpec("bar", x="c", y=["v"]))
+    assert small["reduction"] is None and small["rows"] == bars[:10]
+
+
+def test_file_source_pushes_the_reduction_down_to_sql():
+    service = MultiEngineQueryService()
+    source = {"id": "file_chart_1", "type": "file", "format": "csv", "data": _series(20_000)}
+    spec = dr.ReductionSpec.from_options({"chart_type": "line", "x": "t", "y": "v", "max_points": 400})
+
+    result = asyncio.run(service.execute_chart_query("SELECT t, v FROM data", source, spec, optimization=False))
+    assert result["success"] and result["reduction"]["pushed_down"] and result["reduction"]["method"] == "m4"
+    ts = [r["t"] for r in result["data"]]
+    assert len(ts) <= 400 and ts == sorted(ts) and ts[0] == 0 and ts[-1] == 19_999
+    assert max(r["v"] for r in result["data"]) == max(r["v"] for r in source["data"])
+
+    bar = dr.ReductionSpec.from_options({"chart_type": "bar", "max_categories": 4}, x="c", y=["n"])
+    grouped = asyncio.run(service.execute_chart_query(
+        "WITH b AS (SELECT CAST(t % 10 AS VARCHAR) AS c, 1 AS n FROM data) SELECT c, n FROM b", source, bar,
+        optimization=False,
+    ))
+    assert grouped["success"] and [r["c"] for r in grouped["data"]][-1] == dr.OTHER_LABEL
+    assert np.isclose(sum(r["n"] for r in grouped["data"]), 20_000)
@@ -0,0 +1,77 @@
+import asyncio
+
+import duckdb
+import pyarrow as pa
+import pytest
+
+from app.modules.data.services.data_browser import BrowseError, BrowseRequest, DataBrowser
+
+
+@pytest.fixture
+def parquet_path(tmp_path):
+    path = str(tmp_path / "orders.parquet")
+    duckdb.connect().execute(
+        f"COPY (SELECT range AS id, range % 3 AS region, 'name_' || range AS name FROM range(25000)) "
+        f"TO '{path}' (FORMAT PARQUET)"
+    )
+    return path
+
+
+def test_cursor_pages_walk_a_filtered_sorted_projection(parquet_path, tmp_path):
+    browser = DataBrowser(cache_dir=str(tmp_path / "cache"))
+    params = dict(columns="id,name", sort="-id", filters=["region:eq:1", "id:lt:100"], limit=10)
+
+    async def walk():
+        pages, cursor = [], None
+        while True:
+            page = await browser.page(parquet_path, BrowseRequest.parse(cursor=cursor, **params))
+            pages.append(page)
+            cursor = page["next_cursor"]
+            if not cursor:
+                return pages
+
+    pages = asyncio.run(walk())
+    ids = [row["id"] for page in pages for row in page["data"]]
+    assert ids == [i for i in range(99, -1, -1) if i % 3 == 1]
+    assert pages[0]["total_rows"] == len(ids) and len(pages) == 4
+    assert [c["name"] for c in pages[0]["columns"]] == ["id", "name"]
+    assert not pages[-1]["has_more"]
+
+
+def test_bad_requests_are_rejected(parquet_path, tmp_path):
+    browser = DataBrowser(cache_dir=str(tmp_path / "cache"))
+    with pytest.raises(BrowseError):
+        asyncio.run(browser.page(parquet_path, BrowseRequest.parse(sort="missing", limit=5)))
+    with pytest.raises(BrowseError):
+        BrowseRequest.parse(filters=["id:like:1"])
+    cursor = asyncio.run(browser.page(parquet_path, BrowseRequest.parse(limit=5)))["next_cursor"]
+    with pytest.raises(BrowseError):
+        BrowseRequest.parse(sort="id", cursor=cursor)
+
+
+def test_arrow_stream_yields_all_selected_rows(parquet_path, tmp_path):
+    browser = DataBrowser(cache_dir=str(tmp_path / "cache"))
+
+    async def collect():
+        chunks = await browser.stream(parquet_path, BrowseRequest.parse(filters=["region:in:0,2"]), "arrow")
+        return b"".join([chunk async for chunk in chunks])
+
+    table = pa.ipc.open_stream(asyncio.run(collect())).read_all()
+    assert table.num_rows == sum(1 for i in range(25000) if i % 3 != 1)
+    assert table.column_names == ["id", "region", "name"]
+
+
+def test_sample_rows_are_browsable_without_a_stored_file(tmp_path):
+    browser = DataBrowser(cache_dir=str(tmp_path / "cache"))
+    source = {"id": "file_1", "sample_data": [{"a": i, "b": "x" if i % 2 else 1} for i in range(30)]}
+
+    async def scenario():
+        path = await browser.resolve_parquet(source, "user-1")
+        again = await browser.resolve_parquet(source, "user-1")
+        page = await browser.page(path, BrowseRequest.parse(sort="-a", limit=3))
+        return path, again, page
+
+    path, again, page = asyncio.run(scenario())
+    assert path == again
+    assert [row["a"] for row in page["data"]] == [29, 28, 27]
+    assert page["data"][1]["b"] == "1"
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime
+
+from app.core.cache_invalidation import cache_tags, data_source_tag
+from app.modules.data.services import data_source_catalog as dsc
+from app.modules.data.services.multi_engine_query_service import DuckDBEngine
+
+
+def _row(i, user="u1"):
+    return {
+        "id": f"file_{i}", "name": f"Source {i}", "type": "file", "format": "csv", "db_type": None, "size": 10,
+        "row_count": 2, "description": None, "file_path": None, "original_filename": f"s{i}.csv", "user_id": user,
+        "created_at": datetime(2024, 1, i), "updated_at": None, "is_active": True, "last_accessed": None,
+        "schema": {"columns": [{"name": "v"}]}, "sample_data": [{"v": i}, {"v": i * 10}], "connection_config": None,
+    }
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class _MappedRow:
+    def __init__(self, mapping):
+        self._mapping = mapping
+
+
+class _FakeSession:
+    """Answers catalog SELECTs from an in-memory table, honouring the id filter"""
+
+    def __init__(self, table, log):
+        self.table, self.log = table, log
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        columns = [c.name for c in stmt.selected_columns]
+        ids = next((v for v in stmt.compile().params.values() if isinstance(v, list)), None)
+        self.log.append(columns)
+        rows = [r for r in self.table if ids is None or r["id"] in ids]
+        return _Result([_MappedRow({c: r[c] for c in columns}) for r in rows])
+
+
+def _catalog(table):
+    log = []
+    return dsc.DataSourceCatalog(session_factory=lambda: _FakeSession(table, log)), log
+
+
+def test_get_many_batches_misses_caches_rows_and_is_evicted_by_tag():
+    table = [_row(i) for i in range(1, 6)]
+    catalog, log = _catalog(table)
+
+    async def scenario():
+        first = await catalog.get_many(["file_1", "file_2", "file_3", "missing"])
+        again = await catalog.get_many(["file_2", "file_3", "file_4"])
+        sample = await catalog.get_sample("file_2")
+        table[1] = dict(table[1], name="Renamed")
+        await cache_tags.invalidate(data_source_tag("file_2"))
+        renamed = await catalog.get("file_2")
+        return first, again, sample, renamed
+
+    first, again, sample, renamed = asyncio.run(scenario())
+    assert list(first) == ["file_1", "file_2", "file_3"]
+    assert first["file_1"]["created_at"] == "2024-01-01T00:00:00" and "sample_data" not in first["file_1"]
+    # Listing queries never select the heavy sample column; samples are loaded on request only
+    assert "sample_data" not in log[0] and "connection_config" not in log[0]
+    assert len(log) == 4  # first batch, file_4 only, the sample, the invalidated row
+    assert set(again) == {"file_2", "file_3", "file_4"}
+    assert sample == [{"v": 2}, {"v": 20}] and "sample_data" in log[2]
+    assert renamed["name"] == "Renamed"
+    assert catalog.stats["hits"] >= 2
+
+
+def test_duckdb_engine_loads_other_files_of_the_same_owner():
+    table = [_row(2), _row(3, user="someone_else")]
+    catalog, log = _catalog(table)
+    original = dsc.data_source_catalog._session_factory
+    dsc.data_source_catalog._session_factory = catalog._session_factory
+    try:
+        primary = {"id": "file_1", "type": "file", "format": "csv", "user_id": "u1", "data": [{"v": 1}, {"v": 5}]}
+        engine = DuckDBEngine()
+        result = asyncio.run(engine.execute(
+            'SELECT (SELECT SUM(v) FROM file_1) AS a, (SELECT SUM(v) FROM "file_2") AS b', primary, {}
+        ))
+        assert result["success"] and result["data"] == [{"a": 6, "b": 22}]
+        assert len(log) == 1  # the referenced file came from one catalog query
+
+        blocked = asyncio.run(engine.execute("SELECT SUM(v) FROM file_3", primary, {}))
+        assert not blocked["success"]
+    finally:
+        dsc.data_source_catalog._session_factory = original
+        dsc.data_source_catalog.invalidate("file_2")
+        dsc.data_source_catalog.invalidate("file_3")
@@ -0,0 +1,77 @@
+import asyncio
+import os
+
+import duckdb
+import pandas as pd
+import pytest
+
+from app.modules.data.services.excel_ingest import (
+    attach_columnar_sheets,
+    cleanup_workbook,
+    ingest_workbook,
+)
+
+
+def _workbook(path):
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        pd.DataFrame({"id": range(250), "amount": [i * 1.5 for i in range(250)]}).to_excel(
+            writer, sheet_name="Sales Q1", index=False
+        )
+        pd.DataFrame({"region": ["north", "south", "east"], "code": [1, "B", 3]}).to_excel(
+            writer, sheet_name="Regions", index=False
+        )
+
+
+def test_sheets_are_converted_once_with_counts_and_types(tmp_path):
+    path = str(tmp_path / "book.xlsx")
+    _workbook(path)
+
+    workbook = asyncio.run(ingest_workbook(path))
+    try:
+        sheets = {s["sheet"]: s for s in workbook["sheets"]}
+        assert set(sheets) == {"Sales Q1", "Regions"} and not workbook["failed"]
+        assert sheets["Sales Q1"]["table_name"] == "sheet_0_Sales_Q1"
+        assert sheets["Sales Q1"]["row_count"] == 250
+        assert [c["type"] for c in sheets["Sales Q1"]["columns"]] == ["BIGINT", "DOUBLE"]
+        # Mixed numbers and text in one column are kept as text instead of failing the sheet
+        assert sheets["Regions"]["columns"][1] == {"name": "code", "type": "VARCHAR"}
+        assert all(os.path.exists(s["path"]) for s in sheets.values())
+    finally:
+        cleanup_workbook(workbook)
+    assert not os.path.exists(workbook["work_dir"])
+
+
+def test_stored_sheets_attach_as_views(tmp_path):
+    path = str(tmp_path / "book.xlsx")
+    _workbook(path)
+    workbook = asyncio.run(ingest_workbook(path))
+    try:
+        schema = {
+            "table_name": workbook["sheets"][1]["table_name"],
+            "duckdb_tables": {s["sheet"]: s["table_name"] for s in workbook["sheets"]},
+            "columnar_sheets": {s["sheet"]: s["path"] for s in workbook["sheets"]},
+        }
+        conn = duckdb.connect()
+        assert attach_columnar_sheets(conn, schema, resolve_path=lambda key: key)
+        assert conn.execute("SELECT SUM(id) FROM sheet_0_Sales_Q1").fetchone()[0] == sum(range(250))
+        assert conn.execute("SELECT COUNT(*) FROM data").fetchone()[0] == 3
+
+        missing = dict(schema, columnar_sheets={"Regions": str(tmp_path / "gone.parquet")})
+        assert not attach_columnar_sheets(duckdb.connect(), missing, resolve_path=lambda key: key)
+    finally:
+        cleanup_workbook(workbook)
+
+
+def test_workbooks_are_parsed_with_calamine_when_installed(tmp_path):
+    pytest.importorskip("python_calamine")
+    path = str(tmp_path / "book.xlsx")
+    _workbook(path)
+
+    workbook = asyncio.run(ingest_workbook(path))
+    try:
+        sheets = {s["sheet"]: s for s in workbook["sheets"]}
+        assert workbook["engine"] == "calamine" and not workbook["failed"]
+        assert sheets["Sales Q1"]["row_count"] == 250 and sheets["Regions"]["row_count"] == 3
+        assert duckdb.sql(f"SELECT SUM(id) FROM '{sheets['Sales Q1']['path']}'").fetchone()[0] == sum(range(250))
+    finally:
+        cleanup_workbook(workbook)
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.modules.data.services.multi_engine_query_service import MultiEngineQueryService, QueryEngine
+from app.modules.data.services.result_spill import ResultBudget, complete_rows, spill_store
+
+
+def _budget(**overrides):
+    budget = ResultBudget(max_rows=1_000, max_bytes=10 * 1024 * 1024, spill_max_rows=50_000,
+                          spill_max_bytes=1024 * 1024 * 1024, timeout_seconds=30, batch_rows=2_000)
+    for key, value in overrides.items():
+        setattr(budget, key, value)
+    return budget
+
+
+def test_oversized_results_spill_to_pages_and_stop_at_the_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_SPILL_DIR", str(tmp_path / "spill"))
+    service = MultiEngineQueryService()
+    source = {"id": "inline", "type": "memory"}
+    sql = "SELECT range AS id, 'row ' || range::VARCHAR AS label, CASE WHEN range % 2 = 0 THEN range / 2 END AS v FROM range({n}) ORDER BY id"
+
+    async def scenario():
+        # The interrupted statement frees its compute slot on this loop while the next queries run
+        slow = await service.execute_query("SELECT COUNT(*) FROM range(100000000000)", source, QueryEngine.DUCKDB,
+                                           optimization=False, budget=_budget(timeout_seconds=0.3))
+        small = await service.execute_query(sql.format(n=500), source, QueryEngine.DUCKDB, optimization=False, budget=_budget())
+        big = await service.execute_query(sql.format(n=30_000), source, QueryEngine.DUCKDB, optimization=False, budget=_budget())
+        capped = await service.execute_query(sql.format(n=80_000), source, QueryEngine.DUCKDB, optimization=False, budget=_budget())
+        return small, big, capped, slow
+
+    small, big, capped, slow = asyncio.run(scenario())
+    assert small["row_count"] == 500 and "spill" not in small and len(small["data"]) == 500
+
+    assert big["row_count"] == 30_000 and len(big["data"]) == 1_000 and big["spill"]["rows"] == 30_000
+    page = spill_store.page(big["spill"]["handle"], offset=29_990, limit=50)
+    assert page["total_rows"] == 30_000 and page["row_count"] == 10 and not page["has_more"]
+    assert page["data"][-2:] == [{"id": 29_998, "label": "row 29998", "v": 14_999.0},
+                                 {"id": 29_999, "label": "row 29999", "v": None}]
+
+    assert capped["truncated"] and capped["row_count"] == 50_000
+    assert slow["success"] is False and slow["timed_out"]
+
+    # Callers that persist a result read the spill back (and release it); truncated results fail
+    rows = complete_rows(big)
+    assert len(rows) == 30_000 and rows[-1]["id"] == 29_999
+    assert not spill_store.page(big["spill"]["handle"])["success"]
+    with pytest.raises(ValueError):
+        complete_rows(capped)
+
+
+def test_direct_sql_fetches_in_batches_under_the_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_SPILL_DIR", str(tmp_path / "spill"))
+    url = f"sqlite:///{tmp_path / 'warehouse.db'}"
+    engine = sa.create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(sa.text("CREATE TABLE events (id INTEGER, kind TEXT)"))
+        conn.execute(sa.text("INSERT INTO events VALUES (:id, :kind)"), [{"id": i, "kind": f"k{i % 3}"} for i in range(5_000)])
+    engine.dispose()
+
+    source = {"id": "sqlite_src", "type": "database", "connection_info": {"uri": url, "db_type": "sqlite"}}
+    result = asyncio.run(MultiEngineQueryService().execute_query(
+        "SELECT id, kind FROM events ORDER BY id", source, QueryEngine.DIRECT_SQL, optimization=False,
+        budget=_budget(max_rows=100),
+    ))
+    assert result["success"] and result["row_count"] == 5_000 and len(result["data"]) == 100
+    assert spill_store.page(result["spill"]["handle"], offset=4_999)["data"] == [{"id": 4_999, "kind": "k1"}]
@@ -0,0 +1,93 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+from app.core.config import settings
+from app.modules.data.services import multi_engine_query_service as mq
+from app.modules.data.services import rollup_manager as rm
+
+
+def _file_source():
+    data = [
+        {"region": ["north", "south", "east"][i % 3], "channel": "web" if i % 4 else "store", "amount": i % 50, "qty": i % 7}
+        for i in range(3000)
+    ]
+    return {"id": "file_rollup_1", "type": "file", "format": "csv", "file_path": "user_files/u/rollup", "data": data}
+
+
+@pytest.fixture
+def small_rollups(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "ROLLUP_MIN_SOURCE_ROWS", 1000)
+    monkeypatch.setattr(settings, "ROLLUP_MIN_QUERY_COUNT", 2)
+    monkeypatch.setattr(rm.rollup_manager, "rollup_dir", str(tmp_path / "rollups"))
+
+
+def test_patterns_and_rewrite_reaggregate_the_rollup():
+    pattern = rm.extract_pattern(
+        "SELECT region, SUM(amount) AS total, AVG(qty), COUNT(*) FROM orders WHERE channel = 'web' "
+        "GROUP BY region ORDER BY total DESC",
+        "postgres",
+    )
+    assert pattern.table == "orders" and pattern.dimensions == ("channel", "region")
+    assert pattern.measure_map == {"amount": ("sum",), "qty": ("count", "sum")}
+    for sql in (
+        "SELECT region, COUNT(DISTINCT amount) FROM orders GROUP BY region",
+        "SELECT o.region, SUM(amount) FROM orders o JOIN r ON o.id = r.id GROUP BY o.region",
+        "SELECT region, SUM(amount * qty) FROM orders GROUP BY region",
+        "SELECT * FROM orders",
+    ):
+        assert rm.extract_pattern(sql, "postgres") is None
+
+    rollup = rm.plan_rollups(Counter({pattern: 3}), min_count=2)[0]
+    rollup.kind, rollup.location = "materialized_view", "public." + rollup.name
+    rewritten = rm.rewrite_for_rollup(
+        "SELECT region, SUM(amount) AS total, AVG(qty) FROM public.orders WHERE channel = 'web' GROUP BY region",
+        rollup,
+        "postgres",
+    )
+    assert rewritten is None  # table written differently than the rollup's
+    rewritten = rm.rewrite_for_rollup("SELECT region, COUNT(*), AVG(qty) FROM orders GROUP BY region", rollup, "postgres")
+    assert f"FROM public.{rollup.name}" in rewritten
+    assert 'COALESCE(SUM("__rollup_rows"), 0) AS "count(*)"' in rewritten
+    assert 'SUM("count__qty")' in rewritten
+
+
+def test_recurring_file_query_is_served_from_a_rollup(small_rollups):
+    source = _file_source()
+    service = mq.MultiEngineQueryService()
+    query = "SELECT region, SUM(amount) AS total, AVG(qty) AS avg_qty, COUNT(*) AS n FROM data GROUP BY region ORDER BY region"
+
+    async def scenario():
+        first = await service.execute_query(query, source, optimization=False)
+        await service.execute_query(query, source, optimization=False)
+        await asyncio.gather(*list(mq._background_tasks))
+        served = await service.execute_query(
+            "SELECT region, AVG(qty) AS avg_qty, SUM(amount) AS total, COUNT(*) AS n FROM data GROUP BY region ORDER BY region",
+            source,
+        )
+        return first, served
+
+    first, served = asyncio.run(scenario())
+    assert "rollup" not in first["query_analysis"]
+    assert served["query_analysis"]["rollup"]["rows"] == 3
+    for raw, rolled in zip(first["data"], served["data"]):
+        assert raw["region"] == rolled["region"] and raw["n"] == rolled["n"] and raw["total"] == rolled["total"]
+        assert rolled["avg_qty"] == pytest.approx(raw["avg_qty"])
+
+    status = rm.rollup_manager.status(source)
+    assert len(status["rollups"]) == 1 and status["patterns"][0]["count"] == 2
+
+
+def test_client_materialized_views_accept_only_one_read_only_select():
+    assert rm.qualified_view_name("daily_sales", "analytics") == "analytics.daily_sales"
+    for name, schema in (("v; DROP TABLE t", None), ("v", "public.x"), ("v", "x--")):
+        with pytest.raises(ValueError):
+            rm.qualified_view_name(name, schema)
+
+    select = rm.materialized_view_select("select region, sum(amount) from sales group by 1", "postgres")
+    assert select == "SELECT region, SUM(amount) FROM sales GROUP BY 1"
+    for sql in ("SELECT 1; DROP TABLE sales", "SELECT 1; SELECT 2", "DELETE FROM sales",
+                "WITH d AS (DELETE FROM sales RETURNING *) SELECT * FROM d", "EXPLAIN ANALYZE SELECT 1"):
+        with pytest.raises(ValueError):
+            rm.materialized_view_select(sql, "postgres")
@@ -0,0 +1,74 @@
+import asyncio
+
+from sqlalchemy import create_engine, event, text
+
+from app.modules.ai.services.schema_cache_service import SchemaCacheService
+from app.modules.data.services import schema_introspection as si
+
+# SQLite stands in for a warehouse: sqlite_master.sql is the DDL marker
+SQLITE = si.CatalogQueries(
+    objects="""SELECT 'main' AS table_schema, name AS table_name, type AS table_type,
+                      NULL AS row_estimate, sql AS ddl_version
+               FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'""",
+    columns="""SELECT 'main' AS table_schema, m.name AS table_name, p.name AS column_name, p.type AS data_type,
+                      CASE WHEN p."notnull" THEN 'NO' ELSE 'YES' END AS is_nullable, p.cid AS ordinal_position
+               FROM sqlite_master m, pragma_table_info(m.name) p WHERE m.type IN ('table', 'view')""",
+    primary_keys="""SELECT 'main' AS table_schema, m.name AS table_name, p.name AS column_name
+                    FROM sqlite_master m, pragma_table_info(m.name) p WHERE m.type = 'table' AND p.pk > 0""",
+    foreign_keys="""SELECT 'main' AS table_schema, m.name AS table_name, f."from" AS column_name,
+                           'main' AS ref_schema, f."table" AS ref_table, f."to" AS ref_column
+                    FROM sqlite_master m, pragma_foreign_key_list(m.name) f WHERE m.type = 'table'""",
+)
+
+
+def test_bulk_introspection_refreshes_only_changed_objects(tmp_path, monkeypatch):
+    monkeypatch.setitem(si.CATALOG_QUERIES, 'sqlite', SQLITE)
+    url = f"sqlite:///{tmp_path / 'warehouse.db'}"
+    statements = []
+
+    def engine_factory(engine_url):
+        engine = create_engine(engine_url)
+        event.listen(engine, "before_cursor_execute", lambda c, cur, stmt, *a: statements.append(stmt))
+        return engine
+
+    setup = create_engine(url)
+    with setup.begin() as conn:
+        conn.execute(text("CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT NOT NULL)"))
+        conn.execute(text("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER REFERENCES customers(id))"))
+        for i in range(30):
+            conn.execute(text(f"CREATE TABLE extra_{i} (v REAL)"))
+
+    cache = SchemaCacheService()
+    introspector = si.SchemaIntrospector(schema_cache=cache, engine_factory=engine_factory)
+    try:
+        first = asyncio.run(introspector.introspect('sqlite', url, 'ds_1'))
+        assert first['refresh']['mode'] == 'full' and len(first['tables']) == 32
+        assert len(statements) == 4  # objects, columns, primary keys, foreign keys for 32 tables
+        orders = next(t for t in first['tables'] if t['name'] == 'orders')
+        assert orders['primary_key'] == ['id'] and orders['columns'][0]['primary_key']
+        assert orders['foreign_keys'] == [
+            {'column': 'customer_id', 'ref_schema': 'main', 'ref_table': 'customers', 'ref_column': 'id'}
+        ]
+        assert cache.get_schema('ds_1')['tables'] == first['tables']
+
+        statements.clear()
+        unchanged = asyncio.run(introspector.introspect('sqlite', url, 'ds_1'))
+        assert unchanged['refresh']['mode'] == 'unchanged' and len(statements) == 1
+        assert unchanged['tables'] == first['tables']
+
+        with setup.begin() as conn:
+            conn.execute(text("ALTER TABLE customers ADD COLUMN email TEXT"))
+            conn.execute(text("DROP TABLE extra_0"))
+        statements.clear()
+        changed = asyncio.run(introspector.introspect('sqlite', url, 'ds_1'))
+        probe = changed['refresh'].pop('probe')
+        assert changed['refresh'] == {'mode': 'incremental', 'reread': 1, 'dropped': 1, 'queries': 4}
+        assert probe != unchanged['refresh']['probe'] and asyncio.run(introspector.probe('sqlite', url)) == probe
+        assert all(':tables' not in s and 'IN (' in s for s in statements[1:])
+        customers = next(t for t in changed['tables'] if t['name'] == 'customers')
+        assert [c['name'] for c in customers['columns']] == ['id', 'name', 'email']
+        assert not customers['columns'][1]['nullable']
+        assert len(changed['tables']) == 31 and cache.get_schema('ds_1')['tables'] == changed['tables']
+    finally:
+        introspector.close()
+        setup.dispose()
@@ -0,0 +1,71 @@
+import asyncio
+
+from app.modules.data.services.multi_engine_query_service import MultiEngineQueryService
+
+
+def _file_source():
+    rows = [{"region": r, "amount": i} for i, r in enumerate(["north", "south", "west"] * 20)]
+    return {"id": "file_123", "type": "file", "format": "csv", "data": rows}
+
+
+def test_execute_queries_shared_loads_once_and_keeps_order():
+    service = MultiEngineQueryService()
+    engine = service.engines[next(k for k in service.engines if k.value == "duckdb")]
+    loads = []
+    original = engine.open_shared_dataset
+
+    async def counting_open(data_source, max_parallel=4):
+        loads.append(max_parallel)
+        return await original(data_source, max_parallel)
+
+    engine.open_shared_dataset = counting_open
+    queries = [
+        "SELECT COUNT(*) AS n FROM data",
+        "SELECT region, SUM(amount) AS total FROM sales GROUP BY region ORDER BY region",
+        'SELECT MAX(amount) AS m FROM "file_123"',
+        "DELETE FROM data",
+    ]
+    results = asyncio.run(service.execute_queries_shared(queries, _file_source(), max_parallel=2))
+
+    assert len(loads) == 1
+    assert results[0]["data"] == [{"n": 60}]
+    # Unknown table names are rewritten to the loaded 'data' table
+    assert [r["region"] for r in results[1]["data"]] == ["north", "south", "west"]
+    assert results[2]["data"] == [{"m": 59}]
+    assert results[3]["success"] is False
+
+    # Second run is served from the query cache without reloading
+    again = asyncio.run(service.execute_queries_shared(queries[:3], _file_source(), max_parallel=2))
+    assert len(loads) == 1 and all(r.get("cached") for r in again)
+
+
+def test_spilled_shared_results_are_not_cached_as_complete(tmp_path, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "QUERY_RESULT_MAX_ROWS", 10)
+    monkeypatch.setattr(settings, "QUERY_SPILL_DIR", str(tmp_path / "spill"))
+    service = MultiEngineQueryService()
+    first = asyncio.run(service.execute_queries_shared(["SELECT * FROM data"], _file_source()))
+    again = asyncio.run(service.execute_queries_shared(["SELECT * FROM data"], _file_source()))
+    assert first[0]["spill"]["rows"] == 60 and len(first[0]["data"]) == 10
+    assert not again[0].get("cached") and again[0]["spill"]["rows"] == 60
+
+
+def test_shared_dataset_connection_is_sealed(tmp_path, monkeypatch):
+    from app.modules.data.services import multi_engine_query_service
+
+    monkeypatch.setattr(multi_engine_query_service, "_read_only_error", lambda query, dialect=None: None)
+    engine = MultiEngineQueryService().engines[multi_engine_query_service.QueryEngine.DUCKDB]
+
+    async def scenario():
+        async with await engine.open_shared_dataset(_file_source()) as dataset:
+            return await dataset.execute_many([
+                "SELECT COUNT(*) AS n FROM data",
+                "SELECT * FROM read_csv_auto('/etc/hostname')",
+                f"COPY data TO '{tmp_path / 'out.csv'}'",
+            ])
+
+    counted, scan, copy = asyncio.run(scenario())
+    assert counted["data"] == [{"n": 60}]
+    assert not scan["success"] and "disabled" in scan["error"]
+    assert not copy["success"] and not (tmp_path / "out.csv").exists()
@@ -0,0 +1,109 @@
+from app.modules.data.services.sql_pipeline import SQLPipeline
+
+
+def test_queries_are_parsed_once_and_rewritten_on_the_ast():
+    pipeline = SQLPipeline(max_entries=8)
+    sql = ("WITH recent AS (SELECT * FROM sales WHERE status = 'it''s  done') "
+           "SELECT sales.region, EXTRACT(YEAR FROM sales.sale_date) AS y, COUNT(*) FROM sales "
+           "JOIN recent r ON r.id = sales.id JOIN file_abc f ON f.id = sales.id GROUP BY 1, 2")
+
+    rebound = pipeline.compile(sql, read="duckdb", rebind_file_tables=True)
+    again = pipeline.compile(sql, read="duckdb", rebind_file_tables=True)
+    tree = pipeline.parse(sql, "duckdb")
+    assert again is rebound and pipeline.stats["parses"] == 1 and pipeline.stats["parse_hits"] == 1
+    assert rebound.rebound_tables == ["sales"] and rebound.file_references == ["file_abc"]
+    assert 'FROM "data" AS sales' in rebound.sql and "EXTRACT(YEAR FROM sales.sale_date)" in rebound.sql
+    assert "'it''s  done'" in rebound.sql and rebound.ctes == ["recent"]
+    assert rebound.facts["joins"] == 2 and rebound.facts["has_group_by"] and not rebound.facts["has_limit"]
+    assert tree.sql() != rebound.sql  # passes work on copies of the cached tree
+
+    untouched = pipeline.compile("select  a from t  -- keep", read="postgres")
+    assert untouched.sql == "select  a from t  -- keep" and untouched.tables == ["t"]
+    assert pipeline.compile("SELECT DATE_TRUNC('month', d) FROM t", read="postgres", write="clickhouse").sql == (
+        "SELECT DATE_TRUNC('MONTH', d) FROM t"
+    )
+
+    broken = pipeline.compile("SELECT FROM WHERE (", read="postgres")
+    assert not broken.parsed and broken.sql == "SELECT FROM WHERE (" and broken.errors
+
+
+def test_read_only_guard_parses_statements_instead_of_scanning_keywords(tmp_path):
+    import asyncio
+
+    import duckdb
+
+    from app.modules.data.services.multi_engine_query_service import DirectSQLEngine, DuckDBEngine
+    from app.modules.data.services.sql_pipeline import sql_pipeline
+
+    parquet = str(tmp_path / "events.parquet")
+    duckdb.sql(f"COPY (SELECT 1 AS id, DATE '2024-01-02' AS updated_at, 'ann' AS created_by) TO '{parquet}' (FORMAT parquet)")
+    database = {"type": "database", "id": "db_ro", "connection_info": {"uri": f"sqlite:///{tmp_path / 'app.db'}", "db_type": "sqlite"}}
+
+    async def scenario():
+        direct = DirectSQLEngine()
+        created = await direct.execute("CREATE TABLE users (id INTEGER, created_by TEXT)", database, {"allow_ddl": True})
+        on_file = await DuckDBEngine().execute_on_parquet("SELECT created_by, MAX(updated_at) FROM data GROUP BY 1", parquet, {"id": "ds"})
+        on_db = await direct.execute("SELECT created_by FROM users WHERE created_by <> 'deleted'", database, {})
+        blocked = await direct.execute("WITH d AS (DELETE FROM users RETURNING *) SELECT * FROM d", database, {})
+        return created, on_file, on_db, blocked
+
+    created, on_file, on_db, blocked = asyncio.run(scenario())
+    assert created["success"] and on_file["success"] and on_file["data"][0]["created_by"] == "ann"
+    assert on_db["success"] and not blocked["success"] and "DELETE is not allowed" in blocked["error"]
+    assert sql_pipeline.check_read_only("EXPLAIN (ANALYZE, FORMAT JSON) SELECT updated_at FROM t", "postgres").allowed
+    assert sql_pipeline.check_read_only("EXPLAIN ANALYZE UPDATE t SET a = 1", "postgres").modifies
+    assert not sql_pipeline.check_read_only("SELECT 1; DROP TABLE t").allowed
+    assert not sql_pipeline.check_read_only("SELECT * INTO backup FROM t", "postgres").allowed
+    assert sql_pipeline.check_read_only("SELECT a FROM t WHERE note = 'drop it' QUALIFY ::: x").allowed  # unparsable
+
+
+def test_duckdb_queries_cannot_read_host_files():
+    pipeline = SQLPipeline()
+    for sql in (
+        "SELECT * FROM read_csv_auto('/etc/passwd')",
+        "SELECT content FROM read_text('/etc/hostname')",
+        "SELECT * FROM data WHERE id IN (SELECT id FROM read_parquet('/tmp/x.parquet'))",
+        "SELECT * FROM glob('/*')",  # unparsable, caught by the text guard
+        "SELECT * FROM '/etc/passwd'",
+    ):
+        check = pipeline.check_read_only(sql, "duckdb")
+        assert not check.allowed and "reads files" in check.reason, sql
+    assert pipeline.check_read_only("SELECT * FROM data WHERE name GLOB 'a*'", "duckdb").allowed
+    assert pipeline.check_read_only("SELECT * FROM \"Sales Data\"", "duckdb").allowed
+
+
+def test_engines_reject_writes_even_past_the_statement_guard(tmp_path, monkeypatch):
+    import asyncio
+
+    import duckdb
+
+    from app.modules.data.services import multi_engine_query_service
+    from app.modules.data.services.multi_engine_query_service import DirectSQLEngine, DuckDBEngine
+
+    parquet = str(tmp_path / "events.parquet")
+    duckdb.sql(f"COPY (SELECT 1 AS id, 'ann' AS created_by) TO '{parquet}' (FORMAT parquet)")
+    monkeypatch.setattr(multi_engine_query_service, "_read_only_error", lambda query, dialect=None: None)
+    exported = tmp_path / "out.csv"
+
+    async def run(sql):
+        return await DuckDBEngine().execute_on_parquet(sql, parquet, {"id": "ds"})
+
+    database = {"type": "database", "id": "db_ro", "connection_info": {"uri": f"sqlite:///{tmp_path / 'app.db'}", "db_type": "sqlite"}}
+
+    async def scenario():
+        direct = DirectSQLEngine()
+        await direct.execute("CREATE TABLE users (id INTEGER)", database, {"allow_ddl": True})
+        db_write = await direct.execute("INSERT INTO users VALUES (1)", database, {})
+        return db_write, [await run(sql) for sql in (
+            "SELECT created_by FROM data",
+            f"COPY data TO '{exported}' (HEADER)",
+            "INSERT INTO data VALUES (2, 'bob')",
+            "SELECT * FROM read_csv_auto('/etc/hosts')",
+            "SET enable_external_access = true",
+        )]
+
+    db_write, (select, copy, write, scan, unlock) = asyncio.run(scenario())
+    assert not db_write["success"] and "readonly" in db_write["error"]
+    assert select["success"] and select["data"] == [{"created_by": "ann"}]
+    assert not copy["success"] and not exported.exists()
+    assert not write["success"] and not scan["success"] and not unlock["success"]
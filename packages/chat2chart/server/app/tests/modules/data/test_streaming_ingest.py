@@ -0,0 +1,106 @@
+import asyncio
+
+import pyarrow.parquet as pq
+
+from app.modules.data.services.streaming_ingest import MultipartFileStream, StreamingUploadIngest
+
+
+def _csv_chunks(rows: int, chunk_size: int = 4096):
+    body = "id;name;amount\n" + "".join(f"{i};name_{i};{i * 1.5}\n" for i in range(rows))
+    data = body.encode()
+    return [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+
+
+def test_preview_arrives_before_upload_finishes_and_parquet_is_complete():
+    async def scenario():
+        ingest = StreamingUploadIngest("csv", preview_bytes=8 * 1024)
+        try:
+            previews = []
+            for index, chunk in enumerate(_csv_chunks(50_000)):
+                preview = await ingest.feed(chunk)
+                if preview:
+                    previews.append((index, preview))
+            summary = await ingest.finish()
+            return previews, summary, pq.read_metadata(summary["parquet_path"]).num_rows
+        finally:
+            ingest.cleanup()
+
+    previews, summary, parquet_rows = asyncio.run(scenario())
+    assert len(previews) == 1
+    index, preview = previews[0]
+    assert index < 5
+    assert [c["name"] for c in preview["columns"]] == ["id", "name", "amount"]
+    assert preview["delimiter"] == ";" and preview["sample"][0]["name"] == "name_0"
+    assert summary["row_count"] == parquet_rows == 50_000
+    assert len(summary["content_hash"]) == 64
+
+
+def test_type_drift_after_first_block_falls_back_to_duckdb():
+    async def scenario():
+        ingest = StreamingUploadIngest("csv", delimiter=",", preview_bytes=1024)
+        try:
+            rows = "".join(f"{i},{i}\n" for i in range(200_000)) + "x,not-a-number\n"
+            await ingest.feed(b"a,b\n" + rows.encode())
+            return await ingest.finish()
+        finally:
+            ingest.cleanup()
+
+    summary = asyncio.run(scenario())
+    assert summary["row_count"] == 200_001
+    assert {c["type"] for c in summary["schema"]["columns"]} == {"VARCHAR"}
+
+
+class _FakeRequest:
+    def __init__(self, body: bytes, boundary: str, piece: int = 7):
+        self.headers = {"content-type": f"multipart/form-data; boundary={boundary}"}
+        self._pieces = [body[i:i + piece] for i in range(0, len(body), piece)]
+
+    async def stream(self):
+        for piece in self._pieces:
+            yield piece
+
+
+def test_multipart_stream_yields_file_bytes_and_fields():
+    boundary = "XyZ"
+    file_bytes = b"a,b\n1,2\n3,4\n"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"name\"\r\n\r\nSales\r\n"
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"sales.csv\"\r\n"
+        f"Content-Type: text/csv\r\n\r\n"
+    ).encode() + file_bytes + f"\r\n--{boundary}\r\nContent-Disposition: form-data; name=\"delimiter\"\r\n\r\n,\r\n--{boundary}--\r\n".encode()
+
+    async def scenario():
+        stream = await MultipartFileStream(_FakeRequest(body, boundary)).start()
+        received = b"".join([chunk async for chunk in stream.chunks()])
+        return stream, received
+
+    stream, received = asyncio.run(scenario())
+    assert stream.filename == "sales.csv"
+    assert received == file_bytes
+    assert stream.fields == {"name": "Sales", "delimiter": ","}
+
+
+def test_concurrent_uploads_up_to_the_worker_count_do_not_starve_previews(monkeypatch):
+    from app.core.compute_executor import ComputeExecutor
+    from app.modules.data.services import streaming_ingest
+
+    executor = ComputeExecutor(thread_workers=2, process_workers=0, max_per_tenant=2)
+    monkeypatch.setattr(streaming_ingest, "compute_executor", executor)
+
+    async def upload():
+        # the preview fires on the same feed that starts the converter, so both need the pool at once
+        ingest = StreamingUploadIngest("csv", preview_bytes=streaming_ingest.CHUNK_SIZE)
+        try:
+            previews = [p for chunk in _csv_chunks(300_000, chunk_size=64 * 1024) if (p := await ingest.feed(chunk))]
+            return previews, await ingest.finish()
+        finally:
+            ingest.cleanup()
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.gather(*(upload() for _ in range(executor.thread_workers))), 60)
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert all(len(previews) == 1 and summary["row_count"] == 300_000 for previews, summary in results)
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from app.modules.queries.snapshot_store import (
+    SnapshotStore,
+    build_incremental_query,
+    compute_watermark,
+    serialize_watermark,
+)
+
+
+def test_build_incremental_query_wraps_sql_with_watermark():
+    sql = build_incremental_query("SELECT * FROM events;", "created_at", "2024-01-01 00:00:00")
+    assert sql == (
+        "SELECT * FROM (SELECT * FROM events) AS _aiser_snapshot "
+        "WHERE \"created_at\" > '2024-01-01 00:00:00'"
+    )
+    # Without a watermark the original query runs unchanged
+    assert build_incremental_query("SELECT 1", "id", None) == "SELECT 1"
+    assert build_incremental_query("SELECT 1", "id", 41).endswith('"id" > 41')
+
+
+def test_compute_watermark_handles_mixed_types():
+    rows = [{"id": 3}, {"id": 7}, {"id": None}]
+    assert compute_watermark(rows, "id") == 7
+    assert compute_watermark(rows, "id", current=10) == 10
+    stored = serialize_watermark(datetime(2024, 1, 1, 12, 0))
+    assert compute_watermark([{"ts": datetime(2024, 1, 2)}], "ts", stored) == datetime(2024, 1, 2)
+
+
+def test_snapshot_store_appends_and_compacts(tmp_path):
+    store = SnapshotStore(base_dir=str(tmp_path), max_parts=2)
+    store.replace(1, [{"id": 1, "v": "a"}, {"id": 2, "v": "b"}])
+    store.write_part(1, [{"id": 3, "v": "c"}])
+    assert store.count(1) == 3
+    # Third part exceeds max_parts and triggers compaction into one file
+    store.write_part(1, [{"id": 4, "v": "d"}])
+    assert len(store._parts(1)) == 1
+    page = store.read(1, offset=1, limit=2)
+    assert page["total_rows"] == 4
+    assert page["columns"] == ["id", "v"]
+    # Pages follow insertion order across appends and compaction
+    assert [r["id"] for r in page["rows"]] == [2, 3]
+    assert [r["id"] for r in store.read(1, offset=3)["rows"]] == [4]
+
+    store.replace(1, [{"id": 9, "v": "z"}])
+    assert store.count(1) == 1
+    store.delete(1)
+    assert not store.exists(1)
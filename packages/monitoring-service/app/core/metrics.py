@@ -4,9 +4,11 @@ Production-ready monitoring for Aiser Platform
 """
 
 import time
+import json
 import asyncio
-from typing import Dict, List, Optional
-from datetime import datetime, timezone
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass
 from prometheus_client import (
     Counter,
@@ -19,7 +21,22 @@ import logging
 
 from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import (
+    select,
+    func,
+    and_,
+    insert,
+    MetaData,
+    Table,
+    Column,
+    BigInteger,
+    Integer,
+    Float,
+    String,
+    DateTime,
+    UniqueConstraint,
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 
 from app.core.database import get_async_session
 from app.models.metrics import MetricRecord, AlertRule, Alert
@@ -103,6 +120,55 @@ ERRORS_TOTAL = Counter(
     "errors_total", "Total errors", ["error_type", "component"], registry=REGISTRY
 )
 
+# Metrics pipeline health
+METRIC_POINTS_DROPPED = Counter(
+    "metric_points_dropped_total",
+    "Metric points dropped because the ring buffer was full",
+    registry=REGISTRY,
+)
+
+METRIC_FLUSH_DURATION = Histogram(
+    "metric_flush_duration_seconds",
+    "Time spent flushing buffered metric points",
+    registry=REGISTRY,
+)
+
+# Rollup tables (1m/1h) so long-range dashboards don't scan raw metric rows.
+# Rollups are aggregated from the stream at flush time and upserted, so each
+# flush touches one row per (metric, labels, bucket) instead of re-reading raw data.
+ROLLUP_METADATA = MetaData()
+
+
+def _rollup_table(name: str) -> Table:
+    return Table(
+        name,
+        ROLLUP_METADATA,
+        Column("id", BigInteger, primary_key=True, autoincrement=True),
+        Column("name", String(255), nullable=False),
+        Column("labels_key", String(1024), nullable=False),
+        Column("labels", JSONB, nullable=False),
+        Column("organization_id", String(255), nullable=False, default=""),
+        Column("project_id", String(255), nullable=False, default=""),
+        Column("bucket", DateTime(timezone=True), nullable=False, index=True),
+        Column("count", Integer, nullable=False),
+        Column("sum", Float, nullable=False),
+        Column("min", Float, nullable=False),
+        Column("max", Float, nullable=False),
+        UniqueConstraint(
+            "name", "labels_key", "organization_id", "project_id", "bucket",
+            name=f"uq_{name}_series_bucket",
+        ),
+    )
+
+
+METRIC_ROLLUP_1M = _rollup_table("metric_rollups_1m")
+METRIC_ROLLUP_1H = _rollup_table("metric_rollups_1h")
+
+ROLLUP_RESOLUTIONS = (
+    (METRIC_ROLLUP_1M, timedelta(minutes=1)),
+    (METRIC_ROLLUP_1H, timedelta(hours=1)),
+)
+
 
 @dataclass
 class MetricData:
@@ -116,32 +182,126 @@ class MetricData:
     project_id: Optional[str] = None
 
 
+class MetricRingBuffer:
+    """Bounded ring buffer for metric points.
+
+    Backed by ``collections.deque``: ``append``/``popleft`` are atomic under the
+    GIL, so producers (request handlers, the sampler) and the flusher never take
+    a lock. When full, the oldest point is overwritten and counted as dropped.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        self.capacity = capacity
+        self._points: deque = deque(maxlen=capacity)
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def append(self, point: MetricData) -> None:
+        if len(self._points) >= self.capacity:
+            METRIC_POINTS_DROPPED.inc()
+        self._points.append(point)
+
+    def drain(self, max_points: Optional[int] = None) -> List[MetricData]:
+        """Remove and return up to max_points buffered points (oldest first)"""
+        drained: List[MetricData] = []
+        limit = max_points or self.capacity
+        while len(drained) < limit:
+            try:
+                drained.append(self._points.popleft())
+            except IndexError:
+                break
+        return drained
+
+    def requeue(self, points: List[MetricData]) -> None:
+        """Put drained points back at the front after a failed flush.
+
+        Only the free capacity is refilled (newest of ``points`` kept); points
+        that no longer fit are counted as dropped.
+        """
+        free = max(0, self.capacity - len(self._points))
+        keep = points[len(points) - free:] if free < len(points) else points
+        if len(keep) < len(points):
+            METRIC_POINTS_DROPPED.inc(len(points) - len(keep))
+        self._points.extendleft(reversed(keep))
+
+    def clear(self) -> None:
+        self._points.clear()
+
+
+def _labels_key(labels: Dict[str, str]) -> str:
+    return json.dumps(labels or {}, sort_keys=True, separators=(",", ":"))
+
+
+def _bucket_start(ts: datetime, resolution: timedelta) -> datetime:
+    seconds = int(resolution.total_seconds())
+    epoch = int(ts.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+
+
+def aggregate_rollups(
+    points: List[MetricData], resolution: timedelta
+) -> List[Dict[str, Any]]:
+    """Aggregate points into count/sum/min/max rows per series and time bucket"""
+    buckets: Dict[Tuple[str, str, str, str, datetime], Dict[str, Any]] = {}
+    for point in points:
+        key = (
+            point.name,
+            _labels_key(point.labels),
+            point.organization_id or "",
+            point.project_id or "",
+            _bucket_start(point.timestamp, resolution),
+        )
+        row = buckets.get(key)
+        if row is None:
+            buckets[key] = {
+                "name": key[0],
+                "labels_key": key[1],
+                "labels": point.labels or {},
+                "organization_id": key[2],
+                "project_id": key[3],
+                "bucket": key[4],
+                "count": 1,
+                "sum": point.value,
+                "min": point.value,
+                "max": point.value,
+            }
+        else:
+            row["count"] += 1
+            row["sum"] += point.value
+            row["min"] = min(row["min"], point.value)
+            row["max"] = max(row["max"], point.value)
+    return list(buckets.values())
+
+
 class MetricsCollector:
     """Real metrics collection system"""
 
     def __init__(self):
-        self.metrics_buffer: List[MetricData] = []
-        self.buffer_size = 1000
+        self.buffer_size = 10000
+        self.flush_batch_size = 5000
         self.flush_interval = 30  # seconds
+        self.metrics_buffer = MetricRingBuffer(self.buffer_size)
+        self._rollup_tables_ready = False
+        # Prime psutil's CPU counters so later non-blocking calls return the
+        # utilisation since the previous sample instead of sleeping.
+        psutil.cpu_percent(interval=None)
 
     async def collect_system_metrics(self):
-        """Collect system-level metrics"""
+        """Collect system-level metrics without blocking the event loop"""
         try:
-            # CPU usage
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # CPU usage since the last sample (interval=None never sleeps)
+            cpu_percent = psutil.cpu_percent(interval=None)
             SYSTEM_CPU_USAGE.set(cpu_percent)
 
             # Memory usage
             memory = psutil.virtual_memory()
             SYSTEM_MEMORY_USAGE.set(memory.used)
 
-            # Disk usage
-            for partition in psutil.disk_partitions():
-                try:
-                    usage = psutil.disk_usage(partition.mountpoint)
-                    SYSTEM_DISK_USAGE.labels(device=partition.device).set(usage.used)
-                except PermissionError:
-                    continue
+            # Disk usage - statvfs on network mounts can stall, so run it off-loop
+            disk_usage = await asyncio.to_thread(self._sample_disk_usage)
+            for device, used in disk_usage:
+                SYSTEM_DISK_USAGE.labels(device=device).set(used)
 
         except Exception as e:
             logger.error(f"Error collecting system metrics: {e}")
@@ -149,6 +309,17 @@ class MetricsCollector:
                 error_type="system_metrics", component="collector"
             ).inc()
 
+    @staticmethod
+    def _sample_disk_usage() -> List[Tuple[str, int]]:
+        usage_by_device = []
+        for partition in psutil.disk_partitions():
+            try:
+                usage = psutil.disk_usage(partition.mountpoint)
+                usage_by_device.append((partition.device, usage.used))
+            except (PermissionError, OSError):
+                continue
+        return usage_by_device
+
     async def collect_business_metrics(self, session: AsyncSession):
         """Collect business-level metrics"""
         try:
@@ -186,49 +357,165 @@ class MetricsCollector:
         organization_id: str = None,
         project_id: str = None,
     ):
-        """Record a custom metric"""
-        metric_data = MetricData(
-            name=name,
-            value=value,
-            labels=labels or {},
-            timestamp=datetime.now(timezone.utc),
-            organization_id=organization_id,
-            project_id=project_id,
+        """Record a custom metric.
+
+        Only appends to the ring buffer; the collection loop flushes in bulk.
+        """
+        self.metrics_buffer.append(
+            MetricData(
+                name=name,
+                value=value,
+                labels=labels or {},
+                timestamp=datetime.now(timezone.utc),
+                organization_id=organization_id,
+                project_id=project_id,
+            )
         )
 
-        self.metrics_buffer.append(metric_data)
-
-        # Flush buffer if it's full
-        if len(self.metrics_buffer) >= self.buffer_size:
-            await self.flush_metrics()
-
     async def flush_metrics(self, session: AsyncSession = None):
-        """Flush metrics buffer to database"""
-        if not self.metrics_buffer:
+        """Flush buffered points to the database in bulk and update rollups"""
+        if not len(self.metrics_buffer) or session is None:
             return
 
-        try:
-            if session:
-                # Save to database
-                for metric_data in self.metrics_buffer:
-                    metric_record = MetricRecord(
-                        name=metric_data.name,
-                        value=metric_data.value,
-                        labels=metric_data.labels,
-                        timestamp=metric_data.timestamp,
-                        organization_id=metric_data.organization_id,
-                        project_id=metric_data.project_id,
-                    )
-                    session.add(metric_record)
-
+        start_time = time.time()
+        while len(self.metrics_buffer):
+            points = self.metrics_buffer.drain(self.flush_batch_size)
+            try:
+                await self._write_raw_points(session, points)
+                await self._write_rollups(session, points)
                 await session.commit()
+            except Exception as e:
+                logger.error(f"Error flushing {len(points)} metric points: {e}")
+                # Keep the batch for the next flush instead of discarding it
+                self.metrics_buffer.requeue(points)
+                ERRORS_TOTAL.labels(
+                    error_type="metrics_flush", component="collector"
+                ).inc()
+                try:
+                    await session.rollback()
+                except Exception:
+                    pass
+                break
+        METRIC_FLUSH_DURATION.observe(time.time() - start_time)
+
+    async def _write_raw_points(self, session: AsyncSession, points: List[MetricData]):
+        """Insert raw points with COPY on asyncpg, multi-row INSERT otherwise"""
+        records = [
+            {
+                "name": p.name,
+                "value": p.value,
+                "labels": p.labels,
+                "timestamp": p.timestamp,
+                "organization_id": p.organization_id,
+                "project_id": p.project_id,
+            }
+            for p in points
+        ]
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        driver_connection = getattr(raw, "driver_connection", None)
+        if hasattr(driver_connection, "copy_records_to_table"):
+            columns = list(records[0].keys())
+            await driver_connection.copy_records_to_table(
+                MetricRecord.__tablename__,
+                records=[
+                    tuple(
+                        json.dumps(r[c]) if c == "labels" else r[c] for c in columns
+                    )
+                    for r in records
+                ],
+                columns=columns,
+            )
+            return
+        # executemany with insertmanyvalues batches into multi-row INSERTs
+        await session.execute(insert(MetricRecord), records)
+
+    async def _write_rollups(self, session: AsyncSession, points: List[MetricData]):
+        """Upsert 1m/1h aggregates for the flushed points"""
+        if not self._rollup_tables_ready:
+            connection = await session.connection()
+            await connection.run_sync(ROLLUP_METADATA.create_all)
+            self._rollup_tables_ready = True
+
+        for table, resolution in ROLLUP_RESOLUTIONS:
+            rows = aggregate_rollups(points, resolution)
+            if not rows:
+                continue
+            stmt = pg_insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                constraint=f"uq_{table.name}_series_bucket",
+                set_={
+                    "count": table.c.count + stmt.excluded.count,
+                    "sum": table.c.sum + stmt.excluded.sum,
+                    "min": func.least(table.c.min, stmt.excluded.min),
+                    "max": func.greatest(table.c.max, stmt.excluded.max),
+                },
+            )
+            await session.execute(stmt)
 
-            # Clear buffer
-            self.metrics_buffer.clear()
+    async def query_metric_series(
+        self,
+        session: AsyncSession,
+        name: str,
+        start: datetime,
+        end: datetime,
+        labels: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """Return a time series, reading from the coarsest table that fits the range.
+
+        Ranges up to 6 hours read raw points, up to 7 days the 1m rollup, and
+        anything longer the 1h rollup.
+        """
+        span = end - start
+        if span <= timedelta(hours=6):
+            query = select(MetricRecord.timestamp, MetricRecord.value).where(
+                and_(
+                    MetricRecord.name == name,
+                    MetricRecord.timestamp >= start,
+                    MetricRecord.timestamp < end,
+                )
+            )
+            if labels is not None:
+                query = query.where(MetricRecord.labels == labels)
+            result = await session.execute(query.order_by(MetricRecord.timestamp))
+            return {
+                "resolution": "raw",
+                "points": [
+                    {"timestamp": ts.isoformat(), "value": value}
+                    for ts, value in result.all()
+                ],
+            }
 
-        except Exception as e:
-            logger.error(f"Error flushing metrics: {e}")
-            ERRORS_TOTAL.labels(error_type="metrics_flush", component="collector").inc()
+        table, resolution = (
+            ROLLUP_RESOLUTIONS[0] if span <= timedelta(days=7) else ROLLUP_RESOLUTIONS[1]
+        )
+        query = select(
+            table.c.bucket,
+            func.sum(table.c.sum) / func.sum(table.c.count),
+            func.min(table.c.min),
+            func.max(table.c.max),
+            func.sum(table.c.count),
+        ).where(
+            and_(table.c.name == name, table.c.bucket >= start, table.c.bucket < end)
+        )
+        if labels is not None:
+            query = query.where(table.c.labels_key == _labels_key(labels))
+        result = await session.execute(
+            query.group_by(table.c.bucket).order_by(table.c.bucket)
+        )
+        return {
+            "resolution": "1m" if resolution == timedelta(minutes=1) else "1h",
+            "points": [
+                {
+                    "timestamp": bucket.isoformat(),
+                    "avg": avg,
+                    "min": min_value,
+                    "max": max_value,
+                    "count": count,
+                }
+                for bucket, avg, min_value, max_value, count in result.all()
+            ],
+        }
 
 
 class AlertManager:
@@ -457,19 +744,26 @@ performance_monitor = PerformanceMonitor()
 
 
 # Background tasks
-async def metrics_collection_task():
-    """Background task for metrics collection"""
+async def metrics_collection_task(sample_interval: float = 5.0):
+    """Background task for metrics collection.
+
+    Samples system metrics every ``sample_interval`` seconds (non-blocking) and
+    flushes the buffer / checks alerts every ``flush_interval`` seconds.
+    """
+    last_flush = time.monotonic()
     while True:
         try:
             await metrics_collector.collect_system_metrics()
 
-            # Get database session for business metrics
-            async with get_async_session() as session:
-                await metrics_collector.collect_business_metrics(session)
-                await metrics_collector.flush_metrics(session)
-                await alert_manager.check_alerts(session)
+            if time.monotonic() - last_flush >= metrics_collector.flush_interval:
+                last_flush = time.monotonic()
+                # Get database session for business metrics
+                async with get_async_session() as session:
+                    await metrics_collector.collect_business_metrics(session)
+                    await metrics_collector.flush_metrics(session)
+                    await alert_manager.check_alerts(session)
 
-            await asyncio.sleep(30)  # Collect every 30 seconds
+            await asyncio.sleep(sample_interval)
 
         except Exception as e:
             logger.error(f"Error in metrics collection task: {e}")